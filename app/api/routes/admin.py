@@ -0,0 +1,86 @@
+"""
+Admin endpoints for runtime diagnostics.
+Lets operators profile a slow node without redeploying it.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.auth import get_current_admin
+from app.core.model_registry import get_model_entry, list_models
+from app.core.profiler import get_profiler
+from app.core.workers import worker_memory_report
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.post("/admin/profiler/start", summary="Start the sampling profiler")
+async def start_profiler(
+    seconds: float | None = Query(None, gt=0, description="Stop after this many seconds"),
+    requests: int | None = Query(None, gt=0, description="Stop after this many /api/predict or /api/chat requests"),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Start a profiling session for N seconds or the next N profiled requests.
+
+    Sessions are always capped at PROFILER_MAX_SECONDS so a forgotten
+    request-count session cannot keep sampling forever.
+    """
+    if seconds is None and requests is None:
+        raise HTTPException(status_code=400, detail="Provide 'seconds' or 'requests'")
+
+    max_seconds = settings.PROFILER_MAX_SECONDS
+    seconds = min(seconds, max_seconds) if seconds is not None else max_seconds
+
+    logger.info(f"Profiler session requested by {current_user.get('email')}")
+    return get_profiler().start(seconds=seconds, requests=requests)
+
+
+@router.post("/admin/profiler/stop", summary="Stop the sampling profiler")
+async def stop_profiler(current_user: dict = Depends(get_current_admin)):
+    """Stop the running profiling session, keeping its data."""
+    return get_profiler().stop()
+
+
+@router.get("/admin/profiler", summary="Download the collected profile")
+async def get_profile(
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed|traces)$"),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Return the current or last profile.
+
+    Formats:
+        speedscope: JSON loadable at https://www.speedscope.app
+        collapsed: Collapsed stacks for flamegraph tools
+        traces: Per-request time spent in traced service functions
+    """
+    profiler = get_profiler()
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    if format == "traces":
+        return profiler.report()
+    return profiler.speedscope()
+
+
+@router.get("/admin/workers", summary="Memory of each server worker")
+async def get_workers(current_user: dict = Depends(get_current_admin)):
+    """
+    Report RSS, PSS and shared/private memory of every worker process.
+
+    RSS counts the shared model pages in every worker; PSS divides them
+    among the workers sharing them, so a total PSS that grows by roughly
+    each worker's private memory confirms the model is still shared.
+    """
+    return worker_memory_report()
+
+
+@router.get("/admin/models", summary="Registered model artifacts")
+async def get_models(current_user: dict = Depends(get_current_admin)):
+    """
+    List the model artifacts in the registry with their reports, and the
+    entry of the model this server is configured to serve (if registered).
+    """
+    return {"serving": get_model_entry(settings.MODEL_NAME), "models": list_models()}
@@ -3,12 +3,14 @@ Chatbot endpoint for interactive explanation generation.
 Integrates GPT-based intelligence with fallback to rule-based responses.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.services.explanation import ExplanationService
 from app.services.gpt_service import get_gpt_service
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.core.chatbot import Chatbot
+from app.dependencies import get_explanation_service
 from app.core.disclaimer import get_disclaimer
+from app.core.serialization import FastJSONResponse, encode_response
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -25,13 +27,17 @@ gpt_service = get_gpt_service()
     summary="Interactive chatbot for tumor explanations",
     description="Chat with the bot to get human-readable explanations powered by GPT"
 )
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    explanation_service: ExplanationService = Depends(get_explanation_service)
+):
     """
     Interactive chatbot endpoint for explanations.
     Supports GPT-based responses with fallback to rule-based chatbot.
     
     Args:
         request: Chat request with user message and optional MRI prediction context
+        explanation_service: Shared explanation service
         
     Returns:
         ChatResponse: Bot response with explanation, source, and disclaimer
@@ -43,7 +49,7 @@ async def chat(request: ChatRequest):
         source = "fallback"
         
         if gpt_service.is_available():
-            logger.info(f"GPT service available, generating response for: {request.message[:50]}...")
+            logger.info("GPT service available, generating response for: %.50s...", request.message)
             
             # Call GPT service with prediction context
             gpt_result = await gpt_service.generate_response(
@@ -55,9 +61,9 @@ async def chat(request: ChatRequest):
             if gpt_result["source"] == "gpt":
                 response_text = gpt_result["reply"]
                 source = "gpt"
-                logger.info(f"GPT response generated successfully")
+                logger.info("GPT response generated successfully")
             else:
-                logger.warning(f"GPT generation failed: {gpt_result.get('error', 'Unknown error')}")
+                logger.warning("GPT generation failed: %s", gpt_result.get('error', 'Unknown error'))
         else:
             logger.info("GPT service not available, using fallback chatbot")
         
@@ -78,20 +84,20 @@ async def chat(request: ChatRequest):
             source = "fallback"
         
         # Generate explanation if needed
-        explanation_service = ExplanationService()
         explanation = explanation_service.explain_response(response_text)
         
-        logger.info(f"Chat response completed. Source: {source}, Message: {request.message[:50]}")
+        logger.info("Chat response completed. Source: %s, Message: %.50s", source, request.message)
         
-        return ChatResponse(
-            response=response_text,
-            explanation=explanation,
-            source=source,
-            disclaimer=get_disclaimer()
-        )
+        # Trusted internal result: skip response-model validation
+        return FastJSONResponse(encode_response(ChatResponse, {
+            "response": response_text,
+            "explanation": explanation,
+            "source": source,
+            "disclaimer": get_disclaimer()
+        }))
         
     except Exception as e:
-        logger.error(f"Error during chat: {str(e)}")
+        logger.error("Error during chat: %s", e)
         return ChatResponse(
             response="An error occurred while processing your request. Please try again with a different question.",
             explanation="If this error persists, please consult with a medical professional.",
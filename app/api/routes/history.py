@@ -0,0 +1,58 @@
+"""
+Prediction history endpoint.
+Lists the current user's stored predictions with cursor pagination.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from app.core.auth import get_current_user
+from app.dependencies import get_prediction_history
+from app.schemas.prediction import PredictionHistoryResponse
+from app.services.history import PredictionHistory
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.get(
+    "/predictions",
+    response_model=PredictionHistoryResponse,
+    summary="List my past predictions",
+    description="Newest first. Pass the returned next_cursor to fetch the following page."
+)
+async def list_predictions(
+    limit: int = Query(20, ge=1, description="Page size"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    label: str | None = Query(None, description="Only predictions with this top label"),
+    history: PredictionHistory = Depends(get_prediction_history),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Page through the current user's prediction history.
+    
+    Uses range-based (keyset) pagination on (created_at, _id), so every page
+    is an index range scan regardless of how deep it is.
+    
+    Args:
+        limit: Page size (capped at HISTORY_PAGE_SIZE_MAX)
+        cursor: Opaque cursor returned by the previous page
+        label: Optional top-label filter
+        history: Prediction history store
+        
+    Returns:
+        PredictionHistoryResponse: Items and the cursor of the next page
+        
+    Raises:
+        HTTPException: If the cursor is invalid or the database is unavailable
+    """
+    limit = min(limit, settings.HISTORY_PAGE_SIZE_MAX)
+    try:
+        # pymongo is blocking; keep the event loop free
+        return await run_in_threadpool(history.query, current_user["_id"], limit, cursor, label)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error fetching prediction history: %s", e)
+        raise HTTPException(status_code=503, detail="Prediction history is unavailable")
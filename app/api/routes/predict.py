@@ -3,22 +3,34 @@ Image prediction endpoint for brain tumor MRI analysis.
 Includes MRI image validation before running predictions.
 """
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query
+from starlette.concurrency import run_in_threadpool
 from PIL import Image
 from io import BytesIO
-from app.services.inference import InferenceService
-from app.schemas.prediction import PredictionResponse
+from app.services.inference import InferenceService, MEDICAL_ANALYSIS_JSON
+from app.services.study import StudyService, extract_study_archive
+from app.services.history import PredictionHistory
+from app.schemas.prediction import MedicalAnalysis, PredictionResponse, StudyPredictionResponse
+from app.core.serialization import FastJSONResponse, encode_response
+from app.core.single_flight import SingleFlight
 from app.core.disclaimer import get_disclaimer
-from app.dependencies import get_model_loader
-from app.core.model_loader import ModelLoader
+from app.dependencies import get_inference_service, get_prediction_history, get_study_service
 from app.config import settings
 from app.core.auth import get_current_user
+from app.core.augmentation import MAX_AUGMENTATIONS
+from app.core.dicom import DICOM_CONTENT_TYPES, DICOM_EXTENSIONS
 from app.utils.logger import get_logger
+from typing import List
+import hashlib
 import os
+import tempfile
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+# Identical uploads in flight at the same time share one prediction
+_predict_flight = SingleFlight("predict")
+
 
 def get_absolute_image_url(file_path: str) -> str:
     """
@@ -36,6 +48,128 @@ def get_absolute_image_url(file_path: str) -> str:
     return absolute_url
 
 
+def derivative_urls(derivatives: dict) -> dict:
+    """
+    Replace derivative file paths with absolute URLs.
+    
+    Args:
+        derivatives: Result of ``DerivativeService.locate``
+        
+    Returns:
+        Dictionary matching the DerivativeInfo schema
+    """
+    return {
+        "preview_url": get_absolute_image_url(derivatives["preview_path"]),
+        "thumbnail_urls": {
+            size: get_absolute_image_url(path) for size, path in derivatives["thumbnail_paths"].items()
+        },
+        "ready": derivatives["ready"],
+    }
+
+
+def encode_prediction(result: dict, model=PredictionResponse) -> bytes:
+    """
+    Encode a prediction result without re-validating it.
+    
+    The medical analysis of known classes is spliced in from its
+    pre-encoded JSON; anything else is trimmed to the schema fields.
+    
+    Args:
+        result: Result dictionary from the inference or study service
+        model: Response model defining the payload fields
+        
+    Returns:
+        Encoded JSON body
+    """
+    analysis = result.get("medical_analysis")
+    if analysis is None:
+        return encode_response(model, result)
+    
+    fragment = MEDICAL_ANALYSIS_JSON.get(analysis.get("tumor_type"))
+    if fragment is not None:
+        return encode_response(model, result, {"medical_analysis": fragment})
+    
+    trimmed = {name: analysis.get(name) for name in MedicalAnalysis.model_fields}
+    return encode_response(model, {**result, "medical_analysis": trimmed})
+
+
+def save_upload(file_contents: bytes, file_path: str):
+    """
+    Write an upload under its content-addressed path unless it is already there.
+
+    The bytes go to a unique temporary file that is renamed into place, so a
+    concurrent request for the same content (other options, another worker)
+    never sees a partly written file.
+    """
+    if os.path.exists(file_path):
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_contents)
+        # mkstemp creates the file private; uploads are served as static files
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def run_prediction(
+    inference_service: InferenceService,
+    file_contents: bytes,
+    file_path: str,
+    filename: str,
+    tiled: bool,
+    explain: bool,
+    tta: int,
+) -> dict:
+    """
+    Save an upload, run inference and resolve URLs.
+    
+    Runs once per set of identical concurrent requests; the returned
+    dictionary is shared by all of them and must not be modified.
+    
+    Args:
+        inference_service: Shared inference service
+        file_contents: Uploaded bytes
+        file_path: Content-addressed path to save them under
+        filename: Original file name, for logging
+        tiled: Run tiled multi-scale inference
+        explain: Generate a Grad-CAM overlay
+        tta: Number of test-time augmentations
+        
+    Returns:
+        Prediction with absolute URLs and the disclaimer
+    """
+    save_upload(file_contents, file_path)
+    
+    # Get absolute URL for the image
+    image_url = get_absolute_image_url(file_path)
+    
+    # Run inference - this includes validation internally
+    prediction = await inference_service.predict_image(file_path, tiled=tiled, explain=explain, tta=tta)
+    
+    # Replace local file paths with absolute URLs
+    prediction["image_path"] = image_url
+    heatmap_path = prediction.pop("heatmap_path", None)
+    if heatmap_path:
+        prediction["heatmap_url"] = get_absolute_image_url(heatmap_path)
+    derivatives = prediction.get("derivatives")
+    if derivatives:
+        prediction["derivatives"] = derivative_urls(derivatives)
+    
+    # Add disclaimer for successful predictions
+    if prediction.get("is_valid_brain_image", False) and prediction.get("status") == "success":
+        prediction["disclaimer"] = get_disclaimer()
+    elif prediction.get("status") == "invalid_image":
+        # For invalid images, provide a clear error message
+        prediction["disclaimer"] = "⚠️ INVALID IMAGE: The uploaded file is not a valid brain MRI scan. Please upload a brain MRI image in DICOM, JPEG, or PNG format."
+    
+    logger.info("Prediction completed for %s. Valid brain image: %s", filename, prediction.get('is_valid_brain_image', False))
+    return prediction
+
+
 @router.post(
     "/predict",
     response_model=PredictionResponse,
@@ -44,7 +178,14 @@ def get_absolute_image_url(file_path: str) -> str:
 )
 async def predict(
     file: UploadFile = File(...),
-    model_loader: ModelLoader = Depends(get_model_loader),
+    tiled: bool = Query(False, description="Tile large images into multi-scale patches (slower, keeps fine detail)"),
+    explain: bool = Query(False, description="Return a Grad-CAM heatmap showing where the model looked"),
+    tta: int = Query(
+        0, ge=0, le=MAX_AUGMENTATIONS,
+        description="Number of test-time augmentations to average (0 = off); reports their variance"
+    ),
+    inference_service: InferenceService = Depends(get_inference_service),
+    history: PredictionHistory = Depends(get_prediction_history),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -52,7 +193,11 @@ async def predict(
     
     Args:
         file: Uploaded MRI image file
-        model_loader: Model loader dependency
+        tiled: Run tiled multi-scale inference instead of a single resize
+        explain: Generate a Grad-CAM overlay for the top class
+        tta: Number of test-time augmentations to average
+        inference_service: Shared inference service
+        history: Prediction history store (successful predictions are queued)
         
     Returns:
         PredictionResponse: Prediction results with disclaimer
@@ -65,8 +210,11 @@ async def predict(
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file uploaded")
         
-        if not file.content_type or "image" not in file.content_type:
-            raise HTTPException(status_code=400, detail="File must be an image")
+        is_dicom_upload = (
+            file.content_type in DICOM_CONTENT_TYPES or file.filename.lower().endswith(DICOM_EXTENSIONS)
+        )
+        if not is_dicom_upload and (not file.content_type or "image" not in file.content_type):
+            raise HTTPException(status_code=400, detail="File must be an image or DICOM file")
         
         # Read file contents
         file_contents = await file.read()
@@ -74,38 +222,112 @@ async def predict(
         if len(file_contents) > settings.MAX_UPLOAD_SIZE:
             raise HTTPException(status_code=413, detail="File too large")
         
-        # Save uploaded file
+        # Save uploaded file under a content-addressed name: the URL never
+        # changes meaning, so it can be cached as immutable
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(file_contents)
+        extension = os.path.splitext(file.filename)[1].lower()
+        if not extension.isascii() or not extension[1:].isalnum():
+            extension = ""
+        file_path = os.path.join(
+            settings.UPLOAD_DIR, hashlib.sha256(file_contents).hexdigest()[:32] + extension
+        )
         
-        # Get absolute URL for the image
-        image_url = get_absolute_image_url(file_path)
+        def compute():
+            return run_prediction(
+                inference_service, file_contents, file_path, file.filename, tiled, explain, tta
+            )
         
-        # Initialize inference service (which includes validation)
-        inference_service = InferenceService(model_loader)
-        
-        # Run inference - this includes validation internally
-        prediction = await inference_service.predict_image(file_path)
-        
-        # Replace local file path with absolute URL
-        prediction["image_path"] = image_url
-        
-        # Add disclaimer for successful predictions
-        if prediction.get("is_valid_brain_image", False) and prediction.get("status") == "success":
-            prediction["disclaimer"] = get_disclaimer()
+        if settings.SINGLE_FLIGHT_ENABLED:
+            # The path holds the content hash; options change the result
+            prediction = await _predict_flight.do((file_path, tiled, explain, tta), compute)
         else:
-            # For invalid images, provide a clear error message
-            if prediction.get("status") == "invalid_image":
-                prediction["disclaimer"] = "⚠️ INVALID IMAGE: The uploaded file is not a valid brain MRI scan. Please upload a brain MRI image in DICOM, JPEG, or PNG format."
+            prediction = await compute()
         
-        logger.info(f"Prediction completed for {file.filename}. Valid brain image: {prediction.get('is_valid_brain_image', False)}")
+        if settings.HISTORY_ENABLED and prediction.get("is_valid_brain_image", False) and prediction.get("status") == "success":
+            # Write-behind: only appends to an in-memory buffer
+            history.record(current_user, prediction)
         
-        return prediction
+        # Trusted internal result: skip response-model validation
+        return FastJSONResponse(encode_prediction(prediction))
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error during prediction: {str(e)}")
+        logger.error("Error during prediction: %s", e)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@router.post(
+    "/predict/study",
+    response_model=StudyPredictionResponse,
+    summary="Predict brain tumor from a whole MRI study",
+    description="Upload the slices of a study (several files or one zip) and get a study-level prediction"
+)
+async def predict_study(
+    files: List[UploadFile] = File(...),
+    study_service: StudyService = Depends(get_study_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Predict brain tumor presence from all slices of an MRI study.
+    
+    Args:
+        files: Slice images, DICOM files or a zip archive of them
+        study_service: Shared study service
+        
+    Returns:
+        StudyPredictionResponse: Study-level prediction with top slices
+        
+    Raises:
+        HTTPException: If the upload is empty or too large, or inference fails
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix="study_") as study_dir:
+            paths = []
+            total_bytes = 0
+            for upload in files:
+                contents = await upload.read()
+                total_bytes += len(contents)
+                if total_bytes > settings.STUDY_MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail="Study too large")
+                
+                name = os.path.basename(upload.filename or "slice")
+                path = os.path.join(study_dir, f"{len(paths):05d}_{name}")
+                with open(path, "wb") as f:
+                    f.write(contents)
+                
+                if name.lower().endswith(".zip") or upload.content_type in ("application/zip", "application/x-zip-compressed"):
+                    archive_dir = tempfile.mkdtemp(dir=study_dir)
+                    paths.extend(extract_study_archive(
+                        path, archive_dir,
+                        max_files=settings.STUDY_MAX_FILES - len(paths),
+                        max_bytes=settings.STUDY_MAX_UPLOAD_SIZE,
+                    ))
+                else:
+                    paths.append(path)
+                
+                if len(paths) >= settings.STUDY_MAX_FILES:
+                    paths = paths[:settings.STUDY_MAX_FILES]
+                    break
+            
+            # CPU-bound; keep the event loop free for other requests
+            result = await run_in_threadpool(study_service.predict_study, paths)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error during study prediction: %s", e)
+        raise HTTPException(status_code=500, detail=f"Study prediction failed: {str(e)}")
+    
+    if result["status"] == "success":
+        result["disclaimer"] = get_disclaimer()
+    
+    logger.info(
+        "Study prediction completed: %d files, %d slices evaluated",
+        len(files), result["slices_evaluated"]
+    )
+    return FastJSONResponse(encode_prediction(result, StudyPredictionResponse))
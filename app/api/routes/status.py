@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import REGISTRY
 
 router = APIRouter()
 
@@ -22,3 +24,9 @@ async def service_status(request: Request):
         "version": app.version if hasattr(app, "version") else None,
         "paths": paths,
     }
+
+
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Export in-process counters (e.g. rate-limit decisions) in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
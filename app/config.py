@@ -21,13 +21,93 @@ class Settings:
     
     # Image settings
     IMAGE_SIZE = int(os.getenv("IMAGE_SIZE", "224"))
+    # Resize filter of the preprocessing shared by training and serving (nearest/box/bilinear/hamming/bicubic/lanczos)
+    PREPROCESS_RESAMPLE = os.getenv("PREPROCESS_RESAMPLE", "lanczos")
     MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "10485760"))  # 10MB
+    # Staged validation: header limits, then a downsampled color/brightness check before full statistics
+    VALIDATION_MAX_PIXELS = int(os.getenv("VALIDATION_MAX_PIXELS", "40000000"))  # rejected from the header alone
+    VALIDATION_PREVIEW_SIZE = int(os.getenv("VALIDATION_PREVIEW_SIZE", "256"))
+    
+    # Tiled inference for large images (opt-in per request)
+    TILE_SCALES = [float(s) for s in os.getenv("TILE_SCALES", "1.0,0.5").split(",") if s.strip()]
+    TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.25"))
+    TILE_MAX_PATCHES = int(os.getenv("TILE_MAX_PATCHES", "16"))
+    
+    # DICOM uploads: frames decoded per multi-frame file (spread over the series)
+    DICOM_MAX_FRAMES = int(os.getenv("DICOM_MAX_FRAMES", "32"))
+    
+    # Study (multi-slice) inference
+    STUDY_MAX_FILES = int(os.getenv("STUDY_MAX_FILES", "512"))  # slices accepted per study
+    STUDY_MAX_UPLOAD_SIZE = int(os.getenv("STUDY_MAX_UPLOAD_SIZE", "209715200"))  # 200MB
+    STUDY_MAX_SLICES = int(os.getenv("STUDY_MAX_SLICES", "64"))  # most informative slices run through the CNN
+    STUDY_BATCH_SIZE = int(os.getenv("STUDY_BATCH_SIZE", "16"))
+    STUDY_TIME_BUDGET_S = float(os.getenv("STUDY_TIME_BUDGET_S", "20"))
+    STUDY_TOP_SLICES = int(os.getenv("STUDY_TOP_SLICES", "5"))
+    
+    # Upload derivatives: thumbnails and a web preview generated during inference
+    DERIVATIVES_ENABLED = os.getenv("DERIVATIVES_ENABLED", "true").lower() == "true"
+    DERIVATIVE_THUMBNAIL_SIZES = [
+        int(s) for s in os.getenv("DERIVATIVE_THUMBNAIL_SIZES", "128,256").split(",") if s.strip()
+    ]
+    DERIVATIVE_PREVIEW_SIZE = int(os.getenv("DERIVATIVE_PREVIEW_SIZE", "1024"))
+    DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+    
+    # Concurrent /api/predict requests with identical content and options share one inference
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    
+    # Prediction history (write-behind buffer in front of MongoDB)
+    HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))  # records per insert_many
+    HISTORY_FLUSH_INTERVAL_S = float(os.getenv("HISTORY_FLUSH_INTERVAL_S", "1.0"))
+    HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))  # buffered records before dropping
+    HISTORY_PAGE_SIZE_MAX = int(os.getenv("HISTORY_PAGE_SIZE_MAX", "100"))
+    
+    # Rate limiting: token buckets per client (user id or IP) and per node, by route class
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # 'memory' or 'redis' (shared by workers)
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"  # use X-Forwarded-For
+    RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1"))  # trusted proxies appending to it
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # route class -> (per-client limit, global limit); "<count>/<second|minute|hour|day>", "off" disables
+    RATE_LIMITS = {
+        "predict": (os.getenv("RATE_LIMIT_PREDICT", "20/minute"), os.getenv("RATE_LIMIT_PREDICT_GLOBAL", "240/minute")),
+        "auth": (os.getenv("RATE_LIMIT_AUTH", "10/minute"), os.getenv("RATE_LIMIT_AUTH_GLOBAL", "300/minute")),
+        "chat": (os.getenv("RATE_LIMIT_CHAT", "60/minute"), os.getenv("RATE_LIMIT_CHAT_GLOBAL", "off")),
+        "api": (os.getenv("RATE_LIMIT_API", "300/minute"), os.getenv("RATE_LIMIT_API_GLOBAL", "off")),
+    }
+    
+    # HTTP compression and caching
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "31536000"))  # immutable files, 1 year
+    
+    # Production server (gunicorn.conf.py): pre-forked workers sharing one preloaded model
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = one worker per usable CPU
+    WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "300"))  # private memory per worker, caps the count
+    WORKER_MAX = int(os.getenv("WORKER_MAX", "8"))
+    MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"  # load the model before forking
+    
+    # Inference server: a separate local process owns the model; workers hand it batches via shared memory
+    INFERENCE_SIDECAR_ENABLED = os.getenv("INFERENCE_SIDECAR_ENABLED", "false").lower() == "true"
+    INFERENCE_SIDECAR_SOCKET = os.getenv("INFERENCE_SIDECAR_SOCKET", "/tmp/neuroassist-inference.sock")
+    INFERENCE_SIDECAR_MAX_BATCH = int(os.getenv("INFERENCE_SIDECAR_MAX_BATCH", "32"))  # rows per model call
+    INFERENCE_SIDECAR_MAX_WAIT_MS = float(os.getenv("INFERENCE_SIDECAR_MAX_WAIT_MS", "5"))  # wait to fill a batch
+    INFERENCE_SIDECAR_TIMEOUT_S = float(os.getenv("INFERENCE_SIDECAR_TIMEOUT_S", "30"))
     
     # Upload directory
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", "app/static/uploads")
     
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # 'json' or 'text'
+    # Max INFO records per second for high-volume modules ("module=N,...")
+    LOG_RATE_LIMITS = os.getenv(
+        "LOG_RATE_LIMITS",
+        "app.services.inference=50,app.core.image_utils=50,app.api.routes.chat=50,app.core.medical_chatbot_rules=50"
+    )
     
     # Model confidence threshold
     CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.5"))
@@ -55,5 +135,14 @@ class Settings:
         origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5174").split(",")
     ]
 
+    # Admin users allowed to use /api/admin endpoints (comma-separated emails)
+    ADMIN_EMAILS = [
+        email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+    ]
+
+    # Sampling profiler
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+    PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "300"))
+
 
 settings = Settings()
@@ -0,0 +1,108 @@
+"""
+Test-time augmentation (TTA) for more stable predictions.
+
+A preprocessed image is expanded into a fixed, deterministic sequence of
+variants (horizontal flips, small rotations and intensity jitter) stacked
+into one batch, so every variant goes through a single ``model.predict``
+call. Averaging the variant probabilities smooths out sensitivity to the
+exact resize, and their spread is reported as an uncertainty estimate.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class Augmentation:
+    """One test-time variant of an image."""
+    name: str
+    flip: bool = False
+    angle: float = 0.0
+    gain: float = 1.0
+    gamma: float = 1.0
+
+
+# Ordered so that any prefix is a balanced set; the identity always comes first
+AUGMENTATIONS: Tuple[Augmentation, ...] = (
+    Augmentation("identity"),
+    Augmentation("hflip", flip=True),
+    Augmentation("rotate+7", angle=7.0),
+    Augmentation("rotate-7", angle=-7.0),
+    Augmentation("brighter", gain=1.1),
+    Augmentation("darker", gain=0.9),
+    Augmentation("hflip_rotate+7", flip=True, angle=7.0),
+    Augmentation("hflip_rotate-7", flip=True, angle=-7.0),
+    Augmentation("gamma0.9", gamma=0.9),
+    Augmentation("gamma1.1", gamma=1.1),
+    Augmentation("hflip_brighter", flip=True, gain=1.1),
+    Augmentation("hflip_darker", flip=True, gain=0.9),
+)
+
+MAX_AUGMENTATIONS = len(AUGMENTATIONS)
+
+
+def build_tta_batch(batch: np.ndarray, count: int) -> np.ndarray:
+    """
+    Expand one preprocessed image into a batch of augmented variants.
+
+    Args:
+        batch: Preprocessed array of shape (1, H, W, 3), uint8 pixels or
+            floats in [0, 1]
+        count: Number of variants (clamped to 1..MAX_AUGMENTATIONS)
+
+    Returns:
+        Float32 array of shape (count, H, W, 3) in [0, 1], identity first
+    """
+    count = max(1, min(int(count), MAX_AUGMENTATIONS))
+    if batch.dtype == np.uint8:
+        base = np.divide(batch[0], 255.0, dtype=np.float32)
+    else:
+        base = np.asarray(batch, dtype=np.float32)[0]
+    out = np.empty((count,) + base.shape, dtype=np.float32)
+
+    rotated = {}
+    for i, aug in enumerate(AUGMENTATIONS[:count]):
+        variant = base[:, ::-1] if aug.flip else base
+        if aug.angle:
+            key = (aug.flip, aug.angle)
+            if key not in rotated:
+                # Preprocessed values come from uint8 / 255, so this round trip is lossless
+                pil = Image.fromarray(np.rint(variant * 255.0).astype(np.uint8))
+                pil = pil.rotate(aug.angle, resample=Image.Resampling.BILINEAR)
+                rotated[key] = np.asarray(pil, dtype=np.float32) * (1.0 / 255.0)
+            variant = rotated[key]
+        if aug.gamma != 1.0:
+            variant = np.power(variant, aug.gamma)
+        if aug.gain != 1.0:
+            variant = variant * aug.gain
+        out[i] = variant
+
+    np.clip(out, 0.0, 1.0, out=out)
+    return out
+
+
+def summarize_tta(probabilities: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Average variant probabilities and measure their disagreement.
+
+    Args:
+        probabilities: Array of shape (count, num_classes)
+
+    Returns:
+        Tuple of (mean probabilities, uncertainty info dictionary)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    mean = probabilities.mean(axis=0)
+    variance = probabilities.var(axis=0)
+    top_class = int(np.argmax(mean))
+    agreement = float(np.mean(probabilities.argmax(axis=1) == top_class))
+
+    return mean, {
+        "augmentations": len(probabilities),
+        "variance": np.round(variance, 6).tolist(),
+        "top_class_std": round(float(np.sqrt(variance[top_class])), 4),
+        "agreement": round(agreement, 4),
+    }
@@ -89,3 +89,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     if user is None:
         raise credentials_exception
     return user
+
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Require the current user to be listed in ADMIN_EMAILS."""
+    if current_user.get("email", "").lower() not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
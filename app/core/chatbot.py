@@ -59,7 +59,7 @@ class Chatbot:
             is_relevant, relevance_reason = MedicalChatbotRules.is_question_relevant(user_message)
             
             if not is_relevant:
-                logger.warning(f"Off-topic question detected: {relevance_reason}")
+                logger.warning("Off-topic question detected: %s", relevance_reason)
                 return MedicalChatbotRules.get_off_topic_redirect(user_message)
             
             # Step 2: Check if MRI data is needed but not provided (ONLY for specific analysis requests)
@@ -75,7 +75,7 @@ class Chatbot:
             # Check knowledge base for matches
             for key, responses in self.knowledge_base.items():
                 if key in message_lower:
-                    logger.info(f"Found match for key: {key}")
+                    logger.debug("Found match for key: %s", key)
                     response = responses[0]
                     break
             
@@ -90,7 +90,7 @@ class Chatbot:
                 mri_data
             )
             
-            logger.info(f"Response validation metadata: {metadata}")
+            logger.info("Response validation metadata: %s", metadata)
             
             # Step 5: Sanitize response for safety
             final_response = MedicalChatbotRules.sanitize_response(enhanced_response)
@@ -98,7 +98,7 @@ class Chatbot:
             return final_response
             
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
+            logger.error("Error generating response: %s", e)
             error_response = "I encountered an error while processing your question. Please try again."
             return MedicalChatbotRules.add_medical_disclaimer(error_response)
     
@@ -0,0 +1,209 @@
+"""
+Response compression middleware.
+
+Negotiates brotli (when the ``brotli`` package is installed) or gzip from
+``Accept-Encoding`` and compresses responses above a size threshold.
+Responses that are already encoded (e.g. precompressed static assets),
+too small, or of an incompressible type such as JPEG/PNG images pass
+through untouched. Single-chunk bodies (JSON API responses) are compressed
+in one call; streamed bodies are compressed chunk by chunk.
+"""
+
+import zlib
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+
+def parse_accept_encoding(header: str) -> List[str]:
+    """
+    List the codings a client accepts, most preferred first.
+
+    Args:
+        header: Value of the Accept-Encoding header
+
+    Returns:
+        Coding names with q > 0, ordered by q
+    """
+    codings = []
+    for position, part in enumerate(header.split(",")):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            codings.append((-q, position, name.strip().lower()))
+    return [name for _, _, name in sorted(codings)]
+
+
+def choose_encoding(header: str, allow_brotli: bool = True) -> Optional[str]:
+    """Pick "br" or "gzip" for an Accept-Encoding header, or None."""
+    for coding in parse_accept_encoding(header):
+        if coding == "br" and allow_brotli and BROTLI_AVAILABLE:
+            return "br"
+        if coding in ("gzip", "*"):
+            return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(data)
+        return self._gz.compress(data)
+
+    def flush(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gz.flush()
+
+
+class CompressionMiddleware:
+    """Compress eligible responses with brotli or gzip."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        allow_brotli: bool = True,
+    ):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            minimum_size: Responses smaller than this many bytes are sent as-is
+            gzip_level: zlib compression level (1-9)
+            brotli_quality: Brotli quality (0-11); 4-5 suits dynamic content
+            allow_brotli: Offer brotli when the client accepts it
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.allow_brotli = allow_brotli
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.allow_brotli)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-response state: decides on the start message, then compresses the body."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _eligible(self, headers: Headers) -> bool:
+        # Ranges address bytes of the identity body; compressing one corrupts it
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get("content-length")
+        return length is None or int(length) >= self.middleware.minimum_size
+
+    def _start_headers(self) -> Tuple[MutableHeaders, Message]:
+        message = self.start_message
+        headers = MutableHeaders(raw=list(message["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            # A compressed representation is a different entity
+            headers["ETag"] = "W/" + headers["etag"].removeprefix("W/")
+        return headers, message
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            if message["status"] in (204, 206, 304) or not self._eligible(headers):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                # Whole body in one message (typical JSON response)
+                if len(body) < self.middleware.minimum_size:
+                    self.passthrough = True
+                    await self.downstream(self.start_message)
+                    await self.downstream(message)
+                    return
+                compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+                compressed = compressor.compress(body) + compressor.flush()
+                headers, start = self._start_headers()
+                headers["Content-Length"] = str(len(compressed))
+                start["headers"] = headers.raw
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streamed body: compress incrementally, length is unknown
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers, start = self._start_headers()
+            del headers["Content-Length"]
+            start["headers"] = headers.raw
+            await self.downstream(start)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
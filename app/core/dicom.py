@@ -0,0 +1,222 @@
+"""
+DICOM ingestion for MRI uploads.
+
+Headers are parsed without touching the pixel data, and only the frames
+selected for inference are decoded (one at a time with pydicom >= 3, which
+seeks straight to each frame). Stored values are mapped to the model's
+8-bit input range in one vectorized step: modality rescale, then the
+window/level from the header (or the frame's own range when the file has
+none), with MONOCHROME1 inverted. Memory stays bounded on large
+multi-frame files because at most ``DICOM_MAX_FRAMES`` frames are decoded,
+evenly spread through the series.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import pydicom
+    DICOM_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    pydicom = None
+    DICOM_AVAILABLE = False
+
+DICOM_EXTENSIONS = (".dcm", ".dicom")
+DICOM_CONTENT_TYPES = ("application/dicom", "application/dicom+json")
+
+
+def is_dicom(file_path: str) -> bool:
+    """
+    Check for the "DICM" magic after the 128-byte preamble.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        True if the file looks like a DICOM Part 10 file
+    """
+    if file_path.lower().endswith(DICOM_EXTENSIONS):
+        return True
+    try:
+        with open(file_path, "rb") as f:
+            f.seek(128)
+            return f.read(4) == b"DICM"
+    except OSError:
+        return False
+
+
+def _first_value(value, default: Optional[float]) -> Optional[float]:
+    """Window tags may be multi-valued; use the first (primary) window."""
+    if value is None:
+        return default
+    if not isinstance(value, (str, bytes)) and hasattr(value, "__len__"):
+        value = value[0] if len(value) else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class DicomHeader:
+    """Pixel-relevant attributes read without decoding pixel data."""
+    rows: int
+    columns: int
+    frames: int
+    bits_stored: int
+    photometric: str
+    slope: float
+    intercept: float
+    window_center: Optional[float]
+    window_width: Optional[float]
+    modality: str
+
+
+def read_header(file_path: str) -> DicomHeader:
+    """
+    Parse the DICOM header, stopping before the pixel data element.
+
+    Args:
+        file_path: Path to the DICOM file
+
+    Returns:
+        DicomHeader
+
+    Raises:
+        ValueError: If pydicom is missing or the file has no image
+    """
+    if not DICOM_AVAILABLE:
+        raise ValueError("DICOM support requires the 'pydicom' package")
+
+    ds = pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
+    if "Rows" not in ds or "Columns" not in ds:
+        raise ValueError("DICOM file contains no image")
+
+    window_width = _first_value(ds.get("WindowWidth"), None)
+    return DicomHeader(
+        rows=int(ds.Rows),
+        columns=int(ds.Columns),
+        frames=int(_first_value(ds.get("NumberOfFrames"), 1) or 1),
+        bits_stored=int(ds.get("BitsStored", 8) or 8),
+        photometric=str(ds.get("PhotometricInterpretation", "MONOCHROME2")),
+        slope=_first_value(ds.get("RescaleSlope"), 1.0),
+        intercept=_first_value(ds.get("RescaleIntercept"), 0.0),
+        window_center=_first_value(ds.get("WindowCenter"), None),
+        window_width=window_width if window_width and window_width > 0 else None,
+        modality=str(ds.get("Modality", "")),
+    )
+
+
+def select_frames(total: int, max_frames: int) -> List[int]:
+    """
+    Pick at most ``max_frames`` frame indices spread evenly over the series.
+
+    Args:
+        total: Number of frames in the file
+        max_frames: Frame budget
+
+    Returns:
+        Sorted frame indices
+    """
+    if total <= max_frames:
+        return list(range(total))
+    if max_frames <= 1:
+        return [total // 2]
+    return sorted({int(round(i)) for i in np.linspace(0, total - 1, max_frames)})
+
+
+def _iter_raw_frames(file_path: str, indices: List[int]) -> Iterator[np.ndarray]:
+    """Decode only the requested frames, one at a time where pydicom allows it."""
+    try:
+        from pydicom.pixels import iter_pixels
+    except ImportError:
+        # pydicom < 3 decodes the whole pixel array at once
+        ds = pydicom.dcmread(file_path, force=True)
+        pixels = ds.pixel_array
+        if int(_first_value(ds.get("NumberOfFrames"), 1) or 1) == 1:
+            pixels = pixels[None]
+        for index in indices:
+            yield pixels[index]
+        return
+
+    yield from iter_pixels(file_path, indices=indices)
+
+
+def to_uint8(pixels: np.ndarray, header: DicomHeader) -> np.ndarray:
+    """
+    Map stored DICOM values to 8-bit display values.
+
+    Applies the modality rescale and the header's window/level (DICOM
+    PS3.3 C.11.2.1.2 linear function), or min/max scaling when the file
+    has no window. MONOCHROME1 is inverted so bright means dense.
+
+    Args:
+        pixels: Stored values of one or more frames (any integer or float dtype)
+        header: Parsed header of the file
+
+    Returns:
+        uint8 array of the same shape
+    """
+    values = pixels.astype(np.float32, copy=False)
+    if header.slope != 1.0 or header.intercept != 0.0:
+        values = values * np.float32(header.slope) + np.float32(header.intercept)
+
+    if header.window_width is not None and header.window_center is not None:
+        low = header.window_center - 0.5 - (header.window_width - 1) / 2
+        span = max(header.window_width - 1, 1.0)
+    else:
+        low = float(values.min())
+        span = max(float(values.max()) - low, 1.0)
+
+    scaled = (values - np.float32(low)) * np.float32(255.0 / span)
+    np.clip(scaled, 0, 255, out=scaled)
+    if header.photometric == "MONOCHROME1":
+        scaled = 255.0 - scaled
+    return (scaled + 0.5).astype(np.uint8)
+
+
+def _frame_to_image(frame: np.ndarray) -> Image.Image:
+    if frame.ndim == 3:
+        return Image.fromarray(frame[..., :3], mode="RGB")
+    return Image.fromarray(frame, mode="L")
+
+
+def load_dicom_frames(file_path: str, max_frames: int) -> Tuple[List[Image.Image], DicomHeader, List[int]]:
+    """
+    Decode up to ``max_frames`` frames of a DICOM file as 8-bit images.
+
+    Args:
+        file_path: Path to the DICOM file
+        max_frames: Maximum number of frames to decode
+
+    Returns:
+        Tuple of (PIL images, header, decoded frame indices)
+
+    Raises:
+        ValueError: If the file cannot be decoded
+    """
+    header = read_header(file_path)
+    indices = select_frames(header.frames, max(1, max_frames))
+    try:
+        images = []
+        for frame in _iter_raw_frames(file_path, indices):
+            # Color (RGB/YBR) DICOM is already 8-bit display data
+            if frame.ndim == 3 and frame.dtype == np.uint8:
+                images.append(_frame_to_image(frame))
+            else:
+                images.append(_frame_to_image(to_uint8(frame, header)))
+    except Exception as e:
+        raise ValueError(f"Cannot decode DICOM pixel data: {e}")
+
+    logger.debug(
+        "DICOM decoded: %d/%d frames, %dx%d, %d-bit %s",
+        len(images), header.frames, header.columns, header.rows, header.bits_stored, header.photometric
+    )
+    return images, header, indices
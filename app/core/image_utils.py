@@ -3,18 +3,69 @@ Image preprocessing utilities for Brain Tumor Classification.
 
 Handles loading and preprocessing images to match training pipeline
 (224x224 resize, normalization to [0,1]).
+
+The pixel pipeline itself (RGB order, resampling filter, batching) lives in
+``app.core.preprocessing`` and is shared with the training scripts.
+
+Models exported for serving take uint8 pixels and rescale them inside the
+graph (see ``app.core.serving_model``). For those the decoded pixels are
+copied straight into a pooled batch buffer, with no float conversion;
+``to_model_input`` adapts a batch to whichever input dtype a model takes.
 """
 
 from PIL import Image
 import os
+import threading
 import numpy as np
-from typing import Tuple
+from typing import Dict, List, Tuple
 from app.config import settings
+from app.core.profiler import traced
+from app.core.dicom import is_dicom, load_dicom_frames
+from app.core.preprocessing import preprocess, to_model_input  # noqa: F401 (re-exported)
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class BatchBufferPool:
+    """
+    Reusable uint8 batch tensors, so requests do not allocate their input.
+    
+    A buffer belongs to one request from ``acquire`` until ``release``; a
+    buffer that is never released is simply garbage collected.
+    """
+
+    def __init__(self, max_free: int = 8):
+        """
+        Initialize the pool.
+        
+        Args:
+            max_free: Idle buffers kept per shape
+        """
+        self.max_free = max_free
+        self._free: Dict[Tuple[int, ...], List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Take an idle buffer of ``shape`` (contents undefined) or allocate one."""
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                return free.pop()
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, buffer: np.ndarray):
+        """Return a buffer for reuse."""
+        with self._lock:
+            free = self._free.setdefault(buffer.shape, [])
+            if len(free) < self.max_free:
+                free.append(buffer)
+
+
+# Shared by all requests of the process
+BATCH_BUFFERS = BatchBufferPool()
+
+
 class ImageProcessor:
     """Process and preprocess images for model inference."""
     
@@ -72,10 +123,14 @@ class ImageProcessor:
         }
     
     @staticmethod
+    @traced()
     def load_image(file_path: str) -> Image.Image:
         """
         Load image from file path.
         
+        DICOM files are decoded to an 8-bit grayscale image of their middle
+        frame using the window/level from the header.
+        
         Args:
             file_path: Path to image file
             
@@ -86,58 +141,50 @@ class ImageProcessor:
             ValueError: If image cannot be loaded
         """
         try:
-            image = Image.open(file_path)
-            logger.info(f"Image loaded: {file_path}")
+            if is_dicom(file_path):
+                frames, _, _ = load_dicom_frames(file_path, max_frames=1)
+                image = frames[0]
+            else:
+                image = Image.open(file_path)
+            logger.debug("Image loaded: %s", file_path)
             return image
         except Exception as e:
-            logger.error(f"Error loading image: {str(e)}")
+            logger.error("Error loading image: %s", e)
             raise ValueError(f"Cannot load image: {str(e)}")
     
     @staticmethod
-    def preprocess_image(image: Image.Image, size: int | None = None) -> np.ndarray:
+    @traced()
+    def preprocess_image(
+        image: Image.Image, size: int | None = None, dtype: str = "float32", out: np.ndarray | None = None
+    ) -> np.ndarray:
         """
         Preprocess image for CNN model inference.
         
-        Matches the training preprocessing pipeline:
+        Uses the pipeline shared with training (``app.core.preprocessing``):
         1. Convert to RGB
-        2. Resize to (150, 150) - matches notebook training
-        3. Normalize pixel values to [0, 1]
+        2. Resize with the configured filter (PREPROCESS_RESAMPLE)
+        3. Normalize pixel values to [0, 1] (float32 only; uint8 models
+           rescale inside the graph)
         4. Add batch dimension
         
         Args:
             image: PIL Image object
-            size: Target image size (default 150 to match training)
+            size: Target image size (default IMAGE_SIZE)
+            dtype: "float32" for [0, 1] floats, "uint8" for raw pixels
+            out: uint8 array of shape (1, size, size, 3) to write into
+                (e.g. a row of a pooled batch buffer)
             
         Returns:
-            Preprocessed numpy array with shape (1, 150, 150, 3)
+            Preprocessed numpy array with shape (1, size, size, 3)
         """
         try:
             # Use configured IMAGE_SIZE if not provided
             if size is None:
                 size = ImageProcessor.IMAGE_SIZE
-
-            # Convert to RGB if needed
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-
-            # Resize image to match training input
-            image = image.resize((size, size), Image.Resampling.LANCZOS)
-            logger.info(f"Image resized to {size}x{size}")
-            
-            # Convert to numpy array
-            image_array = np.array(image, dtype=np.float32)
-            
-            # Normalize to [0, 1] - matches training normalization
-            image_array = image_array / 255.0
-            
-            # Add batch dimension: (224, 224, 3) -> (1, 224, 224, 3)
-            image_array = np.expand_dims(image_array, axis=0)
-            
-            logger.info("Image preprocessed and normalized")
-            return image_array
+            return preprocess(image, size, dtype=dtype, out=out)
             
         except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
+            logger.error("Error preprocessing image: %s", e)
             raise ValueError(f"Cannot preprocess image: {str(e)}")
     
     @staticmethod
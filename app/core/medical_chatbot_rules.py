@@ -11,6 +11,7 @@ Enforces medical AI assistant guidelines:
 
 import re
 from typing import Dict, Tuple, Optional, List
+from app.core.profiler import traced
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -56,6 +57,7 @@ class MedicalChatbotRules:
     }
     
     @staticmethod
+    @traced()
     def is_question_relevant(question: str) -> Tuple[bool, str]:
         """
         Check if question is relevant to brain tumors and MRI analysis.
@@ -121,6 +123,7 @@ class MedicalChatbotRules:
         return False, "Question doesn't appear to be medical-related"
     
     @staticmethod
+    @traced()
     def check_prohibited_content(response: str) -> Tuple[bool, Optional[str]]:
         """
         Check if response contains prohibited medical advice.
@@ -145,6 +148,7 @@ class MedicalChatbotRules:
         return True, None
     
     @staticmethod
+    @traced()
     def add_medical_disclaimer(response: str, disclaimer_type: str = "general") -> str:
         """
         Add appropriate medical disclaimer to response.
@@ -199,6 +203,7 @@ class MedicalChatbotRules:
         )
     
     @staticmethod
+    @traced()
     def sanitize_response(response: str) -> str:
         """
         Sanitize response to ensure it meets medical AI standards.
@@ -226,6 +231,7 @@ class MedicalChatbotRules:
         return response.strip()
     
     @staticmethod
+    @traced()
     def validate_and_enhance_response(
         question: str,
         response: str,
@@ -254,7 +260,7 @@ class MedicalChatbotRules:
         metadata["question_relevant"] = is_relevant
         
         if not is_relevant:
-            logger.warning(f"Off-topic question detected: {relevance_reason}")
+            logger.warning("Off-topic question detected: %s", relevance_reason)
             metadata["issues"].append(f"Off-topic: {relevance_reason}")
             return MedicalChatbotRules.get_off_topic_redirect(question), metadata
         
@@ -263,7 +269,7 @@ class MedicalChatbotRules:
         metadata["response_safe"] = is_safe
         
         if not is_safe:
-            logger.warning(f"Prohibited content detected: {violation}")
+            logger.warning("Prohibited content detected: %s", violation)
             metadata["issues"].append(f"Safety violation: {violation}")
             # Sanitize response
             response = MedicalChatbotRules.sanitize_response(response)
@@ -276,7 +282,7 @@ class MedicalChatbotRules:
         # Sanitize response for general safety
         response = MedicalChatbotRules.sanitize_response(response)
         
-        logger.info(f"Response validated. Issues: {metadata['issues']}")
+        logger.info("Response validated. Issues: %s", metadata['issues'])
         
         return response, metadata
 
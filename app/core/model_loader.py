@@ -61,7 +61,7 @@ class ModelLoader:
             logger.info("Model loaded successfully")
             
             # Print model summary
-            logger.info(f"Model input shape: {self._model.input_shape}")
+            logger.info(f"Model input shape: {self._model.input_shape} ({self.input_dtype})")
             logger.info(f"Model output shape: {self._model.output_shape}")
             logger.info(f"Model parameters: {self._model.count_params():,}")
             
@@ -89,6 +89,22 @@ class ModelLoader:
         """
         return self.get_model()
     
+    @property
+    def input_dtype(self) -> str:
+        """
+        Dtype the model's input layer takes.
+        
+        "uint8" for serving exports that rescale inside the graph, usually
+        "float32" otherwise. Without a model the statistics fallback is
+        used, which takes uint8 pixels directly.
+        """
+        try:
+            model = self.get_model()
+        except Exception:
+            return "uint8"
+        dtype = model.inputs[0].dtype
+        return getattr(dtype, "name", str(dtype))
+    
     def is_loaded(self) -> bool:
         """
         Check if model is loaded.
@@ -96,4 +112,4 @@ class ModelLoader:
         Returns:
             True if model is loaded, False otherwise
         """
-        return self._pipeline is not None
+        return self._model is not None
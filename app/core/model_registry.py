@@ -0,0 +1,84 @@
+"""
+Registry of the model artifacts in ``app/models``.
+
+``registry.json`` next to the model files records, per file name, the
+content hash and size of the artifact and whatever the producing pipeline
+wants to keep with it (teacher, parameters, accuracy, latency report).
+Serving still picks a model with ``MODEL_NAME``; the registry tells which
+artifact that is and how it was evaluated.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.gradcam import file_sha256
+
+MODELS_DIR = Path(__file__).parent.parent / "models"
+REGISTRY_FILE = "registry.json"
+
+_lock = threading.Lock()
+
+
+def _registry_path(models_dir: Optional[Path]) -> Path:
+    return Path(models_dir or MODELS_DIR) / REGISTRY_FILE
+
+
+def _read(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def register_model(model_path: str, metadata: Optional[Dict[str, Any]] = None, models_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Record a model artifact, replacing any entry with the same file name.
+
+    Args:
+        model_path: Path of the model file (normally inside ``app/models``)
+        metadata: JSON-serializable details to store with the entry
+        models_dir: Directory holding the registry (default ``app/models``)
+
+    Returns:
+        The stored entry
+
+    Raises:
+        FileNotFoundError: If the model file does not exist
+    """
+    model_path = Path(model_path)
+    entry = {
+        "name": model_path.name,
+        "path": str(model_path),
+        "sha256": file_sha256(str(model_path)),
+        "size_bytes": model_path.stat().st_size,
+        "registered_at": datetime.now(timezone.utc).isoformat(),
+        **(metadata or {}),
+    }
+    path = _registry_path(models_dir)
+    with _lock:
+        registry = _read(path)
+        registry[entry["name"]] = entry
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file and renamed, so readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".registry-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(registry, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    return entry
+
+
+def get_model_entry(name: str, models_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Registry entry for a model file name, or None if it is not registered."""
+    return _read(_registry_path(models_dir)).get(name)
+
+
+def list_models(models_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """All registered models, most recently registered first."""
+    entries = list(_read(_registry_path(models_dir)).values())
+    return sorted(entries, key=lambda entry: entry.get("registered_at", ""), reverse=True)
@@ -0,0 +1,226 @@
+"""
+Model input preprocessing shared by training and serving.
+
+Training used to read images with ``cv2.imread`` (BGR order, cv2's bilinear
+resize without antialiasing), while serving used PIL (RGB, LANCZOS), so the
+model saw differently distributed pixels in production. Both now go
+through this module: images are decoded with PIL, converted to RGB and
+resized with one filter (``PREPROCESS_RESAMPLE``), then written into a
+single NHWC uint8 array. Normalization to [0, 1] is one vectorized
+operation over the whole batch, or is left to models that rescale inside
+the graph.
+
+Batches are decoded and resized on a thread pool; Pillow releases the GIL
+while decoding and resampling.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+COLOR_MODE = "RGB"
+
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "hamming": Image.Resampling.HAMMING,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+# Below this many images a thread pool costs more than it saves
+PARALLEL_MIN_IMAGES = 4
+
+ImageSource = Union[Image.Image, str, os.PathLike]
+
+
+def resample_filter(name: Optional[str] = None) -> Image.Resampling:
+    """
+    Resolve the configured resampling filter.
+
+    Args:
+        name: Filter name (default ``settings.PREPROCESS_RESAMPLE``)
+
+    Returns:
+        PIL resampling filter
+
+    Raises:
+        ValueError: If the name is not a known filter
+    """
+    name = (name or settings.PREPROCESS_RESAMPLE).lower()
+    try:
+        return RESAMPLE_FILTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown resample filter {name!r}; expected one of {sorted(RESAMPLE_FILTERS)}")
+
+
+def to_model_input(batch: np.ndarray, dtype: str) -> np.ndarray:
+    """
+    Convert a preprocessed batch to the model's input dtype.
+
+    uint8 batches are scaled to [0, 1] for float models exactly as
+    ``preprocess_batch`` does; float batches in [0, 1] are rounded back to
+    pixels for uint8 models.
+
+    Args:
+        batch: Array of shape (N, H, W, 3), uint8 or floats in [0, 1]
+        dtype: Model input dtype name ("uint8", "float32", ...)
+
+    Returns:
+        Batch of the requested dtype (the input itself if it already matches)
+    """
+    if batch.dtype == dtype:
+        return batch
+    if dtype == "uint8":
+        return np.rint(np.clip(batch, 0.0, 1.0) * 255.0).astype(np.uint8)
+    if batch.dtype == np.uint8:
+        return np.divide(batch, 255.0, dtype=np.float32).astype(dtype, copy=False)
+    return batch.astype(dtype)
+
+
+def load_rgb(source: ImageSource) -> Image.Image:
+    """
+    Open an image for preprocessing.
+
+    Args:
+        source: PIL image or path to an image file
+
+    Returns:
+        PIL image (decoded lazily when opened from a path)
+    """
+    if isinstance(source, Image.Image):
+        return source
+    return Image.open(source)
+
+
+def resize_into(image: Image.Image, out: np.ndarray, resample: Optional[Image.Resampling] = None) -> np.ndarray:
+    """
+    Convert an image to RGB, resize it and write its pixels into ``out``.
+
+    Grayscale images are resized before the conversion, which gives the
+    same pixels as converting first.
+
+    Args:
+        image: PIL image of any mode
+        out: uint8 array of shape (H, W, 3)
+        resample: Resampling filter (default: configured filter)
+
+    Returns:
+        ``out``
+    """
+    height, width = out.shape[:2]
+    if resample is None:
+        resample = resample_filter()
+    if image.mode == "L":
+        # Grayscale scans are resized on one channel and broadcast to RGB:
+        # the same pixels as converting first, a third of the resampling
+        if image.size != (width, height):
+            image = image.resize((width, height), resample)
+        np.copyto(out, np.asarray(image)[..., None])
+        return out
+
+    if image.mode != COLOR_MODE:
+        image = image.convert(COLOR_MODE)
+    if image.size != (width, height):
+        image = image.resize((width, height), resample)
+    np.copyto(out, np.asarray(image))
+    return out
+
+
+def preprocess_batch(
+    images: Sequence[ImageSource],
+    size: int,
+    dtype: str = "float32",
+    out: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Preprocess images into one model batch.
+
+    Args:
+        images: PIL images and/or image file paths
+        size: Side length of the square model input
+        dtype: "uint8" for raw pixels (models that rescale in the graph) or
+            a float dtype for values in [0, 1]
+        out: uint8 array of shape (N, size, size, 3) to fill (e.g. a pooled
+            buffer); only used for uint8 output
+        workers: Threads decoding/resizing in parallel (default: CPU count,
+            serial for small batches)
+
+    Returns:
+        Array of shape (N, size, size, 3)
+
+    Raises:
+        OSError: If a path cannot be opened or decoded
+    """
+    count = len(images)
+    pixels = out if out is not None and dtype == "uint8" else np.empty((count, size, size, 3), dtype=np.uint8)
+    resample = resample_filter()
+
+    def fill(index: int):
+        resize_into(load_rgb(images[index]), pixels[index], resample)
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if count >= PARALLEL_MIN_IMAGES else 1
+    if workers > 1 and count > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, count)) as pool:
+            # list() re-raises the first decoding error
+            list(pool.map(fill, range(count)))
+    else:
+        for index in range(count):
+            fill(index)
+    return to_model_input(pixels, dtype)
+
+
+def preprocess(image: ImageSource, size: int, dtype: str = "float32", out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Preprocess a single image into a batch of one.
+
+    Args:
+        image: PIL image or image file path
+        size: Side length of the square model input
+        dtype: "uint8" or a float dtype (see ``preprocess_batch``)
+        out: uint8 array of shape (1, size, size, 3) to fill
+
+    Returns:
+        Array of shape (1, size, size, 3)
+    """
+    return preprocess_batch([image], size, dtype=dtype, out=out, workers=1)
+
+
+def load_dataset(paths: Iterable[Union[str, os.PathLike]], size: int, workers: Optional[int] = None) -> tuple:
+    """
+    Preprocess a training set, skipping files that cannot be decoded.
+
+    Args:
+        paths: Image file paths
+        size: Side length of the square model input
+        workers: Threads decoding in parallel (default: CPU count)
+
+    Returns:
+        Tuple of (uint8 array (N, size, size, 3), indices of the paths kept)
+    """
+    paths = list(paths)
+    pixels = np.empty((len(paths), size, size, 3), dtype=np.uint8)
+    resample = resample_filter()
+
+    def fill(index: int) -> bool:
+        try:
+            with Image.open(paths[index]) as image:
+                resize_into(image, pixels[index], resample)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        ok = list(pool.map(fill, range(len(paths))))
+    kept: List[int] = [index for index, loaded in enumerate(ok) if loaded]
+    if len(kept) < len(paths):
+        pixels = pixels[kept]
+    return pixels, kept
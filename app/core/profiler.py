@@ -0,0 +1,355 @@
+"""
+Built-in sampling profiler for diagnosing slow nodes in production.
+
+A background thread periodically snapshots the Python stacks of every
+thread with ``sys._current_frames()`` and aggregates them into collapsed
+stacks. Hot-path functions decorated with ``traced`` additionally record
+per-request wall time while a profiling session is active. Everything is
+stdlib-only, so it can be switched on at runtime without restarting the
+process or installing anything on the host.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Paths whose requests are counted and traced while a session is running
+PROFILED_PATHS = ("/api/predict", "/api/chat")
+
+# Per-request section timings (name -> [calls, seconds]) for the current request
+_request_trace: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler with per-request section tracing."""
+
+    def __init__(self, interval: float = 0.005, max_traces: int = 200):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between stack samples
+            max_traces: Maximum number of per-request traces kept per session
+        """
+        self.interval = interval
+        self.max_traces = max_traces
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        """Clear all collected samples and traces."""
+        self._stacks: Counter = Counter()
+        self._sample_count = 0
+        self._traces: List[Dict[str, Any]] = []
+        self._section_totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self._started_at: Optional[float] = None
+        self._stopped_at: Optional[float] = None
+        self._deadline: Optional[float] = None
+        self._requests_remaining: Optional[int] = None
+        self._requests_seen = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether a profiling session is currently running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: Optional[float] = None, requests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Start a profiling session, discarding the previous one.
+
+        The session stops after ``seconds`` have elapsed or after ``requests``
+        profiled requests have completed, whichever comes first.
+
+        Args:
+            seconds: Maximum session duration in seconds
+            requests: Number of profiled requests to capture
+
+        Returns:
+            Session status dictionary
+
+        Raises:
+            ValueError: If neither limit is given
+        """
+        if not seconds and not requests:
+            raise ValueError("Either seconds or requests must be provided")
+
+        self.stop()
+        with self._lock:
+            self._reset()
+            self._started_at = time.perf_counter()
+            self._deadline = self._started_at + seconds if seconds else None
+            self._requests_remaining = requests
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+
+        logger.info(f"🔬 Profiler started (seconds={seconds}, requests={requests}, interval={self.interval}s)")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Stop the running session, keeping its collected data.
+
+        Returns:
+            Session status dictionary
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._stop_event.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+            logger.info(f"🔬 Profiler stopped after {self._sample_count} samples")
+        return self.status()
+
+    def _run(self):
+        """Sampling loop executed in the background thread."""
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                break
+            self._sample(own_ident)
+        self._stopped_at = time.perf_counter()
+
+    def _sample(self, own_ident: int):
+        """Record one stack snapshot of every thread except the sampler."""
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self._stacks[";".join(stack)] += 1
+            self._sample_count += 1
+
+    @contextmanager
+    def request(self, path: str):
+        """
+        Track one profiled request and collect its section trace.
+
+        Args:
+            path: Request path, stored with the trace
+        """
+        if not self.active:
+            yield
+            return
+
+        sections: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        token = _request_trace.set(sections)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_trace.reset(token)
+            self._finish_request(path, elapsed, sections)
+
+    def _finish_request(self, path: str, elapsed: float, sections: Dict[str, List[float]]):
+        """Store a completed request trace and enforce the request limit."""
+        with self._lock:
+            self._requests_seen += 1
+            for name, (calls, seconds) in sections.items():
+                totals = self._section_totals[name]
+                totals[0] += calls
+                totals[1] += seconds
+            if len(self._traces) < self.max_traces:
+                self._traces.append({
+                    "path": path,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "sections": {
+                        name: {"calls": calls, "total_ms": round(seconds * 1000, 3)}
+                        for name, (calls, seconds) in sections.items()
+                    },
+                })
+            if self._requests_remaining is not None:
+                self._requests_remaining -= 1
+                if self._requests_remaining <= 0:
+                    self._stop_event.set()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the state of the current or last session.
+
+        Returns:
+            Dictionary with activity flag, sample and request counts
+        """
+        end = self._stopped_at if self._stopped_at is not None else time.perf_counter()
+        return {
+            "active": self.active,
+            "interval_seconds": self.interval,
+            "samples": self._sample_count,
+            "requests_profiled": self._requests_seen,
+            "requests_remaining": self._requests_remaining,
+            "elapsed_seconds": round(end - self._started_at, 3) if self._started_at else 0.0,
+        }
+
+    def collapsed(self) -> str:
+        """
+        Export samples in collapsed-stack format (one ``stack count`` per line).
+
+        Returns:
+            Text consumable by flamegraph.pl, speedscope or inferno
+        """
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def speedscope(self) -> Dict[str, Any]:
+        """
+        Export samples in the speedscope "sampled" file format.
+
+        Returns:
+            Speedscope JSON document
+        """
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        with self._lock:
+            for stack, count in self._stacks.items():
+                indices = []
+                for name in stack.split(";"):
+                    if name not in frame_index:
+                        frame_index[name] = len(frames)
+                        frames.append({"name": name})
+                    indices.append(frame_index[name])
+                samples.append(indices)
+                weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": "NeuroAssist sampling profile",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": "NeuroAssist sampling profile",
+            "exporter": "app.core.profiler",
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get per-request traces and aggregated section timings.
+
+        Returns:
+            Dictionary with session status, section totals and request traces
+        """
+        with self._lock:
+            return {
+                **self.status(),
+                "sections": {
+                    name: {"calls": calls, "total_ms": round(seconds * 1000, 3)}
+                    for name, (calls, seconds) in sorted(
+                        self._section_totals.items(), key=lambda item: item[1][1], reverse=True
+                    )
+                },
+                "traces": list(self._traces),
+            }
+
+
+def _record_section(sections: Dict[str, List[float]], name: str, elapsed: float):
+    """Add one call of ``name`` to a request trace."""
+    entry = sections[name]
+    entry[0] += 1
+    entry[1] += elapsed
+
+
+@contextmanager
+def trace_section(name: str):
+    """
+    Record the wall time of a code block in the request trace.
+
+    Args:
+        name: Section name
+    """
+    sections = _request_trace.get()
+    if sections is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_section(sections, name, time.perf_counter() - start)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording the wall time of a function in the request trace.
+
+    Costs a single context-variable lookup when no profiling session is active.
+
+    Args:
+        name: Section name (defaults to the function's qualified name)
+
+    Returns:
+        Decorator for sync or async functions
+    """
+    def decorator(func: Callable) -> Callable:
+        section = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                sections = _request_trace.get()
+                if sections is None:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _record_section(sections, section, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            sections = _request_trace.get()
+            if sections is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record_section(sections, section, time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+# Global profiler instance
+_profiler = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """Get or initialize the global profiler instance."""
+    global _profiler
+    if _profiler is None:
+        from app.config import settings
+        _profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000.0)
+    return _profiler
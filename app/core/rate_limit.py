@@ -0,0 +1,406 @@
+"""
+Token-bucket rate limiting.
+
+Requests are classified by path into route classes (``predict``, ``auth``,
+``chat``, ``api``). Each class has a per-client bucket, keyed by the user id
+from a valid bearer token or by client IP otherwise, and a global bucket
+shared by all clients of the node. Buckets live in process memory, or in
+Redis when several workers must share them. In memory each of N gunicorn
+workers keeps its own buckets, so each enforces 1/N of every limit: with
+requests spread over the workers the node as a whole stays near the
+configured limits, but one client may get a little more or less than its
+share. Use Redis for exact limits. The check runs in an ASGI
+middleware before routing, so a rejected request costs a dictionary lookup
+and never reaches body parsing, authentication queries or the model. Every
+decision is counted in ``rate_limit_decisions_total``.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import REGISTRY
+from app.core.workers import worker_count
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+# First match wins. A prefix ending in "/" covers everything below it; any other
+# matches that path and its sub-paths only (/api/predict, /api/predict/study,
+# not /api/predictions). Paths outside /api (static files, health) are not limited
+ROUTE_CLASSES = (
+    ("/api/predict", "predict"),
+    ("/api/auth/", "auth"),
+    ("/api/login", "auth"),
+    ("/api/register", "auth"),
+    ("/api/chat", "chat"),
+    ("/api/", "api"),
+)
+
+_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+DECISIONS = REGISTRY.counter(
+    "rate_limit_decisions_total",
+    "Rate limit decisions by route class, bucket scope and outcome",
+    ("route_class", "scope", "decision"),
+)
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Bucket capacity and refill rate parsed from a spec like ``20/minute``."""
+    spec: str
+    capacity: float
+    refill_per_second: float
+
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """
+    Parse a ``<count>/<second|minute|hour|day>`` limit.
+
+    The bucket holds ``count`` tokens, so a client may burst up to the
+    whole allowance and is then held to the average rate.
+
+    Args:
+        spec: Limit specification; empty, "0" or "off" disables the limit
+
+    Returns:
+        Limit, or None when disabled
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    spec = (spec or "").strip().lower()
+    if spec in ("", "0", "off", "none"):
+        return None
+    count, _, period = spec.partition("/")
+    period = period.rstrip("s") or "second"
+    if period not in _PERIODS:
+        raise ValueError(f"Invalid rate limit period in '{spec}'")
+    capacity = float(count)
+    if capacity <= 0:
+        return None
+    return Limit(spec, capacity, capacity / _PERIODS[period])
+
+
+def split_limit(limit: Optional[Limit], parts: int) -> Optional[Limit]:
+    """
+    Share of a limit enforced by each of ``parts`` independent processes.
+
+    The spec (reported in X-RateLimit-Limit) stays the configured one; a
+    bucket never holds less than one token.
+    """
+    if limit is None or parts <= 1:
+        return limit
+    return replace(limit, capacity=max(1.0, limit.capacity / parts), refill_per_second=limit.refill_per_second / parts)
+
+
+class MemoryBucketStore:
+    """Token buckets in process memory, least recently used evicted first."""
+
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic):
+        """
+        Initialize the store.
+
+        Args:
+            max_keys: Buckets kept before idle ones are dropped (a dropped
+                bucket starts full again)
+            clock: Monotonic time source in seconds
+        """
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: Limit, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """
+        Take ``cost`` tokens from a bucket if it has them.
+
+        Args:
+            key: Bucket key
+            limit: Capacity and refill rate
+            cost: Tokens the request needs
+
+        Returns:
+            Tuple of (allowed, tokens remaining, seconds until enough tokens)
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [limit.capacity, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.refill_per_second)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, bucket[0], 0.0
+            return False, bucket[0], (cost - bucket[0]) / limit.refill_per_second
+
+    async def acquire(self, key: str, limit: Limit, cost: float = 1.0) -> Tuple[bool, float, float]:
+        return self.consume(key, limit, cost)
+
+
+# Refill and take atomically on the Redis server, using its clock so every
+# worker and host agrees on elapsed time
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers through Redis."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        """
+        Initialize the store.
+
+        Args:
+            url: Redis URL (e.g. redis://localhost:6379/0)
+            prefix: Key prefix for bucket hashes
+
+        Raises:
+            RuntimeError: If the ``redis`` package is not installed
+        """
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, limit: Limit, cost: float = 1.0) -> Tuple[bool, float, float]:
+        allowed, tokens = await self._script(
+            keys=[self.prefix + key], args=[limit.capacity, limit.refill_per_second, cost]
+        )
+        tokens = float(tokens)
+        if allowed:
+            return True, tokens, 0.0
+        return False, tokens, (cost - tokens) / limit.refill_per_second
+
+
+@dataclass
+class RouteLimits:
+    """Per-client and global limits of one route class."""
+    client: Optional[Limit]
+    global_: Optional[Limit]
+
+
+class RateLimiter:
+    """Classify requests, identify clients and consult the bucket store."""
+
+    def __init__(
+        self,
+        rules: Dict[str, RouteLimits],
+        store,
+        trust_proxy: bool = False,
+        enabled: bool = True,
+        proxy_hops: int = 1,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            rules: Route class -> limits
+            store: MemoryBucketStore or RedisBucketStore
+            trust_proxy: Take the client IP from X-Forwarded-For (behind a
+                reverse proxy such as Render's)
+            enabled: Switch all limiting off without removing the middleware
+            proxy_hops: Trusted proxies in front of the app; the client IP is
+                the entry this many from the right of X-Forwarded-For (the
+                entries to its left are whatever the client sent)
+        """
+        self.rules = rules
+        self.store = store
+        self.trust_proxy = trust_proxy
+        self.enabled = enabled
+        self.proxy_hops = max(1, proxy_hops)
+
+    @staticmethod
+    def classify(path: str) -> Optional[str]:
+        """Route class of a request path, or None if it is not limited."""
+        for prefix, route_class in ROUTE_CLASSES:
+            if prefix.endswith("/"):
+                if path.startswith(prefix):
+                    return route_class
+            elif path == prefix or path.startswith(prefix + "/"):
+                return route_class
+        return None
+
+    def client_key(self, scope: Scope) -> str:
+        """
+        Identify the client: ``user:<email>`` for a valid bearer token,
+        ``ip:<address>`` otherwise. The token is verified (HMAC only, no
+        database lookup) so a forged subject cannot pick its own bucket.
+        """
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization", "")
+        if authorization[:7].lower() == "bearer ":
+            try:
+                subject = jwt.decode(
+                    authorization[7:], settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+                ).get("sub")
+                if subject:
+                    return f"user:{subject}"
+            except JWTError:
+                pass
+
+        if self.trust_proxy:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                # Each trusted proxy appends the address it received from;
+                # the leftmost entries are client-controlled
+                entries = [entry.strip() for entry in forwarded.split(",")]
+                return "ip:" + entries[max(0, len(entries) - self.proxy_hops)]
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def check(self, scope: Scope) -> Optional[Tuple[str, Limit, float, float]]:
+        """
+        Apply the client and global buckets of the request's route class.
+
+        Returns:
+            None if allowed, else (scope name, exceeded limit, tokens left,
+            seconds to wait)
+        """
+        route_class = self.classify(scope["path"])
+        limits = self.rules.get(route_class) if route_class else None
+        if limits is None:
+            return None
+
+        checks = []
+        if limits.client is not None:
+            checks.append(("client", f"{route_class}:{self.client_key(scope)}", limits.client))
+        if limits.global_ is not None:
+            checks.append(("global", f"{route_class}:*", limits.global_))
+
+        for bucket_scope, key, limit in checks:
+            try:
+                allowed, remaining, retry_after = await self.store.acquire(key, limit)
+            except Exception as e:
+                # Fail open: a broken shared backend must not take the API down
+                DECISIONS.inc(route_class=route_class, scope=bucket_scope, decision="error")
+                logger.warning("Rate limit backend error: %s", e)
+                continue
+            if not allowed:
+                DECISIONS.inc(route_class=route_class, scope=bucket_scope, decision="rejected")
+                return bucket_scope, limit, remaining, retry_after
+            DECISIONS.inc(route_class=route_class, scope=bucket_scope, decision="allowed")
+        return None
+
+
+class RateLimitMiddleware:
+    """Reject requests over their limits with 429 before the app sees them."""
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            limiter: Limiter to use (the shared one from settings by default)
+        """
+        self.app = app
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> RateLimiter:
+        return self._limiter or get_rate_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter = self.limiter
+        if scope["type"] != "http" or not limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = await limiter.check(scope)
+        if rejection is None:
+            await self.app(scope, receive, send)
+            return
+
+        bucket_scope, limit, remaining, retry_after = rejection
+        wait = max(1, math.ceil(retry_after))
+        response = JSONResponse(
+            {"detail": f"Too many requests. Try again in {wait} seconds."},
+            status_code=429,
+            headers={
+                "Retry-After": str(wait),
+                "X-RateLimit-Limit": limit.spec,
+                "X-RateLimit-Remaining": str(int(remaining)),
+                "X-RateLimit-Scope": bucket_scope,
+            },
+        )
+        await response(scope, receive, send)
+
+
+def build_rate_limiter() -> RateLimiter:
+    """Create a limiter from the RATE_LIMIT_* settings."""
+    rules = {
+        route_class: RouteLimits(parse_limit(client_spec), parse_limit(global_spec))
+        for route_class, (client_spec, global_spec) in settings.RATE_LIMITS.items()
+    }
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        store = RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+    else:
+        store = MemoryBucketStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        # Buckets are per process: each worker enforces its share
+        workers = worker_count()
+        rules = {
+            route_class: RouteLimits(split_limit(limits.client, workers), split_limit(limits.global_, workers))
+            for route_class, limits in rules.items()
+        }
+    return RateLimiter(
+        rules,
+        store,
+        trust_proxy=settings.RATE_LIMIT_TRUST_PROXY,
+        enabled=settings.RATE_LIMIT_ENABLED,
+        proxy_hops=settings.RATE_LIMIT_PROXY_HOPS,
+    )
+
+
+# Global limiter instance
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or initialize the global rate limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = build_rate_limiter()
+    return _rate_limiter
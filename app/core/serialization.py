@@ -0,0 +1,105 @@
+"""
+Fast JSON responses for trusted internal results.
+
+Prediction and chat results are built by our own services, so validating
+them again through the response models only costs time. ``encode_response``
+keeps exactly the fields the response model declares, encodes them with
+orjson when it is installed (stdlib ``json`` otherwise) and splices in
+fragments that were encoded once at startup, such as the per-class medical
+analysis. The routes keep ``response_model`` for the OpenAPI schema and
+return the encoded bytes directly.
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Type
+
+import numpy as np
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _default(value: Any) -> Any:
+    """Encode types the JSON encoders do not handle natively."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON.
+
+    Args:
+        value: JSON-compatible value (mappings, tuples and numpy values allowed)
+
+    Returns:
+        Encoded bytes
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_response(
+    model: Type[BaseModel],
+    data: Mapping,
+    fragments: Optional[Dict[str, bytes]] = None,
+) -> bytes:
+    """
+    Encode a trusted result with the field set of a response model.
+
+    Fields missing from ``data`` get the model's default, like FastAPI's
+    own serialization; keys the model does not declare are dropped.
+    Fragments are already-encoded JSON values inserted verbatim.
+
+    Args:
+        model: Response model whose fields define the payload
+        data: Result dictionary from a service
+        fragments: Field name -> pre-encoded JSON value
+
+    Returns:
+        Encoded JSON object
+    """
+    fragments = fragments or {}
+    payload = {}
+    for name, field in model.model_fields.items():
+        if name in fragments:
+            continue
+        if name in data:
+            payload[name] = data[name]
+        elif not field.is_required():
+            payload[name] = field.get_default(call_default_factory=True)
+
+    body = dumps(payload)
+    if not fragments:
+        return body
+
+    spliced = b",".join(dumps(name) + b":" + fragment for name, fragment in fragments.items())
+    if body == b"{}":
+        return b"{" + spliced + b"}"
+    return body[:-1] + b"," + spliced + b"}"
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with ``dumps``, or sent as-is when given bytes."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,79 @@
+"""
+Serving export of older Keras models with uint8 input.
+
+Models trained before the training scripts built ``Input(dtype='uint8')``
+and ``Rescaling(1/255)`` into the graph take float32 pixels in [0, 1], so
+every request converts its resized image to float and divides by 255 in
+numpy. The export wraps such a model behind a uint8 NHWC input and a
+``Rescaling(1/255)`` layer, so the division runs inside the graph and the
+serving path feeds decoded pixels as they are. Point MODEL_NAME at the
+exported file to use it (``scripts/export_serving_model.py``). Models that
+already take uint8 are served as they are and are refused here: wrapping
+them would rescale twice.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+SERVING_SUFFIX = "_uint8"
+
+
+def build_uint8_serving_model(model):
+    """
+    Wrap a [0, 1]-input Keras model so it takes uint8 pixels.
+    
+    Args:
+        model: Trained Keras model with float input of shape (H, W, C)
+        
+    Returns:
+        Keras model with uint8 input and the same outputs
+
+    Raises:
+        ValueError: If the model already takes uint8 pixels
+    """
+    import tensorflow as tf
+
+    dtype = getattr(model.inputs[0].dtype, "name", str(model.inputs[0].dtype))
+    if dtype == "uint8":
+        raise ValueError(f"{model.name} already takes uint8 pixels (rescaled in its graph); serve it as it is")
+    inputs = tf.keras.Input(shape=model.input_shape[1:], dtype="uint8", name="pixels")
+    scaled = tf.keras.layers.Rescaling(1.0 / 255, name="rescale")(inputs)
+    outputs = model(scaled)
+    return tf.keras.Model(inputs, outputs, name=f"{model.name}{SERVING_SUFFIX}")
+
+
+def export_serving_model(model_path: str, output_path: Optional[str] = None, samples: int = 16) -> Dict[str, Any]:
+    """
+    Export a uint8-input copy of a model and check it against the original.
+    
+    Args:
+        model_path: Trained .h5 model
+        output_path: Where to write the export (``<stem>_uint8.h5`` next to
+            the model by default)
+        samples: Random images used for the parity check
+        
+    Returns:
+        Report with the output path and the largest probability difference
+
+    Raises:
+        ValueError: If the model already takes uint8 pixels
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    serving = build_uint8_serving_model(model)
+    path = Path(model_path)
+    output = Path(output_path) if output_path else path.with_name(f"{path.stem}{SERVING_SUFFIX}{path.suffix}")
+    serving.save(str(output))
+
+    pixels = np.random.default_rng(0).integers(0, 256, (samples,) + tuple(model.input_shape[1:]), dtype=np.uint8)
+    expected = model.predict(np.divide(pixels, 255.0, dtype=np.float32), verbose=0)
+    served = tf.keras.models.load_model(str(output)).predict(pixels, verbose=0)
+    return {
+        "output_path": str(output),
+        "input_dtype": "uint8",
+        "max_abs_diff": float(np.max(np.abs(expected - served))),
+        "argmax_agreement": float(np.mean(expected.argmax(axis=1) == served.argmax(axis=1))),
+    }
@@ -0,0 +1,75 @@
+"""
+Single-flight deduplication of concurrent identical work.
+
+A double-clicked upload or a client retry sends the same bytes several
+times at once, before any cache could hold the result. ``SingleFlight``
+runs the first call for a key (the leader) as a task and makes every call
+for the same key that arrives while it is running await that task instead
+of starting its own. All callers receive the same result object, or the
+same exception. Nothing is kept once the task finishes: this is
+deduplication of in-flight work, not a cache.
+
+Calls are counted in ``single_flight_requests_total`` by flight name and
+role (``leader`` or ``coalesced``).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import REGISTRY
+
+REQUESTS = REGISTRY.counter(
+    "single_flight_requests_total",
+    "Calls that started a computation (leader) or joined one in flight (coalesced)",
+    ("flight", "role"),
+)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one computation."""
+
+    def __init__(self, name: str):
+        """
+        Initialize the group.
+
+        Args:
+            name: Flight name used as the metric label
+        """
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``func`` once for all concurrent callers with the same key.
+
+        The computation runs as its own task and callers await it shielded,
+        so a caller that is cancelled (e.g. its client disconnected) does
+        not cancel the work the others are waiting for.
+
+        Args:
+            key: Identity of the work (e.g. content hash and options)
+            func: Zero-argument coroutine function doing the work
+
+        Returns:
+            The shared result; treat it as read-only
+
+        Raises:
+            Exception: Whatever the computation raised, in every caller
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            REQUESTS.inc(flight=self.name, role="coalesced")
+            return await asyncio.shield(task)
+
+        REQUESTS.inc(flight=self.name, role="leader")
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def coalesced(self) -> int:
+        """Number of calls so far that joined a computation in flight."""
+        return int(REQUESTS.value(flight=self.name, role="coalesced"))
@@ -0,0 +1,113 @@
+"""
+Static file serving with cache policies and precompressed assets.
+
+Uploads, heatmaps and derivatives are stored under content-addressed names,
+so a URL always refers to the same bytes and can be cached for a year.
+Vite emits content-hashed files under ``/assets``, which are immutable as
+well, while ``index.html`` must be revalidated so new deployments are picked
+up. Conditional GET (ETag / Last-Modified -> 304) comes from Starlette's
+``StaticFiles`` and is kept for every response, including precompressed
+variants.
+"""
+
+import mimetypes
+import os
+import re
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.compression import parse_accept_encoding
+
+IMMUTABLE_CACHE = "public, max-age={max_age}, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# sha256-prefix names written by the upload path (e.g. "3fa9...c1.jpg", "3fa9..._model.webp")
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{32}[._]")
+
+# Vite build output: "index-4f8a2b1c.js", "logo-BkD3x9aZ.svg"
+HASHED_ASSET = re.compile(r"-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sets Cache-Control from the file name."""
+
+    def __init__(self, *args, max_age: int = 31536000, fallback_cache: str = "public, max-age=3600", **kwargs):
+        """
+        Initialize the static files app.
+        
+        Args:
+            max_age: Lifetime in seconds for immutable (content-addressed) files
+            fallback_cache: Cache-Control for all other files
+        """
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+        self.fallback_cache = fallback_cache
+
+    def cache_control(self, full_path: str) -> str:
+        """Cache-Control value for a file."""
+        if CONTENT_ADDRESSED.match(os.path.basename(full_path)):
+            return IMMUTABLE_CACHE.format(max_age=self.max_age)
+        return self.fallback_cache
+
+    def _respond(self, response: Response, scope: Scope) -> Response:
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = self.cache_control(str(full_path))
+        return self._respond(response, scope)
+
+
+class PrecompressedStaticFiles(CachedStaticFiles):
+    """
+    Serve ``file.br`` / ``file.gz`` siblings to clients that accept them.
+
+    Variants are produced at build time by ``scripts/precompress_frontend.py``.
+    """
+
+    def cache_control(self, full_path: str) -> str:
+        name = os.path.basename(full_path)
+        if name.endswith(".html"):
+            return REVALIDATE_CACHE
+        if HASHED_ASSET.search(name) or CONTENT_ADDRESSED.match(name):
+            return IMMUTABLE_CACHE.format(max_age=self.max_age)
+        return self.fallback_cache
+
+    def _variant(self, full_path: str, scope: Scope) -> Optional[tuple]:
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted and "*" not in accepted:
+                continue
+            candidate = full_path + suffix
+            try:
+                return encoding, candidate, os.stat(candidate)
+            except OSError:
+                continue
+        return None
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        full_path = str(full_path)
+        variant = self._variant(full_path, scope) if status_code == 200 else None
+        if variant is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            response.headers["Vary"] = "Accept-Encoding"
+        else:
+            encoding, path, variant_stat = variant
+            # Media type comes from the original name, not ".br"/".gz"
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                stat_result=variant_stat,
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+        response.headers["Cache-Control"] = self.cache_control(full_path)
+        return self._respond(response, scope)
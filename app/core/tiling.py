@@ -0,0 +1,153 @@
+"""
+Tiling utilities for multi-scale inference on large MRI images.
+
+A large image is covered by overlapping square windows at one or more
+scales. Each window is resized to the model input size and all windows,
+plus one global view of the whole image, are stacked into a single batch.
+The number of windows is capped by a patch budget so the extra latency is
+bounded no matter how large the upload is.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class Tile:
+    """One window of the source image (coordinates in source pixels)."""
+    scale: float
+    row: int
+    col: int
+    box: Tuple[int, int, int, int]
+
+
+def _grid_positions(length: int, window: int, count: int) -> List[int]:
+    """Evenly spread ``count`` window offsets over ``length`` pixels."""
+    if count <= 1 or length <= window:
+        return [max(0, (length - window) // 2)]
+    return [int(round(v)) for v in np.linspace(0, length - window, count)]
+
+
+def plan_tiles(
+    width: int,
+    height: int,
+    patch_size: int,
+    scales: Sequence[float] = (1.0,),
+    overlap: float = 0.25,
+    max_patches: int = 16,
+) -> List[Tile]:
+    """
+    Plan the windows for tiled inference.
+
+    At scale ``s`` a window spans ``patch_size / s`` source pixels, so scale
+    1.0 looks at native resolution and smaller scales look at wider context.
+    The first tile is always the global view. When a scale would need more
+    windows than its share of the budget, windows are spread further apart
+    (less overlap) instead of being dropped from one side of the image.
+
+    Args:
+        width: Source image width
+        height: Source image height
+        patch_size: Model input size in pixels
+        scales: Scales to tile at
+        overlap: Target fraction of overlap between neighbouring windows
+        max_patches: Maximum number of tiles, including the global view
+
+    Returns:
+        List of tiles, global view first
+    """
+    tiles = [Tile(scale=0.0, row=0, col=0, box=(0, 0, width, height))]
+    if max_patches <= 1 or not scales:
+        return tiles
+
+    share = (max_patches - 1) // len(scales)
+    stride_factor = max(0.05, 1.0 - overlap)
+
+    for scale in sorted(scales):
+        window = int(round(patch_size / scale))
+        if window >= min(width, height) or share < 1:
+            # The window would not add detail beyond the global view
+            continue
+
+        stride = max(1, int(window * stride_factor))
+        cols = max(1, int(np.ceil((width - window) / stride)) + 1)
+        rows = max(1, int(np.ceil((height - window) / stride)) + 1)
+        while rows * cols > share:
+            if cols >= rows and cols > 1:
+                cols -= 1
+            elif rows > 1:
+                rows -= 1
+            else:
+                break
+
+        ys = _grid_positions(height, window, rows)
+        xs = _grid_positions(width, window, cols)
+        for r, y in enumerate(ys):
+            for c, x in enumerate(xs):
+                tiles.append(Tile(scale=scale, row=r, col=c, box=(x, y, x + window, y + window)))
+
+    return tiles
+
+
+def extract_tiles(image: Image.Image, tiles: Sequence[Tile], patch_size: int) -> np.ndarray:
+    """
+    Crop and resize every tile into one model batch.
+
+    Args:
+        image: Source PIL image
+        tiles: Tiles from ``plan_tiles``
+        patch_size: Model input size in pixels
+
+    Returns:
+        Float32 array of shape (len(tiles), patch_size, patch_size, 3) in [0, 1]
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    batch = np.empty((len(tiles), patch_size, patch_size, 3), dtype=np.float32)
+    for i, tile in enumerate(tiles):
+        patch = image.resize((patch_size, patch_size), Image.Resampling.BILINEAR, box=tile.box, reducing_gap=2.0)
+        batch[i] = np.asarray(patch, dtype=np.float32)
+    batch *= 1.0 / 255.0
+    return batch
+
+
+def aggregate_tiles(probabilities: np.ndarray, tiles: Sequence[Tile]) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Combine per-tile probabilities into an image-level result and a heatmap.
+
+    The image-level distribution is the mean over all tiles. The heatmap is
+    the probability of the image-level top class on the grid of the finest
+    scale that was tiled.
+
+    Args:
+        probabilities: Array of shape (len(tiles), num_classes)
+        tiles: Tiles the probabilities were computed for
+
+    Returns:
+        Tuple of (image-level probabilities, heatmap info dictionary)
+    """
+    image_probs = probabilities.mean(axis=0)
+    top_class = int(np.argmax(image_probs))
+
+    patch_scales = sorted({tile.scale for tile in tiles if tile.scale > 0}, reverse=True)
+    heatmap: List[List[float]] = []
+    heatmap_scale = None
+    if patch_scales:
+        heatmap_scale = patch_scales[0]
+        indices = [i for i, tile in enumerate(tiles) if tile.scale == heatmap_scale]
+        rows = max(tiles[i].row for i in indices) + 1
+        cols = max(tiles[i].col for i in indices) + 1
+        grid = np.zeros((rows, cols), dtype=np.float64)
+        for i in indices:
+            grid[tiles[i].row, tiles[i].col] = probabilities[i, top_class]
+        heatmap = np.round(grid, 4).tolist()
+
+    return image_probs, {
+        "heatmap": heatmap,
+        "heatmap_class_index": top_class,
+        "heatmap_scale": heatmap_scale,
+    }
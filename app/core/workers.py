@@ -0,0 +1,258 @@
+"""
+Multi-worker (pre-fork) deployment support.
+
+In production gunicorn imports the app once in the master process
+(``preload_app``), loads the model there and freezes the garbage collector,
+then forks the workers. The model weights and every module imported before
+the fork are shared copy-on-write between all workers instead of being
+loaded once per worker; ``gc.freeze()`` keeps the collector from touching
+(and thereby copying) those objects later. State that must not cross a fork
+-- the MongoDB client, background threads -- is reset in each worker.
+
+TensorFlow starts its thread pools when the model loads, and a fork only
+copies the calling thread. Inference in the workers is safe as long as the
+master itself never runs the model; set ``MODEL_PRELOAD=false`` to load it
+lazily per worker instead (one copy each) if a TensorFlow build misbehaves.
+
+Memory is reported per worker from ``/proc/<pid>/smaps_rollup``: RSS counts
+shared pages in every process, PSS splits them between the processes that
+share them, and private (USS) memory is what each worker adds on its own.
+"""
+
+import gc
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.metrics import REGISTRY
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may use, honouring affinity and cgroup CPU quotas.
+
+    Returns:
+        Number of usable CPUs (at least 1)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def memory_limit_bytes() -> Optional[int]:
+    """
+    Memory available to the container (cgroup limit) or the machine.
+
+    Returns:
+        Limit in bytes, or None if unknown
+    """
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value != "max" and int(value) < 1 << 60:
+                return int(value)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def recommended_workers(worker_memory_mb: int, shared_memory_mb: int = 0, maximum: int = 8) -> int:
+    """
+    Worker count for CPU-bound inference.
+
+    One worker per usable CPU (inference keeps a core busy, so more workers
+    only add contention), reduced if the private memory of that many workers
+    would not fit next to the shared model.
+
+    Args:
+        worker_memory_mb: Private memory each worker needs
+        shared_memory_mb: Memory shared by all workers (model, libraries)
+        maximum: Upper bound
+
+    Returns:
+        Number of workers (at least 1)
+    """
+    workers = min(available_cpus(), maximum)
+    limit = memory_limit_bytes()
+    if limit and worker_memory_mb > 0:
+        fitting = int((limit / 2**20 - shared_memory_mb) // worker_memory_mb)
+        workers = min(workers, fitting)
+    return max(1, workers)
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    RSS, PSS and shared/private memory of a process in bytes.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        Dictionary with rss, pss, shared, private and the raw smaps fields,
+        or None if the process cannot be inspected
+    """
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in _SMAPS_FIELDS:
+                    values[_SMAPS_FIELDS[name]] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    values["shared"] = values.get("shared_clean", 0) + values.get("shared_dirty", 0)
+    values["private"] = values.get("private_clean", 0) + values.get("private_dirty", 0)
+    return values
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def worker_pids() -> List[int]:
+    """
+    PIDs of all workers serving the app.
+
+    Under gunicorn these are the children of the master recorded by
+    ``prepare_for_fork``, except the inference sidecar (``APP_SIDECAR_PID``);
+    a single uvicorn process reports itself.
+    """
+    master = os.environ.get("APP_MASTER_PID")
+    if master:
+        sidecar = os.environ.get("APP_SIDECAR_PID")
+        pids = [pid for pid in _children(int(master)) if str(pid) != sidecar]
+        if pids:
+            return sorted(pids)
+    return [os.getpid()]
+
+
+def worker_count() -> int:
+    """Number of worker processes gunicorn was configured with (1 outside gunicorn)."""
+    try:
+        return max(1, int(os.environ.get("APP_WORKER_COUNT", "1")))
+    except ValueError:
+        return 1
+
+
+def worker_memory_report() -> Dict[str, Any]:
+    """
+    Memory of every worker and of the master, with totals.
+
+    Returns:
+        Dictionary with per-process figures and totals in bytes
+    """
+    workers = []
+    for pid in worker_pids():
+        memory = process_memory(pid)
+        if memory is not None:
+            workers.append({"pid": pid, "current": pid == os.getpid(), **memory})
+
+    report = {
+        "workers": workers,
+        "worker_count": len(workers),
+        "total_rss": sum(w["rss"] for w in workers),
+        "total_pss": sum(w["pss"] for w in workers),
+        "total_private": sum(w["private"] for w in workers),
+    }
+    master = os.environ.get("APP_MASTER_PID")
+    if master:
+        report["master"] = {"pid": int(master), **(process_memory(int(master)) or {})}
+    # RSS double-counts shared pages; PSS is the memory actually used
+    report["shared_ratio"] = round(1 - report["total_pss"] / report["total_rss"], 4) if report["total_rss"] else None
+    return report
+
+
+def _collect_worker_memory() -> Dict[tuple, float]:
+    samples = {}
+    for worker in worker_memory_report()["workers"]:
+        for kind in ("rss", "pss", "shared", "private"):
+            samples[(str(worker["pid"]), kind)] = worker[kind]
+    return samples
+
+
+REGISTRY.gauge(
+    "worker_memory_bytes",
+    "Memory of each worker process by kind (rss, pss, shared, private)",
+    ("pid", "kind"),
+    collect=_collect_worker_memory,
+)
+
+
+def prepare_for_fork(load_model: bool = True):
+    """
+    Load shared state in the master, then freeze it for copy-on-write.
+
+    Args:
+        load_model: Load the model weights before forking
+    """
+    os.environ["APP_MASTER_PID"] = str(os.getpid())
+    start = time.perf_counter()
+    if load_model:
+        from app.dependencies import get_inference_service, get_model_loader
+        model_loader = get_model_loader()
+        try:
+            model_loader.get_model()
+        except Exception as e:
+            logger.warning("Model not preloaded (workers will use the fallback or load lazily): %s", e)
+        get_inference_service(model_loader)
+
+    # Objects that exist now are never collected again, so the collector
+    # does not write to (and un-share) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded app for fork in %.1f s (%d objects frozen)",
+        time.perf_counter() - start, gc.get_freeze_count()
+    )
+
+
+def reset_after_fork():
+    """Drop per-process state inherited from the master."""
+    from app import db
+    from app.core import rate_limit
+    from app.services import history
+    from app.utils import logger as app_logger
+
+    # The log writer thread stayed in the master; without a new one the
+    # worker's records pile up in a queue nothing drains
+    app_logger.reset_logging_after_fork()
+    # pymongo clients are not fork-safe; each worker connects on first use
+    db._mongo_client = None
+    db._mongo_db = None
+    # Background threads do not survive fork; the writer restarts on first record
+    history._prediction_history = None
+    # A Redis connection pool must not be shared between processes
+    rate_limit._rate_limiter = None
@@ -71,6 +71,12 @@ def get_password_reset_otps_collection():
     return db["password_reset_otps"]
 
 
+def get_predictions_collection():
+    """Get prediction history collection."""
+    db = get_mongo_db()
+    return db["predictions"]
+
+
 # Initialize collections with indexes (non-blocking)
 def init_collections():
     """Initialize MongoDB collections with required indexes."""
@@ -84,6 +90,10 @@ def init_collections():
         # Create index for automatic expiration of OTPs
         otps.create_index("expires_at", expireAfterSeconds=0)
         logger.info("✅ Password reset OTPs collection TTL index created")
+        
+        from app.services.history import create_history_indexes
+        create_history_indexes(get_predictions_collection())
+        logger.info("✅ Predictions collection indexes created")
     except Exception as e:
         # Don't crash if indexes already exist or connection has issues
         logger.warning(f"⚠️  Could not fully initialize collection indexes: {e}")
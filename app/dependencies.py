@@ -1,22 +1,91 @@
 """
 Dependency injection for FastAPI endpoints.
+
+Services are constructed once and shared across requests; they hold no
+per-request state.
 """
 
+from fastapi import Depends
 from app.core.model_loader import ModelLoader
+from app.services.inference import InferenceService
+from app.services.explanation import ExplanationService
+from app.services.study import StudyService
+from app.services.history import PredictionHistory, get_prediction_history as _get_prediction_history
+from app.services.sidecar import SidecarModelLoader, get_sidecar_client
 from app.config import settings
 
-# Global model loader instance
+# Global service instances
 _model_loader = None
+_inference_service = None
+_study_service = None
+_explanation_service = None
 
 
 def get_model_loader() -> ModelLoader:
     """
     Get or create the model loader instance (singleton pattern).
     
+    With the inference server enabled the model lives in that process and
+    this loader only forwards batches to it.
+    
     Returns:
         ModelLoader: The model loader instance
     """
     global _model_loader
     if _model_loader is None:
-        _model_loader = ModelLoader(settings.MODEL_NAME)
+        if settings.INFERENCE_SIDECAR_ENABLED:
+            _model_loader = SidecarModelLoader(settings.MODEL_NAME, get_sidecar_client())
+        else:
+            _model_loader = ModelLoader(settings.MODEL_NAME)
     return _model_loader
+
+
+def get_inference_service(model_loader: ModelLoader = Depends(get_model_loader)) -> InferenceService:
+    """
+    Get the shared inference service.
+    
+    Rebuilt only if the model loader changes (e.g. a dependency override).
+    
+    Returns:
+        InferenceService: The inference service instance
+    """
+    global _inference_service
+    if _inference_service is None or _inference_service.model_loader is not model_loader:
+        _inference_service = InferenceService(model_loader)
+    return _inference_service
+
+
+def get_study_service(inference_service: InferenceService = Depends(get_inference_service)) -> StudyService:
+    """
+    Get the shared study service.
+    
+    Returns:
+        StudyService: The study service instance
+    """
+    global _study_service
+    if _study_service is None or _study_service.inference_service is not inference_service:
+        _study_service = StudyService(inference_service)
+    return _study_service
+
+
+def get_explanation_service() -> ExplanationService:
+    """
+    Get the shared explanation service.
+    
+    Returns:
+        ExplanationService: The explanation service instance
+    """
+    global _explanation_service
+    if _explanation_service is None:
+        _explanation_service = ExplanationService()
+    return _explanation_service
+
+
+def get_prediction_history() -> PredictionHistory:
+    """
+    Get the shared prediction history store.
+    
+    Returns:
+        PredictionHistory: The history store with its write-behind buffer
+    """
+    return _get_prediction_history()
@@ -1,12 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.api.routes import predict, chat, auth, status
-from app.utils.logger import get_logger
+from app.api.routes import predict, chat, auth, status, admin, history
+from app.core.profiler import get_profiler, PROFILED_PATHS
+from app.core.compression import CompressionMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.static_files import CachedStaticFiles, PrecompressedStaticFiles
+from app.utils.logger import get_logger, request_id_var
 from app.db import init_collections, close_mongo_connection
+from app.services.history import get_prediction_history
 from app.config import settings
 import sys
 import os
+import uuid
 from pathlib import Path
 
 def _log_startup_info():
@@ -52,13 +57,21 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close MongoDB connection on shutdown."""
+    """Flush buffered history records, then close the MongoDB connection."""
+    try:
+        get_prediction_history().stop()
+    except Exception as e:
+        logger.error(f"❌ Error flushing prediction history: {e}")
     try:
         close_mongo_connection()
         logger.info("✅ MongoDB connection closed")
     except Exception as e:
         logger.error(f"❌ Error closing MongoDB connection: {e}")
 
+# Rate limiting runs inside CORS (so 429s carry CORS headers) but before
+# routing, so rejected requests never reach body parsing or the model
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware - configured from environment variables
 logger.info(f"🔧 Configuring CORS with origins: {settings.CORS_ORIGINS}")
 app.add_middleware(
@@ -70,11 +83,46 @@ app.add_middleware(
 )
 logger.info(f"✅ CORS middleware configured for origins: {settings.CORS_ORIGINS}")
 
+# Compress API JSON and static text assets for slow networks
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log record of a request with its id (X-Request-ID or generated)."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Trace /api/predict and /api/chat requests while a profiling session runs."""
+    profiler = get_profiler()
+    if not profiler.active or not request.url.path.startswith(PROFILED_PATHS):
+        return await call_next(request)
+    with profiler.request(request.url.path):
+        return await call_next(request)
+
+
 # Include routers (BEFORE static files)
 app.include_router(predict.router, prefix="/api", tags=["Prediction"])
+app.include_router(history.router, prefix="/api", tags=["History"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(auth.router, prefix="/api", tags=["Auth"])
 app.include_router(status.router, prefix="", tags=["Status"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
 
 # Health check endpoint (before static files mount)
 @app.get("/health", tags=["Health"])
@@ -88,13 +136,21 @@ async def health_check():
 
 # Mount static files for uploaded images and heatmaps
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-app.mount("/static", StaticFiles(directory=settings.UPLOAD_DIR), name="static")
+app.mount(
+    "/static",
+    CachedStaticFiles(directory=settings.UPLOAD_DIR, max_age=settings.STATIC_MAX_AGE),
+    name="static"
+)
 logger.info(f"Static files mounted from {settings.UPLOAD_DIR}")
 
 # Mount React frontend static files LAST - this must be last so it doesn't interfere with API routes
 frontend_dist = Path(__file__).parent.parent / "frontend" / "dist"
 if frontend_dist.exists():
-    app.mount("/", StaticFiles(directory=str(frontend_dist), html=True), name="frontend")
+    app.mount(
+        "/",
+        PrecompressedStaticFiles(directory=str(frontend_dist), html=True, max_age=settings.STATIC_MAX_AGE),
+        name="frontend"
+    )
     logger.info(f"Frontend static files mounted from {frontend_dist}")
 else:
     logger.warning(f"Frontend dist directory not found at {frontend_dist}. Only API will be available.")
@@ -2,8 +2,9 @@
 Pydantic schemas for prediction requests and responses.
 """
 
+from datetime import datetime
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class PredictionItem(BaseModel):
@@ -40,6 +41,53 @@ class BrainImageValidation(BaseModel):
     reason: str
 
 
+class TilingInfo(BaseModel):
+    """Details of a tiled multi-scale inference run."""
+    patches: int
+    patch_budget: int
+    scales: List[float]
+    latency_ms: float
+    heatmap: List[List[float]]
+    heatmap_class_index: int
+    heatmap_scale: Optional[float] = None
+
+
+class TTAInfo(BaseModel):
+    """Spread of predictions across test-time augmentations."""
+    augmentations: int
+    variance: List[float]  # per class, indexed by class_index
+    top_class_std: float
+    agreement: float  # fraction of augmentations voting for the top class
+    latency_ms: float
+
+
+class FramePrediction(BaseModel):
+    """Top class of one DICOM frame."""
+    frame: int
+    class_index: int
+    label: str
+    confidence: float
+
+
+class DicomInfo(BaseModel):
+    """Details of a DICOM upload."""
+    frames_total: int
+    frames_used: int
+    modality: str
+    bits_stored: int
+    photometric: str
+    window_center: Optional[float] = None
+    window_width: Optional[float] = None
+    frame_predictions: List[FramePrediction] = []
+
+
+class DerivativeInfo(BaseModel):
+    """Downscaled renditions of the upload for previews and history lists."""
+    preview_url: str
+    thumbnail_urls: Dict[str, str]  # longest side in pixels -> URL
+    ready: bool  # False while they are still being written in the background
+
+
 class PredictionResponse(BaseModel):
     """Response schema for prediction endpoint."""
     model_config = ConfigDict(
@@ -97,3 +145,68 @@ class PredictionResponse(BaseModel):
     validation_reason: Optional[str] = None
     error: Optional[str] = None
     medical_analysis: Optional[MedicalAnalysis] = None
+    inference_mode: Optional[str] = None  # 'single', 'tta' or 'tiled'
+    tiling: Optional[TilingInfo] = None
+    tta: Optional[TTAInfo] = None
+    dicom: Optional[DicomInfo] = None
+    heatmap_url: Optional[str] = None  # Grad-CAM overlay, when requested
+    derivatives: Optional[DerivativeInfo] = None
+
+
+class StudySlice(BaseModel):
+    """A slice contributing to a study-level prediction."""
+    slice_index: int
+    source: str
+    frame: Optional[int] = None
+    class_index: int
+    label: str
+    confidence: float
+    study_class_probability: float
+    informativeness: float
+
+
+class StudyPredictionResponse(BaseModel):
+    """Response schema for whole-study prediction."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    predictions: List[PredictionItem]
+    top_prediction: Optional[TopPrediction] = None
+    top_slices: List[StudySlice]
+    medical_analysis: Optional[MedicalAnalysis] = None
+    model_version: Optional[str] = None
+    status: str  # 'success', 'invalid_image', 'error'
+    slices_received: int
+    slices_valid: int
+    slices_evaluated: int
+    truncated: bool  # time budget ran out before all selected slices were evaluated
+    time_budget_ms: float
+    latency_ms: float
+    disclaimer: Optional[str] = None
+    error: Optional[str] = None
+
+
+class HistoryPrediction(BaseModel):
+    """Class probability stored with a history record."""
+    label: str
+    confidence: float
+
+
+class PredictionHistoryItem(BaseModel):
+    """One stored prediction."""
+    id: str
+    created_at: datetime
+    top_label: Optional[str] = None
+    class_index: Optional[int] = None
+    confidence: Optional[float] = None
+    predictions: List[HistoryPrediction] = []
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    heatmap_url: Optional[str] = None
+    model_version: Optional[str] = None
+    inference_mode: Optional[str] = None
+
+
+class PredictionHistoryResponse(BaseModel):
+    """One page of a user's prediction history, newest first."""
+    items: List[PredictionHistoryItem]
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last page
@@ -0,0 +1,238 @@
+"""
+Derived images (thumbnails and a web preview) for uploaded scans.
+
+Uploads are kept at full resolution for inference, but lists and history
+views only need small renditions. Derivatives are produced from the image
+already decoded for inference (a copy of it), in a background thread the
+request never waits for. Their names follow from the upload's content hash,
+so the response carries their URLs right away (``ready`` tells whether the
+files exist yet), re-uploading the same scan reuses them and the ``/static``
+mount can serve them as immutable.
+"""
+
+import os
+import threading
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.core.static_files import CONTENT_ADDRESSED
+from app.services.gradcam import file_sha256
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DERIVATIVE_SUBDIR = "derivatives"
+
+# Baseline JPEG encodes ~15x faster than WebP at preview size for a similar
+# file size on MRI slices, and every browser and image library reads it
+_DERIVATIVE_EXTENSION = ".jpg"
+
+
+def content_key(image_path: str) -> str:
+    """
+    Content hash prefix identifying an upload.
+
+    Uploads saved by the predict route are already named after their
+    SHA-256 prefix; other files are hashed.
+
+    Args:
+        image_path: Path to the uploaded file
+
+    Returns:
+        32-character hex key
+    """
+    name = os.path.basename(image_path)
+    if CONTENT_ADDRESSED.match(name):
+        return name[:32]
+    return file_sha256(image_path)[:32]
+
+
+def _is_grayscale(image: Image.Image, tolerance: int = 2) -> bool:
+    """Check on a reduced copy whether an RGB image carries color at all."""
+    if image.mode == "L":
+        return True
+    factor = max(1, max(image.size) // 64)
+    sample = np.asarray(image.convert("RGB").reduce(factor), dtype=np.int16)
+    return int(np.abs(sample - sample[..., :1]).max()) <= tolerance
+
+
+class DerivativeService:
+    """Generate and locate thumbnails and previews of uploads."""
+
+    def __init__(
+        self,
+        thumbnail_sizes: Optional[List[int]] = None,
+        preview_size: int = 1024,
+        quality: int = 80,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            thumbnail_sizes: Longest side of each thumbnail in pixels
+            preview_size: Longest side of the web preview in pixels
+            quality: Lossy encoder quality (0-100)
+        """
+        self.thumbnail_sizes = sorted(thumbnail_sizes or [128, 256], reverse=True)
+        self.preview_size = preview_size
+        self.quality = quality
+        # Created on first use, so a service built before fork starts no thread
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, image_path: str, key: str, name: str) -> Path:
+        return Path(image_path).parent / DERIVATIVE_SUBDIR / f"{key}_{name}{_DERIVATIVE_EXTENSION}"
+
+    def _write(self, image: Image.Image, path: Path) -> int:
+        """Encode one rendition atomically (a unique temporary file per writer)."""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format="JPEG", quality=self.quality)
+            # mkstemp creates the file private; renditions are served as static files
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path.stat().st_size
+
+    def _renditions(self, image_path: str):
+        key = content_key(image_path)
+        preview_path = self._path(image_path, key, "preview")
+        thumbnails = {str(size): self._path(image_path, key, f"thumb{size}") for size in self.thumbnail_sizes}
+        return preview_path, thumbnails
+
+    def locate(self, image_path: str) -> Dict[str, Any]:
+        """
+        Paths the derivatives of an upload are (or will be) written to.
+
+        Args:
+            image_path: Path to the uploaded file
+
+        Returns:
+            Dictionary with the preview path, thumbnail paths by size and
+            whether all of them exist
+        """
+        preview_path, thumbnails = self._renditions(image_path)
+        return {
+            "preview_path": str(preview_path),
+            "thumbnail_paths": {size: str(path) for size, path in thumbnails.items()},
+            "ready": preview_path.exists() and all(path.exists() for path in thumbnails.values()),
+        }
+
+    def generate(self, image: Image.Image, image_path: str) -> Dict[str, Any]:
+        """
+        Write the preview and thumbnails of a decoded upload.
+
+        Each rendition is downscaled from the previous (larger) one, so the
+        full-resolution image is resampled only once, and grayscale scans
+        (all valid MRI) are resampled and stored as a single channel.
+        Renditions already on disk for the same content are reused.
+
+        Args:
+            image: Decoded upload (the image used for inference)
+            image_path: Path to the uploaded file
+
+        Returns:
+            Dictionary with rendition paths, generation time and sizes
+        """
+        start = time.perf_counter()
+        preview_path, thumbnails = self._renditions(image_path)
+        renditions = [preview_path, *thumbnails.values()]
+
+        if all(path.exists() for path in renditions):
+            logger.debug("Derivatives already exist for %s", preview_path.name)
+        else:
+            preview_path.parent.mkdir(parents=True, exist_ok=True)
+            current = image.convert("L" if _is_grayscale(image) else "RGB")
+            if current is image:
+                current = image.copy()
+            current.thumbnail((self.preview_size, self.preview_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            self._write(current, preview_path)
+            for size in self.thumbnail_sizes:
+                current.thumbnail((size, size), Image.Resampling.LANCZOS)
+                self._write(current, thumbnails[str(size)])
+
+        total_bytes = sum(path.stat().st_size for path in renditions)
+        original_bytes = os.path.getsize(image_path)
+        return {
+            "preview_path": str(preview_path),
+            "thumbnail_paths": {size: str(path) for size, path in thumbnails.items()},
+            "generation_ms": round((time.perf_counter() - start) * 1000, 2),
+            "bytes": total_bytes,
+            "original_bytes": original_bytes,
+            "storage_overhead": round(total_bytes / original_bytes, 4) if original_bytes else None,
+        }
+
+    def schedule(self, image: Image.Image, image_path: str) -> Dict[str, Any]:
+        """
+        Generate derivatives in the background, without waiting for them.
+
+        The job gets its own copy of the image, so the caller may keep
+        resizing and converting it. Failures are logged; they never reach
+        the prediction.
+
+        Args:
+            image: Decoded upload
+            image_path: Path to the uploaded file
+
+        Returns:
+            ``locate`` result for the upload
+        """
+        located = self.locate(image_path)
+        if located["ready"]:
+            return located
+        key = content_key(image_path)
+        with self._lock:
+            if key in self._pending:
+                return located  # identical upload already being rendered
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="derivatives")
+            future = self._executor.submit(self.generate, image.copy(), image_path)
+            self._pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return located
+
+    def _finished(self, key: str, future: Future):
+        with self._lock:
+            self._pending.pop(key, None)
+        error = future.exception()
+        if error is not None:
+            logger.warning("Derivative generation failed: %s", error)
+        else:
+            logger.debug("Derivatives for %s written in %.1f ms", key[:12], future.result()["generation_ms"])
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the derivatives scheduled so far are written (tests, shutdown)."""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass  # logged by _finished
+
+
+# Global derivative service instance
+_derivative_service = None
+
+
+def get_derivative_service() -> DerivativeService:
+    """Get or initialize the global derivative service instance."""
+    global _derivative_service
+    if _derivative_service is None:
+        _derivative_service = DerivativeService(
+            thumbnail_sizes=settings.DERIVATIVE_THUMBNAIL_SIZES,
+            preview_size=settings.DERIVATIVE_PREVIEW_SIZE,
+            quality=settings.DERIVATIVE_QUALITY,
+        )
+    return _derivative_service
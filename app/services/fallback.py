@@ -0,0 +1,161 @@
+"""
+Fallback predictor used when the trained model is unavailable.
+
+Generates realistic, deterministic class scores from cheap image
+statistics. Features are computed on a small grayscale buffer in a single
+histogram pass, and randomness comes from a per-call ``numpy.random.Generator``
+seeded with a hash of that buffer, so the predictor has no global side
+effects and is safe to call from many threads at once.
+"""
+
+import hashlib
+from typing import List, Sequence
+
+import numpy as np
+from PIL import Image
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ITU-R 601-2 luma weights, same as PIL's "L" conversion
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Score bonus added per class when a feature rule fires
+# (column order matches class indices: glioma, meningioma, no tumor, pituitary)
+_RULE_BONUS = np.array([
+    [0.0, 0.0, 0.15, 0.0],  # low contrast -> "No Tumor"
+    [0.1, 0.0, 0.0, 0.0],   # high entropy -> "Glioma"
+    [0.0, 0.1, 0.0, 0.0],   # dark image -> "Meningioma"
+    [0.0, 0.0, 0.0, 0.1],   # many edges -> "Pituitary"
+], dtype=np.float64)
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+class FallbackPredictor:
+    """Deterministic, thread-safe image-statistics predictor."""
+
+    def __init__(self, feature_size: int = 128, num_classes: int = 4):
+        """
+        Initialize the predictor.
+
+        Args:
+            feature_size: Longest side of the buffer features are computed on
+            num_classes: Number of output classes
+        """
+        self.feature_size = feature_size
+        self.num_classes = num_classes
+
+    def _buffer_from_image(self, image: Image.Image) -> np.ndarray:
+        """Downsample a PIL image to a small uint8 grayscale buffer."""
+        factor = max(1, max(image.size) // self.feature_size)
+        if factor > 1:
+            image = image.reduce(factor)
+        return np.asarray(image.convert("L"), dtype=np.uint8)
+
+    def _buffers_from_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Convert an NHWC model batch (uint8 or [0, 1] floats) to grayscale buffers."""
+        batch = np.asarray(batch)
+        step = max(1, max(batch.shape[1:3]) // self.feature_size)
+        batch = batch[:, ::step, ::step]
+        if batch.dtype != np.uint8:
+            # Quantize first so a /255 float batch hashes like its uint8 source
+            batch = np.clip(batch * 255.0 + 0.5, 0, 255).astype(np.uint8)
+        if batch.ndim == 4 and batch.shape[-1] >= 3:
+            gray = batch[..., :3] @ _LUMA
+        else:
+            gray = batch.reshape(batch.shape[:3])
+        return np.clip(gray + 0.5, 0, 255).astype(np.uint8)
+
+    def _features(self, buffer: np.ndarray) -> np.ndarray:
+        """
+        Compute mean, std, entropy and edge density of one buffer.
+
+        Mean, standard deviation and entropy all come from one histogram.
+        """
+        hist = np.bincount(buffer.ravel(), minlength=256).astype(np.float64)
+        hist /= hist.sum()
+        mean = hist @ _LEVELS
+        std = np.sqrt(max(hist @ (_LEVELS * _LEVELS) - mean * mean, 0.0))
+        nonzero = hist[hist > 0]
+        entropy = -np.sum(nonzero * np.log2(nonzero))
+
+        signed = buffer.astype(np.int16)
+        gx = np.abs(np.diff(signed, axis=1))[:-1, :]
+        gy = np.abs(np.diff(signed, axis=0))[:, :-1]
+        edge_density = float(np.mean((gx + gy) > 0)) if gx.size else 0.0
+
+        return np.array([mean, std, entropy, edge_density])
+
+    def _generator(self, buffer: np.ndarray) -> np.random.Generator:
+        """Create a Generator seeded from the buffer contents."""
+        digest = hashlib.blake2b(buffer.tobytes(), digest_size=8).digest()
+        return np.random.default_rng(int.from_bytes(digest, "little"))
+
+    def _score(self, buffers: Sequence[np.ndarray]) -> np.ndarray:
+        """Turn grayscale buffers into an (N, num_classes) probability matrix."""
+        features = np.stack([self._features(buffer) for buffer in buffers])
+        base = np.stack([
+            self._generator(buffer).dirichlet(np.ones(self.num_classes)) for buffer in buffers
+        ])
+
+        mean, std, entropy, edge_density = features.T
+        rules = np.stack([std < 20, entropy > 6.5, mean < 50, edge_density > 0.1], axis=1)
+        scores = base + rules.astype(np.float64) @ _RULE_BONUS[:, :self.num_classes]
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores.astype(np.float32)
+
+    def _uniform(self, count: int) -> np.ndarray:
+        return np.full((count, self.num_classes), 1.0 / self.num_classes, dtype=np.float32)
+
+    def predict(self, image: Image.Image) -> np.ndarray:
+        """
+        Predict class probabilities for one image.
+
+        Args:
+            image: PIL Image object
+
+        Returns:
+            Numpy array of shape (num_classes,)
+        """
+        try:
+            return self._score([self._buffer_from_image(image)])[0]
+        except Exception as e:
+            logger.warning("Fallback prediction failed: %s. Using uniform distribution.", e)
+            return self._uniform(1)[0]
+
+    def predict_images(self, images: List[Image.Image]) -> np.ndarray:
+        """
+        Predict class probabilities for several PIL images.
+
+        Args:
+            images: PIL Image objects
+
+        Returns:
+            Numpy array of shape (N, num_classes)
+        """
+        try:
+            return self._score([self._buffer_from_image(image) for image in images])
+        except Exception as e:
+            logger.warning("Fallback prediction failed: %s. Using uniform distribution.", e)
+            return self._uniform(len(images))
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities for a preprocessed model batch.
+
+        Accepts the same NHWC tensor the CNN would receive, so a micro-batch
+        can fall back as a whole when the model is unavailable.
+
+        Args:
+            batch: Array of shape (N, H, W, C), uint8 or floats in [0, 1]
+
+        Returns:
+            Numpy array of shape (N, num_classes)
+        """
+        try:
+            return self._score(list(self._buffers_from_batch(batch)))
+        except Exception as e:
+            logger.warning("Fallback prediction failed: %s. Using uniform distribution.", e)
+            return self._uniform(len(batch))
@@ -0,0 +1,267 @@
+"""
+Grad-CAM explainability service.
+
+Computes class-activation heatmaps for the predicted class from the same
+forward pass that produces the prediction: a two-output Keras model returns
+both the last convolutional activations and the class probabilities under
+one ``GradientTape``, so explaining an image costs one backward pass instead
+of a second full inference. Overlays are cached by image hash and model
+version, encoded off the event loop and served from the ``/static`` mount.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, features
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HEATMAP_SUBDIR = "heatmaps"
+
+# Compact lossy WebP when Pillow supports it, PNG otherwise
+_HEATMAP_FORMAT = "WEBP" if features.check("webp") else "PNG"
+_HEATMAP_EXTENSION = ".webp" if _HEATMAP_FORMAT == "WEBP" else ".png"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Hash a file's contents.
+
+    Args:
+        path: File path
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_version_key(model_loader) -> str:
+    """
+    Identify the model weights an overlay was computed with.
+
+    Combines the model file name with its modification time so retraining
+    in place invalidates cached overlays.
+
+    Args:
+        model_loader: ModelLoader instance
+
+    Returns:
+        Version string safe to use in file names
+    """
+    stem = Path(model_loader.model_name).stem
+    model_path = getattr(model_loader, "model_path", None)
+    try:
+        return f"{stem}-{int(Path(model_path).stat().st_mtime)}"
+    except (OSError, TypeError):
+        return stem
+
+
+def _colormap(values: np.ndarray) -> np.ndarray:
+    """Map [0, 1] values to a blue-green-red "jet"-style palette (uint8 RGB)."""
+    v = np.clip(values, 0.0, 1.0)
+    r = np.clip(1.5 - np.abs(4.0 * v - 3.0), 0.0, 1.0)
+    g = np.clip(1.5 - np.abs(4.0 * v - 2.0), 0.0, 1.0)
+    b = np.clip(1.5 - np.abs(4.0 * v - 1.0), 0.0, 1.0)
+    return (np.stack([r, g, b], axis=-1) * 255).astype(np.uint8)
+
+
+# 256-entry lookup table so overlays index a palette instead of recomputing it
+_PALETTE = _colormap(np.linspace(0.0, 1.0, 256)).astype(np.float32)
+
+
+def last_conv_layer(model, conv_types: tuple):
+    """
+    Find the layer Grad-CAM should explain.
+
+    Pooling, normalization and reshaping layers also output 4D tensors, so
+    the layer is picked by type rather than by output rank.
+
+    Args:
+        model: Keras model
+        conv_types: Convolution layer classes (Conv2D, DepthwiseConv2D)
+
+    Returns:
+        The last convolution layer of the model
+
+    Raises:
+        ValueError: If the model has no convolution layer
+    """
+    for layer in reversed(model.layers):
+        if isinstance(layer, conv_types):
+            return layer
+    raise ValueError("Model has no convolutional layer to explain")
+
+
+class GradCamService:
+    """Compute, cache and encode Grad-CAM overlays."""
+
+    def __init__(self, cache_size: int = 256, max_side: int = 512, alpha: float = 0.45):
+        """
+        Initialize the service.
+
+        Args:
+            cache_size: Number of (image hash, model version) entries kept in memory
+            max_side: Longest side of the encoded overlay in pixels
+            alpha: Heatmap opacity over the scan
+        """
+        self.cache_size = cache_size
+        self.max_side = max_side
+        self.alpha = alpha
+        self.output_dir = Path(settings.UPLOAD_DIR) / HEATMAP_SUBDIR
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Keyed by the model object: a reloaded model never reuses a stale entry
+        self._grad_models = weakref.WeakKeyDictionary()
+
+    def _heatmap_path(self, image_hash: str, model_version: str) -> Path:
+        return self.output_dir / f"{image_hash[:32]}_{model_version}{_HEATMAP_EXTENSION}"
+
+    def lookup(self, image_hash: str, model_version: str) -> Optional[str]:
+        """
+        Find an already generated overlay.
+
+        Args:
+            image_hash: SHA-256 of the uploaded file
+            model_version: Key from ``model_version_key``
+
+        Returns:
+            Path of the overlay file, or None
+        """
+        key = (image_hash, model_version)
+        with self._lock:
+            path = self._cache.get(key)
+            if path is not None:
+                self._cache.move_to_end(key)
+                return path
+
+        # Survive restarts: overlays are content-addressed on disk
+        candidate = self._heatmap_path(image_hash, model_version)
+        if candidate.exists():
+            self._remember(key, str(candidate))
+            return str(candidate)
+        return None
+
+    def _remember(self, key: Tuple[str, str], path: str):
+        with self._lock:
+            self._cache[key] = path
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _get_grad_model(self, model):
+        """Build (once per model) a model returning last-conv activations and predictions."""
+        grad_model = self._grad_models.get(model)
+        if grad_model is not None:
+            return grad_model
+
+        import tensorflow as tf
+
+        conv_layer = last_conv_layer(
+            model, (tf.keras.layers.Conv2D, tf.keras.layers.DepthwiseConv2D)
+        )
+        grad_model = tf.keras.Model(model.inputs, [conv_layer.output, model.output])
+        self._grad_models[model] = grad_model
+        logger.info("Grad-CAM model built on layer '%s'", conv_layer.name)
+        return grad_model
+
+    def predict_with_cam(self, model, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run one forward pass returning predictions and top-class Grad-CAMs.
+
+        Args:
+            model: Loaded Keras model
+            batch: Preprocessed array of shape (N, H, W, 3)
+
+        Returns:
+            Tuple of (probabilities (N, C), CAMs (N, h, w) normalized to [0, 1])
+        """
+        import tensorflow as tf
+
+        grad_model = self._get_grad_model(model)
+        inputs = tf.convert_to_tensor(batch)
+        with tf.GradientTape() as tape:
+            conv_output, predictions = grad_model(inputs, training=False)
+            top_class = tf.argmax(predictions, axis=1)
+            class_scores = tf.gather(predictions, top_class, axis=1, batch_dims=1)
+
+        grads = tape.gradient(class_scores, conv_output)
+        weights = tf.reduce_mean(grads, axis=(1, 2))
+        cams = tf.nn.relu(tf.einsum("nhwc,nc->nhw", conv_output, weights))
+        peak = tf.reduce_max(cams, axis=(1, 2), keepdims=True)
+        cams = tf.math.divide_no_nan(cams, peak)
+        return predictions.numpy(), cams.numpy()
+
+    def _encode_overlay(self, image: Image.Image, cam: np.ndarray, path: Path) -> str:
+        """Blend a CAM over the scan and write it as a compact image file."""
+        base = image.convert("L")
+        base.thumbnail((self.max_side, self.max_side), Image.Resampling.BILINEAR)
+
+        cam_image = Image.fromarray((np.clip(cam, 0, 1) * 255).astype(np.uint8), mode="L")
+        cam_levels = np.asarray(cam_image.resize(base.size, Image.Resampling.BILINEAR))
+
+        gray = np.asarray(base, dtype=np.float32)[..., None]
+        overlay = (1 - self.alpha) * gray + self.alpha * _PALETTE[cam_levels]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temporary file per writer: workers may render the same overlay
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                Image.fromarray(overlay.astype(np.uint8), mode="RGB").save(
+                    f, format=_HEATMAP_FORMAT, quality=80, method=2
+                )
+            # mkstemp creates the file private; overlays are served as static files
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return str(path)
+
+    async def save_overlay(self, image: Image.Image, cam: np.ndarray, image_hash: str, model_version: str) -> str:
+        """
+        Encode an overlay in a worker thread and cache its path.
+
+        Args:
+            image: Original scan
+            cam: CAM normalized to [0, 1]
+            image_hash: SHA-256 of the uploaded file
+            model_version: Key from ``model_version_key``
+
+        Returns:
+            Path of the written overlay
+        """
+        path = self._heatmap_path(image_hash, model_version)
+        loop = asyncio.get_running_loop()
+        written = await loop.run_in_executor(None, self._encode_overlay, image, cam, path)
+        self._remember((image_hash, model_version), written)
+        return written
+
+
+# Global Grad-CAM service instance
+_gradcam_service = None
+
+
+def get_gradcam_service() -> GradCamService:
+    """Get or initialize the global Grad-CAM service instance."""
+    global _gradcam_service
+    if _gradcam_service is None:
+        _gradcam_service = GradCamService()
+    return _gradcam_service
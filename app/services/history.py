@@ -0,0 +1,309 @@
+"""
+Prediction history.
+
+Successful predictions are stored per user so the history view can list
+them without re-running inference. Writes go through a write-behind buffer:
+the request only appends a compact record to an in-memory queue, and a
+background thread inserts queued records with one ``insert_many`` per batch,
+so each batch costs a single round-trip and one index update pass instead of
+one per prediction. Reads use keyset (range) pagination on
+``(created_at, _id)``, which the ``user_id`` compound index serves directly;
+unlike skip/limit, deep pages cost the same as the first one.
+"""
+
+import base64
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import settings
+from app.db import get_predictions_collection
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Newest first; _id breaks ties between records written in the same millisecond
+HISTORY_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+HISTORY_INDEXES = (
+    ("user_created", [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("user_label_created", [("user_id", ASCENDING), ("top_label", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("created", [("created_at", DESCENDING)]),
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _utc_now_ms() -> datetime:
+    """Current UTC time at MongoDB's millisecond precision."""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def create_history_indexes(collection):
+    """
+    Create the indexes used by history queries.
+
+    Args:
+        collection: Predictions collection
+    """
+    for name, keys in HISTORY_INDEXES:
+        collection.create_index(keys, name=name)
+
+
+def build_history_record(user: Dict[str, Any], prediction: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a prediction response to the fields the history view needs.
+
+    The medical analysis and disclaimer are derived from the label, so they
+    are not stored; neither are tiling heatmaps or TTA statistics.
+
+    Args:
+        user: Authenticated user document
+        prediction: Prediction result with URLs already resolved
+
+    Returns:
+        Document ready for insertion
+    """
+    top = prediction.get("top_prediction") or {}
+    derivatives = prediction.get("derivatives") or {}
+    thumbnails = derivatives.get("thumbnail_urls") or {}
+    return {
+        "_id": ObjectId(),
+        "user_id": user["_id"],
+        "created_at": _utc_now_ms(),
+        "top_label": top.get("label"),
+        "class_index": top.get("class_index"),
+        "confidence": top.get("confidence"),
+        "predictions": [
+            {"label": p["label"], "confidence": p["confidence"]} for p in prediction.get("predictions", [])
+        ],
+        "image_url": prediction.get("image_path"),
+        "thumbnail_url": thumbnails.get(min(thumbnails, key=int)) if thumbnails else None,
+        "heatmap_url": prediction.get("heatmap_url"),
+        "model_version": prediction.get("model_version"),
+        "inference_mode": prediction.get("inference_mode"),
+    }
+
+
+def encode_cursor(created_at: datetime, record_id: ObjectId) -> str:
+    """Encode the sort key of the last returned record as an opaque cursor."""
+    millis = (created_at.replace(tzinfo=None) - _EPOCH) // timedelta(milliseconds=1)
+    raw = f"{millis}:{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Returns:
+        Tuple of (naive UTC datetime, as pymongo stores it, and record id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        millis, record_id = raw.split(":", 1)
+        return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(record_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class PredictionHistory:
+    """Write-behind persistence and paginated reads of prediction history."""
+
+    def __init__(
+        self,
+        collection=None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+    ):
+        """
+        Initialize the history store.
+
+        Args:
+            collection: Predictions collection (resolved lazily when None)
+            batch_size: Maximum records per insert_many
+            flush_interval: Seconds a record may wait before its batch is written
+            max_queue: Records buffered before new ones are dropped
+        """
+        self._collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0}
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_predictions_collection()
+        return self._collection
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, user: Dict[str, Any], prediction: Dict[str, Any]) -> bool:
+        """
+        Queue a prediction for persistence without blocking the request.
+
+        Args:
+            user: Authenticated user document
+            prediction: Prediction result with URLs already resolved
+
+        Returns:
+            True if queued, False if the buffer is full and the record was dropped
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(build_history_record(user, prediction))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            logger.warning("Prediction history buffer full; dropping record")
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block for the first record, then collect more until the batch or interval is full."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error("Failed to persist %d history records: %s", len(batch), e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every queued record has been written.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Write remaining records and stop the writer thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def query(
+        self,
+        user_id: Any,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fetch one page of a user's history, newest first.
+
+        Args:
+            user_id: Owner of the records
+            limit: Page size
+            cursor: ``next_cursor`` of the previous page
+            label: Only records with this top label
+
+        Returns:
+            Dictionary with ``items`` and ``next_cursor`` (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        criteria: Dict[str, Any] = {"user_id": user_id}
+        if label:
+            criteria["top_label"] = label
+        if cursor:
+            created_at, record_id = decode_cursor(cursor)
+            criteria["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": record_id}},
+            ]
+
+        # One extra record tells whether another page exists
+        documents = list(
+            self.collection.find(criteria, {"user_id": 0}).sort(HISTORY_SORT).limit(limit + 1)
+        )
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+
+        items = []
+        for document in documents:
+            created_at = document["created_at"].replace(tzinfo=timezone.utc)
+            document["id"] = str(document.pop("_id"))
+            document["created_at"] = created_at
+            items.append(document)
+
+        next_cursor = None
+        if has_more:
+            last = items[-1]
+            next_cursor = encode_cursor(last["created_at"], ObjectId(last["id"]))
+        return {"items": items, "next_cursor": next_cursor}
+
+
+# Global history instance
+_prediction_history = None
+
+
+def get_prediction_history() -> PredictionHistory:
+    """Get or initialize the global prediction history instance."""
+    global _prediction_history
+    if _prediction_history is None:
+        _prediction_history = PredictionHistory(
+            batch_size=settings.HISTORY_BATCH_SIZE,
+            flush_interval=settings.HISTORY_FLUSH_INTERVAL_S,
+            max_queue=settings.HISTORY_QUEUE_SIZE,
+        )
+    return _prediction_history
@@ -6,11 +6,24 @@ Handles preprocessing and returns class predictions with confidence scores.
 Includes brain image validation and detailed medical analysis.
 """
 
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
+import json
+import time
 import numpy as np
-from scipy import ndimage
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
 from app.core.model_loader import ModelLoader
-from app.core.image_utils import ImageProcessor
+from app.core.image_utils import BATCH_BUFFERS, ImageProcessor, to_model_input
+from app.core.preprocessing import preprocess_batch
+from app.services.fallback import FallbackPredictor
+from app.services.gradcam import get_gradcam_service, file_sha256, model_version_key
+from app.services.derivatives import get_derivative_service
+from app.core.profiler import traced, trace_section
+from app.core.metrics import REGISTRY
+from app.core.tiling import plan_tiles, extract_tiles, aggregate_tiles
+from app.core.augmentation import build_tta_batch, summarize_tta
+from app.core.dicom import is_dicom, load_dicom_frames
 from app.config import settings
 from app.utils.logger import get_logger
 
@@ -148,6 +161,43 @@ MEDICAL_ANALYSIS_DB = {
     }
 }
 
+
+
+def _analysis_key(class_name: str) -> str:
+    """Normalize a class label ("No Tumor", "Glioma Tumor") to match database keys."""
+    key = class_name.replace(" ", "").replace("_", "").lower()
+    return key[:-len("tumor")] if key.endswith("tumor") and key != "notumor" else key
+
+
+def _build_medical_analysis(class_name: str) -> Mapping[str, Any]:
+    """Build the read-only analysis for one model label."""
+    by_key = {_analysis_key(name): entry for name, entry in MEDICAL_ANALYSIS_DB.items()}
+    entry = by_key.get(_analysis_key(class_name))
+    if entry is None:
+        entry = {
+            "description": f"Unknown tumor type: {class_name}",
+            "advantages": [],
+            "disadvantages": [],
+            "key_characteristics": [],
+            "recommended_next_steps": ["Consult with a medical professional"],
+            "severity_level": "Unknown"
+        }
+    analysis = {"tumor_type": class_name}
+    for field, value in entry.items():
+        analysis[field] = tuple(value) if isinstance(value, list) else value
+    return MappingProxyType(analysis)
+
+
+# Precomputed per model label: shared read-only mappings, plus their JSON
+# encoding so responses can embed the analysis without re-serializing it
+MEDICAL_ANALYSIS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    name: _build_medical_analysis(name) for name in ImageProcessor.CLASS_INDICES.values()
+})
+MEDICAL_ANALYSIS_JSON: Mapping[str, bytes] = MappingProxyType({
+    name: json.dumps(dict(analysis), ensure_ascii=False).encode("utf-8")
+    for name, analysis in MEDICAL_ANALYSIS.items()
+})
+
 # Features expected in valid brain MRI images
 VALID_BRAIN_IMAGE_FEATURES = {
     "min_width": 150,  # Minimum image width
@@ -157,6 +207,142 @@ VALID_BRAIN_IMAGE_FEATURES = {
 }
 
 
+# Thresholds shared by image validation and study slice pre-filtering
+MIN_MEAN_INTENSITY = 10
+MAX_MEAN_INTENSITY = 245
+MIN_CONTRAST = 5
+MIN_ENTROPY = 2.0  # Raised from 1.8 for stricter validation
+MIN_UNIQUE_VALUES = 15  # Raised from 8 for stricter validation
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+# Header checks (no pixel decoding)
+MIN_IMAGE_SIDE = 100
+MIN_ASPECT_RATIO = 0.6
+MAX_ASPECT_RATIO = 1.8
+SUPPORTED_MODES = frozenset({"1", "L", "LA", "P", "PA", "RGB", "RGBA", "I", "I;16", "I;16B", "I;16L", "F"})
+COLOR_MODES = frozenset({"RGB", "RGBA"})
+MAX_CHANNEL_DIFF = 12  # mean |R-G|, |G-B| or |R-B| above this is a color photo
+
+VALIDATIONS = REGISTRY.counter(
+    "image_validation_total",
+    "Image validations by stage (header, preview, statistics) and outcome",
+    ("stage", "outcome"),
+)
+VALIDATION_SECONDS_SAVED = REGISTRY.counter(
+    "image_validation_seconds_saved_total",
+    "Estimated validation time avoided by rejecting before the full-resolution stage",
+    ("stage",),
+)
+
+
+def header_rejection(image: Image.Image) -> str:
+    """
+    Check what the image header alone tells: dimensions, pixel count and mode.
+    
+    ``Image.open`` parses only the header, so this never decodes pixels.
+    
+    Args:
+        image: PIL image, loaded or not
+        
+    Returns:
+        Name of the first failed check ("size", "aspect", "pixels", "mode"), or ""
+    """
+    width, height = image.size
+    if width < MIN_IMAGE_SIDE or height < MIN_IMAGE_SIDE:
+        return "size"
+    aspect_ratio = width / height
+    if aspect_ratio < MIN_ASPECT_RATIO or aspect_ratio > MAX_ASPECT_RATIO:
+        return "aspect"
+    if width * height > settings.VALIDATION_MAX_PIXELS:
+        return "pixels"
+    if image.mode not in SUPPORTED_MODES:
+        return "mode"
+    return ""
+
+
+def validation_preview(image: Image.Image, size: int) -> Image.Image:
+    """
+    Small version of an image for the cheap validation stage.
+    
+    A JPEG that has not been decoded yet is reopened and decoded at reduced
+    scale (``draft`` lets libjpeg skip most of the work), leaving the full
+    decode to images that pass. Anything else is reduced from its pixels.
+    
+    Args:
+        image: PIL image
+        size: Approximate length of the shorter side
+        
+    Returns:
+        Reduced image in L, RGB or RGBA mode
+    """
+    filename = getattr(image, "filename", "")
+    if image.format == "JPEG" and filename and getattr(image, "fp", None) is not None:
+        with Image.open(filename) as preview:
+            preview.draft(image.mode, (size, size))
+            preview.load()
+            factor = max(1, min(preview.size) // size)
+            return preview.reduce(factor) if factor > 1 else preview.copy()
+
+    if image.mode in ("1", "I", "I;16", "I;16B", "I;16L", "F"):
+        image = image.convert("L")
+    elif image.mode not in ("L", "RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.mode else "RGB")
+    factor = max(1, min(image.size) // size)
+    return image.reduce(factor) if factor > 1 else image
+
+
+def color_difference(image: Image.Image) -> float:
+    """Largest mean absolute difference between two color channels."""
+    pixels = np.asarray(image.convert("RGB"), dtype=np.int16)
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    return float(max(np.abs(r - g).mean(), np.abs(g - b).mean(), np.abs(r - b).mean()))
+
+
+def grayscale_statistics(gray: np.ndarray) -> Dict[str, float]:
+    """
+    Compute intensity statistics of an 8-bit grayscale image in one histogram pass.
+    
+    Args:
+        gray: uint8 array of grayscale values
+        
+    Returns:
+        Dictionary with mean, std, entropy and unique_values
+    """
+    hist = np.bincount(np.asarray(gray, dtype=np.uint8).ravel(), minlength=256).astype(np.float64)
+    hist /= hist.sum()
+    mean = float(hist @ _LEVELS)
+    std = float(np.sqrt(max(hist @ (_LEVELS * _LEVELS) - mean * mean, 0.0)))
+    nonzero = hist[hist > 0]
+    return {
+        "mean": mean,
+        "std": std,
+        "entropy": float(-np.sum(nonzero * np.log2(nonzero))),
+        "unique_values": int(nonzero.size),
+    }
+
+
+def statistics_rejection(stats: Dict[str, float]) -> str:
+    """
+    Check grayscale statistics against the validation thresholds.
+    
+    Args:
+        stats: Output of ``grayscale_statistics``
+        
+    Returns:
+        Name of the first failed check, or "" if all pass
+    """
+    if stats["mean"] < MIN_MEAN_INTENSITY or stats["mean"] > MAX_MEAN_INTENSITY:
+        return "brightness"
+    if stats["std"] < MIN_CONTRAST:
+        return "contrast"
+    if stats["entropy"] < MIN_ENTROPY:
+        return "entropy"
+    if stats["unique_values"] < MIN_UNIQUE_VALUES:
+        return "detail"
+    return ""
+
+
 class InferenceService:
     """Service for running model inference on brain tumor images."""
     
@@ -169,93 +355,132 @@ class InferenceService:
         """
         self.model_loader = model_loader
         self.image_processor = ImageProcessor()
+        self.fallback_predictor = FallbackPredictor()
+        self.gradcam = get_gradcam_service()
+        self.derivatives = get_derivative_service()
     
+    @traced()
     def validate_brain_image(self, image) -> tuple:
         """
         Validate if the uploaded image is a valid brain MRI scan.
         Rejects colored photos and non-medical images.
         
+        Checks run in stages of increasing cost, and an image stops at the
+        first stage that rejects it:
+        
+        1. header: size, aspect ratio, pixel count and mode, from the header
+           that ``Image.open`` parses (no pixels decoded);
+        2. preview: color and brightness on a ~256 px version (a JPEG is
+           decoded at reduced scale);
+        3. statistics: brightness, contrast, entropy and detail on the full
+           grayscale image.
+        
+        Outcomes are counted in ``image_validation_total``; the time early
+        rejections avoid is estimated from what the full validation costs
+        per megapixel and added to ``image_validation_seconds_saved_total``.
+        
         Args:
             image: PIL Image object
             
         Returns:
             Tuple of (is_valid: bool, confidence: float, reason: str)
         """
+        start = time.perf_counter()
         try:
             width, height = image.size
+            megapixels = width * height / 1e6
 
-            # Size check - minimum dimensions
-            min_width, min_height = 100, 100
-            if width < min_width or height < min_height:
-                return False, 0.05, f"Image too small ({width}x{height}). Minimum {min_width}x{min_height}px required"
-
-            # Aspect ratio - brain MRIs are square-ish, reject extreme ratios (like wide photos)
-            aspect_ratio = width / height if height > 0 else 0
-            if aspect_ratio < 0.6 or aspect_ratio > 1.8:
-                logger.warning(f"Unusual aspect ratio (likely a photo): {aspect_ratio:.2f}")
-                return False, 0.10, f"Image dimensions {width}x{height} don't match brain MRI format."
-
-            # STRICT COLOR CHECK - Reject colored images (photos)
-            if image.mode == "RGB" or image.mode == "RGBA":
-                img_array = np.array(image.convert("RGB")).astype(float)
-                r = img_array[:, :, 0]
-                g = img_array[:, :, 1]
-                b = img_array[:, :, 2]
-                
-                # Calculate how much color saturation exists
-                r_vs_g = np.mean(np.abs(r - g))
-                g_vs_b = np.mean(np.abs(g - b))
-                r_vs_b = np.mean(np.abs(r - b))
-                max_channel_diff = max(r_vs_g, g_vs_b, r_vs_b)
-                
-                # VERY STRICT: Reject any image with significant color (photos, natural images)
-                # Medical scans should be pure grayscale (all channels equal)
-                # Lowered threshold from 25 to 12 to catch more colored images
-                if max_channel_diff > 12:
-                    logger.warning(f"❌ Colored image detected (channel diff: {max_channel_diff:.1f}). Likely a photo, not medical scan.")
+            # Stage 1: header only
+            rejection = header_rejection(image)
+            if rejection:
+                self._count_rejection("header", megapixels, start)
+                if rejection == "size":
+                    return False, 0.05, f"Image too small ({width}x{height}). Minimum {MIN_IMAGE_SIDE}x{MIN_IMAGE_SIDE}px required"
+                if rejection == "aspect":
+                    # Brain MRIs are square-ish, reject extreme ratios (like wide photos)
+                    logger.warning("Unusual aspect ratio (likely a photo): %.2f", width / height)
+                    return False, 0.10, f"Image dimensions {width}x{height} don't match brain MRI format."
+                if rejection == "pixels":
+                    logger.warning("Image too large to decode safely: %dx%d", width, height)
+                    return False, 0.05, f"Image too large ({width}x{height}). Maximum {settings.VALIDATION_MAX_PIXELS:,} pixels."
+                return False, 0.05, f"Unsupported image format: {image.mode}"
+            VALIDATIONS.inc(stage="header", outcome="passed")
+
+            # Stage 2: downsampled color and brightness
+            with trace_section("validate.preview"):
+                preview = validation_preview(image, settings.VALIDATION_PREVIEW_SIZE)
+                max_channel_diff = color_difference(preview) if image.mode in COLOR_MODES else 0.0
+                # Medical scans are pure grayscale (all channels equal)
+                if max_channel_diff > MAX_CHANNEL_DIFF:
+                    self._count_rejection("preview", megapixels, start)
+                    logger.warning("❌ Colored image detected (channel diff: %.1f). Likely a photo, not medical scan.", max_channel_diff)
                     return False, 0.15, f"❌ Colored photograph detected (color intensity: {max_channel_diff:.1f}). Brain MRI must be pure grayscale."
+                # Averaging preserves the mean, so the preview decides brightness
+                preview_mean = float(np.asarray(preview.convert("L")).mean())
+                if preview_mean < MIN_MEAN_INTENSITY or preview_mean > MAX_MEAN_INTENSITY:
+                    self._count_rejection("preview", megapixels, start)
+                    logger.warning("Invalid brightness: %.1f", preview_mean)
+                    return False, 0.18, f"Image is too dark or too bright. Medical scan required."
+            VALIDATIONS.inc(stage="preview", outcome="passed")
 
-            # Convert to grayscale for further analysis
-            gray_array = np.array(image.convert("L")).astype(float)
+            # Stage 3: intensity statistics of the full grayscale image (one histogram pass)
+            stats = grayscale_statistics(np.asarray(image.convert("L")))
+            mean_intensity = stats["mean"]
+            std_intensity = stats["std"]
+            entropy = stats["entropy"]
+            rejection = statistics_rejection(stats)
+            self._observe_full_validation(megapixels, start)
+            VALIDATIONS.inc(stage="statistics", outcome="rejected" if rejection else "passed")
 
             # Brightness check - reject pure black/white
-            mean_intensity = float(np.mean(gray_array))
-            if mean_intensity < 10 or mean_intensity > 245:
-                logger.warning(f"Invalid brightness: {mean_intensity:.1f}")
+            if rejection == "brightness":
+                logger.warning("Invalid brightness: %.1f", mean_intensity)
                 return False, 0.18, f"Image is too dark or too bright. Medical scan required."
 
             # Contrast check - medical images need clear detail
-            std_intensity = float(np.std(gray_array))
-            if std_intensity < 5:
-                logger.warning(f"Low contrast: {std_intensity:.1f}")
+            if rejection == "contrast":
+                logger.warning("Low contrast: %.1f", std_intensity)
                 return False, 0.20, "Image lacks sufficient contrast. Clear medical imaging required."
 
             # Histogram analysis - check image complexity
-            hist, _ = np.histogram(gray_array.flatten(), bins=256, range=(0, 256))
-            hist_normalized = hist / hist.sum()
-            hist_nz = hist_normalized[hist_normalized > 0]
-            entropy = -np.sum(hist_nz * np.log2(hist_nz + 1e-10))
-            
-            if entropy < 2.0:  # Raised from 1.8 for stricter validation
-                logger.warning(f"Low entropy (too simple): {entropy:.2f}")
+            if rejection == "entropy":
+                logger.warning("Low entropy (too simple): %.2f", entropy)
                 return False, 0.22, "Image is too simple. Complex medical scan required."
 
             # Unique values - need substantial detail
-            unique_values = len(np.unique(gray_array.astype(np.uint8)))
-            if unique_values < 15:  # Raised from 8 for stricter validation
-                logger.warning(f"Insufficient detail: {unique_values} unique values")
+            if rejection == "detail":
+                logger.warning("Insufficient detail: %d unique values", stats["unique_values"])
                 return False, 0.25, "Image lacks sufficient detail for medical analysis."
 
             # All checks passed - valid medical image
             confidence = 0.92
-            logger.info(f"✅ Valid medical image: {width}x{height}, entropy={entropy:.2f}, contrast={std_intensity:.1f}, color_diff={max_channel_diff if (image.mode == 'RGB' or image.mode == 'RGBA') else 0:.1f}")
+            logger.info(
+                "✅ Valid medical image: %dx%d, entropy=%.2f, contrast=%.1f, color_diff=%.1f",
+                width, height, entropy, std_intensity, max_channel_diff
+            )
             return True, confidence, "✅ Valid brain MRI detected"
             
         except Exception as e:
-            logger.warning(f"Error validating image: {str(e)}")
+            logger.warning("Error validating image: %s", e)
             return False, 0.0, f"Validation error: {str(e)}"
+
+    # Seconds per megapixel of a full validation (decode + statistics),
+    # updated from the images that reach the last stage
+    _full_seconds_per_mpx = 0.02
+
+    def _observe_full_validation(self, megapixels: float, start: float):
+        if megapixels > 0:
+            observed = (time.perf_counter() - start) / megapixels
+            InferenceService._full_seconds_per_mpx += 0.1 * (observed - InferenceService._full_seconds_per_mpx)
+
+    def _count_rejection(self, stage: str, megapixels: float, start: float):
+        VALIDATIONS.inc(stage=stage, outcome="rejected")
+        saved = self._full_seconds_per_mpx * megapixels - (time.perf_counter() - start)
+        if saved > 0:
+            VALIDATION_SECONDS_SAVED.inc(saved, stage=stage)
     
-    def get_medical_analysis(self, class_index: int, confidence: float) -> Dict[str, Any]:
+    @traced()
+    def get_medical_analysis(self, class_index: int, confidence: float) -> Mapping[str, Any]:
         """
         Get detailed medical analysis for predicted tumor type.
         
@@ -264,30 +489,25 @@ class InferenceService:
             confidence: Confidence score of prediction
             
         Returns:
-            Dictionary with detailed medical analysis
+            Read-only mapping with detailed medical analysis (shared between
+            requests; a new dictionary only when a severity note is added)
         """
         class_name = self.image_processor.get_class_name(class_index)
         
-        if class_name not in MEDICAL_ANALYSIS_DB:
-            return {
-                "tumor_type": class_name,
-                "description": f"Unknown tumor type: {class_name}",
-                "advantages": [],
-                "disadvantages": [],
-                "key_characteristics": [],
-                "recommended_next_steps": ["Consult with a medical professional"],
-                "severity_level": "Unknown"
-            }
-        
-        analysis = MEDICAL_ANALYSIS_DB[class_name].copy()
-        analysis["tumor_type"] = class_name
+        analysis = MEDICAL_ANALYSIS.get(class_name)
+        if analysis is None:
+            analysis = _build_medical_analysis(class_name)
         
         # Adjust severity message based on confidence
         if confidence < 0.6:
-            analysis["severity_note"] = f"⚠️ LOW CONFIDENCE PREDICTION ({confidence*100:.1f}%). Recommend specialist review."
+            return {
+                **analysis,
+                "severity_note": f"⚠️ LOW CONFIDENCE PREDICTION ({confidence*100:.1f}%). Recommend specialist review."
+            }
         
         return analysis
     
+    @traced()
     def _fallback_prediction(self, image) -> np.ndarray:
         """
         Fallback prediction using image statistics when model is unavailable.
@@ -299,57 +519,208 @@ class InferenceService:
         Returns:
             Numpy array of shape (4,) with class probabilities
         """
-        try:
-            # Convert to grayscale for analysis
-            gray = np.array(image.convert("L")).astype(float)
-            
-            # Compute image statistics
-            mean_val = np.mean(gray)
-            std_val = np.std(gray)
-            
-            # Compute histogram
-            hist, _ = np.histogram(gray.flatten(), bins=256, range=(0, 256))
-            hist = hist / hist.sum()
-            
-            # Entropy-based feature
-            hist_nz = hist[hist > 0]
-            entropy = -np.sum(hist_nz * np.log2(hist_nz + 1e-10))
-            
-            # Edge density (simplified Sobel)
-            edges = ndimage.sobel(gray)
-            edge_density = np.mean(np.abs(edges) > 0.1)
+        scores = self.fallback_predictor.predict(image)
+        logger.info("Using fallback prediction: %s", scores)
+        return scores
+
+    def _run_model(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the CNN on a preprocessed batch, falling back to image statistics.
+
+        The fallback scores the same batch, so a whole micro-batch degrades
+        together when the model is unavailable.
+        
+        Args:
+            batch: Preprocessed array of shape (N, H, W, 3), uint8 or
+                floats in [0, 1]; converted to the model's input dtype
             
-            # Generate pseudo-random but deterministic scores based on image
-            # Use image features as seed for consistency
-            np.random.seed(int((mean_val + std_val + entropy) * 1000) % (2**31))
-            base_scores = np.random.dirichlet([1, 1, 1, 1])
+        Returns:
+            Numpy array of shape (N, 4) with class probabilities
+        """
+        try:
+            model = self.model_loader.get_model()
+            batch = to_model_input(batch, self._input_dtype())
+            with trace_section("model.predict"):
+                predictions_array = model.predict(batch, verbose=0)
+            logger.info("Using trained model for predictions")
+            return np.asarray(predictions_array)
+        except Exception as model_error:
+            logger.warning("Model unavailable: %s. Using fallback prediction.", model_error)
+            with trace_section("fallback.predict_batch"):
+                scores = self.fallback_predictor.predict_batch(batch)
+            logger.info("Using fallback prediction: %s", scores)
+            return scores
+
+    async def _run_model_async(self, batch: np.ndarray) -> np.ndarray:
+        """
+        ``_run_model`` from the event loop.
+
+        With a remote model (the inference sidecar) the call waits on a
+        socket for up to INFERENCE_SIDECAR_TIMEOUT_S, so it runs in the
+        thread pool; this worker's other requests keep being served and can
+        share the sidecar's batch. A local model runs inline, as before.
+        """
+        if getattr(self.model_loader, "remote", False):
+            return await run_in_threadpool(self._run_model, batch)
+        return self._run_model(batch)
+
+    def _input_dtype(self) -> str:
+        """Input dtype of the served model ("uint8" for serving exports)."""
+        return getattr(self.model_loader, "input_dtype", "float32")
+
+    async def _predict_explained(self, image, image_path: str, batch: np.ndarray) -> tuple:
+        """
+        Run the model and produce a Grad-CAM overlay for the top class.
+
+        The CAM is taken from the same forward pass as the prediction. A
+        cached overlay for the same file and model skips the backward pass.
+        
+        Args:
+            image: PIL Image object (already validated)
+            image_path: Path to the uploaded file
+            batch: Preprocessed array of shape (N, H, W, 3); the overlay is
+                drawn from the first row (the unaugmented image)
             
-            # Adjust scores based on image features
-            if std_val < 20:
-                base_scores[2] += 0.15  # More likely "No Tumor" for low contrast
-            if entropy > 6.5:
-                base_scores[0] += 0.1  # More likely "Glioma" for high entropy
-            if mean_val < 50:
-                base_scores[1] += 0.1  # More likely "Meningioma" for darker images
-            if edge_density > 0.1:
-                base_scores[3] += 0.1  # More likely "Pituitary" for high edge density
+        Returns:
+            Tuple of (predictions array (N, 4), overlay path or None)
+        """
+        if getattr(self.model_loader, "remote", False):
+            # Gradients need the model in this process; the sidecar only predicts
+            return await self._run_model_async(batch), None
+        try:
+            model = self.model_loader.get_model()
+        except Exception as model_error:
+            logger.warning("Grad-CAM unavailable without the trained model: %s", model_error)
+            return self._run_model(batch), None
+
+        image_hash = file_sha256(image_path)
+        version = model_version_key(self.model_loader)
+        heatmap_path = self.gradcam.lookup(image_hash, version)
+        if heatmap_path is not None:
+            logger.debug("Grad-CAM cache hit for %s", image_hash[:12])
+            return await self._run_model_async(batch), heatmap_path
+
+        try:
+            with trace_section("gradcam.forward_backward"):
+                predictions_array, cams = self.gradcam.predict_with_cam(
+                    model, to_model_input(batch, self._input_dtype())
+                )
+        except Exception as cam_error:
+            logger.warning("Grad-CAM failed: %s. Returning prediction without heatmap.", cam_error)
+            return self._run_model(batch), None
+
+        with trace_section("gradcam.encode"):
+            heatmap_path = await self.gradcam.save_overlay(image, cams[0], image_hash, version)
+        return predictions_array, heatmap_path
+
+    def _load_dicom(self, image_path: str) -> tuple:
+        """
+        Decode a (possibly multi-frame) DICOM file for batched inference.
+        
+        The middle frame is moved to the front: it is the one validated and
+        explained, and the rest of the frames follow it in the same batch.
+        
+        Args:
+            image_path: Path to the DICOM file
             
-            # Normalize to sum to 1
-            base_scores = base_scores / base_scores.sum()
+        Returns:
+            Tuple of (frames, frame indices, DICOM info dictionary)
+        """
+        frames, header, indices = load_dicom_frames(image_path, settings.DICOM_MAX_FRAMES)
+        middle = len(frames) // 2
+        order = [middle] + [i for i in range(len(frames)) if i != middle]
+        info = {
+            "frames_total": header.frames,
+            "frames_used": len(frames),
+            "modality": header.modality,
+            "bits_stored": header.bits_stored,
+            "photometric": header.photometric,
+            "window_center": header.window_center,
+            "window_width": header.window_width,
+            "frame_predictions": [],
+        }
+        return [frames[i] for i in order], [indices[i] for i in order], info
+
+    def _build_predictions(self, class_probabilities: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Turn a probability vector into the sorted list of class predictions.
+        
+        Args:
+            class_probabilities: Array of shape (num_classes,)
             
-            logger.info(f"Using fallback prediction: {base_scores}")
-            return base_scores.astype(np.float32)
+        Returns:
+            List of prediction dictionaries, highest confidence first
+        """
+        probabilities = np.asarray(class_probabilities, dtype=np.float64)
+        confidences = np.round(probabilities, 4)
+        percentages = np.round(probabilities * 100, 2)
+        
+        # Sort by confidence (highest first), ties in class order
+        order = np.argsort(-confidences, kind="stable")
+        
+        return [
+            {
+                "class_index": class_idx,
+                "label": self.image_processor.get_class_name(class_idx),
+                "confidence": confidence,
+                "percentage": percentage
+            }
+            for class_idx, confidence, percentage in zip(
+                order.tolist(), confidences[order].tolist(), percentages[order].tolist()
+            )
+        ]
+
+    def _predict_tiled(self, image) -> tuple:
+        """
+        Run tiled multi-scale inference as one batched forward pass.
+        
+        Args:
+            image: PIL Image object (already validated)
             
-        except Exception as e:
-            logger.warning(f"Fallback prediction failed: {e}. Using uniform distribution.")
-            return np.array([0.25, 0.25, 0.25, 0.25], dtype=np.float32)
+        Returns:
+            Tuple of (image-level probabilities, tiling info dictionary)
+        """
+        start = time.perf_counter()
+        patch_size = self.image_processor.IMAGE_SIZE
+        tiles = plan_tiles(
+            image.width,
+            image.height,
+            patch_size,
+            scales=settings.TILE_SCALES,
+            overlap=settings.TILE_OVERLAP,
+            max_patches=settings.TILE_MAX_PATCHES,
+        )
+        with trace_section("tiling.extract"):
+            batch = extract_tiles(image, tiles, patch_size)
+        probabilities = self._run_model(batch)
+        class_probabilities, heatmap_info = aggregate_tiles(probabilities, tiles)
+        
+        tiling = {
+            "patches": len(tiles),
+            "patch_budget": settings.TILE_MAX_PATCHES,
+            "scales": sorted({tile.scale for tile in tiles if tile.scale > 0}),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            **heatmap_info,
+        }
+        logger.info("Tiled inference: %d patches in %.1f ms", len(tiles), tiling["latency_ms"])
+        return class_probabilities, tiling
 
-    async def predict_image(self, image_path: str) -> Dict[str, Any]:
+    @traced()
+    async def predict_image(
+        self, image_path: str, tiled: bool = False, explain: bool = False, tta: int = 0
+    ) -> Dict[str, Any]:
         """
         Run inference on an MRI image with validation and analysis.
         
         Args:
             image_path: Path to image file
+            tiled: Tile large images into overlapping multi-scale patches
+                and aggregate them instead of a single resize
+            explain: Generate a Grad-CAM overlay for the top class (ignored
+                for tiled inference, which returns its own patch heatmap)
+            tta: Number of test-time augmentations to average (0 or 1
+                disables TTA; ignored for tiled inference and multi-frame
+                DICOM, whose frames are averaged instead)
             
         Returns:
             Dictionary with prediction results including:
@@ -359,23 +730,32 @@ class InferenceService:
             - status: 'success' or 'error'
             - is_valid_brain_image: Whether image is valid brain MRI
             - medical_analysis: Detailed medical analysis
+            - derivatives: Thumbnail/preview paths and whether they exist yet (when enabled)
             
         Raises:
             Exception: If prediction fails
         """
         try:
-            logger.info(f"Starting inference on {image_path}")
+            logger.info("Starting inference on %s", image_path)
             
-            # Load image
-            image = self.image_processor.load_image(image_path)
+            # Load image (DICOM frames are decoded with window/level applied)
+            frames = None
+            frame_indices = None
+            dicom_info = None
+            if is_dicom(image_path):
+                frames, frame_indices, dicom_info = self._load_dicom(image_path)
+                image = frames[0]
+            else:
+                image = self.image_processor.load_image(image_path)
+            multi_frame = frames is not None and len(frames) > 1
             
             # Validate if image is a brain MRI
             is_valid, validation_confidence, validation_reason = self.validate_brain_image(image)
             
-            logger.info(f"Image validation: Valid={is_valid}, Confidence={validation_confidence}, Reason={validation_reason}")
+            logger.info("Image validation: Valid=%s, Confidence=%s, Reason=%s", is_valid, validation_confidence, validation_reason)
             
             if not is_valid:
-                logger.warning(f"Invalid brain image: {validation_reason}")
+                logger.warning("Invalid brain image: %s", validation_reason)
                 return {
                     "predictions": [],
                     "top_prediction": None,
@@ -388,47 +768,77 @@ class InferenceService:
                     "error": f"Uploaded image is not a valid brain MRI scan. {validation_reason}"
                 }
             
-            # Preprocess image to match training pipeline
-            # Returns numpy array with shape (1, 150, 150, 3)
-            processed_image = self.image_processor.preprocess_image(image)
-            
-            # Try to get model and run prediction; if model missing, use fallback
-            try:
-                model = self.model_loader.get_model()
-                predictions_array = model.predict(processed_image, verbose=0)
-                logger.info("Using trained model for predictions")
-            except Exception as model_error:
-                logger.warning(f"Model unavailable: {model_error}. Using fallback prediction.")
-                # Use fallback prediction based on image analysis
-                fallback_scores = self._fallback_prediction(image)
-                predictions_array = np.array([fallback_scores])
-            
-            # predictions_array shape: (1, 4)
-            # Each element is the probability for that class
-            class_probabilities = predictions_array[0]  # Shape: (4,)
+            # Thumbnails/preview are encoded in the background; the response
+            # only carries their content-addressed paths
+            derivatives = None
+            if settings.DERIVATIVES_ENABLED:
+                derivatives = self.derivatives.schedule(image, image_path)
             
-            # Get class names and create predictions list
-            predictions = []
-            for class_idx, probability in enumerate(class_probabilities):
-                class_name = self.image_processor.get_class_name(class_idx)
-                confidence = float(probability)
+            tiling = None
+            tta_info = None
+            heatmap_path = None
+            pooled = None
+            if tiled:
+                if getattr(self.model_loader, "remote", False):
+                    class_probabilities, tiling = await run_in_threadpool(self._predict_tiled, image)
+                else:
+                    class_probabilities, tiling = self._predict_tiled(image)
+            else:
+                # Preprocess image to match training pipeline
+                # Returns numpy array with shape (1, 224, 224, 3)
+                input_dtype = self._input_dtype()
+                if multi_frame:
+                    # All decoded frames go through the model as one batch
+                    processed_image = preprocess_batch(
+                        frames, self.image_processor.IMAGE_SIZE, dtype=input_dtype
+                    )
+                    tta = 0
+                elif input_dtype == "uint8":
+                    # Decoded pixels go straight into a reused input tensor
+                    size = self.image_processor.IMAGE_SIZE
+                    pooled = BATCH_BUFFERS.acquire((1, size, size, 3))
+                    processed_image = self.image_processor.preprocess_image(image, dtype="uint8", out=pooled)
+                else:
+                    processed_image = self.image_processor.preprocess_image(image)
                 
-                predictions.append({
-                    "class_index": class_idx,
-                    "label": class_name,
-                    "confidence": round(confidence, 4),
-                    "percentage": round(confidence * 100, 2)
-                })
+                # Expand into augmented variants, still a single model call
+                start = time.perf_counter()
+                if tta > 1:
+                    with trace_section("tta.build_batch"):
+                        processed_image = build_tta_batch(processed_image, tta)
+                
+                # Run the model (or the statistics fallback if it is missing)
+                if explain:
+                    predictions_array, heatmap_path = await self._predict_explained(
+                        image, image_path, processed_image
+                    )
+                else:
+                    predictions_array = await self._run_model_async(processed_image)
+                if pooled is not None:
+                    BATCH_BUFFERS.release(pooled)
                 
-                # Debug logging
-                logger.debug(f"  {class_name}: {confidence:.4f} ({confidence*100:.2f}%)")
+                if tta > 1:
+                    class_probabilities, tta_info = summarize_tta(predictions_array)
+                    tta_info["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                    logger.info(
+                        "TTA: %d augmentations in %.1f ms", tta_info["augmentations"], tta_info["latency_ms"]
+                    )
+                elif multi_frame:
+                    class_probabilities = predictions_array.mean(axis=0)
+                    for frame_index, probabilities in sorted(zip(frame_indices, predictions_array)):
+                        class_index = int(np.argmax(probabilities))
+                        dicom_info["frame_predictions"].append({
+                            "frame": frame_index,
+                            "class_index": class_index,
+                            "label": self.image_processor.get_class_name(class_index),
+                            "confidence": round(float(probabilities[class_index]), 4),
+                        })
+                else:
+                    # predictions_array shape: (1, 4)
+                    # Each element is the probability for that class
+                    class_probabilities = predictions_array[0]  # Shape: (4,)
             
-            # Sort by confidence (highest first)
-            predictions = sorted(
-                predictions,
-                key=lambda x: x["confidence"],
-                reverse=True
-            )
+            predictions = self._build_predictions(class_probabilities)
             
             top_prediction = predictions[0]
             
@@ -439,9 +849,8 @@ class InferenceService:
             )
             
             logger.info(
-                f"Inference completed. "
-                f"Top prediction: {top_prediction['label']} "
-                f"({top_prediction['percentage']}%)"
+                "Inference completed. Top prediction: %s (%s%%)",
+                top_prediction['label'], top_prediction['percentage']
             )
             
             return {
@@ -452,11 +861,17 @@ class InferenceService:
                 "status": "success",
                 "is_valid_brain_image": True,
                 "image_validation_confidence": validation_confidence,
-                "medical_analysis": medical_analysis
+                "medical_analysis": medical_analysis,
+                "inference_mode": "tiled" if tiled else ("tta" if tta_info else "single"),
+                "tiling": tiling,
+                "tta": tta_info,
+                "dicom": dicom_info,
+                "heatmap_path": heatmap_path,
+                "derivatives": derivatives
             }
             
         except Exception as e:
-            logger.error(f"Error during inference: {str(e)}")
+            logger.error("Error during inference: %s", e)
             # Return error response instead of crashing
             return {
                 "predictions": [],
@@ -483,7 +898,7 @@ class InferenceService:
                 result = await self.predict_image(image_path)
                 results.append(result)
             except Exception as e:
-                logger.error(f"Error processing {image_path}: {str(e)}")
+                logger.error("Error processing %s: %s", image_path, e)
                 results.append({
                     "image_path": image_path,
                     "status": "error",
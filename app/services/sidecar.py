@@ -0,0 +1,480 @@
+"""
+Out-of-process inference server ("sidecar").
+
+One local process owns the model and TensorFlow's threads; the web workers
+send it preprocessed batches over a Unix domain socket. Pixel data never
+goes through the socket: each client connection owns a shared-memory
+segment, writes the batch into it and sends only a small header (segment
+name, shape, dtype). The server maps the segment, queues the request and
+runs everything that arrived within ``max_wait_ms`` as one ``predict``
+call, up to ``max_batch`` rows, so requests from all workers share batches.
+Only the (N, 4) probabilities travel back over the socket.
+
+Run it with ``python -m app.services.sidecar``; gunicorn starts it
+automatically when ``INFERENCE_SIDECAR_ENABLED`` is set. The web tier then
+uses ``SidecarModelLoader`` in place of ``ModelLoader``.
+
+Wire format, both directions: a 4-byte big-endian header length, a JSON
+header, then ``nbytes`` of raw array data when the header says
+``"inline": true`` (replies, and requests from clients without shared
+memory).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.image_utils import to_model_input
+from app.core.model_loader import ModelLoader
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_HEADER = struct.Struct(">I")
+_DTYPES = {"float32", "float16", "uint8"}
+_MIN_SEGMENT = 1 << 20
+
+
+class SidecarUnavailable(ConnectionError):
+    """The inference server cannot be reached."""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Map a segment created by a client without taking ownership of it.
+
+    Before Python 3.13 attaching registers the segment with this process's
+    resource tracker, which would unlink it when the server exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    segment = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _close_segment(segment: Optional[shared_memory.SharedMemory]):
+    if segment is None:
+        return
+    try:
+        segment.close()
+    except BufferError:
+        # A batch still references it; the mapping goes when the view does
+        pass
+
+
+def _send(sock: socket.socket, header: Dict[str, Any], payload: Optional[memoryview] = None):
+    raw = json.dumps(header, separators=(",", ":")).encode()
+    sock.sendall(_HEADER.pack(len(raw)) + raw)
+    if payload is not None:
+        sock.sendall(payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise SidecarUnavailable("Inference server closed the connection")
+        received += count
+    return buffer
+
+
+def _recv(sock: socket.socket) -> Tuple[Dict[str, Any], Optional[bytearray]]:
+    (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    header = json.loads(_recv_exactly(sock, length))
+    payload = _recv_exactly(sock, header["nbytes"]) if header.get("inline") else None
+    return header, payload
+
+
+class _Connection:
+    """One socket and its shared-memory segment, used by a single thread."""
+
+    def __init__(self, path: str, timeout: float, use_shm: bool):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError as e:
+            self.sock.close()
+            raise SidecarUnavailable(f"Inference server not reachable at {path}: {e}") from e
+        self.use_shm = use_shm
+        self.segment: Optional[shared_memory.SharedMemory] = None
+
+    def buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        """Segment of at least ``nbytes``, grown to the next power of two."""
+        if self.segment is None or self.segment.size < nbytes:
+            self.release()
+            size = max(_MIN_SEGMENT, 1 << (nbytes - 1).bit_length())
+            self.segment = shared_memory.SharedMemory(create=True, size=size)
+        return self.segment
+
+    def release(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+    def close(self):
+        self.release()
+        self.sock.close()
+
+
+class SidecarClient:
+    """Thread-safe client; each thread keeps its own connection and segment."""
+
+    def __init__(self, socket_path: str, timeout: float = 30.0, use_shm: bool = True):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Server's Unix socket
+            timeout: Seconds to wait for a reply
+            use_shm: Hand off arrays through shared memory (False sends
+                them inline over the socket)
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.use_shm = use_shm
+        self._local = threading.local()
+        self._connections: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> _Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _Connection(self.socket_path, self.timeout, self.use_shm)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _drop(self, connection: _Connection):
+        self._local.connection = None
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close()
+
+    def _request(self, connection: _Connection, batch: np.ndarray) -> np.ndarray:
+        header = {"shape": list(batch.shape), "dtype": batch.dtype.name, "nbytes": batch.nbytes}
+        if connection.use_shm:
+            segment = connection.buffer(batch.nbytes)
+            np.copyto(np.ndarray(batch.shape, batch.dtype, buffer=segment.buf), batch)
+            header["shm"] = segment.name
+            _send(connection.sock, header)
+        else:
+            header["inline"] = True
+            _send(connection.sock, header, memoryview(batch).cast("B"))
+
+        reply, payload = _recv(connection.sock)
+        if reply.get("error"):
+            raise RuntimeError(f"Inference server error: {reply['error']}")
+        return np.frombuffer(payload, dtype=reply["dtype"]).reshape(reply["shape"])
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run a batch through the server's model.
+
+        Args:
+            batch: Preprocessed array of shape (N, H, W, 3)
+
+        Returns:
+            Model output of shape (N, classes)
+
+        Raises:
+            SidecarUnavailable: If the server cannot be reached
+            RuntimeError: If the server failed to run the model
+        """
+        batch = np.ascontiguousarray(batch)
+        if batch.dtype.name not in _DTYPES:
+            batch = batch.astype(np.float32)
+        # One reconnect covers a server restart between requests
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                return self._request(connection, batch)
+            except socket.timeout as e:
+                # The request may still be running; do not send it twice
+                self._drop(connection)
+                raise SidecarUnavailable(f"Inference server timed out after {self.timeout} s") from e
+            except (SidecarUnavailable, OSError) as e:
+                self._drop(connection)
+                if attempt:
+                    raise SidecarUnavailable(str(e)) from e
+
+    def close(self):
+        """Close every connection and unlink their segments."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class RemoteModel:
+    """Keras-like ``predict`` that forwards to the inference server."""
+
+    def __init__(self, client: SidecarClient):
+        self.client = client
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return self.client.predict(batch)
+
+
+class SidecarModelLoader(ModelLoader):
+    """``ModelLoader`` whose model lives in the inference server process."""
+
+    remote = True
+
+    def __init__(self, model_name: str, client: SidecarClient):
+        """
+        Initialize the loader. Nothing is loaded in this process.
+
+        Args:
+            model_name: Model file the server serves (used for cache keys)
+            client: Connection to the server
+        """
+        super().__init__(model_name)
+        self.client = client
+        self._model = RemoteModel(client)
+
+    @property
+    def input_dtype(self) -> str:
+        # Pixels travel as uint8 (a quarter of the float32 bytes); the
+        # server converts them to whatever its model takes
+        return "uint8"
+
+    def get_model(self):
+        return self._model
+
+
+class _Pending:
+    __slots__ = ("batch", "future")
+
+    def __init__(self, batch: np.ndarray, future: asyncio.Future):
+        self.batch = batch
+        self.future = future
+
+
+class InferenceServer:
+    """Owns the model and micro-batches requests from all connections."""
+
+    def __init__(self, model_loader, socket_path: str, max_batch: int = 32, max_wait_ms: float = 5.0):
+        """
+        Initialize the server.
+
+        Args:
+            model_loader: Loader of the model to serve
+            socket_path: Unix socket to listen on
+            max_batch: Most rows per model call (a larger single request
+                still runs alone)
+            max_wait_ms: How long the first queued request waits for others
+        """
+        self.model_loader = model_loader
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        # TensorFlow runs on one dedicated thread, never on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sidecar-model")
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self.stats = {"requests": 0, "rows": 0, "batches": 0, "errors": 0}
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        model = self.model_loader.get_model()
+        batch = to_model_input(batch, getattr(self.model_loader, "input_dtype", "float32"))
+        return np.asarray(model.predict(batch, verbose=0), dtype=np.float32)
+
+    async def start(self):
+        """Load the model, then listen on the socket."""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        try:
+            await loop.run_in_executor(self._executor, self.model_loader.get_model)
+        except Exception as e:
+            logger.warning("Inference server starting without a model (requests will fail over): %s", e)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self._batcher = asyncio.create_task(self._run_batches())
+        logger.info("Inference server listening on %s", self.socket_path)
+
+    async def stop(self):
+        """Stop accepting connections and remove the socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=False)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        segment: Optional[shared_memory.SharedMemory] = None
+        try:
+            while True:
+                try:
+                    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                    header = json.loads(await reader.readexactly(length))
+                    payload = await reader.readexactly(header["nbytes"]) if header.get("inline") else None
+                except asyncio.IncompleteReadError:
+                    return
+
+                batch = None
+                try:
+                    if header["dtype"] not in _DTYPES:
+                        raise ValueError(f"Unsupported dtype {header['dtype']}")
+                    if payload is None:
+                        if segment is None or segment.name != header["shm"]:
+                            # The client grew its segment; unmap the old one
+                            _close_segment(segment)
+                            segment = _attach(header["shm"])
+                        payload = segment.buf
+                    # A view, not a copy: the client waits for the reply
+                    batch = np.ndarray(header["shape"], dtype=header["dtype"], buffer=payload)
+                    future = asyncio.get_running_loop().create_future()
+                    await self._queue.put(_Pending(batch, future))
+                    output = await future
+                    reply = {"shape": list(output.shape), "dtype": output.dtype.name,
+                             "nbytes": output.nbytes, "inline": True}
+                    body = output.tobytes()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    reply, body = {"error": str(e) or type(e).__name__, "nbytes": 0}, b""
+                finally:
+                    # Release the view before the segment can be closed
+                    del batch
+
+                raw = json.dumps(reply, separators=(",", ":")).encode()
+                writer.write(_HEADER.pack(len(raw)) + raw + body)
+                await writer.drain()
+        finally:
+            _close_segment(segment)
+            writer.close()
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            rows = len(pending[0].batch)
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                rows += len(item.batch)
+            await self._run(pending)
+            # Drop the views into client segments before waiting again
+            pending = item = None
+
+    async def _run(self, pending: List[_Pending]):
+        loop = asyncio.get_running_loop()
+        # Shapes that cannot be concatenated run separately
+        groups: Dict[Tuple, List[_Pending]] = {}
+        for item in pending:
+            groups.setdefault((item.batch.shape[1:], item.batch.dtype.name), []).append(item)
+
+        for items in groups.values():
+            batch = items[0].batch if len(items) == 1 else np.concatenate([i.batch for i in items])
+            try:
+                output = await loop.run_in_executor(self._executor, self._predict, batch)
+            except Exception as e:
+                logger.error("Inference server model error: %s", e)
+                for item in items:
+                    item.future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(items)
+            self.stats["rows"] += len(batch)
+            offset = 0
+            for item in items:
+                count = len(item.batch)
+                item.future.set_result(output[offset:offset + count])
+                offset += count
+
+
+def wait_for_server(socket_path: str, timeout: float = 60.0) -> bool:
+    """
+    Wait until the server accepts connections.
+
+    Args:
+        socket_path: Server's Unix socket
+        timeout: Maximum seconds to wait
+
+    Returns:
+        True once a connection succeeded, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+# Global client instance
+_sidecar_client = None
+
+
+def get_sidecar_client() -> SidecarClient:
+    """Get or initialize the global inference server client."""
+    global _sidecar_client
+    if _sidecar_client is None:
+        _sidecar_client = SidecarClient(
+            settings.INFERENCE_SIDECAR_SOCKET, timeout=settings.INFERENCE_SIDECAR_TIMEOUT_S
+        )
+    return _sidecar_client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the inference server")
+    parser.add_argument("--socket", default=settings.INFERENCE_SIDECAR_SOCKET)
+    parser.add_argument("--max-batch", type=int, default=settings.INFERENCE_SIDECAR_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.INFERENCE_SIDECAR_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = InferenceServer(ModelLoader(settings.MODEL_NAME), args.socket, args.max_batch, args.max_wait_ms)
+        await server.start()
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stopped.set)
+        await stopped.wait()
+        await server.stop()
+        logger.info("Inference server stopped: %s", server.stats)
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
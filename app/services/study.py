@@ -0,0 +1,265 @@
+"""
+Study-level (multi-slice) inference.
+
+A study is a set of 2D slices uploaded as separate files, a zip archive or
+multi-frame DICOM. Every slice is decoded once, straight to the model input
+size (JPEG slices use a reduced-scale draft decode), and scored with the same
+intensity/entropy statistics ``validate_brain_image`` uses. Slices failing the
+thresholds are dropped, the most informative ones are run through the CNN in
+batches, and their probabilities are combined into a study-level result. All
+work is bounded by a deadline: when it passes, the study is aggregated from
+whatever slices were processed and flagged as truncated.
+"""
+
+import os
+import re
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.core.dicom import is_dicom, load_dicom_frames
+from app.core.preprocessing import resample_filter
+from app.core.profiler import trace_section
+from app.services.inference import InferenceService, grayscale_statistics, statistics_rejection
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Upload order prefix added when slices are written to the study directory
+_ORDER_PREFIX = re.compile(r"^\d{5}_")
+
+SLICE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".dcm", ".dicom")
+
+
+@dataclass
+class SliceCandidate:
+    """A decoded slice at model input size with its pre-filter score."""
+    index: int
+    source: str
+    frame: Optional[int]
+    pixels: np.ndarray  # uint8 (size, size) grayscale
+    score: float
+
+
+def extract_study_archive(archive_path: str, target_dir: str, max_files: int, max_bytes: int) -> List[str]:
+    """
+    Extract slice files from a zip archive.
+
+    Only known image/DICOM members are written, flattened to their base
+    names, and extraction stops at ``max_files`` members or ``max_bytes``
+    of uncompressed data so a zip bomb cannot exhaust the disk.
+
+    Args:
+        archive_path: Path to the zip file
+        target_dir: Directory to extract into
+        max_files: Maximum number of slices to extract
+        max_bytes: Maximum total uncompressed size
+
+    Returns:
+        Sorted list of extracted file paths
+
+    Raises:
+        ValueError: If the file is not a valid zip archive
+    """
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip archive: {e}")
+
+    paths = []
+    total = 0
+    with archive:
+        members = sorted(archive.infolist(), key=lambda m: m.filename)
+        for member in members:
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name or name.startswith(".") or "__MACOSX" in member.filename:
+                continue
+            if not name.lower().endswith(SLICE_EXTENSIONS):
+                continue
+            if len(paths) >= max_files or total + member.file_size > max_bytes:
+                logger.warning("Study archive truncated at %d slices (%d bytes)", len(paths), total)
+                break
+            total += member.file_size
+            path = os.path.join(target_dir, f"{len(paths):05d}_{name}")
+            with archive.open(member) as src, open(path, "wb") as dst:
+                dst.write(src.read(member.file_size))
+            paths.append(path)
+    return paths
+
+
+class StudyService:
+    """Select, batch and aggregate slices of an MRI study."""
+
+    def __init__(self, inference_service: InferenceService):
+        """
+        Initialize the study service.
+
+        Args:
+            inference_service: Service used to run the CNN on slice batches
+        """
+        self.inference_service = inference_service
+        self.image_size = inference_service.image_processor.IMAGE_SIZE
+
+    def _decode(self, path: str) -> Iterator[Tuple[Optional[int], Image.Image]]:
+        """Yield (frame, image) pairs of one slice file."""
+        if is_dicom(path):
+            frames, _, indices = load_dicom_frames(path, settings.DICOM_MAX_FRAMES)
+            yield from zip(indices, frames)
+            return
+        image = Image.open(path)
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale; never below the model size
+        image.draft("L", (self.image_size, self.image_size))
+        yield None, image
+
+    def _candidates(self, paths: List[str], deadline: float) -> Tuple[List[SliceCandidate], int, bool]:
+        """
+        Decode and pre-filter slices until the deadline.
+
+        Returns:
+            Tuple of (valid candidates, slices seen, truncated flag)
+        """
+        size = (self.image_size, self.image_size)
+        candidates = []
+        seen = 0
+        for path in paths:
+            if time.perf_counter() > deadline:
+                return candidates, seen, True
+            try:
+                for frame, image in self._decode(path):
+                    seen += 1
+                    if min(image.size) < 100:
+                        continue
+                    gray = np.asarray(image.convert("L").resize(size, resample_filter()))
+                    stats = grayscale_statistics(gray)
+                    if statistics_rejection(stats):
+                        continue
+                    # Tissue-rich slices have high entropy and contrast
+                    score = stats["entropy"] + stats["std"] / 64.0
+                    source = _ORDER_PREFIX.sub("", os.path.basename(path))
+                    candidates.append(SliceCandidate(seen - 1, source, frame, gray, score))
+            except Exception as e:
+                logger.warning("Skipping unreadable slice %s: %s", os.path.basename(path), e)
+        return candidates, seen, False
+
+    def _select(self, candidates: List[SliceCandidate]) -> List[SliceCandidate]:
+        """Keep the highest-scoring slices, in study order."""
+        if len(candidates) <= settings.STUDY_MAX_SLICES:
+            return candidates
+        ranked = sorted(candidates, key=lambda c: c.score, reverse=True)[:settings.STUDY_MAX_SLICES]
+        return sorted(ranked, key=lambda c: c.index)
+
+    def _run_batches(self, selected: List[SliceCandidate], deadline: float) -> Tuple[np.ndarray, bool]:
+        """
+        Run selected slices through the model in batches until the deadline.
+
+        Returns:
+            Tuple of (probabilities for the processed prefix, truncated flag)
+        """
+        batch_size = max(1, settings.STUDY_BATCH_SIZE)
+        outputs = []
+        for start in range(0, len(selected), batch_size):
+            if outputs and time.perf_counter() > deadline:
+                return np.concatenate(outputs), True
+            chunk = selected[start:start + batch_size]
+            # uint8 pixels; _run_model converts them to the model's input dtype
+            batch = np.repeat(np.stack([c.pixels for c in chunk])[..., None], 3, axis=-1)
+            with trace_section("study.batch"):
+                outputs.append(np.asarray(self.inference_service._run_model(batch)))
+        if not outputs:
+            return np.empty((0, 0), dtype=np.float32), False
+        return np.concatenate(outputs), False
+
+    def _aggregate(self, slices: List[SliceCandidate], probabilities: np.ndarray) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Combine slice probabilities into a study-level distribution.
+
+        Slices are weighted by their own confidence, so decisive slices
+        count more than ambiguous ones, and the slices with the highest
+        probability for the study-level class are returned as evidence.
+        """
+        weights = probabilities.max(axis=1)
+        study_probs = (probabilities * weights[:, None]).sum(axis=0) / weights.sum()
+        top_class = int(np.argmax(study_probs))
+
+        order = np.argsort(-probabilities[:, top_class])[:settings.STUDY_TOP_SLICES]
+        top_slices = []
+        for i in order:
+            class_index = int(np.argmax(probabilities[i]))
+            top_slices.append({
+                "slice_index": slices[i].index,
+                "source": slices[i].source,
+                "frame": slices[i].frame,
+                "class_index": class_index,
+                "label": self.inference_service.image_processor.get_class_name(class_index),
+                "confidence": round(float(probabilities[i, class_index]), 4),
+                "study_class_probability": round(float(probabilities[i, top_class]), 4),
+                "informativeness": round(slices[i].score, 3),
+            })
+        return study_probs, top_slices
+
+    def predict_study(self, paths: List[str]) -> Dict[str, Any]:
+        """
+        Classify a study from its slice files.
+
+        Blocking (decoding, the model or a round trip to the inference
+        sidecar per batch); the route runs it in the thread pool.
+
+        Args:
+            paths: Slice file paths (images or DICOM), in study order
+
+        Returns:
+            Dictionary with the study-level prediction, top slices and timing
+        """
+        start = time.perf_counter()
+        budget = settings.STUDY_TIME_BUDGET_S
+        deadline = start + budget
+
+        with trace_section("study.prefilter"):
+            candidates, seen, truncated = self._candidates(paths, deadline)
+        selected = self._select(candidates)
+        probabilities, batch_truncated = self._run_batches(selected, deadline)
+        truncated = truncated or batch_truncated
+        evaluated = selected[:len(probabilities)]
+
+        result = {
+            "status": "success",
+            "slices_received": seen,
+            "slices_valid": len(candidates),
+            "slices_evaluated": len(evaluated),
+            "predictions": [],
+            "top_prediction": None,
+            "top_slices": [],
+            "model_version": self.inference_service.model_loader.model_name,
+            "truncated": truncated,
+            "time_budget_ms": round(budget * 1000, 1),
+        }
+
+        if not evaluated and truncated:
+            result["status"] = "error"
+            result["error"] = "Study time budget ran out before any slice was evaluated."
+        elif not evaluated:
+            result["status"] = "invalid_image"
+            result["error"] = "No slice of the study looks like a valid brain MRI."
+        else:
+            study_probs, top_slices = self._aggregate(evaluated, probabilities)
+            predictions = self.inference_service._build_predictions(study_probs)
+            result.update({
+                "predictions": predictions,
+                "top_prediction": predictions[0],
+                "top_slices": top_slices,
+                "medical_analysis": self.inference_service.get_medical_analysis(
+                    predictions[0]["class_index"], predictions[0]["confidence"]
+                ),
+            })
+
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(
+            "Study inference: %d/%d slices evaluated in %.1f ms (truncated=%s)",
+            len(evaluated), seen, result["latency_ms"], truncated
+        )
+        return result
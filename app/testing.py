@@ -0,0 +1,201 @@
+"""
+Deterministic stand-ins shared by the tests and the benchmarks: synthetic
+MRI-like images, a tiny numpy model, an inference sidecar serving it and a
+mongomock-backed database.
+"""
+
+import io
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+TEST_USER_EMAIL = "test-user@example.com"
+TEST_USER_PASSWORD = "test-password"
+
+
+def synthetic_mri(size: int = 512, seed: int = 0) -> Image.Image:
+    """
+    Build a grayscale image that passes ``validate_brain_image``.
+
+    An elliptical "skull" with textured tissue and a bright blob mimics the
+    statistics of an axial MRI slice (dark background, high entropy).
+
+    Args:
+        size: Width and height in pixels
+        seed: Seed for the texture noise
+
+    Returns:
+        RGB PIL image with equal channels
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size - 0.5
+    head = ((xx / 0.42) ** 2 + (yy / 0.48) ** 2) < 1.0
+    tissue = 90 + 60 * np.sin(xx * 40) * np.cos(yy * 35) + rng.normal(0, 18, (size, size))
+    blob = np.exp(-(((xx - 0.1) ** 2 + (yy + 0.05) ** 2) / 0.004)) * 120
+    pixels = np.where(head, tissue + blob, rng.normal(8, 3, (size, size)))
+    gray = np.clip(pixels, 0, 255).astype(np.uint8)
+    return Image.fromarray(gray, mode="L").convert("RGB")
+
+
+def color_photo(size: Tuple[int, int] = (640, 480), seed: int = 0) -> Image.Image:
+    """Build a saturated color image that validation must reject."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    pixels[..., 0] = 230
+    return Image.fromarray(pixels, mode="RGB")
+
+
+def natural_photo(size: Tuple[int, int] = (4000, 3000), seed: int = 0) -> Image.Image:
+    """
+    Build a camera-like color image: smooth gradients with mild sensor noise.
+
+    Unlike ``color_photo`` (pure noise) it compresses like a real photo, so
+    JPEG decode times are realistic.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    pixels = np.stack([xx * 255 / width, yy * 255 / height, (xx + yy) * 128 / (width + height) + 60], axis=-1)
+    pixels += rng.normal(0, 4, pixels.shape).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode="RGB")
+
+
+def encode_jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    """Encode an image to JPEG bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class TinyModel:
+    """
+    Deterministic 4-class model with the Keras ``predict`` signature.
+
+    With ``input_dtype="uint8"`` it behaves like a serving export: it takes
+    uint8 pixels only and rescales them itself, with the same outputs.
+    """
+
+    def __init__(self, seed: int = 1234, input_dtype: str = "float32"):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0, 4, (3, 4)).astype(np.float32)
+        self.bias = rng.normal(0, 0.1, 4).astype(np.float32)
+        self.input_dtype = input_dtype
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        if self.input_dtype == "uint8":
+            if batch.dtype != np.uint8:
+                raise TypeError(f"uint8 model fed {batch.dtype}")
+            batch = np.divide(batch, 255.0, dtype=np.float32)
+        pooled = np.asarray(batch, dtype=np.float32).reshape(len(batch), -1, 3).mean(axis=1)
+        logits = pooled @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class TinyModelLoader:
+    """Drop-in replacement for ``ModelLoader`` serving ``TinyModel``."""
+
+    def __init__(self, input_dtype: str = "float32"):
+        self.model_name = "tiny_model.h5"
+        self._model = TinyModel(input_dtype=input_dtype)
+        self.input_dtype = input_dtype
+
+    def get_model(self):
+        return self._model
+
+    def get_pipeline(self):
+        return self._model
+
+    def is_loaded(self) -> bool:
+        return True
+
+
+def install_mongomock():
+    """
+    Point ``app.db`` at an in-memory mongomock database with a seeded user.
+
+    Returns:
+        The mongomock database
+
+    Raises:
+        RuntimeError: If mongomock is not installed
+    """
+    try:
+        import mongomock
+    except ImportError as e:
+        raise RuntimeError("mongomock is required: pip install mongomock") from e
+
+    from app import db
+    from app.config import settings
+    from app.core.auth import get_password_hash
+
+    db._mongo_client = mongomock.MongoClient()
+    db._mongo_db = db._mongo_client[settings.MONGO_DB_NAME]
+    db.init_collections()
+    db.get_users_collection().update_one(
+        {"email": TEST_USER_EMAIL},
+        {"$set": {
+            "name": "Test User",
+            "email": TEST_USER_EMAIL,
+            "password_hash": get_password_hash(TEST_USER_PASSWORD),
+        }},
+        upsert=True,
+    )
+    return db._mongo_db
+
+
+def relax_rate_limits():
+    """
+    Keep rate limiting in the request path but with limits no benchmark reaches.
+
+    Returns:
+        The shared RateLimiter, reconfigured
+    """
+    from app.core.rate_limit import RouteLimits, get_rate_limiter, parse_limit
+
+    limiter = get_rate_limiter()
+    unlimited = parse_limit("1000000000/second")
+    limiter.rules = {route_class: RouteLimits(unlimited, unlimited) for route_class in limiter.rules}
+    return limiter
+
+
+def start_sidecar(socket_path: str, model_loader=None, max_batch: int = 32, max_wait_ms: float = 5.0):
+    """
+    Run an inference server for ``TinyModel`` in a forked process.
+
+    Args:
+        socket_path: Unix socket to listen on
+        model_loader: Loader to serve (TinyModelLoader by default)
+        max_batch: Most rows per model call
+        max_wait_ms: Batching window
+
+    Returns:
+        The server process, already accepting connections; terminate it when done
+
+    Raises:
+        RuntimeError: If the server does not come up
+    """
+    import asyncio
+    import multiprocessing
+    import signal
+
+    from app.services.sidecar import InferenceServer, wait_for_server
+
+    def serve():
+        async def main():
+            server = InferenceServer(model_loader or TinyModelLoader(), socket_path, max_batch, max_wait_ms)
+            await server.start()
+            stopped = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+            await stopped.wait()
+            await server.stop()
+        asyncio.run(main())
+
+    process = multiprocessing.get_context("fork").Process(target=serve, daemon=True)
+    process.start()
+    if not wait_for_server(socket_path, timeout=10):
+        process.terminate()
+        raise RuntimeError("Inference server did not start")
+    return process
@@ -0,0 +1,115 @@
+"""
+Tests for the hyperparameter search helpers (training/search_architecture.py).
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.testing import natural_photo, synthetic_mri
+from training.search_architecture import (
+    BASELINE,
+    SEARCH_SPACE,
+    TrialLog,
+    build_report,
+    cache_dataset,
+    config_id,
+    median_stop,
+    pareto_front,
+    sample_configs,
+    split_groups,
+)
+
+
+def test_samples_are_distinct_reproducible_and_start_with_the_baseline():
+    configs = sample_configs(12)
+    assert configs[0] == BASELINE
+    assert len({config_id(config) for config in configs}) == 12
+    assert all(config[name] in values for config in configs[1:] for name, values in SEARCH_SPACE.items())
+    assert sample_configs(20)[:12] == configs
+    assert len(sample_configs(10, space={"a": [1, 2]}, include=())) == 2
+
+
+def test_median_rule_stops_only_trials_behind_the_others():
+    curves = {"a": [0.5, 0.6, 0.7], "b": [0.4, 0.6, 0.65], "c": [0.5, 0.55, 0.6], "slow": [0.3, 0.35, 0.4]}
+    assert median_stop(curves, "slow", min_epochs=3)
+    assert not median_stop(curves, "a", min_epochs=3)
+    assert not median_stop(curves, "slow", min_epochs=4)
+    assert not median_stop(curves, "slow", min_epochs=3, min_trials=4)
+    # Others are compared over the same number of epochs
+    curves["slow"] = [0.3, 0.62]
+    assert not median_stop(curves, "slow", min_epochs=2)
+
+
+def test_pareto_front_keeps_undominated_trials():
+    trials = [
+        {"trial": "fast", "val_accuracy": 0.80, "latency_ms": 2.0},
+        {"trial": "dominated", "val_accuracy": 0.78, "latency_ms": 3.0},
+        {"trial": "tie", "val_accuracy": 0.80, "latency_ms": 4.0},
+        {"trial": "accurate", "val_accuracy": 0.90, "latency_ms": 9.0},
+        {"trial": "stopped", "val_accuracy": 0.95, "latency_ms": None},
+    ]
+    assert [t["trial"] for t in pareto_front(trials)] == ["fast", "accurate"]
+
+
+def test_split_keeps_groups_together_and_stratifies():
+    labels = np.repeat([0, 1], 50)
+    groups = np.arange(100)
+    groups[[1, 2, 3]] = 0
+    groups[[51, 52]] = 50
+    train, val = split_groups(groups, labels, 0.2, seed=3)
+    assert sorted(np.concatenate([train, val]).tolist()) == list(range(100))
+    for group in (0, 50):
+        members = set(np.flatnonzero(groups == group).tolist())
+        assert members <= set(train.tolist()) or members <= set(val.tolist())
+    for cls in (0, 1):
+        assert 10 <= np.count_nonzero(labels[val] == cls) <= 13
+
+
+def test_dataset_is_decoded_once_with_duplicate_groups(tmp_path):
+    scan = synthetic_mri(300)
+    images = [scan, scan.resize((200, 200)), natural_photo((300, 300)), scan.transpose(Image.Transpose.ROTATE_90)]
+    paths = []
+    for i, image in enumerate(images):
+        image.save(tmp_path / f"{i}.png")
+        paths.append(str(tmp_path / f"{i}.png"))
+    (tmp_path / "broken.png").write_bytes(b"nope")
+    paths.append(str(tmp_path / "broken.png"))
+
+    directory = cache_dataset(paths, np.array([0, 0, 1, 2, 3]), 64, tmp_path / "cache")
+    pixels = np.load(directory / "pixels.npy", mmap_mode="r")
+    assert pixels.shape == (4, 64, 64, 3) and pixels.dtype == np.uint8
+    assert np.load(directory / "labels.npy").tolist() == [0, 0, 1, 2]
+    assert np.load(directory / "groups.npy").tolist() == [0, 0, 2, 3]
+    assert cache_dataset(paths, np.array([0, 0, 1, 2, 3]), 64, tmp_path / "cache") == directory
+    assert cache_dataset(paths, np.array([0, 0, 1, 2, 3]), 32, tmp_path / "cache") != directory
+
+
+def test_log_and_report(tmp_path):
+    log = TrialLog(tmp_path / "trials.jsonl")
+    base, small = config_id(BASELINE), "small"
+    log.add({"trial": base, "config": BASELINE, "val_accuracy": 0.9, "stopped_early": False})
+    log.add({"trial": base, "config": BASELINE, "val_accuracy": 0.9, "stopped_early": False,
+             "latency_ms_per_image": {"batch_1": 20.0, "batch_32": 5.0}})
+    log.add({"trial": small, "config": {}, "val_accuracy": 0.88, "stopped_early": False,
+             "latency_ms_per_image": {"batch_1": 4.0, "batch_32": 1.0}})
+    log.add({"trial": "poor", "config": {}, "val_accuracy": 0.5, "stopped_early": True})
+    with open(log.path, "a") as f:
+        f.write('{"trial": "interrupt')
+
+    reloaded = TrialLog(log.path)
+    assert reloaded.get(base)["latency_ms_per_image"]["batch_1"] == 20.0
+    report = build_report([dict(record) for record in reloaded.entries.values()], base)
+    assert report["pareto_front"] == [small, base]
+    assert report["front"][0]["vs_baseline"] == {"accuracy_delta": -0.02, "speedup": 5.0}
+    assert report["completed"] == 2 and report["stopped_early"] == 1
+
+
+def test_built_models_take_uint8():
+    pytest.importorskip("tensorflow")
+    from training.search_architecture import build_model
+
+    for config in sample_configs(3):
+        model = build_model(config, 64)
+        assert model.inputs[0].dtype == "uint8"
+        outputs = model.predict(np.zeros((2, 64, 64, 3), dtype=np.uint8), verbose=0)
+        assert outputs.shape == (2, 4)
@@ -0,0 +1,44 @@
+"""
+Tests for test-time augmentation.
+"""
+
+import numpy as np
+import pytest
+from app.core.augmentation import MAX_AUGMENTATIONS, build_tta_batch, summarize_tta
+
+
+@pytest.fixture
+def batch():
+    """Create a preprocessed single-image batch."""
+    rng = np.random.default_rng(11)
+    return (rng.integers(0, 256, (1, 32, 32, 3)) / 255.0).astype(np.float32)
+
+
+def test_build_tta_batch_shapes(batch):
+    """Variants are stacked in one batch with the identity first."""
+    out = build_tta_batch(batch, 8)
+    assert out.shape == (8, 32, 32, 3)
+    assert out.dtype == np.float32
+    assert np.array_equal(out[0], batch[0])
+    assert np.array_equal(out[1], batch[0][:, ::-1])
+    assert out.min() >= 0.0 and out.max() <= 1.0
+
+
+def test_build_tta_batch_clamps_count(batch):
+    """Counts outside 1..MAX_AUGMENTATIONS are clamped."""
+    assert len(build_tta_batch(batch, 0)) == 1
+    assert len(build_tta_batch(batch, 100)) == MAX_AUGMENTATIONS
+
+
+def test_summarize_tta():
+    """Mean, variance and agreement across augmentations."""
+    probs = np.array([[0.7, 0.1, 0.1, 0.1], [0.5, 0.3, 0.1, 0.1], [0.2, 0.6, 0.1, 0.1]])
+    mean, info = summarize_tta(probs)
+    assert np.allclose(mean, probs.mean(axis=0))
+    assert info["augmentations"] == 3
+    assert info["variance"][2] == 0.0
+    assert info["agreement"] == round(2 / 3, 4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+"""
+Tests for response compression and static file caching.
+"""
+
+import asyncio
+import gzip
+import json
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.core.compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+from app.core.static_files import CachedStaticFiles, PrecompressedStaticFiles
+from scripts.precompress_frontend import precompress
+
+LARGE = {"items": [{"label": "Glioma Tumor", "confidence": 0.87}] * 200}
+
+
+def _api():
+    async def large(request):
+        return JSONResponse(LARGE)
+
+    async def small(request):
+        return JSONResponse({"status": "ok"})
+
+    async def encoded(request):
+        return Response(gzip.compress(b"x" * 4096), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    routes = [Route("/large", large), Route("/small", small), Route("/encoded", encoded)]
+    return CompressionMiddleware(Starlette(routes=routes), minimum_size=1024)
+
+
+def request(app, path, headers=None):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(path, headers=headers or {})
+            await response.aread()
+            return response
+    return asyncio.run(go())
+
+
+def test_accept_encoding_negotiation():
+    """q-values order the codings; q=0 excludes one."""
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0") == ["br", "gzip"]
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("br", allow_brotli=False) is None
+
+
+def test_large_json_is_gzipped():
+    """Bodies above the threshold are compressed and still decode to the same JSON."""
+    response = request(_api(), "/large", {"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.num_bytes_downloaded < len(json.dumps(LARGE)) / 4
+    assert response.json() == LARGE
+
+
+def test_small_and_encoded_responses_pass_through():
+    """Small bodies and already-encoded bodies are not touched."""
+    small = request(_api(), "/small", {"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"status": "ok"}
+
+    encoded = request(_api(), "/encoded", {"Accept-Encoding": "gzip"})
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.text == "x" * 4096
+
+    plain = request(_api(), "/large", {"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_uploads_are_immutable_and_revalidate(tmp_path):
+    """Content-addressed uploads get a long max-age, and ETag revalidation returns 304."""
+    name = "0123456789abcdef0123456789abcdef.jpg"
+    (tmp_path / name).write_bytes(b"\xff\xd8" + b"\x00" * 2048)
+    (tmp_path / "legacy.jpg").write_bytes(b"\xff\xd8" + b"\x00" * 2048)
+    app = CompressionMiddleware(CachedStaticFiles(directory=str(tmp_path), max_age=600))
+
+    first = request(app, f"/{name}", {"Accept-Encoding": "gzip"})
+    assert first.headers["cache-control"] == "public, max-age=600, immutable"
+    assert "content-encoding" not in first.headers  # JPEG is incompressible
+
+    second = request(app, f"/{name}", {"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.content == b""
+
+    assert "immutable" not in request(app, "/legacy.jpg").headers["cache-control"]
+
+
+def test_range_responses_are_not_compressed(tmp_path):
+    """A 206 carries raw bytes of the file; its Content-Range must stay valid."""
+    (tmp_path / "report.txt").write_text("brain scan report\n" * 2800)
+    app = CompressionMiddleware(CachedStaticFiles(directory=str(tmp_path)), minimum_size=1024)
+
+    partial = request(app, "/report.txt", {"Accept-Encoding": "gzip", "Range": "bytes=0-9999"})
+    assert partial.status_code == 206
+    assert "content-encoding" not in partial.headers
+    assert partial.headers["content-range"] == "bytes 0-9999/50400"
+    assert partial.content == (tmp_path / "report.txt").read_bytes()[:10000]
+
+    whole = request(app, "/report.txt", {"Accept-Encoding": "gzip"})
+    assert whole.headers["content-encoding"] == "gzip"
+
+
+def test_precompressed_frontend_assets(tmp_path):
+    """Build-time .gz variants are served with the original type; index.html revalidates."""
+    (tmp_path / "assets").mkdir()
+    script = "console.log('brain tumor classifier');\n" * 200
+    (tmp_path / "assets" / "index-4f8a2b1c.js").write_text(script)
+    (tmp_path / "index.html").write_text("<html>" + "<div></div>" * 200 + "</html>")
+    precompress(tmp_path)
+    app = CompressionMiddleware(PrecompressedStaticFiles(directory=str(tmp_path), html=True))
+
+    asset = request(app, "/assets/index-4f8a2b1c.js", {"Accept-Encoding": "gzip"})
+    assert asset.headers["content-encoding"] == "gzip"
+    assert asset.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+    assert "immutable" in asset.headers["cache-control"]
+    assert asset.text == script
+
+    plain = request(app, "/assets/index-4f8a2b1c.js", {"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.text == script
+
+    index = request(app, "/", {"Accept-Encoding": "gzip"})
+    assert index.headers["cache-control"] == "no-cache"
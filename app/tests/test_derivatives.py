@@ -0,0 +1,129 @@
+"""
+Tests for upload thumbnails and previews.
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+from PIL import Image
+from app.testing import TinyModelLoader, synthetic_mri
+from app.api.routes.predict import derivative_urls
+from app.services.derivatives import DerivativeService, content_key
+from app.services.inference import InferenceService
+
+
+def test_generate_writes_renditions(tmp_path):
+    """Preview and thumbnails are bounded in size and stored as grayscale."""
+    path = tmp_path / "scan.png"
+    scan = synthetic_mri(1500).convert("RGB")
+    scan.save(path)
+    service = DerivativeService(thumbnail_sizes=[64, 200], preview_size=800)
+
+    result = service.generate(scan, str(path))
+
+    with Image.open(result["preview_path"]) as preview:
+        assert max(preview.size) == 800
+        assert preview.mode == "L"
+    for size, thumb_path in result["thumbnail_paths"].items():
+        with Image.open(thumb_path) as thumb:
+            assert max(thumb.size) == int(size)
+    assert result["original_bytes"] == path.stat().st_size
+    assert result["storage_overhead"] == round(result["bytes"] / result["original_bytes"], 4)
+    assert all(p.startswith(str(tmp_path / "derivatives")) for p in result["thumbnail_paths"].values())
+
+
+def test_generate_reuses_existing_renditions(tmp_path):
+    """Content-addressed uploads keep their key; a second run does not re-encode."""
+    key = "0123456789abcdef0123456789abcdef"
+    path = tmp_path / f"{key}.png"
+    scan = synthetic_mri(400)
+    scan.save(path)
+    service = DerivativeService(thumbnail_sizes=[128])
+    assert content_key(str(path)) == key
+
+    first = service.generate(scan, str(path))
+    mtime = (tmp_path / "derivatives" / f"{key}_preview.jpg").stat().st_mtime_ns
+    second = service.generate(scan, str(path))
+    assert second["bytes"] == first["bytes"]
+    assert (tmp_path / "derivatives" / f"{key}_preview.jpg").stat().st_mtime_ns == mtime
+
+
+def test_color_images_keep_color(tmp_path):
+    """Only grayscale scans are reduced to one channel."""
+    path = tmp_path / "color.png"
+    rng = np.random.default_rng(3)
+    image = Image.fromarray(rng.integers(0, 256, (300, 300, 3), dtype=np.uint8), mode="RGB")
+    image.save(path)
+    result = DerivativeService(thumbnail_sizes=[64]).generate(image, str(path))
+    with Image.open(result["preview_path"]) as preview:
+        assert preview.mode == "RGB"
+
+
+def test_prediction_returns_derivative_urls_without_waiting(tmp_path, monkeypatch):
+    """predict_image reports where derivatives go; they are written in the background."""
+    path = tmp_path / "scan.png"
+    synthetic_mri(600).save(path)
+    service = InferenceService(TinyModelLoader())
+    release = threading.Event()
+    generate = service.derivatives.generate
+
+    def slow_generate(image, image_path):
+        release.wait(5)
+        return generate(image, image_path)
+
+    monkeypatch.setattr(service.derivatives, "generate", slow_generate)
+    result = asyncio.run(service.predict_image(str(path)))
+
+    derivatives = result["derivatives"]
+    assert derivatives["ready"] is False
+    urls = derivative_urls(derivatives)
+    assert urls["preview_url"].endswith("_preview.jpg")
+    assert set(urls["thumbnail_urls"]) == {"128", "256"}
+
+    release.set()
+    service.derivatives.wait(5)
+    assert service.derivatives.locate(str(path)) == {**derivatives, "ready": True}
+
+
+def test_background_job_gets_its_own_image(tmp_path, monkeypatch):
+    """The request may keep using its image while the job renders a copy."""
+    path = tmp_path / "scan.png"
+    scan = synthetic_mri(300)
+    scan.save(path)
+    service = DerivativeService(thumbnail_sizes=[64])
+    seen = []
+    monkeypatch.setattr(service, "generate", lambda image, image_path: seen.append(image))
+    service.schedule(scan, str(path))
+    service.wait(5)
+    assert seen[0] is not scan and seen[0].tobytes() == scan.tobytes()
+
+
+def test_generation_failure_does_not_fail_prediction(tmp_path, monkeypatch):
+    """A broken encoder is logged; the prediction still succeeds."""
+    path = tmp_path / "scan.png"
+    synthetic_mri(300).save(path)
+    service = InferenceService(TinyModelLoader())
+
+    def broken(image, image_path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(service.derivatives, "generate", broken)
+    result = asyncio.run(service.predict_image(str(path)))
+    service.derivatives.wait(5)
+    assert result["status"] == "success"
+    assert result["derivatives"]["ready"] is False
+    assert not service.derivatives._pending
+
+
+def test_concurrent_writers_do_not_collide(tmp_path):
+    """Writers of the same rendition use their own temporary files."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    service = DerivativeService()
+    scan = synthetic_mri(600)
+    path = tmp_path / "key_preview.jpg"
+    with ThreadPoolExecutor(8) as pool:
+        sizes = list(pool.map(lambda _: service._write(scan, path), range(16)))
+    assert len(set(sizes)) == 1 and path.stat().st_size == sizes[0]
+    assert [p.name for p in tmp_path.iterdir()] == ["key_preview.jpg"]
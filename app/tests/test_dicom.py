@@ -0,0 +1,90 @@
+"""
+Tests for DICOM ingestion.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+pydicom = pytest.importorskip("pydicom")
+
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+from app.core.dicom import is_dicom, load_dicom_frames, read_header, select_frames, to_uint8
+
+
+def write_mri_dicom(path, frames=1, size=160, photometric="MONOCHROME2", window=(1000, 2000)):
+    """Write a 12-bit (multi-frame) MR DICOM with a bright disc in each frame."""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = MRImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = FileDataset(str(path), {}, file_meta=meta, preamble=b"\0" * 128)
+    ds.SOPClassUID = MRImageStorage
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "MR"
+    ds.Rows = ds.Columns = size
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = photometric
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    if window:
+        ds.WindowCenter, ds.WindowWidth = window
+
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:size, 0:size] / size - 0.5
+    disc = (xx ** 2 + yy ** 2) < 0.16
+    stack = np.where(disc, 1500 + rng.normal(0, 300, (frames, size, size)), 40)
+    stack += np.arange(frames)[:, None, None] * 10
+    ds.PixelData = np.clip(stack, 0, 4095).astype(np.uint16).tobytes()
+    ds.save_as(str(path), enforce_file_format=True)
+    return path
+
+
+def test_header_is_read_without_pixels(tmp_path):
+    """Header parsing reports frames, bit depth and window."""
+    path = write_mri_dicom(tmp_path / "scan.dcm", frames=5)
+    header = read_header(str(path))
+    assert is_dicom(str(path))
+    assert (header.frames, header.bits_stored) == (5, 12)
+    assert (header.window_center, header.window_width) == (1000.0, 2000.0)
+
+
+def test_to_uint8_applies_window_and_monochrome1(tmp_path):
+    """Values below/above the window clip; MONOCHROME1 is inverted."""
+    header = read_header(str(write_mri_dicom(tmp_path / "a.dcm")))
+    pixels = np.array([[0, 1000, 4095]], dtype=np.uint16)
+    assert to_uint8(pixels, header).tolist() == [[0, 128, 255]]
+
+    header.photometric = "MONOCHROME1"
+    assert to_uint8(pixels, header).tolist() == [[255, 127, 0]]
+
+
+def test_frame_budget_bounds_decoding(tmp_path):
+    """Only the selected frames are decoded."""
+    path = write_mri_dicom(tmp_path / "multi.dcm", frames=20)
+    images, header, indices = load_dicom_frames(str(path), max_frames=4)
+    assert len(images) == 4 and indices == select_frames(20, 4)
+    assert images[0].mode == "L" and images[0].size == (160, 160)
+
+
+def test_predict_multi_frame_dicom(tmp_path):
+    """Multi-frame files run as one batch and report per-frame results."""
+    from app.testing import TinyModelLoader
+    from app.services.inference import InferenceService
+
+    path = write_mri_dicom(tmp_path / "series.dcm", frames=6)
+    result = asyncio.run(InferenceService(TinyModelLoader()).predict_image(str(path)))
+    assert result["status"] == "success"
+    assert result["dicom"]["frames_used"] == 6
+    assert [f["frame"] for f in result["dicom"]["frame_predictions"]] == list(range(6))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,65 @@
+"""
+Tests for the evaluation harness (scripts/evaluate_model.py).
+"""
+
+import pytest
+from app.testing import color_photo, synthetic_mri
+from scripts.evaluate_model import PredictionCache, build_report, compare_reports, list_split, run_evaluation
+
+CLASSES = ["glioma_tumor", "meningioma_tumor", "no_tumor", "pituitary_tumor"]
+
+
+@pytest.fixture
+def split(tmp_path):
+    data = tmp_path / "Testing"
+    for index, name in enumerate(CLASSES):
+        (data / name).mkdir(parents=True)
+        synthetic_mri(256, seed=index).save(data / name / "scan.png")
+    color_photo((400, 400)).save(data / "no_tumor" / "photo.jpg")
+    (data / "no_tumor" / "notes.txt").write_text("not an image")
+    return data
+
+
+def test_split_follows_sorted_class_folders(split):
+    classes, images = list_split(split)
+    assert classes == CLASSES
+    assert [label for _, label in images] == [0, 1, 2, 2, 3]
+
+
+def test_report_counts_rejections_as_errors_of_the_validator():
+    records = [
+        {"label": 0, "status": "success", "predicted": 0, "latency_s": 0.01},
+        {"label": 0, "status": "success", "predicted": 1, "latency_s": 0.02},
+        {"label": 1, "status": "invalid_image", "latency_s": 0.005},
+        {"label": 1, "status": "success", "predicted": 1, "latency_s": 0.03},
+        {"label": 1, "status": "error", "path": "broken.jpg", "error": "decode", "latency_s": 0.0},
+    ]
+    report = build_report(records, ["a", "b"])
+    assert report["images"] == 4
+    assert report["accuracy"] == 0.5 and report["accepted_accuracy"] == round(2 / 3, 4)
+    assert report["false_reject_rate"] == 0.25
+    assert report["confusion_matrix"]["rows"]["b"] == {"a": 0, "b": 1, "rejected": 1}
+    assert report["per_class"]["b"] == {"support": 2, "precision": 0.5, "recall": 0.5, "rejected": 1}
+    assert report["latency"]["iterations"] == 4
+    assert report["errors"] == [{"path": "broken.jpg", "error": "decode"}]
+
+    deltas = {name: delta for name, _, _, delta in compare_reports(report, {**report, "accuracy": 0.25})}
+    assert deltas["accuracy"] == 0.25 and deltas["false_reject_rate"] == 0
+
+
+def test_reevaluation_only_runs_new_images(split, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = run_evaluation(split, "brain_tumor_model.h5", workers=2, cache_dir=cache_dir)
+    assert (first["images"], first["evaluated"], first["cached"]) == (5, 5, 0)
+    # The color photo is the only scan the validator rejects
+    assert first["per_class"]["no_tumor"]["rejected"] == 1 and first["false_reject_rate"] == 0.2
+
+    synthetic_mri(300, seed=9).save(split / "glioma_tumor" / "new.png")
+    second = run_evaluation(split, "brain_tumor_model.h5", workers=1, cache_dir=cache_dir)
+    assert (second["images"], second["evaluated"], second["cached"]) == (6, 1, 5)
+    assert second["fingerprint"] == first["fingerprint"]
+
+    cache = PredictionCache(cache_dir, first["fingerprint"])
+    assert len(cache.entries) == 6
+    other = run_evaluation(split, "brain_tumor_model.h5", workers=1, cache_dir=cache_dir, tta=4)
+    assert other["fingerprint"] != first["fingerprint"] and other["cached"] == 0
@@ -0,0 +1,48 @@
+"""
+Tests for the fallback predictor.
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.services.fallback import FallbackPredictor
+
+
+@pytest.fixture
+def image():
+    """Create a textured grayscale test image."""
+    rng = np.random.default_rng(7)
+    pixels = rng.integers(0, 256, (300, 280), dtype=np.uint8)
+    return Image.fromarray(pixels, mode="L").convert("RGB")
+
+
+def test_predict_is_deterministic(image):
+    """Same image gives the same scores, which sum to 1."""
+    predictor = FallbackPredictor()
+    first = predictor.predict(image)
+    second = predictor.predict(image)
+    assert first.shape == (4,)
+    assert np.allclose(first, second)
+    assert abs(float(first.sum()) - 1.0) < 1e-5
+
+
+def test_predict_leaves_global_rng_untouched(image):
+    """Fallback must not reseed the process-wide NumPy RNG."""
+    state = np.random.get_state()[1].copy()
+    FallbackPredictor().predict(image)
+    assert np.array_equal(state, np.random.get_state()[1])
+
+
+def test_predict_batch_matches_batch_size():
+    """Batched float and uint8 inputs each give one row per image."""
+    predictor = FallbackPredictor()
+    rng = np.random.default_rng(3)
+    batch = rng.random((5, 150, 150, 3), dtype=np.float32)
+    scores = predictor.predict_batch(batch)
+    assert scores.shape == (5, 4)
+    assert np.allclose(scores.sum(axis=1), 1.0, atol=1e-5)
+    assert np.allclose(scores, predictor.predict_batch((batch * 255).round().astype(np.uint8)), atol=1e-5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,105 @@
+"""
+Tests for the Grad-CAM overlay cache and encoder.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.services.gradcam import GradCamService, file_sha256, last_conv_layer
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Grad-CAM service writing overlays to a temporary directory."""
+    gradcam = GradCamService(cache_size=2)
+    gradcam.output_dir = tmp_path / "heatmaps"
+    return gradcam
+
+
+@pytest.fixture
+def image():
+    """Create a grayscale test scan."""
+    rng = np.random.default_rng(5)
+    return Image.fromarray(rng.integers(0, 256, (300, 260), dtype=np.uint8), mode="L")
+
+
+def test_save_overlay_is_cached(service, image):
+    """Encoded overlays are found again by image hash and model version."""
+    cam = np.outer(np.hanning(9), np.hanning(9))
+    path = asyncio.run(service.save_overlay(image, cam, "ab" * 32, "model-1"))
+
+    overlay = Image.open(path)
+    assert overlay.mode == "RGB"
+    assert max(overlay.size) <= service.max_side
+    assert service.lookup("ab" * 32, "model-1") == path
+    assert service.lookup("ab" * 32, "model-2") is None
+
+
+def test_lookup_falls_back_to_disk(service, image):
+    """Overlays written before a restart are reused."""
+    path = service._encode_overlay(image, np.zeros((4, 4)), service._heatmap_path("cd" * 32, "m"))
+    service._cache.clear()
+    assert service.lookup("cd" * 32, "m") == path
+
+
+def test_file_sha256(tmp_path):
+    """File hashing matches hashlib on the whole content."""
+    import hashlib
+    target = tmp_path / "scan.bin"
+    target.write_bytes(b"x" * 3_000_000)
+    assert file_sha256(str(target)) == hashlib.sha256(b"x" * 3_000_000).hexdigest()
+
+
+
+def test_last_conv_layer_skips_later_4d_layers():
+    """Pooling and normalization after the last convolution are not explained."""
+    class Conv2D:
+        pass
+
+    class DepthwiseConv2D:
+        pass
+
+    class MaxPooling2D:
+        pass
+
+    class Dense:
+        pass
+
+    class Model:
+        def __init__(self, *layers):
+            self.layers = list(layers)
+
+    conv_types = (Conv2D, DepthwiseConv2D)
+    conv, depthwise, pool, dense = Conv2D(), DepthwiseConv2D(), MaxPooling2D(), Dense()
+    assert last_conv_layer(Model(depthwise, conv, pool, dense), conv_types) is conv
+    assert last_conv_layer(Model(conv, depthwise, pool, dense), conv_types) is depthwise
+    with pytest.raises(ValueError):
+        last_conv_layer(Model(pool, dense), conv_types)
+
+
+def test_grad_model_follows_the_model_object(service):
+    """A reloaded model gets its own Grad-CAM model, built on its last Conv2D."""
+    tf = pytest.importorskip("tensorflow")
+
+    def build():
+        return tf.keras.Sequential([
+            tf.keras.Input((32, 32, 3)),
+            tf.keras.layers.Conv2D(4, 3, padding="same", name="conv"),
+            tf.keras.layers.MaxPooling2D(name="pool"),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(4, activation="softmax"),
+        ])
+
+    first = build()
+    grad_model = service._get_grad_model(first)
+    assert grad_model.outputs[0].shape[1:] == (32, 32, 4)
+    assert service._get_grad_model(first) is grad_model
+
+    second = build()
+    assert service._get_grad_model(second) is not grad_model
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
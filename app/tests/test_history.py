@@ -0,0 +1,138 @@
+"""
+Tests for prediction history persistence and cursor pagination.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import mongomock
+import pytest
+from bson import ObjectId
+from app.services.history import PredictionHistory, create_history_indexes, decode_cursor, encode_cursor
+
+USER = {"_id": ObjectId(), "email": "history@example.com"}
+
+
+def prediction(label="Glioma Tumor", confidence=0.9):
+    return {
+        "predictions": [{"class_index": 0, "label": label, "confidence": confidence, "percentage": 90.0}],
+        "top_prediction": {"class_index": 0, "label": label, "confidence": confidence, "percentage": 90.0},
+        "image_path": "http://localhost:8000/static/abc.jpg",
+        "model_version": "tiny",
+        "inference_mode": "single",
+        "medical_analysis": {"description": "not stored"},
+        "derivatives": {"thumbnail_urls": {"256": "t256", "128": "t128"}},
+    }
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.predictions
+    create_history_indexes(collection)
+    return collection
+
+
+def seed(collection, count, same_timestamp_every=3):
+    """Insert records, several sharing a timestamp to exercise the _id tie-break."""
+    base = datetime(2026, 1, 1)
+    collection.insert_many([
+        {"_id": ObjectId(), "user_id": USER["_id"], "created_at": base + timedelta(seconds=i // same_timestamp_every),
+         "top_label": "Glioma Tumor" if i % 2 else "No Tumor", "predictions": []}
+        for i in range(count)
+    ])
+
+
+def test_records_are_batched(collection):
+    """Queued records are written with one insert_many per batch."""
+    history = PredictionHistory(collection, batch_size=10, flush_interval=0.05)
+    for _ in range(25):
+        assert history.record(USER, prediction())
+    assert history.flush()
+    history.stop()
+
+    assert collection.count_documents({}) == 25
+    assert history.stats["batches"] < 25
+    stored = collection.find_one()
+    assert "medical_analysis" not in stored
+    assert stored["thumbnail_url"] == "t128"
+
+
+def test_full_buffer_drops_instead_of_blocking(collection):
+    """A stalled database never blocks the request path."""
+    history = PredictionHistory(collection, max_queue=2)
+    history._ensure_started = lambda: None  # no writer thread
+    assert history.record(USER, prediction())
+    assert history.record(USER, prediction())
+    assert not history.record(USER, prediction())
+    assert history.stats["dropped"] == 1
+
+
+def test_cursor_pagination_visits_every_record_once(collection):
+    """Keyset pages are newest first, without gaps or repeats."""
+    seed(collection, 47)
+    history = PredictionHistory(collection)
+
+    seen, cursor = [], None
+    while True:
+        page = history.query(USER["_id"], limit=10, cursor=cursor)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = [str(d["_id"]) for d in collection.find().sort([("created_at", -1), ("_id", -1)])]
+    assert seen == expected
+
+
+def test_label_filter_and_invalid_cursor(collection):
+    """The label filter narrows results; malformed cursors raise ValueError."""
+    seed(collection, 20)
+    history = PredictionHistory(collection)
+    items = history.query(USER["_id"], limit=50, label="No Tumor")["items"]
+    assert len(items) == 10
+    assert all(item["top_label"] == "No Tumor" for item in items)
+    with pytest.raises(ValueError):
+        history.query(USER["_id"], cursor="not-a-cursor")
+
+
+def test_cursor_roundtrip():
+    """Cursors keep millisecond precision."""
+    created_at, record_id = datetime(2026, 3, 4, 5, 6, 7, 123000), ObjectId()
+    assert decode_cursor(encode_cursor(created_at, record_id)) == (created_at, record_id)
+
+
+def test_history_endpoint():
+    """GET /api/predictions pages through the logged-in user's records."""
+    from app.testing import TEST_USER_EMAIL, TEST_USER_PASSWORD, install_mongomock
+    from app.db import get_predictions_collection, get_users_collection
+    from app.main import app
+
+    install_mongomock()
+    user = get_users_collection().find_one({"email": TEST_USER_EMAIL})
+    history = PredictionHistory(get_predictions_collection(), flush_interval=0.01)
+    for label in ("No Tumor", "Glioma Tumor", "Meningioma Tumor"):
+        history.record(user, prediction(label))
+    history.flush()
+    history.stop()
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            token = (await client.post(
+                "/api/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD}
+            )).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            first = (await client.get("/api/predictions", params={"limit": 2}, headers=headers)).json()
+            second = (await client.get(
+                "/api/predictions", params={"limit": 2, "cursor": first["next_cursor"]}, headers=headers
+            )).json()
+            bad = await client.get("/api/predictions", params={"cursor": "!!"}, headers=headers)
+            return first, second, bad
+
+    first, second, bad = asyncio.run(go())
+    assert len(first["items"]) == 2 and first["next_cursor"]
+    assert len(second["items"]) == 1 and second["next_cursor"] is None
+    assert {item["top_label"] for item in first["items"] + second["items"]} == {
+        "No Tumor", "Glioma Tumor", "Meningioma Tumor"
+    }
+    assert bad.status_code == 400
@@ -0,0 +1,165 @@
+"""
+Tests for the queue-based structured logging pipeline.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from app.config import settings
+from app.utils import logger as logger_module
+from app.utils.logger import JSONFormatter, RateLimitFilter, StructuredQueueHandler, get_logger
+
+
+class ListHandler(logging.Handler):
+    """Collect formatted records."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """JSON lines written by the background listener during the test."""
+    get_logger(__name__)
+    handler = ListHandler()
+    handler.setFormatter(JSONFormatter())
+    listener = logger_module._listener
+    monkeypatch.setattr(listener, "handlers", listener.handlers + (handler,))
+    return handler
+
+
+def wait_for(written, predicate, timeout=2.0):
+    """Wait until the listener has written a record matching ``predicate``."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        records = [json.loads(line) for line in list(written.lines)]
+        matches = [record for record in records if predicate(record)]
+        if matches:
+            return matches
+        time.sleep(0.01)
+    return []
+
+
+def make_record(msg="scan %s took %.1f ms", args=("a.png", 12.34), exc_info=None):
+    return logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, args, exc_info)
+
+
+def test_json_formatter_output_parses():
+    record = make_record()
+    record.request_id = "req-1"
+    record.model_version = "v3"
+    record._private = "hidden"
+
+    payload = json.loads(JSONFormatter().format(record))
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "app.test"
+    assert payload["message"] == "scan a.png took 12.3 ms"
+    assert payload["request_id"] == "req-1"
+    assert payload["model_version"] == "v3"
+    assert "_private" not in payload
+    assert payload["ts"].endswith("+00:00")
+
+
+def test_json_formatter_keeps_traceback_separate():
+    try:
+        raise ValueError("bad pixels")
+    except ValueError:
+        record = make_record(msg="failed", args=None, exc_info=sys.exc_info())
+
+    prepared = StructuredQueueHandler(None).prepare(record)
+    payload = json.loads(JSONFormatter().format(prepared))
+    assert payload["message"] == "failed"
+    assert "ValueError: bad pixels" in payload["exc_info"]
+    assert prepared.exc_info is None
+
+
+def test_prepare_leaves_formatting_to_the_listener():
+    class Counted:
+        calls = 0
+
+        def __str__(self):
+            Counted.calls += 1
+            return "counted"
+
+    record = make_record(msg="value %s", args=(Counted(),))
+    prepared = StructuredQueueHandler(None).prepare(record)
+
+    assert Counted.calls == 0
+    assert prepared.msg == "value %s"
+    assert prepared is not record
+    assert json.loads(JSONFormatter().format(prepared))["message"] == "value counted"
+    assert Counted.calls == 1
+
+
+def test_rate_limit_filter_drops_info_and_reports_suppressed(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(logger_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    limiter = RateLimitFilter(per_second=2)
+
+    passed = [limiter.filter(make_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+
+    # Warnings always pass, even over the limit
+    warning = make_record()
+    warning.levelno = logging.WARNING
+    assert limiter.filter(warning)
+
+    clock[0] += 1
+    record = make_record()
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+    follow_up = make_record()
+    assert limiter.filter(follow_up)
+    assert not hasattr(follow_up, "suppressed")
+
+
+def test_rate_limits_apply_per_module(monkeypatch, written):
+    monkeypatch.setattr(settings, "LOG_RATE_LIMITS", "app.tests.noisy=1, app.tests.other=x")
+    monkeypatch.setattr(logger_module, "time", SimpleNamespace(monotonic=lambda: 100.0))
+    noisy = get_logger("app.tests.noisy")
+    quiet = get_logger("app.tests.quiet")
+    other = get_logger("app.tests.other")
+
+    for index in range(3):
+        noisy.info("noisy %d", index)
+        quiet.info("quiet %d", index)
+        other.info("other %d", index)
+
+    assert wait_for(written, lambda record: record["message"] == "other 2")
+    messages = [json.loads(line)["message"] for line in written.lines]
+    assert [m for m in messages if m.startswith("noisy")] == ["noisy 0"]
+    assert [m for m in messages if m.startswith("quiet")] == ["quiet 0", "quiet 1", "quiet 2"]
+    assert [m for m in messages if m.startswith("other")] == ["other 0", "other 1", "other 2"]
+
+
+@pytest.mark.parametrize("header", ["req-from-client", None])
+def test_request_id_reaches_records(monkeypatch, written, header):
+    from app.api.routes import chat
+    from app.main import app
+
+    monkeypatch.setattr(chat.gpt_service, "is_available", lambda: False)
+    headers = {"X-Request-ID": header} if header else {}
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/chat", json={"message": "What is a brain tumor?"}, headers=headers)
+
+    response = asyncio.run(go())
+    assert response.status_code == 200
+    request_id = response.headers["X-Request-ID"]
+    if header:
+        assert request_id == header
+
+    records = wait_for(written, lambda record: record["logger"] == "app.api.routes.chat")
+    assert records
+    assert all(record["request_id"] == request_id for record in records)
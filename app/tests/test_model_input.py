@@ -0,0 +1,91 @@
+"""
+Tests for uint8 model input (serving exports that rescale in the graph).
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from app.testing import TinyModelLoader, synthetic_mri
+from app.core.image_utils import BATCH_BUFFERS, BatchBufferPool, ImageProcessor, to_model_input
+from app.services.inference import InferenceService
+
+
+def test_uint8_preprocessing_matches_float_pipeline():
+    image = synthetic_mri(300)
+    floats = ImageProcessor.preprocess_image(image)
+    pixels = ImageProcessor.preprocess_image(image, dtype="uint8")
+    assert pixels.dtype == np.uint8 and pixels.shape == floats.shape
+    assert np.array_equal(to_model_input(pixels, "float32"), floats)
+    assert np.array_equal(to_model_input(floats, "uint8"), pixels)
+    assert to_model_input(pixels, "uint8") is pixels
+
+    buffer = np.zeros_like(pixels)
+    assert ImageProcessor.preprocess_image(image, dtype="uint8", out=buffer) is buffer
+    assert np.array_equal(buffer, pixels)
+
+
+def test_buffer_pool_reuses_released_buffers():
+    pool = BatchBufferPool(max_free=1)
+    first = pool.acquire((1, 4, 4, 3))
+    assert pool.acquire((1, 4, 4, 3)) is not first
+    pool.release(first)
+    assert pool.acquire((1, 4, 4, 3)) is first
+    assert pool.acquire((2, 4, 4, 3)).shape == (2, 4, 4, 3)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"tta": 4}, {"explain": True}])
+def test_uint8_model_predicts_like_float_model(tmp_path, kwargs):
+    path = tmp_path / "scan.png"
+    synthetic_mri(256).save(path)
+    reference = InferenceService(TinyModelLoader())
+    served = InferenceService(TinyModelLoader(input_dtype="uint8"))
+
+    expected = asyncio.run(reference.predict_image(str(path), **kwargs))
+    result = asyncio.run(served.predict_image(str(path), **kwargs))
+    assert result["status"] == "success"
+    assert result["predictions"] == expected["predictions"]
+
+
+def test_single_image_input_comes_from_the_pool(tmp_path, monkeypatch):
+    path = tmp_path / "scan.png"
+    synthetic_mri(256).save(path)
+    service = InferenceService(TinyModelLoader(input_dtype="uint8"))
+    released = []
+    monkeypatch.setattr(BATCH_BUFFERS, "release", released.append)
+
+    asyncio.run(service.predict_image(str(path)))
+    assert len(released) == 1 and released[0].dtype == np.uint8
+
+
+def test_exported_serving_model_matches_original(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    from app.core.serving_model import export_serving_model
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(32, 32, 3)),
+        tf.keras.layers.Conv2D(4, 3, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(4, activation="softmax"),
+    ])
+    path = tmp_path / "model.h5"
+    model.save(str(path))
+
+    report = export_serving_model(str(path))
+    assert report["output_path"].endswith("model_uint8.h5")
+    assert report["max_abs_diff"] < 1e-5
+    assert tf.keras.models.load_model(report["output_path"]).inputs[0].dtype == "uint8"
+
+
+def test_models_taking_uint8_are_not_wrapped_again():
+    tf = pytest.importorskip("tensorflow")
+    from app.core.serving_model import build_uint8_serving_model
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(32, 32, 3), dtype="uint8"),
+        tf.keras.layers.Rescaling(1.0 / 255),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(4, activation="softmax"),
+    ])
+    with pytest.raises(ValueError, match="already takes uint8"):
+        build_uint8_serving_model(model)
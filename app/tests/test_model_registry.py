@@ -0,0 +1,84 @@
+"""
+Tests for the model registry and the distillation helpers.
+"""
+
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+from app.core.model_registry import REGISTRY_FILE, get_model_entry, list_models, register_model
+from training.distill_student import list_images, soft_targets
+
+
+def test_register_replaces_entries_by_name(tmp_path):
+    model = tmp_path / "student.h5"
+    model.write_bytes(b"weights v1")
+    first = register_model(str(model), {"report": {"accuracy": 0.9}}, models_dir=tmp_path)
+    assert first["size_bytes"] == 10 and first["report"]["accuracy"] == 0.9
+
+    model.write_bytes(b"weights v2")
+    other = tmp_path / "teacher.h5"
+    other.write_bytes(b"teacher")
+    second = register_model(str(model), models_dir=tmp_path)
+    register_model(str(other), models_dir=tmp_path)
+
+    assert second["sha256"] != first["sha256"]
+    assert get_model_entry("student.h5", models_dir=tmp_path) == second
+    assert [entry["name"] for entry in list_models(models_dir=tmp_path)] == ["teacher.h5", "student.h5"]
+    assert set(json.loads((tmp_path / REGISTRY_FILE).read_text())) == {"student.h5", "teacher.h5"}
+    assert get_model_entry("missing.h5", models_dir=tmp_path) is None
+
+
+def test_admin_lists_registered_models(tmp_path, monkeypatch):
+    from app.core import model_registry
+    from app.core.auth import get_current_admin
+    from app.main import app
+
+    monkeypatch.setattr(model_registry, "MODELS_DIR", tmp_path)
+    model = tmp_path / "brain_tumor_model.h5"
+    model.write_bytes(b"weights")
+    register_model(str(model), {"kind": "teacher"})
+    app.dependency_overrides[get_current_admin] = lambda: {"email": "admin@example.com"}
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/api/admin/models")
+
+    try:
+        response = asyncio.run(go())
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    body = response.json()
+    assert body["serving"]["kind"] == "teacher"
+    assert [entry["name"] for entry in body["models"]] == ["brain_tumor_model.h5"]
+
+
+def test_soft_targets_flatten_the_teacher_distribution():
+    probabilities = np.array([[0.97, 0.01, 0.01, 0.01], [0.25, 0.25, 0.25, 0.25]], dtype=np.float32)
+    assert np.allclose(soft_targets(probabilities, 1.0), probabilities, atol=1e-6)
+    softened = soft_targets(probabilities, 4.0)
+    assert np.allclose(softened.sum(axis=1), 1.0)
+    assert softened[0, 0] < 0.97 and softened.argmax(axis=1)[0] == 0
+    assert np.allclose(softened[1], 0.25)
+
+
+def test_list_images_maps_class_folders(tmp_path):
+    for folder in ("glioma_tumor", "notumor", "unknown"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "a.jpg").write_bytes(b"")
+    paths, labels = list_images(tmp_path)
+    assert labels.tolist() == [0, 2] and paths[1].endswith("notumor/a.jpg")
+
+
+def test_student_is_compact_and_takes_uint8():
+    pytest.importorskip("tensorflow")
+    from training.distill_student import build_student
+
+    student = build_student(150, logits=False)
+    assert student.inputs[0].dtype == "uint8"
+    assert student.count_params() < 500_000
+    outputs = student.predict(np.zeros((2, 150, 150, 3), dtype=np.uint8), verbose=0)
+    assert outputs.shape == (2, 4) and np.allclose(outputs.sum(axis=1), 1.0, atol=1e-5)
@@ -0,0 +1,125 @@
+"""
+Tests for perceptual hashing and the near-duplicate index.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.testing import natural_photo, synthetic_mri
+from app.core.phash import HashIndex, dedupe, duplicate_groups, hash_files, phash, popcount
+from scripts.find_duplicates import find_duplicates
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def random_hashes(count: int, planted: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 63, count, dtype=np.uint64) * np.uint64(2)
+    flips = np.zeros(planted, dtype=np.uint64)
+    for _ in range(2):
+        flips |= np.left_shift(np.uint64(1), rng.integers(0, 64, planted).astype(np.uint64))
+    return np.concatenate([hashes, hashes[:planted] ^ flips])
+
+
+def brute_force_pairs(hashes: np.ndarray, radius: int):
+    distances = popcount(hashes[:, None] ^ hashes[None, :])
+    a, b = np.nonzero(np.triu(distances <= radius, 1))
+    return sorted(zip(a.tolist(), b.tolist(), distances[a, b].tolist()))
+
+
+def test_hash_survives_reencoding_but_separates_scans(tmp_path):
+    scan = synthetic_mri(512)
+    path = tmp_path / "copy.jpg"
+    scan.resize((300, 300)).save(path, quality=60)
+    assert distance(phash(scan), phash(Image.open(path))) <= 2
+    assert distance(phash(scan), phash(scan.transpose(Image.Transpose.ROTATE_90))) > 16
+    assert distance(phash(scan), phash(natural_photo((400, 400)))) > 16
+
+
+def test_popcount_without_bitwise_count(monkeypatch):
+    values = np.array([0, 1, 2 ** 64 - 1, 0xF0F0], dtype=np.uint64)
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert popcount(values).tolist() == [0, 1, 64, 8]
+
+
+@pytest.mark.parametrize("radius", [2, 4, 6])
+def test_index_matches_brute_force(radius):
+    hashes = random_hashes(3000, planted=60)
+    index = HashIndex(hashes, radius=radius)
+    assert [tuple(row) for row in index.pairs().tolist()] == brute_force_pairs(hashes, radius)
+
+    probe = int(hashes[5])
+    expected = sorted((i, d) for i, d in enumerate(popcount(hashes ^ np.uint64(probe)).tolist()) if d <= radius)
+    assert sorted(index.query(probe)) == expected
+    assert index.query(probe)[0] == (5, 0)
+
+
+def test_added_hashes_are_found_before_and_after_rebuild():
+    hashes = random_hashes(500, planted=0)
+    index = HashIndex(hashes[:400], rebuild_threshold=50)
+    ids = index.add(hashes[400:420])
+    near = int(hashes[410]) ^ 0b101
+    assert index.query(near) == [(ids[10], 2)]
+    index.add(hashes[420:])
+    assert index.query(near) == [(410, 2)]
+    assert len(index) == 500
+
+
+def test_save_and_load(tmp_path):
+    hashes = random_hashes(100, planted=5)
+    HashIndex(hashes).save(str(tmp_path / "index.npz"), [f"img{i}" for i in range(105)])
+    index, names = HashIndex.load(str(tmp_path / "index.npz"))
+    assert np.array_equal(index.hashes, hashes) and names[104] == "img104"
+    assert len(index.pairs()) >= 5
+
+
+def test_groups_and_dedupe_keep_one_image_per_group(tmp_path):
+    assert duplicate_groups(np.array([[0, 2, 1], [2, 3, 0]]), 5).tolist() == [0, 1, 0, 0, 4]
+
+    scan = synthetic_mri(400)
+    paths = []
+    for name, image in [("a.png", scan), ("b.png", natural_photo((300, 300))),
+                        ("c.jpg", scan.resize((256, 256))), ("d.png", scan.transpose(Image.Transpose.ROTATE_90))]:
+        image.save(tmp_path / name)
+        paths.append(str(tmp_path / name))
+    (tmp_path / "broken.jpg").write_bytes(b"nope")
+    paths.append(str(tmp_path / "broken.jpg"))
+
+    hashes, kept = hash_files(paths, workers=2)
+    assert kept == [0, 1, 2, 3] and len(hashes) == 4
+    keep, pairs, conflicts = dedupe(paths)
+    assert keep == [0, 1, 3, 4]
+    assert pairs[:, :2].tolist() == [[0, 2]]
+    assert conflicts == []
+
+    # A copy filed under another class: neither label can be trusted
+    keep, pairs, conflicts = dedupe(paths, labels=["glioma", "no_tumor", "meningioma", "glioma", "glioma"])
+    assert keep == [1, 3, 4]
+    assert conflicts == [[0, 2]]
+    keep, _, conflicts = dedupe(paths, labels=["glioma", "no_tumor", "glioma", "no_tumor", "glioma"])
+    assert keep == [0, 1, 3, 4] and conflicts == []
+
+
+def test_report_finds_leakage_between_splits(tmp_path):
+    scan = synthetic_mri(400)
+    for split, cls, name, image in [
+        ("Training", "glioma_tumor", "a.png", scan),
+        ("Training", "no_tumor", "b.png", natural_photo((300, 300))),
+        ("Testing", "glioma_tumor", "copy.jpg", scan.resize((200, 200))),
+        ("Testing", "no_tumor", "c.png", scan.transpose(Image.Transpose.ROTATE_90)),
+        ("Testing", "pituitary_tumor", "mislabelled.png", natural_photo((300, 300))),
+    ]:
+        (tmp_path / split / cls).mkdir(parents=True, exist_ok=True)
+        image.save(tmp_path / split / cls / name)
+
+    report, index, paths = find_duplicates({"Training": tmp_path / "Training", "Testing": tmp_path / "Testing"})
+    assert report["images"] == 5 and len(index) == 5 and len(paths) == 5
+    assert report["cross_split_pairs"] == {"Testing / Training": 2}
+    assert report["splits"]["Testing"] == {"images": 3, "leaked": 2, "leaked_fraction": round(2 / 3, 4)}
+    assert report["label_conflict_groups"] == 1
+    # The conflicting pair is dropped entirely; the glioma copy keeps one image
+    assert [Path(path).name for path in report["prune"]] == ["copy.jpg", "mislabelled.png", "b.png"]
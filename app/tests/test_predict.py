@@ -2,8 +2,11 @@
 Tests for prediction endpoint.
 """
 
+import os
+
 import pytest
 from fastapi.testclient import TestClient
+from app.testing import encode_jpeg, synthetic_mri
 from app.main import app
 
 
@@ -41,5 +44,27 @@ def test_predict_invalid_file(client):
     assert response.status_code in [400, 422]
 
 
+def test_uploads_appear_only_when_complete(tmp_path, monkeypatch):
+    from app.api.routes.predict import save_upload
+
+    path = tmp_path / "scan.jpg"
+    body = encode_jpeg(synthetic_mri(128))
+    replace = os.replace
+
+    def checked_replace(src, dst):
+        assert not os.path.exists(dst)
+        assert open(src, "rb").read() == body
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", checked_replace)
+    save_upload(body, str(path))
+    assert path.read_bytes() == body
+    assert [p.name for p in tmp_path.iterdir()] == ["scan.jpg"]
+
+    monkeypatch.setattr(os, "replace", lambda src, dst: pytest.fail("existing upload rewritten"))
+    save_upload(b"other", str(path))
+    assert path.read_bytes() == body
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
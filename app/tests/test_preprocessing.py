@@ -0,0 +1,70 @@
+"""
+Parity tests for the preprocessing shared by training and serving.
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.testing import natural_photo, synthetic_mri
+from app.config import settings
+from app.core.image_utils import ImageProcessor
+from app.core.preprocessing import load_dataset, preprocess, preprocess_batch, resample_filter, to_model_input
+
+SIZE = 64
+
+
+@pytest.fixture
+def scans(tmp_path):
+    paths = []
+    for index, image in enumerate([synthetic_mri(300, seed=1), synthetic_mri(200, seed=2).convert("L"),
+                                   natural_photo((320, 240))]):
+        path = tmp_path / f"scan_{index}.png"
+        image.save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_training_and_serving_produce_identical_inputs(scans):
+    pixels, kept = load_dataset(scans, SIZE)
+    assert kept == [0, 1, 2] and pixels.dtype == np.uint8
+    for index, path in enumerate(scans):
+        served = ImageProcessor.preprocess_image(ImageProcessor.load_image(path), size=SIZE)
+        assert np.array_equal(served[0], to_model_input(pixels[index:index + 1], "float32")[0])
+
+
+def test_channels_are_rgb():
+    image = Image.new("RGB", (80, 80), (255, 0, 0))
+    pixels = preprocess(image, SIZE, dtype="uint8")[0]
+    assert (pixels[..., 0] == 255).all() and (pixels[..., 2] == 0).all()
+
+
+@pytest.mark.parametrize("mode", ["L", "P", "RGBA", "CMYK"])
+def test_modes_match_converting_to_rgb_first(mode):
+    image = natural_photo((150, 120)).convert(mode)
+    expected = np.asarray(image.convert("RGB").resize((SIZE, SIZE), resample_filter()))
+    assert np.array_equal(preprocess(image, SIZE, dtype="uint8")[0], expected)
+
+
+def test_batch_matches_single_images(scans):
+    images = [Image.open(path) for path in scans]
+    singles = np.concatenate([preprocess(image, SIZE) for image in images])
+    assert np.array_equal(preprocess_batch(images, SIZE, workers=1), singles)
+    assert np.array_equal(preprocess_batch(scans, SIZE, workers=3), singles)
+
+    out = np.zeros((3, SIZE, SIZE, 3), dtype=np.uint8)
+    assert preprocess_batch(scans, SIZE, dtype="uint8", out=out) is out
+    assert np.array_equal(to_model_input(out, "float32"), singles)
+
+
+def test_dataset_skips_unreadable_files(scans, tmp_path):
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    pixels, kept = load_dataset([scans[0], str(broken), scans[2]], SIZE)
+    assert kept == [0, 2] and pixels.shape == (2, SIZE, SIZE, 3)
+
+
+def test_resample_filter_is_configurable(monkeypatch):
+    monkeypatch.setattr(settings, "PREPROCESS_RESAMPLE", "bilinear")
+    assert resample_filter() == Image.Resampling.BILINEAR
+    with pytest.raises(ValueError):
+        resample_filter("cubic-spline")
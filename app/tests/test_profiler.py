@@ -0,0 +1,200 @@
+"""
+Tests for the sampling profiler and the admin endpoints that drive it.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from app.testing import TinyModelLoader, encode_jpeg, synthetic_mri
+from app.config import settings
+from app.core import profiler as profiler_module
+from app.core.profiler import SamplingProfiler
+
+
+ADMIN = {"email": "admin@example.com"}
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """Fresh global profiler sampling every millisecond."""
+    instance = SamplingProfiler(interval=0.001)
+    monkeypatch.setattr(profiler_module, "_profiler", instance)
+    yield instance
+    instance.stop()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The application with an admin signed in and no MongoDB history."""
+    from app.core.auth import get_current_user
+    from app.dependencies import get_prediction_history
+    from app.main import app
+
+    class NoHistory:
+        def record(self, user, prediction):
+            return True
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", [ADMIN["email"]])
+    app.dependency_overrides[get_current_user] = lambda: ADMIN
+    app.dependency_overrides[get_prediction_history] = NoHistory
+    yield app
+    app.dependency_overrides.clear()
+
+
+def call(app, *requests):
+    """Send ``(method, url, kwargs)`` requests in order and return the responses."""
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.request(method, url, **kwargs) for method, url, kwargs in requests]
+    return asyncio.run(go())
+
+
+def wait_until_stopped(profiler, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while profiler.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not profiler.active
+
+
+def predict_request():
+    body = encode_jpeg(synthetic_mri(256))
+    return ("POST", "/api/predict", {"files": {"file": ("scan.jpg", body, "image/jpeg")}})
+
+
+def chat_request():
+    return ("POST", "/api/chat", {"json": {"message": "What is a brain tumor?"}})
+
+
+@pytest.fixture
+def routes(app, tmp_path, monkeypatch):
+    """Serve predictions from ``TinyModel`` and answer chat with the rule-based bot."""
+    from app.api.routes import chat
+    from app.dependencies import get_inference_service
+    from app.services.inference import InferenceService
+
+    service = InferenceService(TinyModelLoader())
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(chat.gpt_service, "is_available", lambda: False)
+    app.dependency_overrides[get_inference_service] = lambda: service
+    yield service
+    service.derivatives.wait(5)
+
+
+def sample_inside(monkeypatch, owner, name, profiler):
+    """Take a stack sample of every thread each time ``owner.name`` is called."""
+    original = getattr(owner, name)
+
+    def sampled(*args, **kwargs):
+        profiler._sample(None)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(owner, name, staticmethod(sampled) if isinstance(owner, type) else sampled)
+
+
+@pytest.mark.parametrize("method,url", [
+    ("POST", "/api/admin/profiler/start?seconds=1"),
+    ("POST", "/api/admin/profiler/stop"),
+    ("GET", "/api/admin/profiler"),
+    ("GET", "/api/admin/workers"),
+    ("GET", "/api/admin/models"),
+])
+def test_admin_endpoints_reject_non_admins(app, profiler, method, url):
+    from app.core.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: {"email": "someone@example.com"}
+    (response,) = call(app, (method, url, {}))
+    assert response.status_code == 403
+    assert not profiler.active
+
+
+def test_start_requires_a_limit(app, profiler):
+    (response,) = call(app, ("POST", "/api/admin/profiler/start", {}))
+    assert response.status_code == 400
+    assert not profiler.active
+
+
+def test_session_stops_after_its_duration(app, profiler):
+    (response,) = call(app, ("POST", "/api/admin/profiler/start?seconds=0.2", {}))
+    assert response.status_code == 200
+    assert response.json()["active"] is True
+
+    assert wait_until_stopped(profiler)
+    status = profiler.status()
+    assert status["samples"] > 0
+    assert status["elapsed_seconds"] >= 0.2
+
+
+def test_stop_ends_the_session_early(app, profiler):
+    start, stop = call(
+        app,
+        ("POST", "/api/admin/profiler/start?seconds=60", {}),
+        ("POST", "/api/admin/profiler/stop", {}),
+    )
+    assert start.json()["active"] is True
+    assert stop.status_code == 200
+    assert stop.json()["active"] is False
+    assert stop.json()["elapsed_seconds"] < 60
+
+
+def test_session_stops_after_n_profiled_requests(app, profiler, routes):
+    responses = call(
+        app,
+        ("POST", "/api/admin/profiler/start?requests=2", {}),
+        ("GET", "/health", {}),
+        predict_request(),
+        chat_request(),
+    )
+    assert [r.status_code for r in responses] == [200] * 4
+    assert wait_until_stopped(profiler)
+
+    # Only /api/predict and /api/chat count towards the limit
+    (report,) = call(app, ("GET", "/api/admin/profiler?format=traces", {}))
+    report = report.json()
+    assert report["requests_profiled"] == 2
+    assert report["requests_remaining"] == 0
+    assert [trace["path"] for trace in report["traces"]] == ["/api/predict", "/api/chat"]
+    assert "InferenceService.predict_image" in report["sections"]
+    assert "ImageProcessor.preprocess_image" in report["sections"]
+    assert "MedicalChatbotRules.validate_and_enhance_response" in report["sections"]
+
+
+def test_profiles_name_the_service_frames(app, profiler, routes, monkeypatch):
+    from app.core import image_utils
+    from app.core.medical_chatbot_rules import MedicalChatbotRules
+
+    # Sample from inside the hot paths so the stacks do not depend on timing
+    sample_inside(monkeypatch, image_utils, "preprocess", profiler)
+    sample_inside(monkeypatch, MedicalChatbotRules, "is_question_relevant", profiler)
+
+    responses = call(
+        app,
+        ("POST", "/api/admin/profiler/start?seconds=30", {}),
+        predict_request(),
+        chat_request(),
+        ("POST", "/api/admin/profiler/stop", {}),
+        ("GET", "/api/admin/profiler?format=collapsed", {}),
+        ("GET", "/api/admin/profiler?format=speedscope", {}),
+    )
+    assert [r.status_code for r in responses] == [200] * 6
+    collapsed, speedscope = responses[4].text, responses[5].json()
+
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    assert "InferenceService.predict_image" in collapsed
+    assert "ImageProcessor.preprocess_image" in collapsed
+    assert "MedicalChatbotRules.validate_and_enhance_response" in collapsed
+
+    frames = speedscope["shared"]["frames"]
+    names = {frame["name"].split(" ")[0] for frame in frames}
+    assert {
+        "InferenceService.predict_image",
+        "ImageProcessor.preprocess_image",
+        "MedicalChatbotRules.validate_and_enhance_response",
+    } <= names
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(0 <= index < len(frames) for sample in profile["samples"] for index in sample)
@@ -0,0 +1,186 @@
+"""
+Tests for token-bucket rate limiting and metrics export.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from app.core.auth import create_access_token
+from app.core.metrics import MetricsRegistry
+from app.core.rate_limit import (
+    DECISIONS, MemoryBucketStore, RateLimitMiddleware, RateLimiter, RouteLimits, parse_limit
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def limiter(client="3/minute", global_=None, trust_proxy=False, clock=None, proxy_hops=1):
+    rules = {"predict": RouteLimits(parse_limit(client), parse_limit(global_))}
+    return RateLimiter(rules, MemoryBucketStore(clock=clock or FakeClock()), trust_proxy=trust_proxy, proxy_hops=proxy_hops)
+
+
+def post(app, path="/api/predict", headers=None, client=("10.0.0.1", 5000)):
+    async def go():
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(path, content=b"x" * 1024, headers=headers or {})
+    return asyncio.run(go())
+
+
+async def downstream(scope, receive, send):
+    """Inner app that consumes the body, like the real routes do."""
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_parse_limit():
+    """Specs give capacity and refill rate; 'off' disables."""
+    limit = parse_limit("30/minute")
+    assert limit.capacity == 30 and limit.refill_per_second == pytest.approx(0.5)
+    assert parse_limit("5/seconds").refill_per_second == 5
+    assert parse_limit("off") is None
+    with pytest.raises(ValueError):
+        parse_limit("5/fortnight")
+
+
+def test_memory_limits_are_split_between_workers(monkeypatch):
+    from app.config import settings
+    from app.core.rate_limit import build_rate_limiter
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setenv("APP_WORKER_COUNT", "4")
+    predict = build_rate_limiter().rules["predict"]
+    configured = parse_limit(settings.RATE_LIMITS["predict"][0])
+    assert predict.client.capacity == max(1.0, configured.capacity / 4)
+    assert predict.client.refill_per_second == pytest.approx(configured.refill_per_second / 4)
+    assert predict.client.spec == configured.spec
+
+    monkeypatch.setenv("APP_WORKER_COUNT", "1")
+    assert build_rate_limiter().rules["predict"].client == configured
+
+
+def test_classify_matches_whole_path_segments():
+    assert RateLimiter.classify("/api/predict") == "predict"
+    assert RateLimiter.classify("/api/predict/study") == "predict"
+    assert RateLimiter.classify("/api/predictions") == "api"
+    assert RateLimiter.classify("/api/auth/forgot-password") == "auth"
+    assert RateLimiter.classify("/api/chat") == "chat"
+    assert RateLimiter.classify("/static/uploads/scan.jpg") is None
+
+
+def test_bucket_bursts_then_refills():
+    """A full bucket allows a burst, then refills at the average rate."""
+    clock = FakeClock()
+    store = MemoryBucketStore(clock=clock)
+    limit = parse_limit("2/second")
+    assert store.consume("k", limit)[0]
+    assert store.consume("k", limit)[0]
+    allowed, remaining, retry_after = store.consume("k", limit)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.consume("k", limit)[0]
+
+
+def test_bucket_store_evicts_idle_keys():
+    """The store never holds more than max_keys buckets."""
+    store = MemoryBucketStore(max_keys=2, clock=FakeClock())
+    for key in "abc":
+        store.consume(key, parse_limit("1/minute"))
+    assert list(store._buckets) == ["b", "c"]
+
+
+def test_rejection_happens_before_the_body_is_read():
+    """Requests over the limit get 429 without the app or body parser running."""
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await downstream(scope, receive, send)
+
+    middleware = RateLimitMiddleware(app, limiter(client="2/minute"))
+    assert [post(middleware).status_code for _ in range(3)] == [200, 200, 429]
+    assert len(calls) == 2
+
+    rejected = post(middleware)
+    assert rejected.headers["retry-after"] == "30"
+    assert rejected.headers["x-ratelimit-scope"] == "client"
+    assert post(middleware, path="/health").status_code == 200
+
+
+def test_clients_are_keyed_by_user_then_ip():
+    """Valid tokens share a user bucket across IPs; forged tokens fall back to IP."""
+    middleware = RateLimitMiddleware(downstream, limiter(client="1/minute"))
+    token = create_access_token({"sub": "alice@example.com"})
+    auth = {"Authorization": f"Bearer {token}"}
+
+    assert post(middleware, headers=auth, client=("10.0.0.1", 1)).status_code == 200
+    assert post(middleware, headers=auth, client=("10.0.0.2", 1)).status_code == 429
+    forged = {"Authorization": "Bearer not.a.token"}
+    assert post(middleware, headers=forged, client=("10.0.0.3", 1)).status_code == 200
+    assert post(middleware, headers=forged, client=("10.0.0.3", 1)).status_code == 429
+
+
+def test_forwarded_for_only_when_trusted():
+    """Behind a proxy, X-Forwarded-For tells clients apart."""
+    trusted = RateLimitMiddleware(downstream, limiter(client="1/minute", trust_proxy=True))
+    assert post(trusted, headers={"X-Forwarded-For": "1.1.1.1"}).status_code == 200
+    assert post(trusted, headers={"X-Forwarded-For": "2.2.2.2"}).status_code == 200
+
+    untrusted = RateLimitMiddleware(downstream, limiter(client="1/minute"))
+    assert post(untrusted, headers={"X-Forwarded-For": "1.1.1.1"}).status_code == 200
+    assert post(untrusted, headers={"X-Forwarded-For": "2.2.2.2"}).status_code == 429
+
+
+def test_spoofed_forwarded_entries_do_not_change_the_key():
+    """Only the entries appended by trusted proxies identify the client."""
+    one_hop = RateLimitMiddleware(downstream, limiter(client="1/minute", trust_proxy=True))
+    assert post(one_hop, headers={"X-Forwarded-For": "6.6.6.1, 3.3.3.3"}).status_code == 200
+    assert post(one_hop, headers={"X-Forwarded-For": "6.6.6.2, 3.3.3.3"}).status_code == 429
+
+    two_hops = limiter(client="1/minute", trust_proxy=True, proxy_hops=2)
+    scope = {"type": "http", "path": "/api/predict", "headers": [(b"x-forwarded-for", b"6.6.6.1, 3.3.3.3, 10.0.0.9")]}
+    assert two_hops.client_key(scope) == "ip:3.3.3.3"
+    scope["headers"] = [(b"x-forwarded-for", b"3.3.3.3")]
+    assert two_hops.client_key(scope) == "ip:3.3.3.3"
+
+
+def test_global_bucket_and_metrics():
+    """The global bucket caps all clients together; decisions are counted."""
+    middleware = RateLimitMiddleware(downstream, limiter(client="10/minute", global_="2/minute"))
+    before = DECISIONS.value(route_class="predict", scope="global", decision="rejected")
+    statuses = [post(middleware, client=(f"10.0.1.{i}", 1)).status_code for i in range(3)]
+    assert statuses == [200, 200, 429]
+    assert DECISIONS.value(route_class="predict", scope="global", decision="rejected") == before + 1
+
+
+def test_failing_backend_fails_open():
+    """A broken shared store lets requests through and counts the error."""
+    class BrokenStore:
+        async def acquire(self, key, limit, cost=1.0):
+            raise ConnectionError("redis down")
+
+    rules = {"predict": RouteLimits(parse_limit("1/minute"), None)}
+    middleware = RateLimitMiddleware(downstream, RateLimiter(rules, BrokenStore()))
+    assert post(middleware).status_code == 200
+
+
+def test_metrics_rendering():
+    """Counters and gauges render in Prometheus text format."""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("route",))
+    counter.inc(route="/a")
+    counter.inc(2, route="/a")
+    registry.gauge("workers", "Workers", collect=lambda: {(): 3})
+    text = registry.render()
+    assert 'requests_total{route="/a"} 3' in text
+    assert "# TYPE workers gauge" in text and "workers 3" in text
+    with pytest.raises(ValueError):
+        counter.inc(path="/a")
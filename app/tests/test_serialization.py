@@ -0,0 +1,60 @@
+"""
+Tests for the pre-serialized response fast path.
+"""
+
+import asyncio
+import json
+
+import pytest
+from app.testing import TinyModelLoader, synthetic_mri
+from app.api.routes.predict import derivative_urls, encode_prediction
+from app.core.serialization import dumps, encode_response
+from app.schemas.chat import ChatResponse
+from app.schemas.prediction import PredictionResponse
+from app.services.inference import InferenceService
+
+
+def validated(model, data):
+    """What FastAPI's response_model path would send."""
+    return json.loads(model.model_validate(data).model_dump_json())
+
+
+@pytest.mark.parametrize("options", [{}, {"tta": 4}, {"tiled": True}])
+def test_prediction_matches_response_model(tmp_path, options):
+    """Fast path output equals validated output, including spliced analysis."""
+    path = tmp_path / "scan.png"
+    synthetic_mri(300).save(path)
+    result = asyncio.run(InferenceService(TinyModelLoader()).predict_image(str(path), **options))
+    result.pop("heatmap_path", None)
+    result["derivatives"] = derivative_urls(result["derivatives"])
+    assert result["medical_analysis"] is not None
+
+    assert json.loads(encode_prediction(result)) == validated(PredictionResponse, result)
+
+
+def test_low_confidence_note_is_not_emitted():
+    """Extra keys outside the schema are dropped like response_model does."""
+    result = {
+        "predictions": [], "image_path": "x", "status": "success",
+        "is_valid_brain_image": True, "image_validation_confidence": 0.9,
+        "medical_analysis": {"tumor_type": "Custom", "description": "d", "advantages": [],
+                             "disadvantages": [], "key_characteristics": [],
+                             "recommended_next_steps": [], "severity_level": "x",
+                             "severity_note": "low"},
+        "internal": 1,
+    }
+    encoded = json.loads(encode_prediction(result))
+    assert encoded == validated(PredictionResponse, result)
+    assert "internal" not in encoded and "severity_note" not in encoded["medical_analysis"]
+
+
+def test_chat_response_and_fragments():
+    """Defaults are filled and fragments are spliced verbatim."""
+    data = {"response": "r", "explanation": "e", "disclaimer": "d"}
+    assert json.loads(encode_response(ChatResponse, data)) == validated(ChatResponse, data)
+    body = encode_response(ChatResponse, data, {"disclaimer": dumps("pre-encoded")})
+    assert json.loads(body)["disclaimer"] == "pre-encoded"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,44 @@
+"""
+Tests for shared service construction and precomputed medical analysis.
+"""
+
+import json
+
+import pytest
+from app.testing import TinyModelLoader
+from app.dependencies import get_explanation_service, get_inference_service
+from app.services.inference import MEDICAL_ANALYSIS_JSON
+
+
+def test_services_are_shared():
+    """Dependency getters return one instance per model loader."""
+    loader = TinyModelLoader()
+    assert get_inference_service(loader) is get_inference_service(loader)
+    assert get_inference_service(TinyModelLoader()) is not None
+    assert get_explanation_service() is get_explanation_service()
+
+
+def test_medical_analysis_is_precomputed_and_read_only():
+    """Model labels map to the shared analysis and its JSON fragment."""
+    service = get_inference_service(TinyModelLoader())
+    label = service.image_processor.get_class_name(0)
+    analysis = service.get_medical_analysis(0, 0.95)
+
+    assert analysis is service.get_medical_analysis(0, 0.99)
+    assert analysis["tumor_type"] == label
+    assert not analysis["description"].startswith("Unknown")
+    assert json.loads(MEDICAL_ANALYSIS_JSON[label]) == json.loads(json.dumps(dict(analysis)))
+    with pytest.raises(TypeError):
+        analysis["severity_level"] = "None"
+
+
+def test_low_confidence_adds_note_without_mutating_shared_analysis():
+    """A severity note is added to a copy, never to the shared mapping."""
+    service = get_inference_service(TinyModelLoader())
+    noted = service.get_medical_analysis(1, 0.4)
+    assert "severity_note" in noted
+    assert "severity_note" not in service.get_medical_analysis(1, 0.9)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,121 @@
+"""
+Tests for the out-of-process inference server and its shared-memory client.
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from app.testing import TinyModel, TinyModelLoader, start_sidecar, synthetic_mri
+from app.services.inference import InferenceService
+from app.services.sidecar import SidecarClient, SidecarModelLoader, SidecarUnavailable
+
+
+class FailingLoader:
+    model_name = "missing.h5"
+
+    def get_model(self):
+        raise RuntimeError("model file not found")
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "inference.sock")
+
+
+@pytest.fixture
+def server(socket_path):
+    process = start_sidecar(socket_path, max_wait_ms=20)
+    yield process
+    process.terminate()
+    process.join(5)
+
+
+@pytest.mark.parametrize("use_shm", [True, False])
+def test_client_matches_local_model(server, socket_path, use_shm):
+    client = SidecarClient(socket_path, use_shm=use_shm)
+    batch = np.random.default_rng(0).random((3, 224, 224, 3), dtype=np.float32)
+    try:
+        np.testing.assert_allclose(client.predict(batch), TinyModel().predict(batch), rtol=1e-6)
+        # A larger batch grows the connection's segment
+        big = np.concatenate([batch] * 4)
+        np.testing.assert_allclose(client.predict(big), TinyModel().predict(big), rtol=1e-6)
+    finally:
+        client.close()
+
+
+def test_concurrent_requests_each_get_their_own_rows(server, socket_path):
+    client = SidecarClient(socket_path)
+    rng = np.random.default_rng(1)
+    batches = [rng.random((1 + i % 3, 64, 64, 3), dtype=np.float32) for i in range(12)]
+    outputs = [None] * len(batches)
+
+    def worker(i):
+        outputs[i] = client.predict(batches[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(batches))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    client.close()
+
+    for batch, output in zip(batches, outputs):
+        np.testing.assert_allclose(output, TinyModel().predict(batch), rtol=1e-6)
+
+
+def test_server_errors_and_missing_server(socket_path, tmp_path):
+    client = SidecarClient(socket_path)
+    with pytest.raises(SidecarUnavailable):
+        client.predict(np.zeros((1, 8, 8, 3), dtype=np.float32))
+
+    process = start_sidecar(socket_path, model_loader=FailingLoader())
+    try:
+        with pytest.raises(RuntimeError, match="model file not found"):
+            client.predict(np.zeros((1, 8, 8, 3), dtype=np.float32))
+    finally:
+        client.close()
+        process.terminate()
+        process.join(5)
+
+
+def test_inference_service_uses_the_server(server, socket_path, tmp_path):
+    path = tmp_path / "scan.png"
+    synthetic_mri(256).save(path)
+    client = SidecarClient(socket_path)
+    try:
+        remote = asyncio.run(
+            InferenceService(SidecarModelLoader("brain_tumor_model.h5", client)).predict_image(str(path))
+        )
+    finally:
+        client.close()
+    local = asyncio.run(InferenceService(TinyModelLoader()).predict_image(str(path)))
+    assert remote["top_prediction"]["label"] == local["top_prediction"]["label"]
+    assert remote["top_prediction"]["confidence"] == pytest.approx(local["top_prediction"]["confidence"], abs=1e-4)
+
+
+@pytest.mark.parametrize("options", [{}, {"tiled": True}, {"explain": True}, {"tta": 4}])
+def test_remote_model_never_runs_on_the_event_loop(tmp_path, monkeypatch, options):
+    path = tmp_path / "scan.png"
+    synthetic_mri(512).save(path)
+    threads = []
+
+    class RemoteModel(TinyModel):
+        def predict(self, batch, verbose=0):
+            threads.append(threading.get_ident())
+            return super().predict(batch, verbose=verbose)
+
+    loader = TinyModelLoader()
+    loader._model = RemoteModel()
+    loader.remote = True
+    service = InferenceService(loader)
+    monkeypatch.setattr(service.gradcam, "predict_with_cam", lambda *args: pytest.fail("Grad-CAM on a remote model"))
+
+    async def go():
+        return threading.get_ident(), await service.predict_image(str(path), **options)
+
+    loop_thread, result = asyncio.run(go())
+    assert result["status"] == "success"
+    assert threads and loop_thread not in threads
+    assert result["heatmap_path"] is None
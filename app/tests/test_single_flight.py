@@ -0,0 +1,115 @@
+"""
+Tests for single-flight coalescing of identical concurrent predictions.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from app.testing import encode_jpeg, synthetic_mri
+from app.config import settings
+from app.core.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test-share")
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return {"key": key}
+
+    async def go():
+        return await asyncio.gather(
+            *[flight.do("a", lambda: work("a")) for _ in range(5)],
+            flight.do("b", lambda: work("b")),
+        )
+
+    results = asyncio.run(go())
+    assert calls == ["a", "b"]
+    assert all(result is results[0] for result in results[:5])
+    assert results[5] == {"key": "b"}
+    assert flight.coalesced() == 4
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight("test-errors")
+    attempts = []
+
+    async def fail():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("decode failed")
+
+    async def go():
+        first = await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+        second = await asyncio.gather(flight.do("k", fail), return_exceptions=True)
+        return first + second
+
+    results = asyncio.run(go())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(attempts) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test-cancel")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def go():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(go()) == "done"
+
+
+def test_identical_uploads_run_inference_once(tmp_path, monkeypatch):
+    from app.core.auth import get_current_user
+    from app.dependencies import get_inference_service, get_prediction_history
+    from app.main import app
+
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    calls = []
+
+    class SlowService:
+        async def predict_image(self, file_path, tiled=False, explain=False, tta=0):
+            calls.append((file_path, tta))
+            await asyncio.sleep(0.1)
+            return {"status": "invalid_image", "is_valid_brain_image": False, "predictions": [],
+                    "top_prediction": None, "image_path": file_path}
+
+    class NoHistory:
+        def record(self, user, prediction):
+            return True
+
+    app.dependency_overrides[get_inference_service] = SlowService
+    app.dependency_overrides[get_prediction_history] = NoHistory
+    app.dependency_overrides[get_current_user] = lambda: {"email": "flight@example.com"}
+    body = encode_jpeg(synthetic_mri(128))
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            def post(tta=0):
+                return client.post(
+                    "/api/predict", params={"tta": tta}, files={"file": ("scan.jpg", body, "image/jpeg")}
+                )
+            return await asyncio.gather(*[post() for _ in range(4)], post(tta=4))
+
+    try:
+        responses = asyncio.run(go())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.content for r in responses[:4]}) == 1
+    # Four identical requests ran once; different options ran separately
+    assert len(calls) == 2
+    assert len(list(tmp_path.iterdir())) == 1
+
@@ -0,0 +1,73 @@
+"""
+Tests for study-level (multi-slice) inference.
+"""
+
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.testing import TinyModelLoader, synthetic_mri
+from app.config import settings
+from app.services.inference import InferenceService
+from app.services.study import StudyService, extract_study_archive
+
+
+@pytest.fixture
+def study_paths(tmp_path):
+    """Six MRI-like slices and two blank ones."""
+    paths = []
+    for i in range(8):
+        path = tmp_path / f"slice_{i:02d}.png"
+        if i in (0, 7):
+            Image.new("L", (256, 256), 0).save(path)
+        else:
+            synthetic_mri(256, seed=i).save(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def service():
+    return StudyService(InferenceService(TinyModelLoader()))
+
+
+def test_predict_study_filters_and_aggregates(service, study_paths, monkeypatch):
+    """Blank slices are dropped and the selected slices are aggregated."""
+    monkeypatch.setattr(settings, "STUDY_MAX_SLICES", 4)
+    monkeypatch.setattr(settings, "STUDY_BATCH_SIZE", 3)
+    result = service.predict_study(study_paths)
+
+    assert result["status"] == "success"
+    assert (result["slices_received"], result["slices_valid"], result["slices_evaluated"]) == (8, 6, 4)
+    assert not result["truncated"]
+    assert abs(sum(p["confidence"] for p in result["predictions"]) - 1.0) < 1e-3
+    assert result["top_slices"] and all(s["slice_index"] not in (0, 7) for s in result["top_slices"])
+
+
+def test_predict_study_respects_time_budget(service, study_paths, monkeypatch):
+    """An exhausted budget returns a truncated study instead of running on."""
+    monkeypatch.setattr(settings, "STUDY_TIME_BUDGET_S", 0.0)
+    result = service.predict_study(study_paths)
+    assert result["truncated"]
+    assert result["slices_evaluated"] == 0
+    assert result["status"] == "error"
+
+
+def test_extract_study_archive_limits(tmp_path):
+    """Only slice files are extracted, up to the file budget."""
+    archive = tmp_path / "study.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(5):
+            zf.writestr(f"series/IM{i}.png", b"x" * 10)
+        zf.writestr("series/notes.txt", b"ignored")
+        zf.writestr("__MACOSX/series/._IM0.png", b"ignored")
+    out = tmp_path / "out"
+    out.mkdir()
+
+    paths = extract_study_archive(str(archive), str(out), max_files=3, max_bytes=1000)
+    assert [p.rsplit("_", 1)[1] for p in paths] == ["IM0.png", "IM1.png", "IM2.png"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,40 @@
+"""
+Tests for tiled multi-scale inference helpers.
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from app.core.tiling import plan_tiles, extract_tiles, aggregate_tiles
+
+
+def test_plan_respects_patch_budget():
+    """Large images never produce more tiles than the budget."""
+    for budget in (1, 4, 9, 16):
+        tiles = plan_tiles(4000, 3000, 224, scales=(1.0, 0.5), overlap=0.25, max_patches=budget)
+        assert 1 <= len(tiles) <= budget
+        assert tiles[0].box == (0, 0, 4000, 3000)
+
+
+def test_plan_small_image_uses_global_view_only():
+    """Images smaller than a window are not tiled."""
+    tiles = plan_tiles(200, 200, 224, scales=(1.0, 0.5), max_patches=16)
+    assert len(tiles) == 1
+
+
+def test_extract_and_aggregate_shapes():
+    """Every tile becomes one batch row and the heatmap covers the finest grid."""
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (600, 600), dtype=np.uint8))
+    tiles = plan_tiles(600, 600, 150, scales=(1.0,), overlap=0.0, max_patches=17)
+    batch = extract_tiles(image, tiles, 150)
+    assert batch.shape == (len(tiles), 150, 150, 3)
+    assert 0.0 <= batch.min() and batch.max() <= 1.0
+
+    probabilities = np.tile([[0.1, 0.6, 0.2, 0.1]], (len(tiles), 1))
+    image_probs, info = aggregate_tiles(probabilities, tiles)
+    assert int(np.argmax(image_probs)) == 1
+    assert np.array(info["heatmap"]).shape == (4, 4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+Tests for staged image validation (header, preview, full statistics).
+"""
+
+import pytest
+from PIL import Image
+from app.testing import TinyModelLoader, color_photo, synthetic_mri
+from app.config import settings
+from app.services.inference import VALIDATIONS, InferenceService, header_rejection, validation_preview
+
+
+@pytest.fixture
+def service():
+    return InferenceService(TinyModelLoader())
+
+
+def decoded(image: Image.Image) -> bool:
+    """Opening a file reads only the header; decoding closes the file."""
+    return image.fp is None
+
+
+def counts(stage):
+    return VALIDATIONS.value(stage=stage, outcome="rejected"), VALIDATIONS.value(stage=stage, outcome="passed")
+
+
+def test_header_stage_rejects_without_decoding(service, tmp_path, monkeypatch):
+    wide = tmp_path / "wide.jpg"
+    color_photo((1600, 600)).save(wide)
+    cmyk = tmp_path / "print.jpg"
+    Image.new("CMYK", (400, 400), (10, 20, 30, 0)).save(cmyk)
+    rejected_before, _ = counts("header")
+
+    image = Image.open(wide)
+    valid, _, reason = service.validate_brain_image(image)
+    assert not valid and "don't match brain MRI format" in reason
+    assert not decoded(image)
+
+    image = Image.open(cmyk)
+    assert service.validate_brain_image(image)[2] == "Unsupported image format: CMYK"
+    assert not decoded(image)
+
+    monkeypatch.setattr(settings, "VALIDATION_MAX_PIXELS", 100_000)
+    big = tmp_path / "big.png"
+    synthetic_mri(512).save(big)
+    image = Image.open(big)
+    assert header_rejection(image) == "pixels"
+    assert "too large" in service.validate_brain_image(image)[2]
+    assert not decoded(image)
+
+    assert counts("header")[0] == rejected_before + 3
+
+
+def test_preview_stage_rejects_color_photo_at_reduced_scale(service, tmp_path):
+    path = tmp_path / "photo.jpg"
+    color_photo((1200, 1200)).save(path, quality=90)
+    rejected_before, _ = counts("preview")
+
+    image = Image.open(path)
+    preview = validation_preview(image, 256)
+    assert 256 <= min(preview.size) < 600
+    valid, _, reason = service.validate_brain_image(image)
+    assert not valid and "Colored photograph" in reason
+    # The full-resolution JPEG was never decoded
+    assert not decoded(image)
+    assert counts("preview")[0] == rejected_before + 1
+
+    dark = tmp_path / "dark.png"
+    Image.new("L", (300, 300), 2).save(dark)
+    assert "too dark" in service.validate_brain_image(Image.open(dark))[2]
+
+
+def test_valid_scans_reach_the_statistics_stage(service, tmp_path):
+    path = tmp_path / "scan.jpg"
+    synthetic_mri(1024).save(path, quality=95)
+    _, passed_before = counts("statistics")
+
+    assert service.validate_brain_image(Image.open(path))[0]
+    assert service.validate_brain_image(synthetic_mri(256))[0]
+    flat = Image.new("L", (300, 300), 120)
+    assert "contrast" in service.validate_brain_image(flat)[2]
+    assert counts("statistics")[1] == passed_before + 2
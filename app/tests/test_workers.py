@@ -0,0 +1,108 @@
+"""
+Tests for pre-fork worker support: sizing, memory reporting and fork resets.
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.core import workers
+from app.core.metrics import REGISTRY
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(f"/proc/{os.getpid()}/smaps_rollup"), reason="needs /proc/<pid>/smaps_rollup"
+)
+
+
+def test_process_memory_reports_rss_pss_shared_private():
+    memory = workers.process_memory(os.getpid())
+    assert memory["rss"] > 0
+    assert 0 < memory["pss"] <= memory["rss"]
+    assert memory["shared"] + memory["private"] == memory["rss"]
+    assert workers.process_memory(2 ** 30) is None
+
+
+def test_recommended_workers_follows_cpus_and_memory(monkeypatch):
+    monkeypatch.setattr(workers, "available_cpus", lambda: 8)
+    monkeypatch.setattr(workers, "memory_limit_bytes", lambda: 2 * 2 ** 30)
+    assert workers.recommended_workers(100, maximum=4) == 4
+    # 2 GiB minus a 1 GiB model leaves room for three 300 MB workers
+    assert workers.recommended_workers(300, shared_memory_mb=1024) == 3
+    monkeypatch.setattr(workers, "memory_limit_bytes", lambda: 2 ** 28)
+    assert workers.recommended_workers(300, shared_memory_mb=1024) == 1
+
+
+def test_forked_workers_share_preloaded_weights(monkeypatch):
+    weights = np.ones(32 * 2 ** 20 // 8)  # 32 MB "model" loaded in the master
+    monkeypatch.setenv("APP_MASTER_PID", str(os.getpid()))
+
+    children = []
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:
+            float(weights.sum())  # read-only use keeps the pages shared
+            time.sleep(2)
+            os._exit(0)
+        children.append(pid)
+
+    try:
+        time.sleep(0.5)
+        assert set(children) <= set(workers.worker_pids())
+        report = workers.worker_memory_report()
+        child_reports = [w for w in report["workers"] if w["pid"] in children]
+        assert len(child_reports) == 2
+        for child in child_reports:
+            # The weights count in every RSS but are split three ways in PSS
+            assert child["shared"] > weights.nbytes * 0.9
+            assert child["private"] < weights.nbytes / 2
+            assert child["pss"] < child["rss"]
+        assert report["shared_ratio"] > 0
+        assert 'worker_memory_bytes{pid="%d",kind="pss"}' % children[0] in REGISTRY.render()
+    finally:
+        for pid in children:
+            os.waitpid(pid, 0)
+
+
+def test_sidecar_is_not_listed_as_a_worker(monkeypatch):
+    monkeypatch.setenv("APP_MASTER_PID", "1")
+    monkeypatch.setenv("APP_SIDECAR_PID", "12")
+    monkeypatch.setattr(workers, "_children", lambda pid: [13, 12, 11])
+    assert workers.worker_pids() == [11, 13]
+
+
+def test_reset_after_fork_drops_per_process_state():
+    from app import db
+    from app.core import rate_limit
+    from app.services import history
+
+    db._mongo_client = object()
+    history.get_prediction_history()
+    rate_limit.get_rate_limiter()
+
+    workers.reset_after_fork()
+
+    assert db._mongo_client is None and db._mongo_db is None
+    assert history._prediction_history is None
+    assert rate_limit._rate_limiter is None
+
+
+def test_forked_worker_logs_are_written(tmp_path):
+    from app.utils import logger as app_logger
+
+    log = app_logger.get_logger("app.tests.fork")
+    output = tmp_path / "child.log"
+    pid = os.fork()
+    if pid == 0:
+        try:
+            import sys
+            sys.stderr = open(output, "w")  # the new writer streams here
+            workers.reset_after_fork()
+            log.warning("hello from worker %d", os.getpid())
+            app_logger.shutdown_logging()
+            sys.stderr.flush()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert f"hello from worker {pid}" in output.read_text()
@@ -1,38 +1,215 @@
 """
 Logger configuration for the application.
+
+All application loggers share one ``QueueHandler``: request code only
+enqueues records, and a background ``QueueListener`` thread formats them
+(as JSON by default) and writes them to stderr. Records carry the id of
+the request that produced them, and high-volume modules can be rate
+limited so that per-request info lines cannot flood the output.
 """
 
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
 from app.config import settings
 
+# Id of the request being handled, set by the request-id middleware
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_queue_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_pid: Optional[int] = None
+_setup_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves message formatting to the listener thread.
+
+    The record keeps its ``msg`` and ``args``, so ``%`` interpolation runs
+    on the writer thread instead of the request thread. Arguments are
+    therefore rendered as they are when the record is written; log values,
+    not objects the caller goes on mutating. Tracebacks are still rendered
+    here so that queued records do not keep the failing frames alive.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to each record (runs on the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limit INFO-and-below records of one logger to N per second.
+
+    WARNING and above always pass. The number of suppressed records is
+    attached to the next record that gets through.
+    """
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self._window = 0
+        self._count = 0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._count = 0
+            if self._count >= self.per_second:
+                self._suppressed += 1
+                return False
+            self._count += 1
+            suppressed, self._suppressed = self._suppressed, 0
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, int]:
+    """Parse ``"module=N,other.module=M"`` into a mapping."""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+def _build_output_handler() -> logging.Handler:
+    """Create the handler used by the background writer thread."""
+    handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+    return handler
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Create (once) the shared queue handler and start its listener."""
+    global _queue_handler, _listener, _listener_pid
+    if _queue_handler is None:
+        with _setup_lock:
+            if _queue_handler is None:
+                log_queue = queue.SimpleQueue()
+                handler = StructuredQueueHandler(log_queue)
+                handler.addFilter(RequestIdFilter())
+                _listener = logging.handlers.QueueListener(
+                    log_queue, _build_output_handler(), respect_handler_level=False
+                )
+                _listener.start()
+                _listener_pid = os.getpid()
+                atexit.register(shutdown_logging)
+                _queue_handler = handler
+    return _queue_handler
+
+
+def reset_logging_after_fork():
+    """
+    Restart the background writer in a forked child.
+
+    The listener thread does not survive fork, so records the child puts
+    on the inherited queue would never be written. Loggers keep their
+    handler; it gets a fresh queue drained by a new listener. Does nothing
+    in the process that started the current listener.
+    """
+    global _listener, _listener_pid, _setup_lock
+    if _queue_handler is None or _listener_pid == os.getpid():
+        return
+    _setup_lock = threading.Lock()
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, _build_output_handler(), respect_handler_level=False)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a configured logger instance.
-    
+
+    Use lazy ``%s`` arguments rather than f-strings so that filtered or
+    rate-limited records are never formatted.
+
     Args:
         name: Logger name (usually __name__)
-        
+
     Returns:
         Configured logger instance
     """
     logger = logging.getLogger(name)
-    
+
     # Only configure if not already configured
     if not logger.handlers:
         logger.setLevel(settings.LOG_LEVEL)
-        
-        # Console handler
-        handler = logging.StreamHandler()
-        handler.setLevel(settings.LOG_LEVEL)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        
-        logger.addHandler(handler)
-    
+        logger.addHandler(_get_queue_handler())
+
+        limit = _parse_rate_limits(settings.LOG_RATE_LIMITS).get(name)
+        if limit:
+            logger.addFilter(RateLimitFilter(limit))
+
     return logger
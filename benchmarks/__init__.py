@@ -0,0 +1,13 @@
+"""
+Reproducible benchmark suite for the Brain Tumor Chatbot backend.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.15
+
+Microbenchmarks exercise the prediction, chat and auth hot paths directly.
+The load benchmarks drive the real FastAPI app in-process through an ASGI
+transport, with a tiny deterministic model and a mongomock database, so no
+server, TensorFlow model or MongoDB instance is needed.
+"""
@@ -0,0 +1,82 @@
+"""
+Per-request allocation cost of the prediction/chat service layer.
+
+``per_request`` reproduces what the routes used to do on every call: build
+an ``InferenceService`` (with its ``ImageProcessor`` and fallback
+predictor), an ``ExplanationService`` with its own template dictionaries,
+and copy a ``MEDICAL_ANALYSIS_DB`` entry. ``shared`` resolves the same
+objects through the FastAPI dependency getters and returns the precomputed
+read-only analysis.
+
+``model_input.*`` measures the input tensor a single prediction builds:
+``float32`` is the resize, float conversion and division by 255 the
+original Keras model needs; ``uint8_pooled`` writes the resized pixels into
+a reused buffer for a serving export that rescales inside the graph.
+"""
+
+from typing import Any, Dict
+
+from app.testing import TinyModelLoader, synthetic_mri
+from benchmarks.harness import measure_allocations
+
+
+def run(iterations: int = 200) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the allocation benchmarks.
+
+    Args:
+        iterations: Calls per benchmark
+
+    Returns:
+        Mapping of benchmark name to latency and allocation statistics
+    """
+    from app.dependencies import get_explanation_service, get_inference_service
+    from app.services.explanation import ExplanationService
+    from app.services.inference import MEDICAL_ANALYSIS_DB, InferenceService
+
+    model_loader = TinyModelLoader()
+
+    def per_request():
+        service = InferenceService(model_loader)
+        explanation = ExplanationService()
+        explanation.templates = dict(ExplanationService.EXPLANATION_TEMPLATES)
+        explanation.labels = dict(ExplanationService.LABEL_EXPLANATIONS)
+        analysis = MEDICAL_ANALYSIS_DB["Glioma"].copy()
+        analysis["tumor_type"] = "Glioma Tumor"
+        return service, explanation, analysis
+
+    def shared():
+        service = get_inference_service(model_loader)
+        explanation = get_explanation_service()
+        return service, explanation, service.get_medical_analysis(0, 0.9)
+
+    results = {
+        "services.per_request_construction": measure_allocations(per_request, iterations=iterations),
+        "services.shared_singletons": measure_allocations(shared, iterations=iterations),
+    }
+    results.update(_model_input(iterations))
+    return results
+
+
+def _model_input(iterations: int) -> Dict[str, Dict[str, Any]]:
+    from app.core.image_utils import BATCH_BUFFERS, ImageProcessor
+
+    image = synthetic_mri(512).convert("RGB")
+    size = ImageProcessor.IMAGE_SIZE
+
+    def float32():
+        return ImageProcessor.preprocess_image(image)
+
+    def uint8_pooled():
+        buffer = BATCH_BUFFERS.acquire((1, size, size, 3))
+        ImageProcessor.preprocess_image(image, dtype="uint8", out=buffer)
+        BATCH_BUFFERS.release(buffer)
+
+    results = {
+        "model_input.float32": measure_allocations(float32, iterations=iterations),
+        "model_input.uint8_pooled": measure_allocations(uint8_pooled, iterations=iterations),
+    }
+    for stats in results.values():
+        stats["tensor_bytes"] = size * size * 3
+    results["model_input.float32"]["tensor_bytes"] *= 4
+    return results
@@ -0,0 +1,77 @@
+"""
+Grad-CAM overhead: extra latency of explaining a prediction.
+
+Compares a plain ``model.predict`` against the combined forward/backward
+Grad-CAM pass per image and per batch, plus the overlay encoding cost.
+The model benchmarks need TensorFlow and are skipped without it; a small
+randomly initialized CNN with the production input shape stands in for
+the trained model.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from app.testing import synthetic_mri
+from benchmarks.harness import measure
+
+BATCH_SIZES = (1, 8, 32)
+
+
+def _build_model(image_size: int):
+    import tensorflow as tf
+
+    inputs = tf.keras.Input(shape=(image_size, image_size, 3))
+    x = inputs
+    for filters in (16, 32, 64):
+        x = tf.keras.layers.Conv2D(filters, 3, activation="relu", padding="same")(x)
+        x = tf.keras.layers.MaxPooling2D()(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(4, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def run(iterations: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the Grad-CAM benchmarks.
+
+    Args:
+        iterations: Timed iterations per benchmark
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from app.core.image_utils import ImageProcessor
+    from app.services.gradcam import GradCamService
+
+    results = {}
+    service = GradCamService()
+    image = synthetic_mri(512)
+    cam = np.outer(np.hanning(17), np.hanning(17))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "overlay"
+        results["gradcam.encode_overlay.mri_512"] = measure(
+            lambda: service._encode_overlay(image, cam, target), iterations=iterations, warmup=2
+        )
+
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        print("TensorFlow not installed - skipping Grad-CAM model benchmarks")
+        return results
+
+    image_size = ImageProcessor.IMAGE_SIZE
+    model = _build_model(image_size)
+    single = ImageProcessor.preprocess_image(image)
+    for batch_size in BATCH_SIZES:
+        batch = np.repeat(single, batch_size, axis=0)
+        results[f"gradcam.predict.batch_{batch_size}"] = measure(
+            lambda: model.predict(batch, verbose=0), iterations=iterations, warmup=2
+        )
+        results[f"gradcam.predict_with_cam.batch_{batch_size}"] = measure(
+            lambda: service.predict_with_cam(model, batch), iterations=iterations, warmup=2
+        )
+    return results
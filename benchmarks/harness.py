@@ -0,0 +1,171 @@
+"""
+Timing helpers and result comparison for the benchmark suite.
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+
+def summarize(samples_seconds: List[float]) -> Dict[str, Any]:
+    """
+    Summarize a list of durations.
+
+    Args:
+        samples_seconds: Individual durations in seconds
+
+    Returns:
+        Dictionary of latency statistics in milliseconds
+    """
+    ordered = sorted(samples_seconds)
+    count = len(ordered)
+
+    def percentile(p: float) -> float:
+        index = min(count - 1, max(0, int(round(p / 100.0 * (count - 1)))))
+        return ordered[index] * 1000
+
+    return {
+        "iterations": count,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "median_ms": round(percentile(50), 4),
+        "p95_ms": round(percentile(95), 4),
+        "p99_ms": round(percentile(99), 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int = 50, warmup: int = 5) -> Dict[str, Any]:
+    """
+    Time repeated calls of a zero-argument function.
+
+    Args:
+        func: Function to benchmark
+        iterations: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Latency statistics (see ``summarize``)
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def measure_allocations(func: Callable[[], Any], iterations: int = 50, warmup: int = 5) -> Dict[str, Any]:
+    """
+    Time a function and measure the memory it allocates per call.
+
+    Latency is measured without tracing; a second, traced pass records the
+    peak transient allocation and the bytes still held after each call.
+
+    Args:
+        func: Function to benchmark
+        iterations: Number of timed (and traced) calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Latency statistics plus ``alloc_peak_bytes`` and ``alloc_retained_bytes`` medians
+    """
+    stats = measure(func, iterations=iterations, warmup=warmup)
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = func()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+            del result
+    finally:
+        tracemalloc.stop()
+
+    stats["alloc_peak_bytes"] = int(statistics.median(peaks))
+    stats["alloc_retained_bytes"] = int(statistics.median(retained))
+    return stats
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and revision the results were produced on."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        revision = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "git_revision": revision,
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    """Write benchmark results as pretty-printed JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Load benchmark results written by ``write_results``."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.15,
+            metric: str = "median_ms") -> List[Dict[str, Any]]:
+    """
+    Compare two result sets benchmark by benchmark.
+
+    Args:
+        current: Results of this run
+        baseline: Stored baseline results
+        threshold: Allowed relative slowdown before flagging a regression
+        metric: Statistic used for the comparison
+
+    Returns:
+        One row per benchmark present in both sets, with ratio and status
+    """
+    rows = []
+    current_benchmarks = current.get("benchmarks", {})
+    baseline_benchmarks = baseline.get("benchmarks", {})
+
+    for name in sorted(set(current_benchmarks) & set(baseline_benchmarks)):
+        new_value = current_benchmarks[name].get(metric)
+        old_value = baseline_benchmarks[name].get(metric)
+        if not new_value or not old_value:
+            continue
+        ratio = new_value / old_value
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append({
+            "name": name,
+            "baseline": old_value,
+            "current": new_value,
+            "ratio": round(ratio, 3),
+            "status": status,
+        })
+    return rows
@@ -0,0 +1,186 @@
+"""
+Prediction history: write amplification and paginated query latency.
+
+Seeds a predictions collection with ``records`` documents (default one
+million, spread over 100 users) and measures:
+
+- the request-path cost of persisting a prediction, write-behind
+  (``PredictionHistory.record``) against a direct ``insert_one``;
+- write amplification: database round-trips and stored bytes per
+  prediction, compared with the size of the prediction response;
+- first-page and deep-page latency of keyset pagination against the
+  skip/limit query it replaces, at the same depth.
+
+Pass ``--mongo-uri mongodb://localhost:27017`` to run against a real local
+``mongod`` (which also reports keys/documents examined from ``explain``).
+Without it, mongomock stands in; it has no real indexes, so its query
+numbers show the relative cost only and seeding a million records takes
+about a minute.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from bson import BSON, ObjectId
+
+from benchmarks.harness import measure, summarize
+
+USERS = 100
+SEED_CHUNK = 10000
+LABELS = ("Glioma Tumor", "Meningioma Tumor", "No Tumor", "Pituitary Tumor")
+
+
+def _collection(mongo_uri: Optional[str]):
+    if mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongo_uri)["bench_history"]["predictions"]
+    try:
+        import mongomock
+    except ImportError as e:
+        raise RuntimeError("mongomock is required without --mongo-uri: pip install mongomock") from e
+    return mongomock.MongoClient()["bench_history"]["predictions"]
+
+
+def _seed(collection, records: int, users: list):
+    """Insert synthetic history, newest records last, in large chunks."""
+    rng = random.Random(7)
+    base = datetime(2025, 1, 1)
+    for start in range(0, records, SEED_CHUNK):
+        chunk = []
+        for i in range(start, min(start + SEED_CHUNK, records)):
+            label = LABELS[rng.randrange(len(LABELS))]
+            chunk.append({
+                "_id": ObjectId(),
+                "user_id": users[i % len(users)],
+                "created_at": base + timedelta(seconds=i * 7),
+                "top_label": label,
+                "class_index": LABELS.index(label),
+                "confidence": round(rng.random(), 4),
+                "predictions": [{"label": name, "confidence": 0.25} for name in LABELS],
+                "image_url": f"http://localhost:8000/static/{i:032x}.jpg",
+                "thumbnail_url": f"http://localhost:8000/static/derivatives/{i:032x}_thumb128.jpg",
+                "heatmap_url": None,
+                "model_version": "brain_tumor_model.h5",
+                "inference_mode": "single",
+            })
+        collection.insert_many(chunk, ordered=False)
+
+
+def _explain(cursor) -> Dict[str, Any]:
+    """Keys and documents examined, when the server supports explain."""
+    try:
+        stats = cursor.explain().get("executionStats", {})
+    except Exception:
+        return {}
+    return {
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+    }
+
+
+def run(records: int = 1_000_000, iterations: int = 20, mongo_uri: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the history benchmarks.
+
+    Args:
+        records: Documents seeded before measuring queries
+        iterations: Timed queries per measurement
+        mongo_uri: Real MongoDB to use instead of mongomock
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from app.core.serialization import dumps
+    from app.services.history import (
+        HISTORY_SORT, PredictionHistory, build_history_record, create_history_indexes, encode_cursor
+    )
+
+    collection = _collection(mongo_uri)
+    collection.drop()
+    create_history_indexes(collection)
+    users = [ObjectId() for _ in range(USERS)]
+    user = {"_id": users[0]}
+
+    start = time.perf_counter()
+    _seed(collection, records, users)
+    seed_seconds = time.perf_counter() - start
+
+    results = {}
+    prediction = {
+        "predictions": [{"class_index": i, "label": name, "confidence": 0.25, "percentage": 25.0}
+                        for i, name in enumerate(LABELS)],
+        "top_prediction": {"class_index": 0, "label": LABELS[0], "confidence": 0.25, "percentage": 25.0},
+        "image_path": "http://localhost:8000/static/0123456789abcdef0123456789abcdef.jpg",
+        "model_version": "brain_tumor_model.h5",
+        "inference_mode": "single",
+        "medical_analysis": {"description": "x" * 1500},
+        "disclaimer": "MEDICAL DISCLAIMER " * 20,
+    }
+
+    # Request-path cost and write amplification
+    writes = max(200, iterations * 50)
+    history = PredictionHistory(collection, batch_size=100, flush_interval=0.2, max_queue=writes * 2)
+    latencies = []
+    for _ in range(writes):
+        t = time.perf_counter()
+        history.record(user, prediction)
+        latencies.append(time.perf_counter() - t)
+    flush_start = time.perf_counter()
+    history.flush(timeout=120)
+    flush_seconds = time.perf_counter() - flush_start
+    history.stop()
+
+    record_bytes = len(BSON.encode(build_history_record(user, prediction)))
+    stats = summarize(latencies)
+    stats.update({
+        "round_trips_per_record": round(history.stats["batches"] / max(history.stats["written"], 1), 4),
+        "stored_bytes_per_record": record_bytes,
+        "response_bytes": len(dumps(prediction)),
+        "index_entries_per_record": len(collection.index_information()),
+        "drain_ms": round(flush_seconds * 1000, 2),
+    })
+    results["history.write.write_behind_enqueue"] = stats
+
+    stats = measure(lambda: collection.insert_one(build_history_record(user, prediction)),
+                    iterations=min(writes, 200), warmup=5)
+    stats["round_trips_per_record"] = 1.0
+    results["history.write.direct_insert_one"] = stats
+
+    # Query latency: first page, and a deep page via keyset vs skip/limit
+    page = 20
+    per_user = collection.count_documents({"user_id": user["_id"]})
+    depth = max(0, min(per_user - page, 5000))
+    reader = PredictionHistory(collection)
+
+    results["history.query.first_page"] = measure(
+        lambda: reader.query(user["_id"], limit=page), iterations=iterations, warmup=2
+    )
+
+    deep = list(collection.find({"user_id": user["_id"]}, {"created_at": 1}).sort(HISTORY_SORT).skip(depth).limit(1))
+    if deep:
+        cursor = encode_cursor(deep[0]["created_at"], deep[0]["_id"])
+        stats = measure(lambda: reader.query(user["_id"], limit=page, cursor=cursor), iterations=iterations, warmup=2)
+        stats["depth"] = depth
+        keyset_criteria = {"user_id": user["_id"], "$or": [
+            {"created_at": {"$lt": deep[0]["created_at"]}},
+            {"created_at": deep[0]["created_at"], "_id": {"$lt": deep[0]["_id"]}},
+        ]}
+        stats.update(_explain(collection.find(keyset_criteria).sort(HISTORY_SORT).limit(page + 1)))
+        results["history.query.deep_page.keyset"] = stats
+
+        def skip_limit():
+            return list(collection.find({"user_id": user["_id"]}).sort(HISTORY_SORT).skip(depth).limit(page))
+
+        stats = measure(skip_limit, iterations=iterations, warmup=2)
+        stats["depth"] = depth
+        stats.update(_explain(collection.find({"user_id": user["_id"]}).sort(HISTORY_SORT).skip(depth).limit(page)))
+        results["history.query.deep_page.skip_limit"] = stats
+
+    for name in results:
+        results[name].setdefault("records", records)
+    results["history.query.first_page"]["seed_s"] = round(seed_seconds, 1)
+    if mongo_uri:
+        collection.drop()
+    return results
@@ -0,0 +1,154 @@
+"""
+In-process ASGI load generator for /api/predict, /api/chat and /api/login.
+
+Requests go through the full FastAPI stack (middleware, dependencies,
+validation, serialization) via ``httpx.ASGITransport``; the model and the
+database are replaced by the deterministic stand-ins in ``app.testing``.
+
+``load.api_predict`` cycles through distinct images so no two requests in
+flight are identical. ``load.api_predict_duplicates`` sends bursts of
+identical uploads (double clicks, retries), with single-flight coalescing
+on and off.
+"""
+
+import asyncio
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from app.testing import (
+    TEST_USER_EMAIL,
+    TEST_USER_PASSWORD,
+    TinyModelLoader,
+    encode_jpeg,
+    install_mongomock,
+    relax_rate_limits,
+    synthetic_mri,
+)
+from benchmarks.harness import summarize
+
+
+async def _drive(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> Dict[str, Any]:
+    """Send ``total`` requests with at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                failures += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall_start
+
+    stats = summarize(latencies)
+    stats["concurrency"] = concurrency
+    stats["failures"] = failures
+    stats["throughput_rps"] = round(total / wall, 2) if wall > 0 else None
+    return stats
+
+
+async def _drive_bursts(client: httpx.AsyncClient, make_request, total: int, burst: int) -> Dict[str, Any]:
+    """Send ``total`` requests as back-to-back bursts of ``burst`` simultaneous ones."""
+    latencies: List[float] = []
+
+    async def one():
+        start = time.perf_counter()
+        await make_request(client)
+        latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    for _ in range(max(1, total // burst)):
+        await asyncio.gather(*(one() for _ in range(burst)))
+    wall = time.perf_counter() - wall_start
+
+    stats = summarize(latencies)
+    stats["burst"] = burst
+    stats["throughput_rps"] = round(len(latencies) / wall, 2) if wall > 0 else None
+    return stats
+
+
+async def _run(total: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    from app.config import settings
+    from app.dependencies import get_model_loader
+    from app.main import app
+
+    from app.core.single_flight import REQUESTS
+
+    install_mongomock()
+    relax_rate_limits()
+    single_flight = settings.SINGLE_FLIGHT_ENABLED
+    settings.UPLOAD_DIR = tempfile.mkdtemp(prefix="bench_uploads_")
+    model_loader = TinyModelLoader()
+    app.dependency_overrides[get_model_loader] = lambda: model_loader
+
+    images = [encode_jpeg(synthetic_mri(512, seed=i)) for i in range(max(16, 2 * concurrency))]
+    sent = 0
+    login_body = {"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD}
+    chat_body = {
+        "message": "What does a glioma prediction mean?",
+        "prediction_label": "Glioma Tumor",
+        "confidence_score": 0.87,
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/login", json=login_body)
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            async def login(c):
+                return await c.post("/api/login", json=login_body)
+
+            async def chat(c):
+                return await c.post("/api/chat", json=chat_body)
+
+            async def predict(c):
+                nonlocal sent
+                sent += 1
+                files = {"file": ("bench_mri.jpg", images[sent % len(images)], "image/jpeg")}
+                return await c.post("/api/predict", files=files, headers=headers)
+
+            async def duplicate(c):
+                files = {"file": ("bench_mri.jpg", images[0], "image/jpeg")}
+                return await c.post("/api/predict", files=files, headers=headers)
+
+            results = {
+                "load.api_login": await _drive(client, login, max(10, total // 5), concurrency),
+                "load.api_chat": await _drive(client, chat, total, concurrency),
+                "load.api_predict": await _drive(client, predict, total, concurrency),
+            }
+            for enabled in (True, False):
+                settings.SINGLE_FLIGHT_ENABLED = enabled
+                coalesced = REQUESTS.value(flight="predict", role="coalesced")
+                stats = await _drive_bursts(client, duplicate, total, concurrency)
+                stats["coalesced"] = int(REQUESTS.value(flight="predict", role="coalesced") - coalesced)
+                mode = "single_flight" if enabled else "no_single_flight"
+                results[f"load.api_predict_duplicates.{mode}"] = stats
+            return results
+    finally:
+        settings.SINGLE_FLIGHT_ENABLED = single_flight
+        app.dependency_overrides.pop(get_model_loader, None)
+
+
+def run(total: int = 100, concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the load benchmarks.
+
+    Args:
+        total: Requests per endpoint (login uses a fifth, it is CPU-bound hashing)
+        concurrency: Maximum in-flight requests
+
+    Returns:
+        Mapping of benchmark name to latency and throughput statistics
+    """
+    return asyncio.run(_run(total, concurrency))
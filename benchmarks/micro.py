@@ -0,0 +1,157 @@
+"""
+Microbenchmarks for the prediction, chat and auth hot paths.
+"""
+
+from typing import Any, Dict
+
+from app.testing import TinyModelLoader, color_photo, encode_jpeg, natural_photo, synthetic_mri
+from benchmarks.harness import measure
+
+
+def run(iterations: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Run all microbenchmarks.
+
+    Args:
+        iterations: Timed iterations per benchmark (slow cases use fewer)
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from app.core.auth import get_password_hash, verify_password
+    from app.core.image_utils import ImageProcessor
+    from app.core.medical_chatbot_rules import MedicalChatbotRules
+    from app.services.inference import InferenceService
+
+    service = InferenceService(TinyModelLoader())
+    mri_small = synthetic_mri(256)
+    mri_large = synthetic_mri(1024)
+    photo = color_photo()
+    password_hash = get_password_hash("correct horse battery staple")
+    question = "What does a meningioma result with 87% confidence mean for me?"
+    answer = (
+        "A meningioma is usually benign. You should see a neurologist, and I recommend "
+        "you take treatment seriously. You have a good prognosis in most cases."
+    )
+    slow_iterations = max(5, iterations // 5)
+
+    cases = {
+        "validate_brain_image.mri_256": (lambda: service.validate_brain_image(mri_small), iterations),
+        "validate_brain_image.mri_1024": (lambda: service.validate_brain_image(mri_large), iterations),
+        "validate_brain_image.color_photo": (lambda: service.validate_brain_image(photo), iterations),
+        "preprocess_image.mri_256": (lambda: ImageProcessor.preprocess_image(mri_small), iterations),
+        "preprocess_image.mri_1024": (lambda: ImageProcessor.preprocess_image(mri_large), iterations),
+        "fallback_prediction.mri_256": (lambda: service._fallback_prediction(mri_small), iterations),
+        "fallback_prediction.mri_1024": (lambda: service._fallback_prediction(mri_large), iterations),
+        "chat_rules.validate_and_enhance_response": (
+            lambda: MedicalChatbotRules.validate_and_enhance_response(question, answer), iterations
+        ),
+        "auth.get_password_hash": (lambda: get_password_hash("correct horse battery staple"), slow_iterations),
+        "auth.verify_password": (
+            lambda: verify_password("correct horse battery staple", password_hash), slow_iterations
+        ),
+    }
+
+    # Rate limiting: the per-request cost added in front of every /api call
+    from app.core.auth import create_access_token
+    from app.core.rate_limit import MemoryBucketStore, RateLimiter, RouteLimits, parse_limit
+    bucket_store = MemoryBucketStore()
+    unlimited = parse_limit("1000000000/second")
+    rate_limiter = RateLimiter({"predict": RouteLimits(unlimited, unlimited)}, bucket_store)
+    bearer_scope = {
+        "type": "http", "path": "/api/predict", "client": ("10.0.0.1", 5000),
+        "headers": [(b"authorization", f"Bearer {create_access_token({'sub': 'bench@example.com'})}".encode())],
+    }
+    cases["rate_limit.bucket_consume"] = (lambda: bucket_store.consume("predict:ip:10.0.0.1", unlimited), iterations * 20)
+    cases["rate_limit.client_key.bearer"] = (lambda: rate_limiter.client_key(bearer_scope), iterations * 20)
+
+    results = {}
+    for name, (func, count) in cases.items():
+        results[name] = measure(func, iterations=count, warmup=min(5, count))
+
+    # Tiled inference latency is bounded by the patch budget
+    from app.config import settings
+    original_budget = settings.TILE_MAX_PATCHES
+    try:
+        for budget in (1, 5, 16, 32):
+            settings.TILE_MAX_PATCHES = budget
+            results[f"tiled_inference.mri_1024.budget_{budget}"] = measure(
+                lambda: service._predict_tiled(mri_large), iterations=slow_iterations, warmup=1
+            )
+    finally:
+        settings.TILE_MAX_PATCHES = original_budget
+
+    # Test-time augmentation: batch build plus one model call per setting
+    from app.core.augmentation import build_tta_batch
+    processed = ImageProcessor.preprocess_image(mri_small)
+    for count in (1, 4, 8, 12):
+        results[f"tta.mri_256.augmentations_{count}"] = measure(
+            lambda: service._run_model(build_tta_batch(processed, count)), iterations=slow_iterations, warmup=1
+        )
+
+    # Whole-study inference over JPEG slices (decode, pre-filter, batches)
+    import tempfile
+    from app.services.study import StudyService
+    study = StudyService(service)
+    with tempfile.TemporaryDirectory() as study_dir:
+        paths = []
+        for i in range(64):
+            path = f"{study_dir}/slice_{i:03d}.jpg"
+            with open(path, "wb") as f:
+                f.write(encode_jpeg(synthetic_mri(512, seed=i)))
+            paths.append(path)
+        results["study.predict_study.jpeg_512x64"] = measure(
+            lambda: study.predict_study(paths), iterations=max(3, slow_iterations // 2), warmup=1
+        )
+
+    # Staged validation of freshly opened uploads (only the header parsed yet);
+    # full_decode_ms is what decoding alone cost before every check needed pixels
+    from PIL import Image
+    from app.services.inference import VALIDATIONS
+    with tempfile.TemporaryDirectory() as upload_dir:
+        uploads = {
+            "photo_12mp": natural_photo((4000, 3000)),
+            "photo_12mp_noise": color_photo((4000, 3000)),
+            "panorama_12mp": natural_photo((6000, 2000)),
+            "mri_2048": synthetic_mri(2048),
+        }
+        for name, image in uploads.items():
+            path = f"{upload_dir}/{name}.jpg"
+            with open(path, "wb") as f:
+                f.write(encode_jpeg(image))
+            before = {stage: VALIDATIONS.value(stage=stage, outcome="rejected")
+                      for stage in ("header", "preview", "statistics")}
+            stats = measure(
+                lambda: service.validate_brain_image(Image.open(path)), iterations=slow_iterations, warmup=1
+            )
+            stats["full_decode_ms"] = measure(
+                lambda: Image.open(path).load(), iterations=slow_iterations, warmup=1
+            )["median_ms"]
+            stats["rejected_at"] = next(
+                (stage for stage, count in before.items()
+                 if VALIDATIONS.value(stage=stage, outcome="rejected") > count), None
+            )
+            results[f"validate_brain_image.staged.{name}"] = stats
+
+    # Upload derivatives (preview + thumbnails) from an already decoded scan
+    import shutil
+    from app.services.derivatives import get_derivative_service
+    derivatives = get_derivative_service()
+    with tempfile.TemporaryDirectory() as upload_dir:
+        for size in (1024, 2048):
+            scan = synthetic_mri(size).convert("RGB")
+            path = f"{upload_dir}/scan_{size}.jpg"
+            with open(path, "wb") as f:
+                f.write(encode_jpeg(scan))
+
+            def generate_fresh():
+                shutil.rmtree(f"{upload_dir}/derivatives", ignore_errors=True)
+                return derivatives.generate(scan, path)
+
+            stats = measure(generate_fresh, iterations=slow_iterations, warmup=1)
+            stats["storage_overhead"] = generate_fresh()["storage_overhead"]
+            results[f"derivatives.generate.mri_{size}"] = stats
+            results[f"derivatives.generate.mri_{size}.cached"] = measure(
+                lambda: derivatives.generate(scan, path), iterations=slow_iterations, warmup=1
+            )
+    return results
@@ -0,0 +1,80 @@
+"""
+Near-duplicate index: hashing throughput, index build, lookups and joins.
+
+``phash.hash_files`` hashes 64 JPEG scans (512x512) per call, decoded at
+reduced scale; ``images_per_s`` is its throughput. The index benchmarks use
+random 64-bit hashes with 1% planted near-duplicates (3 bits flipped) at
+10k, 100k and 300k items:
+
+- ``build``: constructing the multi-index tables;
+- ``query``: one lookup at the default radius, against ``query_scan``,
+  a vectorized linear scan of every hash (what a lookup costs without an
+  index);
+- ``pairs``: all near-duplicate pairs of the index (corpus deduplication),
+  which a linear scan could only do in O(n^2).
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from app.testing import synthetic_mri
+from benchmarks.harness import measure
+
+SIZES = (10_000, 100_000, 300_000)
+
+
+def _hashes(count: int, rng) -> np.ndarray:
+    hashes = rng.integers(0, 2 ** 63, count, dtype=np.uint64) * np.uint64(2)
+    hashes |= rng.integers(0, 2, count, dtype=np.uint64)
+    planted = count // 100
+    flips = np.zeros(planted, dtype=np.uint64)
+    for _ in range(3):
+        flips |= np.left_shift(np.uint64(1), rng.integers(0, 64, planted).astype(np.uint64))
+    hashes[-planted:] = hashes[:planted] ^ flips
+    return hashes
+
+
+def run(iterations: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the near-duplicate index benchmarks.
+
+    Args:
+        iterations: Timed calls per measurement (fewer for the slow ones)
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from app.core.phash import DEFAULT_RADIUS, HashIndex, hash_files, popcount
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for index in range(64):
+            path = Path(tmp) / f"scan_{index}.jpg"
+            synthetic_mri(512, seed=index).save(path, quality=90)
+            paths.append(str(path))
+        stats = measure(lambda: hash_files(paths), iterations=max(3, iterations // 4), warmup=1)
+        stats["images_per_s"] = round(len(paths) / (stats["median_ms"] / 1000), 1)
+        results["phash.hash_files.64"] = stats
+
+    rng = np.random.default_rng(0)
+    for count in SIZES:
+        hashes = _hashes(count, rng)
+        heavy = max(2, iterations // 10)
+        results[f"phash.build.{count}"] = measure(lambda: HashIndex(hashes), iterations=heavy, warmup=1)
+
+        index = HashIndex(hashes)
+        probes = iter(np.resize(hashes, 1_000_000).tolist())
+        results[f"phash.query.{count}"] = measure(lambda: index.query(next(probes)), iterations=iterations * 10)
+        results[f"phash.query_scan.{count}"] = measure(
+            lambda: np.flatnonzero(popcount(hashes ^ np.uint64(next(probes))) <= DEFAULT_RADIUS),
+            iterations=iterations * 10,
+        )
+
+        pairs = measure(index.pairs, iterations=heavy, warmup=1)
+        pairs["pairs_found"] = len(index.pairs())
+        results[f"phash.pairs.{count}"] = pairs
+    return results
@@ -0,0 +1,74 @@
+"""
+Throughput of the preprocessing shared by training and serving.
+
+Images are 512x512 JPEG files of ``synthetic_mri``, decoded and resized to
+the model input size. ``single`` is one image per call as a request sees
+it; ``single_grayscale`` is the same image stored as 8-bit grayscale
+(DICOM frames, PNG scans), which is resized on one channel. For a batch of 32: ``loop`` preprocesses each image and concatenates
+the results (what the multi-frame and training paths used to do),
+``batch_serial`` fills one preallocated array and normalizes it in one
+operation, and ``batch_threads`` also decodes and resizes on a thread
+pool. ``batch_uint8`` skips the normalization, as for models that rescale
+inside the graph. Each result carries ``images_per_s``.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from app.testing import synthetic_mri
+from benchmarks.harness import measure
+
+
+def _throughput(stats: Dict[str, Any], images: int) -> Dict[str, Any]:
+    stats["images"] = images
+    stats["images_per_s"] = round(images / (stats["median_ms"] / 1000), 1)
+    return stats
+
+
+def run(iterations: int = 20, batch_size: int = 32) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the preprocessing benchmarks.
+
+    Args:
+        iterations: Timed calls per measurement
+        batch_size: Images per batch call
+
+    Returns:
+        Mapping of benchmark name to latency and throughput statistics
+    """
+    from app.core.image_utils import ImageProcessor
+    from app.core.preprocessing import preprocess, preprocess_batch
+
+    size = ImageProcessor.IMAGE_SIZE
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for index in range(batch_size):
+            path = Path(tmp) / f"scan_{index}.jpg"
+            synthetic_mri(512, seed=index).save(path, quality=90)
+            paths.append(str(path))
+
+        single = measure(lambda: preprocess(paths[0], size), iterations=iterations, warmup=2)
+        results["preprocessing.single"] = _throughput(single, 1)
+
+        gray = Path(tmp) / "scan_gray.jpg"
+        synthetic_mri(512).convert("L").save(gray, quality=90)
+        single = measure(lambda: preprocess(str(gray), size), iterations=iterations, warmup=2)
+        results["preprocessing.single_grayscale"] = _throughput(single, 1)
+
+        def loop():
+            return np.concatenate([preprocess(path, size) for path in paths])
+
+        cases = {
+            "loop": loop,
+            "batch_serial": lambda: preprocess_batch(paths, size, workers=1),
+            "batch_threads": lambda: preprocess_batch(paths, size),
+            "batch_uint8": lambda: preprocess_batch(paths, size, dtype="uint8"),
+        }
+        for name, func in cases.items():
+            stats = measure(func, iterations=max(3, iterations // 4), warmup=1)
+            results[f"preprocessing.{name}.{batch_size}"] = _throughput(stats, batch_size)
+    return results
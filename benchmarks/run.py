@@ -0,0 +1,120 @@
+"""
+Benchmark runner.
+
+Usage:
+    python -m benchmarks.run [--suite micro|load|logging|gradcam|allocations|serialization|wire|history|workers|sidecar|preprocessing|phash|all]
+                             [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.15]
+                             [--save-baseline baseline.json]
+
+The history suite seeds --records documents (one million by default) and is
+not part of "all"; point it at a local mongod with --mongo-uri.
+
+Exits with status 1 when a benchmark is slower than the baseline by more
+than the threshold, so the command can gate CI.
+"""
+
+import argparse
+import logging
+import sys
+
+from benchmarks import harness
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the backend benchmark suite")
+    parser.add_argument("--suite", choices=["micro", "load", "logging", "gradcam", "allocations", "serialization", "wire", "history", "workers", "sidecar", "preprocessing", "phash", "all"], default="all")
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations per microbenchmark")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint in load tests")
+    parser.add_argument("--concurrency", type=int, default=8, help="In-flight requests in load tests")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Documents seeded for the history suite")
+    parser.add_argument("--mongo-uri", help="Local MongoDB for the history suite (mongomock otherwise)")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results JSON")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown flagged as regression")
+    parser.add_argument("--metric", default="median_ms", help="Statistic used for comparison")
+    parser.add_argument("--save-baseline", help="Also store the results as a new baseline at this path")
+    args = parser.parse_args(argv)
+
+    # Application logging would dominate the timings
+    logging.disable(logging.WARNING)
+
+    results = {"environment": harness.environment(), "benchmarks": {}}
+
+    if args.suite in ("micro", "all"):
+        from benchmarks import micro
+        results["benchmarks"].update(micro.run(iterations=args.iterations))
+
+    if args.suite in ("load", "all"):
+        from benchmarks import load
+        results["benchmarks"].update(load.run(total=args.requests, concurrency=args.concurrency))
+
+    if args.suite in ("logging", "all"):
+        from benchmarks import logging_overhead
+        results["benchmarks"].update(logging_overhead.run())
+
+    if args.suite in ("gradcam", "all"):
+        from benchmarks import gradcam
+        results["benchmarks"].update(gradcam.run(iterations=max(5, args.iterations // 2)))
+
+    if args.suite in ("allocations", "all"):
+        from benchmarks import allocations
+        results["benchmarks"].update(allocations.run(iterations=args.iterations * 4))
+
+    if args.suite in ("serialization", "all"):
+        from benchmarks import serialization
+        results["benchmarks"].update(serialization.run(iterations=args.iterations * 10))
+
+    if args.suite in ("wire", "all"):
+        from benchmarks import wire
+        results["benchmarks"].update(wire.run(iterations=max(5, args.iterations // 2)))
+
+    if args.suite in ("workers", "all"):
+        from benchmarks import workers
+        results["benchmarks"].update(workers.run())
+
+    if args.suite in ("sidecar", "all"):
+        from benchmarks import sidecar
+        results["benchmarks"].update(sidecar.run(iterations=args.iterations))
+
+    if args.suite in ("preprocessing", "all"):
+        from benchmarks import preprocessing
+        results["benchmarks"].update(preprocessing.run(iterations=max(8, args.iterations // 2)))
+
+    if args.suite in ("phash", "all"):
+        from benchmarks import phash
+        results["benchmarks"].update(phash.run(iterations=max(10, args.iterations // 2)))
+
+    if args.suite == "history":
+        from benchmarks import history
+        results["benchmarks"].update(
+            history.run(records=args.records, iterations=max(5, args.iterations // 5), mongo_uri=args.mongo_uri)
+        )
+
+    harness.write_results(args.output, results)
+    if args.save_baseline:
+        harness.write_results(args.save_baseline, results)
+
+    print(f"{'benchmark':48s} {'median ms':>10s} {'p95 ms':>10s}")
+    for name, stats in sorted(results["benchmarks"].items()):
+        print(f"{name:48s} {stats['median_ms']:10.3f} {stats['p95_ms']:10.3f}")
+    print(f"\nResults written to {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    rows = harness.compare(results, harness.load_results(args.baseline), args.threshold, args.metric)
+    print(f"\nComparison against {args.baseline} ({args.metric}, threshold {args.threshold:.0%}):")
+    for row in rows:
+        marker = {"regression": "❌", "improvement": "✅"}.get(row["status"], "  ")
+        print(f"{marker} {row['name']:46s} {row['baseline']:10.3f} -> {row['current']:10.3f} (x{row['ratio']})")
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) detected")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Serialization cost per response: FastAPI's response-model path vs the
+pre-serialized fast path (with orjson and with the stdlib fallback).
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import Any, Dict
+
+from app.testing import TinyModelLoader, synthetic_mri
+from benchmarks.harness import measure
+
+
+def run(iterations: int = 500) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the serialization benchmarks.
+
+    Args:
+        iterations: Encodings per benchmark
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.api.routes.predict import derivative_urls, encode_prediction
+    from app.core import serialization
+    from app.core.serialization import encode_response
+    from app.schemas.chat import ChatResponse
+    from app.schemas.prediction import PredictionResponse
+    from app.services.inference import InferenceService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scan.png")
+        synthetic_mri(300).save(path)
+        prediction = asyncio.run(InferenceService(TinyModelLoader()).predict_image(path, tta=8))
+    prediction.pop("heatmap_path", None)
+    prediction["derivatives"] = derivative_urls(prediction["derivatives"])
+    chat = {"response": "A meningioma is usually benign. " * 20, "explanation": "General information.",
+            "source": "fallback", "disclaimer": "MEDICAL DISCLAIMER " * 10}
+
+    def response_model_path(model, data):
+        # What FastAPI does for a returned dict: validate, dump, encode, json.dumps
+        return JSONResponse(jsonable_encoder(model.model_validate(data).model_dump(mode="json"))).body
+
+    results = {
+        "serialize.prediction.response_model": measure(
+            lambda: response_model_path(PredictionResponse, prediction), iterations=iterations
+        ),
+        "serialize.chat.response_model": measure(
+            lambda: response_model_path(ChatResponse, chat), iterations=iterations
+        ),
+    }
+
+    orjson_available = serialization.ORJSON_AVAILABLE
+    encoders = ("orjson", "json") if orjson_available else ("json",)
+    try:
+        for encoder in encoders:
+            serialization.ORJSON_AVAILABLE = encoder == "orjson"
+            results[f"serialize.prediction.fast_{encoder}"] = measure(
+                lambda: encode_prediction(prediction), iterations=iterations
+            )
+            results[f"serialize.chat.fast_{encoder}"] = measure(
+                lambda: encode_response(ChatResponse, chat), iterations=iterations
+            )
+    finally:
+        serialization.ORJSON_AVAILABLE = orjson_available
+    return results
@@ -0,0 +1,104 @@
+"""
+Inference server handoff overhead.
+
+Starts the inference server for ``TinyModel`` in a separate process and
+times ``SidecarClient.predict`` with the pixels handed off through shared
+memory and, for comparison, sent inline over the socket. The in-process
+``TinyModel.predict`` on the same batch is the baseline; ``overhead_ms`` is
+the median difference, i.e. what the process boundary costs per call, for a
+single 224x224 image and for a batch of 16. The batching window is zero so
+no request waits for others.
+
+A concurrent run (8 threads, single images, 5 ms window) shows the
+throughput of micro-batching requests from several callers.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from app.testing import TinyModel, start_sidecar
+from benchmarks.harness import measure, summarize
+
+
+def _concurrent(socket_path: str, threads: int, requests: int) -> Dict[str, Any]:
+    from app.services.sidecar import SidecarClient
+
+    client = SidecarClient(socket_path)
+    image = np.random.default_rng(1).random((1, 224, 224, 3), dtype=np.float32)
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            t = time.perf_counter()
+            client.predict(image)
+            with lock:
+                latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(requests // threads,)) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    stats = summarize(latencies)
+    stats.update({"threads": threads, "requests_per_s": round(len(latencies) / elapsed, 1)})
+    return stats
+
+
+def run(iterations: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the inference server benchmarks.
+
+    Args:
+        iterations: Timed calls per measurement
+
+    Returns:
+        Mapping of benchmark name to latency statistics
+    """
+    from app.services.sidecar import SidecarClient
+
+    if not hasattr(os, "fork"):
+        return {}
+
+    results = {}
+    model = TinyModel()
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "inference.sock")
+        server = start_sidecar(socket_path, max_wait_ms=0)
+        try:
+            for rows in (1, 16):
+                batch = rng.random((rows, 224, 224, 3), dtype=np.float32)
+                local = measure(lambda: model.predict(batch), iterations=iterations, warmup=3)
+                local["mb"] = round(batch.nbytes / 2 ** 20, 2)
+                results[f"sidecar.handoff.in_process.{rows}"] = local
+
+                for transport, use_shm in (("shared_memory", True), ("inline", False)):
+                    client = SidecarClient(socket_path, use_shm=use_shm)
+                    stats = measure(lambda: client.predict(batch), iterations=iterations, warmup=3)
+                    client.close()
+                    stats["overhead_ms"] = round(stats["median_ms"] - local["median_ms"], 4)
+                    stats["overhead_per_image_ms"] = round(stats["overhead_ms"] / rows, 4)
+                    stats["mb"] = local["mb"]
+                    results[f"sidecar.handoff.{transport}.{rows}"] = stats
+        finally:
+            server.terminate()
+            server.join(5)
+
+        socket_path = os.path.join(tmp, "batched.sock")
+        server = start_sidecar(socket_path, max_batch=32, max_wait_ms=5)
+        try:
+            results["sidecar.concurrent.8_threads"] = _concurrent(socket_path, threads=8, requests=iterations * 8)
+        finally:
+            server.terminate()
+            server.join(5)
+    return results
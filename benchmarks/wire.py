@@ -0,0 +1,137 @@
+"""
+Bytes on the wire per response, before and after compression.
+
+Each endpoint is requested with ``Accept-Encoding: identity`` (what every
+response used to cost) and with gzip / brotli, through the full app. The
+frontend is also served from a precompressed copy of ``frontend/dist``, and
+a conditional GET with the returned ETag shows the cost of a revalidation.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from app.testing import (
+    TEST_USER_EMAIL,
+    TEST_USER_PASSWORD,
+    TinyModelLoader,
+    encode_jpeg,
+    install_mongomock,
+    relax_rate_limits,
+    synthetic_mri,
+)
+from benchmarks.harness import summarize
+
+FRONTEND_DIST = Path(__file__).parent.parent / "frontend" / "dist"
+
+
+async def _sample(client: httpx.AsyncClient, make_request, iterations: int) -> Dict[str, Any]:
+    """Time a request and record its wire size (body bytes as received)."""
+    latencies: List[float] = []
+    response = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = await make_request(client)
+        await response.aread()
+        latencies.append(time.perf_counter() - start)
+    stats = summarize(latencies)
+    stats["status"] = response.status_code
+    stats["wire_bytes"] = response.num_bytes_downloaded
+    stats["content_encoding"] = response.headers.get("content-encoding", "identity")
+    return stats
+
+
+async def _run(iterations: int) -> Dict[str, Dict[str, Any]]:
+    from app.config import settings
+    from app.core.compression import BROTLI_AVAILABLE, CompressionMiddleware
+    from app.core.static_files import CachedStaticFiles, PrecompressedStaticFiles
+    from app.dependencies import get_model_loader
+    from app.main import app
+    from scripts.precompress_frontend import precompress
+
+    install_mongomock()
+    relax_rate_limits()
+    tmp = tempfile.mkdtemp(prefix="bench_wire_")
+    settings.UPLOAD_DIR = os.path.join(tmp, "uploads")
+    os.makedirs(settings.UPLOAD_DIR)
+    model_loader = TinyModelLoader()
+    app.dependency_overrides[get_model_loader] = lambda: model_loader
+    image_bytes = encode_jpeg(synthetic_mri(512))
+    encodings = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.post(
+                "/api/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD}
+            )
+            auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            files = {"file": ("bench_mri.jpg", image_bytes, "image/jpeg")}
+            prediction = (await client.post("/api/predict", files=files, headers=auth)).json()
+            upload_path = "/" + os.path.basename(prediction["image_path"])
+
+            chat_body = {"message": "What does a glioma prediction mean?",
+                         "prediction_label": "Glioma Tumor", "confidence_score": 0.87}
+            for encoding in encodings:
+                headers = {"Accept-Encoding": encoding}
+                results[f"wire.api_predict.{encoding}"] = await _sample(
+                    client, lambda c: c.post("/api/predict", files=files, headers={**auth, **headers}), iterations
+                )
+                results[f"wire.api_chat.{encoding}"] = await _sample(
+                    client, lambda c: c.post("/api/chat", json=chat_body, headers=headers), iterations
+                )
+
+        # /static is mounted at import time, so serve the temp upload dir directly
+        uploads_app = CompressionMiddleware(
+            CachedStaticFiles(directory=settings.UPLOAD_DIR, max_age=settings.STATIC_MAX_AGE),
+            minimum_size=settings.COMPRESSION_MIN_SIZE,
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=uploads_app), base_url="http://bench") as client:
+            etag = (await client.get(upload_path)).headers.get("etag")
+            results["wire.static_upload.first_get"] = await _sample(client, lambda c: c.get(upload_path), iterations)
+            results["wire.static_upload.conditional_get"] = await _sample(
+                client, lambda c: c.get(upload_path, headers={"If-None-Match": etag}), iterations
+            )
+
+        if FRONTEND_DIST.is_dir():
+            dist = Path(tmp) / "dist"
+            shutil.copytree(FRONTEND_DIST, dist)
+            bundle = max((dist / "assets").glob("*.js"), key=lambda p: p.stat().st_size)
+            asset = "/assets/" + bundle.name
+
+            for label in ("dynamic", "precompressed"):
+                if label == "precompressed":
+                    precompress(dist)
+                static_app = CompressionMiddleware(
+                    PrecompressedStaticFiles(directory=str(dist), html=True), minimum_size=settings.COMPRESSION_MIN_SIZE
+                )
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=static_app), base_url="http://bench") as client:
+                    for encoding in encodings:
+                        if label == "precompressed" and encoding == "identity":
+                            continue
+                        results[f"wire.frontend_bundle.{label}.{encoding}"] = await _sample(
+                            client, lambda c: c.get(asset, headers={"Accept-Encoding": encoding}), iterations
+                        )
+    finally:
+        app.dependency_overrides.pop(get_model_loader, None)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def run(iterations: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the wire-size benchmarks.
+
+    Args:
+        iterations: Requests per measurement
+
+    Returns:
+        Mapping of benchmark name to latency statistics plus ``wire_bytes``
+    """
+    return asyncio.run(_run(iterations))
@@ -0,0 +1,114 @@
+"""
+Pre-fork workers: memory shared between processes and worker start-up time.
+
+Simulates gunicorn's worker model with ``os.fork``. The master holds a
+float32 "weights" array the size of a model plus a heap of small Python
+objects (the imported app), then forks N workers three ways:
+
+- ``per_worker``: nothing preloaded, every worker loads its own weights
+  (what ``uvicorn --workers`` or gunicorn without ``preload_app`` does);
+- ``preload``: weights loaded in the master and shared copy-on-write;
+- ``preload_freeze``: as ``preload``, with ``gc.freeze()`` before forking
+  (what ``prepare_for_fork`` does).
+
+Each worker then runs a garbage collection, as a long-running worker
+eventually will. Reported per mode and worker count: total PSS (memory
+the workers actually use together), total RSS (which counts shared pages
+in every worker) and the mean private memory per worker, read with
+``app.core.workers.process_memory``. Latencies are fork-to-ready times.
+"""
+
+import gc
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.harness import summarize
+
+MODES = ("per_worker", "preload", "preload_freeze")
+
+
+def _load_weights(model_mb: int) -> np.ndarray:
+    weights = np.empty(model_mb * 2 ** 20 // 4, dtype=np.float32)
+    weights.fill(0.5)
+    return weights
+
+
+def _run_workers(count: int, mode: str, model_mb: int, heap: list) -> Dict[str, Any]:
+    from app.core.workers import process_memory
+
+    weights = _load_weights(model_mb) if mode != "per_worker" else None
+    if mode == "preload_freeze":
+        gc.collect()
+        gc.freeze()
+
+    ready_r, ready_w = os.pipe()
+    release_r, release_w = os.pipe()
+    children, starts = [], {}
+    for _ in range(count):
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(release_w)
+            local = weights if weights is not None else _load_weights(model_mb)
+            float(local[::4096].sum())
+            gc.collect()
+            os.write(ready_w, f"{os.getpid()}\n".encode().rjust(16))
+            os.read(release_r, 1)
+            os._exit(0)
+        children.append(pid)
+        starts[pid] = start
+
+    os.close(ready_w)
+    os.close(release_r)
+    ready: List[float] = []
+    for _ in children:
+        pid = int(os.read(ready_r, 16).decode().strip())
+        ready.append(time.perf_counter() - starts[pid])
+
+    memory = [process_memory(pid) for pid in children]
+    os.write(release_w, b"x" * count)
+    for pid in children:
+        os.waitpid(pid, 0)
+    os.close(ready_r)
+    os.close(release_w)
+    if mode == "preload_freeze":
+        gc.unfreeze()
+
+    stats = summarize(ready)
+    stats.update({
+        "workers": count,
+        "model_mb": model_mb,
+        "heap_objects": len(heap),
+        "total_pss_mb": round(sum(m["pss"] for m in memory) / 2 ** 20, 1),
+        "total_rss_mb": round(sum(m["rss"] for m in memory) / 2 ** 20, 1),
+        "private_per_worker_mb": round(sum(m["private"] for m in memory) / len(memory) / 2 ** 20, 1),
+    })
+    return stats
+
+
+def run(worker_counts=(1, 2, 4), model_mb: int = 128, heap_objects: int = 500_000) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the worker memory benchmarks.
+
+    Args:
+        worker_counts: Numbers of workers to fork
+        model_mb: Size of the simulated model weights
+        heap_objects: Small Python objects alive in the master before forking
+
+    Returns:
+        Mapping of benchmark name to start-up latency and memory statistics
+    """
+    if not hasattr(os, "fork") or not os.path.exists(f"/proc/{os.getpid()}/smaps_rollup"):
+        return {}
+
+    # Stand-in for the imported application: many small GC-tracked objects
+    heap = [[i] for i in range(heap_objects)]
+    results = {}
+    for count in worker_counts:
+        for mode in MODES:
+            results[f"workers.{mode}.{count}"] = _run_workers(count, mode, model_mb, heap)
+    return results
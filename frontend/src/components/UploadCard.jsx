@@ -87,7 +87,7 @@ export default function UploadCard(){
             : 'border-cyan-500/20 bg-black/20 hover:border-cyan-500/40 hover:bg-cyan-500/5'
         }`}
       >
-        <input ref={inputRef} type="file" accept="image/*" className="hidden" onChange={(e)=>onFile(e.target.files[0])} />
+        <input ref={inputRef} type="file" accept="image/*,.dcm,application/dicom" className="hidden" onChange={(e)=>onFile(e.target.files[0])} />
         {uploading ? (
           <div className="w-3/4">
             <div className="h-3 bg-[rgba(255,255,255,0.06)] rounded-full overflow-hidden border border-cyan-500/30">
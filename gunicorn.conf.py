@@ -0,0 +1,71 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported and the model loaded once in the master, then the
+workers are forked so they share the model weights copy-on-write instead of
+each loading its own copy. The worker count follows the usable CPUs
+(WEB_CONCURRENCY overrides it); per-worker memory is reported at
+/api/admin/workers and in the ``worker_memory_bytes`` metric.
+
+With INFERENCE_SIDECAR_ENABLED the model is not loaded here at all: the
+master starts the inference server process (app/services/sidecar.py) and
+the workers send it their batches.
+"""
+
+import os
+import subprocess
+import sys
+
+from app.config import settings
+from app.core.workers import prepare_for_fork, recommended_workers, reset_after_fork
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.WEB_CONCURRENCY or recommended_workers(settings.WORKER_MEMORY_MB, maximum=settings.WORKER_MAX)
+preload_app = True
+# Inherited by the workers: in-memory rate limits are split between them
+os.environ["APP_WORKER_COUNT"] = str(workers)
+
+# Studies and tiled inference can keep a worker busy for tens of seconds
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+_sidecar = None
+
+
+def on_starting(server):
+    global _sidecar
+    if not settings.INFERENCE_SIDECAR_ENABLED:
+        return
+    from app.services.sidecar import wait_for_server
+
+    _sidecar = subprocess.Popen([sys.executable, "-m", "app.services.sidecar"])
+    # A child of the master, but not a worker (see app.core.workers.worker_pids)
+    os.environ["APP_SIDECAR_PID"] = str(_sidecar.pid)
+    if not wait_for_server(settings.INFERENCE_SIDECAR_SOCKET, timeout=120):
+        server.log.warning("Inference server not ready; workers use the fallback until it is")
+
+
+def on_exit(server):
+    if _sidecar is not None:
+        _sidecar.terminate()
+        _sidecar.wait(timeout=30)
+
+
+def when_ready(server):
+    prepare_for_fork(load_model=settings.MODEL_PRELOAD)
+    server.log.info("Starting %d workers sharing the preloaded app", server.cfg.workers)
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND != "redis" and server.cfg.workers > 1:
+        server.log.warning(
+            "RATE_LIMIT_BACKEND=%s keeps buckets per worker: each of the %d workers enforces 1/%d "
+            "of every limit; set RATE_LIMIT_BACKEND=redis for exact shared limits",
+            settings.RATE_LIMIT_BACKEND, server.cfg.workers, server.cfg.workers,
+        )
+
+
+def post_fork(server, worker):
+    reset_after_fork()
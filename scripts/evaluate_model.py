@@ -0,0 +1,365 @@
+"""
+Evaluate the serving stack on a labelled data split.
+
+Runs every image of ``app/static/Brain Folders/Testing`` (one folder per
+class) through ``InferenceService.predict_image`` (validation, the shared
+preprocessing and the model, exactly as a request would), spread over
+worker processes that each load the model once. Reports as JSON:
+
+- accuracy over all images (a rejected scan counts as wrong) and over the
+  scans the validator accepted, per-class precision/recall;
+- the confusion matrix, with a "rejected" column;
+- the validator's false-reject rate (every image in the split is an MRI);
+- the distribution of per-image latency (validation + inference).
+
+Predictions are cached per image content in a JSONL file named after the
+pipeline fingerprint: the model file's hash plus the settings and source of
+validation/preprocessing/inference. Re-running with the same model only
+evaluates new or changed images; latency statistics are computed from the
+runs that produced each cached prediction. ``--compare`` prints the change
+against an earlier report.
+
+Usage:
+    python scripts/evaluate_model.py [--data "app/static/Brain Folders/Testing"] [--workers N]
+                                     [--output eval_results.json] [--compare previous.json]
+                                     [--tta 0] [--no-cache]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.config import settings  # noqa: E402
+from app.services.gradcam import file_sha256  # noqa: E402
+from benchmarks.harness import summarize  # noqa: E402
+
+DEFAULT_DATA = ROOT / "app" / "static" / "Brain Folders" / "Testing"
+DEFAULT_CACHE = ROOT / ".eval_cache"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".dcm"}
+
+# Code whose changes invalidate cached predictions
+PIPELINE_SOURCES = [
+    "app/services/inference.py",
+    "app/services/fallback.py",
+    "app/core/preprocessing.py",
+    "app/core/image_utils.py",
+    "app/core/augmentation.py",
+]
+
+REJECTED = "rejected"
+
+
+def list_split(data_dir: Path) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """
+    List a split's class folders and images.
+
+    Class indices follow the sorted folder names, the order the served
+    model's labels are loaded in.
+
+    Args:
+        data_dir: Folder with one sub-folder per class
+
+    Returns:
+        Tuple of (class folder names, [(image path, class index)])
+    """
+    classes = sorted(d.name for d in data_dir.iterdir() if d.is_dir())
+    images = []
+    for index, name in enumerate(classes):
+        for path in sorted((data_dir / name).iterdir()):
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+                images.append((str(path), index))
+    return classes, images
+
+
+def model_fingerprint(model_name: str, tta: int = 0) -> Dict[str, str]:
+    """
+    Identify the model and pipeline predictions were made with.
+
+    Args:
+        model_name: Model file in ``app/models``
+        tta: Test-time augmentations used
+
+    Returns:
+        Dictionary with the model hash and the combined fingerprint
+    """
+    from app.core.model_loader import ModelLoader
+
+    model_path = ModelLoader(model_name).model_path
+    model_hash = file_sha256(str(model_path)) if model_path.exists() else "fallback"
+    digest = hashlib.sha256(model_hash.encode())
+    config = {
+        "image_size": settings.IMAGE_SIZE,
+        "resample": settings.PREPROCESS_RESAMPLE,
+        "validation_max_pixels": settings.VALIDATION_MAX_PIXELS,
+        "validation_preview_size": settings.VALIDATION_PREVIEW_SIZE,
+        "tta": tta,
+    }
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    for source in PIPELINE_SOURCES:
+        digest.update(file_sha256(str(ROOT / source)).encode())
+    return {"model": Path(model_path).name, "model_sha256": model_hash, "fingerprint": digest.hexdigest()[:16]}
+
+
+class PredictionCache:
+    """Append-only JSONL cache of per-image predictions for one fingerprint."""
+
+    def __init__(self, cache_dir: Path, fingerprint: str):
+        self.path = Path(cache_dir) / f"{fingerprint}.jsonl"
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a run interrupted mid-write
+                    self.entries[record["sha256"]] = record
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(sha256)
+
+    def add(self, record: Dict[str, Any]):
+        self.entries[record["sha256"]] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+# Per worker process: one service (and model) for all its images
+_service = None
+_loop = None
+_tta = 0
+
+
+def _init_worker(model_name: str, tta: int):
+    global _service, _loop, _tta
+    import logging
+
+    from app.core.model_loader import ModelLoader
+    from app.services.inference import InferenceService
+
+    logging.disable(logging.WARNING)
+    # Thumbnails would be written next to the dataset images
+    settings.DERIVATIVES_ENABLED = False
+    _service = InferenceService(ModelLoader(model_name))
+    _loop = asyncio.new_event_loop()
+    _tta = tta
+    try:
+        _service.model_loader.get_model()
+    except Exception:
+        pass  # evaluated with the statistics fallback, as the server would
+
+
+def evaluate_image(path: str) -> Dict[str, Any]:
+    """
+    Run one image through the serving stack (in a worker process).
+
+    Returns:
+        Record with status, predicted class, confidence and latency
+    """
+    start = time.perf_counter()
+    try:
+        result = _loop.run_until_complete(_service.predict_image(path, tta=_tta))
+    except Exception as e:
+        return {"status": "error", "error": str(e), "latency_s": time.perf_counter() - start}
+    record = {"status": result["status"], "latency_s": time.perf_counter() - start}
+    if result["status"] == "success":
+        record["predicted"] = result["top_prediction"]["class_index"]
+        record["confidence"] = result["top_prediction"]["confidence"]
+    else:
+        record["reason"] = result.get("validation_reason")
+    return record
+
+
+def run_evaluation(
+    data_dir: Path,
+    model_name: str,
+    workers: int,
+    cache_dir: Optional[Path] = DEFAULT_CACHE,
+    tta: int = 0,
+) -> Dict[str, Any]:
+    """
+    Evaluate a model on a labelled split.
+
+    Args:
+        data_dir: Folder with one sub-folder per class
+        model_name: Model file in ``app/models``
+        workers: Worker processes (each loads the model)
+        cache_dir: Prediction cache directory (None disables the cache)
+        tta: Test-time augmentations per image
+
+    Returns:
+        Report dictionary (see ``build_report``)
+    """
+    classes, images = list_split(data_dir)
+    fingerprint = model_fingerprint(model_name, tta)
+    cache = PredictionCache(cache_dir, fingerprint["fingerprint"]) if cache_dir else None
+
+    records, pending = [], []
+    for path, label in images:
+        sha256 = file_sha256(path)
+        cached = cache.get(sha256) if cache else None
+        if cached is not None:
+            records.append({**cached, "path": path, "label": label, "cached": True})
+        else:
+            pending.append((path, label, sha256))
+
+    start = time.perf_counter()
+    if pending:
+        # Spawned, not forked: the parent may already run threads (and TensorFlow)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(model_name, tta)
+        ) as pool:
+            results = pool.map(evaluate_image, [path for path, _, _ in pending], chunksize=4)
+            for (path, label, sha256), result in zip(pending, results):
+                result["sha256"] = sha256
+                # Errors are not cached, so they are retried next time
+                if cache and result["status"] != "error":
+                    cache.add(result)
+                records.append({**result, "path": path, "label": label, "cached": False})
+    elapsed = time.perf_counter() - start
+
+    report = build_report(records, classes)
+    report.update({
+        **fingerprint,
+        "data": str(data_dir),
+        "workers": workers,
+        "tta": tta,
+        "evaluated": len(pending),
+        "cached": len(records) - len(pending),
+        "wall_time_s": round(elapsed, 2),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return report
+
+
+def build_report(records: List[Dict[str, Any]], classes: List[str]) -> Dict[str, Any]:
+    """
+    Compute quality and latency metrics from per-image records.
+
+    Args:
+        records: Records with label, status, predicted (when accepted) and latency_s
+        classes: Class names by index
+
+    Returns:
+        Dictionary with accuracy, per-class metrics, confusion matrix,
+        false-reject rate and latency statistics
+    """
+    count = len(classes)
+    # Rows: true class; columns: predicted class, then rejected
+    matrix = [[0] * (count + 1) for _ in range(count)]
+    errors = []
+    for record in records:
+        if record["status"] == "error":
+            errors.append({"path": record["path"], "error": record.get("error")})
+            continue
+        column = record["predicted"] if record["status"] == "success" else count
+        matrix[record["label"]][column] += 1
+
+    total = sum(map(sum, matrix))
+    correct = sum(matrix[i][i] for i in range(count))
+    rejected = sum(row[count] for row in matrix)
+    accepted = total - rejected
+
+    per_class = {}
+    for i, name in enumerate(classes):
+        support = sum(matrix[i])
+        predicted = sum(matrix[row][i] for row in range(count))
+        per_class[name] = {
+            "support": support,
+            "precision": round(matrix[i][i] / predicted, 4) if predicted else None,
+            "recall": round(matrix[i][i] / support, 4) if support else None,
+            "rejected": matrix[i][count],
+        }
+
+    latencies = [record["latency_s"] for record in records if record["status"] != "error"]
+    return {
+        "images": total,
+        "accuracy": round(correct / total, 4) if total else None,
+        "accepted_accuracy": round(correct / accepted, 4) if accepted else None,
+        "false_reject_rate": round(rejected / total, 4) if total else None,
+        "per_class": per_class,
+        "confusion_matrix": {
+            "labels": list(classes) + [REJECTED],
+            "rows": {name: dict(zip(list(classes) + [REJECTED], matrix[i])) for i, name in enumerate(classes)},
+        },
+        "latency": summarize(latencies) if latencies else None,
+        "errors": errors,
+    }
+
+
+def compare_reports(current: Dict[str, Any], previous: Dict[str, Any]) -> List[Tuple[str, Any, Any, Any]]:
+    """
+    Headline metric changes between two reports.
+
+    Returns:
+        Rows of (metric, previous, current, delta)
+    """
+    rows = []
+    for metric in ("accuracy", "accepted_accuracy", "false_reject_rate"):
+        rows.append((metric, previous.get(metric), current.get(metric)))
+    for stat in ("median_ms", "p95_ms"):
+        rows.append((
+            f"latency.{stat}",
+            (previous.get("latency") or {}).get(stat),
+            (current.get("latency") or {}).get(stat),
+        ))
+    return [
+        (name, old, new, round(new - old, 4) if old is not None and new is not None else None)
+        for name, old, new in rows
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the serving stack on a labelled split")
+    parser.add_argument("--data", default=str(DEFAULT_DATA), help="Folder with one sub-folder per class")
+    parser.add_argument("--model", default=settings.MODEL_NAME, help="Model file in app/models")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tta", type=int, default=0, help="Test-time augmentations per image")
+    parser.add_argument("--output", default="eval_results.json")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE))
+    parser.add_argument("--no-cache", action="store_true", help="Evaluate every image again")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data)
+    if not data_dir.is_dir():
+        print(f"Data folder not found: {data_dir}", file=sys.stderr)
+        return 1
+
+    report = run_evaluation(
+        data_dir, args.model, max(1, args.workers), None if args.no_cache else Path(args.cache_dir), args.tta
+    )
+    Path(args.output).write_text(json.dumps(report, indent=2))
+
+    latency = report["latency"] or {}
+    print(f"{report['model']} ({report['model_sha256'][:12]}), {report['images']} images "
+          f"({report['evaluated']} evaluated, {report['cached']} cached) in {report['wall_time_s']} s")
+    print(f"accuracy {report['accuracy']}  accepted accuracy {report['accepted_accuracy']}  "
+          f"false rejects {report['false_reject_rate']}  latency median {latency.get('median_ms')} ms "
+          f"p95 {latency.get('p95_ms')} ms")
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print(f"\nAgainst {args.compare}:")
+        for name, old, new, delta in compare_reports(report, previous):
+            print(f"  {name:22s} {old!s:>10} -> {new!s:>10}  ({delta:+})" if delta is not None else f"  {name:22s} {old!s:>10} -> {new!s:>10}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Export the trained model for serving with uint8 input.
+
+Usage:
+    python scripts/export_serving_model.py [app/models/brain_tumor_model.h5] [--output PATH]
+
+Writes ``<stem>_uint8.h5`` (rescaling baked into the graph) and prints a
+parity report against the original. Then set MODEL_NAME to the new file.
+Models from the current training scripts already take uint8 pixels and
+need no export.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.serving_model import export_serving_model  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export a uint8-input serving model")
+    parser.add_argument("model", nargs="?", default="app/models/brain_tumor_model.h5")
+    parser.add_argument("--output", help="Output path (default: <stem>_uint8.h5 next to the model)")
+    args = parser.parse_args(argv)
+
+    try:
+        report = export_serving_model(args.model, args.output)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0 if report["argmax_agreement"] == 1.0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Find near-duplicate images across data splits (train/test leakage).
+
+Hashes every image of the given splits with the perceptual hash of
+``app.core.phash``, joins them with the multi-index hash index and
+reports:
+
+- near-duplicate pairs and groups within the whole corpus;
+- pairs that cross splits (e.g. a Testing image that is a re-encoded
+  Training image), per pair of splits: test accuracy on those is inflated;
+- groups whose images carry different class labels.
+
+Splits default to ``app/static/Brain Folders/Training`` and ``Testing``;
+add uploads or any other folder with ``--split uploads=app/static/uploads``.
+A class is the first folder below the split root (images directly in the
+root have none). ``--index`` saves the hashes for later lookups, and
+``--prune-list`` writes the paths a training run should drop (all but one
+image of each group, every image of a group with conflicting labels).
+
+Usage:
+    python scripts/find_duplicates.py [--split NAME=PATH ...] [--radius 4]
+                                      [--output duplicates.json] [--index hashes.npz] [--prune-list drop.txt]
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.core.phash import DEFAULT_RADIUS, HashIndex, duplicate_groups, hash_files  # noqa: E402
+
+DATA_PATH = ROOT / "app" / "static" / "Brain Folders"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+EXAMPLES = 20
+
+
+def collect(splits: Dict[str, Path]) -> List[Tuple[str, str, str]]:
+    """
+    List the images of every split.
+
+    Returns:
+        (path, split name, class) per image; class is "" for images
+        directly in the split folder
+    """
+    images = []
+    for name, root in splits.items():
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+                parts = path.relative_to(root).parts
+                images.append((str(path), name, parts[0] if len(parts) > 1 else ""))
+    return images
+
+
+def find_duplicates(splits: Dict[str, Path], radius: int = DEFAULT_RADIUS) -> Tuple[Dict[str, Any], HashIndex, List[str]]:
+    """
+    Hash, index and join the images of the splits.
+
+    Args:
+        splits: Split name -> folder
+        radius: Hamming distance at which images count as near-duplicates
+
+    Returns:
+        Tuple of (report, index, indexed paths by id); the report's
+        ``prune`` lists the paths to drop to keep one image per group (and
+        none of a group with conflicting labels)
+    """
+    listed = collect(splits)
+    start = time.perf_counter()
+    hashes, kept = hash_files([path for path, _, _ in listed])
+    hashed = time.perf_counter()
+    images = [listed[i] for i in kept]
+    index = HashIndex(hashes, radius=radius)
+    pairs = index.pairs()
+    joined = time.perf_counter()
+
+    groups = duplicate_groups(pairs, len(images))
+    members = defaultdict(list)
+    for item, group in enumerate(groups.tolist()):
+        members[group].append(item)
+    duplicate_sets = [items for items in members.values() if len(items) > 1]
+
+    cross = Counter()
+    cross_examples = defaultdict(list)
+    for a, b, distance in pairs.tolist():
+        split_a, split_b = images[a][1], images[b][1]
+        if split_a != split_b:
+            key = " / ".join(sorted((split_a, split_b)))
+            cross[key] += 1
+            if len(cross_examples[key]) < EXAMPLES:
+                cross_examples[key].append({"a": images[a][0], "b": images[b][0], "distance": distance})
+
+    leaked = defaultdict(set)
+    for a, b, _ in pairs.tolist():
+        if images[a][1] != images[b][1]:
+            leaked[images[a][1]].add(a)
+            leaked[images[b][1]].add(b)
+
+    conflicting = [items for items in duplicate_sets if len({images[i][2] for i in items}) > 1]
+    conflicts = [
+        [{"path": images[i][0], "split": images[i][1], "class": images[i][2]} for i in items]
+        for items in conflicting
+    ]
+    # Either label of a conflicting group may be wrong, so none of its images is kept
+    prune = [i for items in duplicate_sets for i in sorted(items)[1:]]
+    prune += [items[0] for items in conflicting]
+
+    split_sizes = Counter(split for _, split, _ in images)
+    report = {
+        "images": len(images),
+        "unreadable": len(listed) - len(images),
+        "radius": radius,
+        "pairs": len(pairs),
+        "groups": len(duplicate_sets),
+        "duplicates": sum(len(items) - 1 for items in duplicate_sets),
+        "splits": {
+            name: {
+                "images": split_sizes[name],
+                "leaked": len(leaked[name]),
+                "leaked_fraction": round(len(leaked[name]) / split_sizes[name], 4) if split_sizes[name] else None,
+            }
+            for name in splits
+        },
+        "cross_split_pairs": dict(cross),
+        "cross_split_examples": dict(cross_examples),
+        "label_conflicts": conflicts[:EXAMPLES],
+        "label_conflict_groups": len(conflicts),
+        "timing_s": {"hash": round(hashed - start, 3), "index_and_join": round(joined - hashed, 3)},
+        "prune": sorted(images[i][0] for i in prune),
+    }
+    return report, index, [path for path, _, _ in images]
+
+
+def parse_split(value: str) -> Tuple[str, Path]:
+    name, sep, path = value.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError(f"expected NAME=PATH, got {value!r}")
+    return name, Path(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Find near-duplicate images across data splits")
+    parser.add_argument("--split", type=parse_split, action="append", help="NAME=PATH (repeatable)")
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS, help="Largest Hamming distance of duplicates")
+    parser.add_argument("--output", default="duplicates.json")
+    parser.add_argument("--index", help="Save the hashes and paths as .npz")
+    parser.add_argument("--prune-list", help="Write the paths to drop (one per line)")
+    args = parser.parse_args(argv)
+
+    splits = dict(args.split or [("Training", DATA_PATH / "Training"), ("Testing", DATA_PATH / "Testing")])
+    missing = [str(path) for path in splits.values() if not path.is_dir()]
+    if missing:
+        print(f"Split folders not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    report, index, paths = find_duplicates(splits, args.radius)
+    prune = report.pop("prune")
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.prune_list:
+        Path(args.prune_list).write_text("".join(f"{path}\n" for path in prune))
+    if args.index:
+        index.save(args.index, paths)
+
+    print(f"{report['images']} images, {report['pairs']} near-duplicate pairs in {report['groups']} groups "
+          f"(radius {report['radius']}); hashing {report['timing_s']['hash']} s, "
+          f"index + join {report['timing_s']['index_and_join']} s")
+    for name, stats in report["splits"].items():
+        print(f"  {name}: {stats['leaked']} of {stats['images']} images have a near-duplicate in another split")
+    if report["label_conflict_groups"]:
+        print(f"  {report['label_conflict_groups']} duplicate groups carry different labels")
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Precompress the built frontend for PrecompressedStaticFiles.
+
+Writes ``.gz`` (and ``.br`` when the ``brotli`` package is installed)
+next to every compressible file in ``frontend/dist`` at maximum
+compression, so the server never compresses static assets per request.
+A variant is only kept when it is actually smaller.
+
+Usage (after ``npm run build``):
+    python scripts/precompress_frontend.py [--dist frontend/dist] [--min-size 1024]
+"""
+
+import argparse
+import gzip
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".json", ".svg", ".txt", ".xml", ".map", ".webmanifest"}
+
+
+def precompress(dist: Path, min_size: int = 1024) -> dict:
+    """
+    Write compressed variants for all compressible files under ``dist``.
+
+    Args:
+        dist: Frontend build directory
+        min_size: Skip files smaller than this many bytes
+
+    Returns:
+        Totals of original and compressed bytes per encoding
+    """
+    totals = {"files": 0, "original_bytes": 0, "gzip_bytes": 0, "br_bytes": 0}
+    for path in sorted(dist.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        if len(data) < min_size:
+            continue
+
+        totals["files"] += 1
+        totals["original_bytes"] += len(data)
+        variants = [("gzip", ".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(("br", ".br", brotli.compress(data, quality=11)))
+
+        for encoding, suffix, compressed in variants:
+            target = path.with_name(path.name + suffix)
+            if len(compressed) < len(data):
+                target.write_bytes(compressed)
+                totals[f"{encoding}_bytes"] += len(compressed)
+            elif target.exists():
+                target.unlink()
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precompress frontend/dist assets")
+    parser.add_argument("--dist", default=str(Path(__file__).parent.parent / "frontend" / "dist"))
+    parser.add_argument("--min-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    dist = Path(args.dist)
+    if not dist.is_dir():
+        print(f"Build directory not found: {dist}")
+        return 1
+
+    totals = precompress(dist, args.min_size)
+    print(f"Precompressed {totals['files']} files ({totals['original_bytes']:,} bytes)")
+    print(f"  gzip: {totals['gzip_bytes']:,} bytes")
+    if brotli is not None:
+        print(f"  br:   {totals['br_bytes']:,} bytes")
+    else:
+        print("  br:   skipped (pip install brotli)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
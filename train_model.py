@@ -5,18 +5,21 @@ This script trains a CNN model on the 4 tumor classes and saves it for deploymen
 
 import os
 import numpy as np
-import cv2
 import tensorflow as tf
 from sklearn.model_selection import train_test_split
 from sklearn.utils import shuffle
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout, Input, Rescaling
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping
 from pathlib import Path
+from app.core.phash import dedupe
+from app.core.preprocessing import load_dataset
 
 # Configuration
 IMAGE_SIZE = 150
+# Opt in with PRUNE_DUPLICATES=true: keep one image of each group of near-duplicates
+PRUNE_DUPLICATES = os.getenv("PRUNE_DUPLICATES", "false").lower() == "true"
 BASE_PATH = r"app\static\Brain Folders\Testing"
 MODEL_SAVE_PATH = r"app\models\brain_tumor_model.h5"
 
@@ -42,8 +45,8 @@ os.makedirs(os.path.dirname(MODEL_SAVE_PATH), exist_ok=True)
 
 # Load images from Testing folder
 print("\n📁 Loading images from Testing folder...")
-X_train = []
-Y_train = []
+image_paths = []
+image_labels = []
 
 # Check if data path exists
 if not os.path.exists(BASE_PATH):
@@ -68,33 +71,31 @@ for folder_name, class_index in CLASS_LABELS.items():
         if not os.path.isfile(img_path):
             continue
         
-        try:
-            # Read image
-            img = cv2.imread(img_path)
-            
-            if img is None:
-                continue
-            
-            # Resize to standard size
-            img = cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE))
-            
-            # Append to training data
-            X_train.append(img)
-            Y_train.append(class_index)
-            image_count += 1
-            
-        except Exception as e:
-            print(f"⚠️  Error loading {filename}: {str(e)}")
-            continue
+        image_paths.append(img_path)
+        image_labels.append(class_index)
+        image_count += 1
     
     if image_count > 0:
-        print(f"✅ Loaded {image_count} images")
+        print(f"✅ Found {image_count} images")
     else:
         print(f"❌ No images found")
 
-# Convert to numpy arrays
-X_train = np.array(X_train)
-Y_train = np.array(Y_train)
+# Near-duplicates (re-encoded copies of the same scan) would land on both
+# sides of the train/test split and inflate the test accuracy
+if PRUNE_DUPLICATES:
+    keep, duplicate_pairs, conflicts = dedupe(image_paths, image_labels)
+    print(f"🧹 Pruned {len(image_paths) - len(keep)} near-duplicate images ({len(duplicate_pairs)} pairs)")
+    if conflicts:
+        print(f"⚠️  Skipped {len(conflicts)} near-duplicate groups with conflicting labels:")
+        for group in conflicts:
+            print("   " + ", ".join(f"{image_paths[i]} ({image_labels[i]})" for i in group))
+    image_paths = [image_paths[i] for i in keep]
+    image_labels = [image_labels[i] for i in keep]
+
+# Decode and resize exactly as the server does (RGB, same filter), in parallel;
+# files that cannot be decoded are skipped
+X_train, kept = load_dataset(image_paths, IMAGE_SIZE)
+Y_train = np.array(image_labels)[kept]
 
 print(f"\n📊 Total images loaded: {len(X_train)}")
 
@@ -108,9 +109,8 @@ print(f"📊 Data shape: {X_train.shape}")
 print("\n🔀 Shuffling data...")
 X_train, Y_train = shuffle(X_train, Y_train, random_state=42)
 
-# Normalize images (convert to float and scale to [0, 1])
-print("🎨 Normalizing images...")
-X_train = X_train.astype(np.float32) / 255.0
+# Images stay uint8: the model rescales them to [0, 1] in its first layer,
+# so the saved model takes decoded pixels as served
 
 # Train-test split (80/20)
 print("📌 Splitting data: 80% train, 20% test...")
@@ -129,8 +129,12 @@ print(f"   Test set: {X_test_set.shape} - {len(y_test_set)} samples")
 # Build CNN Model
 print("\n🏗️  Building CNN model...")
 model = Sequential([
+    # uint8 pixels in, normalized to [0, 1] inside the graph
+    Input(shape=(IMAGE_SIZE, IMAGE_SIZE, 3), dtype='uint8'),
+    Rescaling(1.0 / 255),
+    
     # Block 1
-    Conv2D(32, (3, 3), activation='relu', padding='same', input_shape=(IMAGE_SIZE, IMAGE_SIZE, 3)),
+    Conv2D(32, (3, 3), activation='relu', padding='same'),
     Conv2D(32, (3, 3), activation='relu', padding='same'),
     MaxPooling2D((2, 2)),
     Dropout(0.25),
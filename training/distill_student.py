@@ -0,0 +1,345 @@
+"""
+Distill the served CNN into a compact student model for CPU serving.
+
+The teacher (``app/models/brain_tumor_model.h5``) has ~9 conv layers and a
+Flatten -> Dense(512) -> Dense(512) head holding most of its parameters.
+The student is a MobileNet-style network: a strided stem, depthwise
+separable blocks and a global-average-pooling head. It takes uint8 pixels
+and rescales them in the graph, like the serving exports.
+
+The student learns from the teacher's softened probabilities (temperature
+T) mixed with the hard labels:
+
+    loss = alpha * CE(labels, student) + (1 - alpha) * T^2 * CE(soft_teacher, student / T)
+
+Images come from ``app/static/Brain Folders``: ``Training`` for
+distillation (a stratified 10% held out for early stopping, with
+near-duplicates kept on one side), ``Testing`` for the report. Both go through the preprocessing
+shared with serving. The student is saved to
+``app/models/brain_tumor_student.h5`` and registered in
+``app/models/registry.json`` together with the report: parameters,
+latency per image at batch 1 and 32, RSS after loading and running the
+model, and accuracy against the labels and agreement with the teacher.
+The train_model.py teacher saw the Testing images, so its test accuracy
+is optimistic.
+
+Usage:
+    python training/distill_student.py [--teacher app/models/brain_tumor_model.h5]
+                                       [--epochs 30] [--temperature 4] [--alpha 0.3] [--width 1.0]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.core.model_registry import register_model  # noqa: E402
+from app.core.preprocessing import load_dataset, to_model_input  # noqa: E402
+from app.core.workers import process_memory  # noqa: E402
+
+DATA_PATH = ROOT / "app" / "static" / "Brain Folders"
+MODELS_DIR = ROOT / "app" / "models"
+NUM_CLASSES = 4
+
+# Folder names of each class index (same order as the served model)
+CLASS_FOLDERS = [
+    ("glioma_tumor", "glioma"),
+    ("meningioma_tumor", "meningioma"),
+    ("no_tumor", "notumor"),
+    ("pituitary_tumor", "pituitary"),
+]
+
+
+def list_images(split_dir: Path) -> Tuple[List[str], np.ndarray]:
+    """
+    Collect the image paths and class indices of one data split.
+
+    Args:
+        split_dir: ``Training`` or ``Testing`` folder with one folder per class
+
+    Returns:
+        Tuple of (paths, class indices)
+    """
+    paths, labels = [], []
+    for class_index, names in enumerate(CLASS_FOLDERS):
+        for name in names:
+            class_dir = split_dir / name
+            if not class_dir.is_dir():
+                continue
+            for path in sorted(class_dir.iterdir()):
+                if path.is_file():
+                    paths.append(str(path))
+                    labels.append(class_index)
+    return paths, np.array(labels, dtype=np.int64)
+
+
+def load_split(split_dir: Path, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode a split with the shared preprocessing (uint8 NHWC) and its labels."""
+    paths, labels = list_images(split_dir)
+    pixels, kept = load_dataset(paths, size)
+    return pixels, labels[kept]
+
+
+def build_student(input_size: int, width: float = 1.0, num_classes: int = NUM_CLASSES, logits: bool = True):
+    """
+    Build the student network.
+
+    Args:
+        input_size: Side of the square uint8 RGB input
+        width: Channel multiplier for every block
+        num_classes: Output classes
+        logits: End in logits (for training) instead of probabilities
+
+    Returns:
+        Uncompiled Keras model
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    def channels(n):
+        return max(8, int(n * width))
+
+    def separable(x, filters, stride):
+        x = layers.DepthwiseConv2D(3, strides=stride, padding="same", use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU(6.0)(x)
+        x = layers.Conv2D(filters, 1, use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        return layers.ReLU(6.0)(x)
+
+    inputs = tf.keras.Input(shape=(input_size, input_size, 3), dtype="uint8", name="pixels")
+    x = layers.Rescaling(1.0 / 255)(inputs)
+    x = layers.Conv2D(channels(24), 3, strides=2, padding="same", use_bias=False)(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU(6.0)(x)
+    for filters, stride in ((32, 1), (48, 2), (48, 1), (96, 2), (96, 1), (160, 2), (160, 1), (256, 2)):
+        x = separable(x, channels(filters), stride)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    outputs = layers.Dense(num_classes, name="logits")(x)
+    if not logits:
+        outputs = layers.Softmax(name="probabilities")(outputs)
+    return tf.keras.Model(inputs, outputs, name="brain_tumor_student")
+
+
+def soft_targets(probabilities: np.ndarray, temperature: float) -> np.ndarray:
+    """
+    Soften teacher probabilities: softmax(log(p) / T).
+
+    Args:
+        probabilities: Teacher output of shape (N, C)
+        temperature: Softening temperature (1 keeps the distribution)
+
+    Returns:
+        Float32 array of shape (N, C) whose rows sum to 1
+    """
+    logits = np.log(np.clip(probabilities, 1e-7, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def distillation_loss(temperature: float, alpha: float, num_classes: int = NUM_CLASSES):
+    """
+    Keras loss on logits for targets packed as [one-hot labels | soft teacher targets].
+
+    Args:
+        temperature: Softening temperature of the teacher targets
+        alpha: Weight of the hard-label loss
+        num_classes: Classes per half of the packed target
+    """
+    import tensorflow as tf
+
+    def loss(y_true, logits):
+        hard, soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        ce = tf.keras.losses.categorical_crossentropy(hard, logits, from_logits=True)
+        kd = tf.keras.losses.categorical_crossentropy(soft, logits / temperature, from_logits=True)
+        return alpha * ce + (1.0 - alpha) * temperature ** 2 * kd
+
+    return loss
+
+
+def hard_accuracy(num_classes: int = NUM_CLASSES):
+    """Accuracy metric against the one-hot half of the packed targets."""
+    import tensorflow as tf
+
+    def accuracy(y_true, logits):
+        return tf.cast(tf.equal(tf.argmax(y_true[:, :num_classes], 1), tf.argmax(logits, 1)), tf.float32)
+
+    return accuracy
+
+
+def predict(model, pixels: np.ndarray, batch_size: int = 64) -> np.ndarray:
+    """Run a model over uint8 pixels, converted to the dtype its input takes."""
+    dtype = getattr(model.inputs[0].dtype, "name", str(model.inputs[0].dtype))
+    return model.predict(to_model_input(pixels, dtype), batch_size=batch_size, verbose=0)
+
+
+def latency_per_image(model, pixels: np.ndarray, batch: int, repeats: int = 20) -> float:
+    """Median milliseconds per image of a forward pass at a batch size."""
+    dtype = getattr(model.inputs[0].dtype, "name", str(model.inputs[0].dtype))
+    inputs = to_model_input(np.resize(pixels, (batch,) + pixels.shape[1:]), dtype)
+    model.predict_on_batch(inputs)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_on_batch(inputs)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000 / batch)
+
+
+def _measure_rss(model_path: str, input_shape: Tuple[int, ...], queue):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    pixels = np.zeros((32,) + tuple(input_shape), dtype=np.uint8)
+    predict(model, pixels)
+    memory = process_memory(os.getpid()) or {}
+    queue.put(memory.get("rss"))
+
+
+def serving_rss(model_path: str, input_shape: Tuple[int, ...]) -> int:
+    """
+    RSS of a fresh process after loading a model and running a batch of 32.
+
+    A separate process keeps the two models (and TensorFlow's caches for
+    them) from inflating each other's numbers.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_rss, args=(model_path, input_shape, queue))
+    process.start()
+    rss = queue.get(timeout=600)
+    process.join()
+    return rss
+
+
+def model_report(model, model_path: str, test_x: np.ndarray, test_y: np.ndarray, teacher_pred: np.ndarray) -> Dict[str, Any]:
+    """Parameters, latency, RSS and accuracy of one model on the test split."""
+    pred = predict(model, test_x).argmax(axis=1)
+    return {
+        "parameters": int(model.count_params()),
+        "file_bytes": os.path.getsize(model_path),
+        "latency_ms_per_image": {
+            "batch_1": round(latency_per_image(model, test_x, 1), 3),
+            "batch_32": round(latency_per_image(model, test_x, 32), 3),
+        },
+        "rss_bytes": serving_rss(model_path, test_x.shape[1:]),
+        "accuracy": round(float(np.mean(pred == test_y)), 4),
+        "teacher_agreement": round(float(np.mean(pred == teacher_pred)), 4),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Distill a compact student from the served CNN")
+    parser.add_argument("--teacher", default=str(MODELS_DIR / "brain_tumor_model.h5"))
+    parser.add_argument("--output", default=str(MODELS_DIR / "brain_tumor_student.h5"))
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.3, help="Weight of the hard-label loss")
+    parser.add_argument("--width", type=float, default=1.0, help="Student channel multiplier")
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    print(f"🧑‍🏫 Loading teacher {args.teacher}")
+    teacher = tf.keras.models.load_model(args.teacher, compile=False)
+    size = teacher.input_shape[1]
+
+    print("📁 Loading data...")
+    paths, labels = list_images(Path(args.data) / "Training")
+    train_x, kept = load_dataset(paths, size)
+    train_y = labels[kept]
+    test_x, test_y = load_split(Path(args.data) / "Testing", size)
+    if len(train_x) == 0 or len(test_x) == 0:
+        print(f"❌ No images found under {args.data}")
+        return 1
+    print(f"   Train: {len(train_x)} images, test: {len(test_x)} images")
+
+    print(f"🔥 Teacher soft labels (T={args.temperature})...")
+    targets = np.concatenate([
+        tf.keras.utils.to_categorical(train_y, NUM_CLASSES),
+        soft_targets(predict(teacher, train_x), args.temperature),
+    ], axis=1)
+
+    # Images are listed class by class, so Keras' validation_split (the last
+    # rows, unshuffled) would hold out a single class. Hold out a stratified
+    # share instead, keeping near-duplicates on one side of the split
+    from training.search_architecture import near_duplicate_groups, split_groups
+
+    groups = near_duplicate_groups([paths[i] for i in kept])
+    fit_idx, val_idx = split_groups(groups, train_y, 0.1, seed=0)
+
+    student = build_student(size, width=args.width)
+    student.compile(
+        optimizer=tf.keras.optimizers.Adam(args.learning_rate),
+        loss=distillation_loss(args.temperature, args.alpha),
+        metrics=[hard_accuracy()],
+    )
+    print(f"🏗️  Student: {student.count_params():,} parameters (teacher: {teacher.count_params():,})")
+    student.fit(
+        train_x[fit_idx], targets[fit_idx],
+        validation_data=(train_x[val_idx], targets[val_idx]),
+        shuffle=True,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=5, restore_best_weights=True)],
+        verbose=2,
+    )
+
+    # Served models output probabilities
+    serving = build_student(size, width=args.width, logits=False)
+    serving.set_weights(student.get_weights())
+    serving.save(args.output)
+    print(f"💾 Student saved to {args.output}")
+
+    print("📊 Evaluating...")
+    teacher_pred = predict(teacher, test_x).argmax(axis=1)
+    report = {
+        "teacher": model_report(teacher, args.teacher, test_x, test_y, teacher_pred),
+        "student": model_report(serving, args.output, test_x, test_y, teacher_pred),
+        "test_images": int(len(test_x)),
+        "distillation": {
+            "teacher": Path(args.teacher).name,
+            "temperature": args.temperature,
+            "alpha": args.alpha,
+            "width": args.width,
+            "epochs": args.epochs,
+            "train_images": int(len(train_x)),
+        },
+    }
+    teacher_report, student_report = report["teacher"], report["student"]
+    report["compression"] = {
+        "parameters": round(teacher_report["parameters"] / student_report["parameters"], 1),
+        "latency_batch_1": round(
+            teacher_report["latency_ms_per_image"]["batch_1"] / student_report["latency_ms_per_image"]["batch_1"], 2
+        ),
+        "accuracy_delta": round(student_report["accuracy"] - teacher_report["accuracy"], 4),
+    }
+
+    report_path = Path(args.output).with_suffix(".json")
+    report_path.write_text(json.dumps(report, indent=2))
+    entry = register_model(
+        args.output,
+        {"kind": "distilled_student", "input_dtype": "uint8", "report": report},
+        models_dir=Path(args.output).parent,
+    )
+    print(json.dumps(report, indent=2))
+    print(f"✅ Registered {entry['name']} ({entry['sha256'][:12]}); serve it with MODEL_NAME={entry['name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
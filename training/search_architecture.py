@@ -0,0 +1,606 @@
+"""
+Search CNN hyperparameters for the best accuracy per millisecond of CPU inference.
+
+``train_model.py`` hardcodes its architecture (filters, dropout, the
+Flatten -> Dense(512) head, the learning rate). This script samples
+configurations from ``SEARCH_SPACE`` (always including that baseline),
+trains them in parallel worker processes and scores every trial on:
+
+- validation accuracy on a held-out part of the Training split. Near-duplicate
+  groups (``app.core.phash``) stay on one side of the split, so a re-encoded
+  copy of a training image cannot inflate the score;
+- CPU latency per image at batch 1 and 32, measured one model at a time after
+  training so parallel trials do not slow each other's measurements.
+
+The report lists every trial and the Pareto front: the trials no other trial
+beats on both accuracy and batch-1 latency.
+
+The images are decoded once with the preprocessing shared with serving and
+cached as ``.npy`` files. Workers memory-map them, so all processes read the
+same page-cache copy and each batch is gathered on demand. Each worker gets
+``cores / workers`` TensorFlow threads.
+
+Poor trials are stopped early with a median rule. After ``--min-epochs``
+epochs, a trial stops when its best validation accuracy so far is below the
+median best of the other trials at the same epoch. Trials stopped this way
+are reported but get no latency measurement and are not on the front. Within
+a trial, Keras early stopping on the validation loss still applies.
+
+Trial results are appended to a log under ``.search_cache`` named after the
+dataset and the training options, so an interrupted or extended search
+(``--trials`` raised) only trains the new configurations.
+
+Usage:
+    python training/search_architecture.py [--trials 16] [--workers 4] [--epochs 15]
+                                           [--min-epochs 3] [--output search_results.json]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.config import settings  # noqa: E402
+from app.core.phash import DEFAULT_RADIUS, HashIndex, duplicate_groups, hash_files  # noqa: E402
+from app.core.preprocessing import load_dataset  # noqa: E402
+from app.services.gradcam import file_sha256  # noqa: E402
+from training.distill_student import NUM_CLASSES, latency_per_image, list_images  # noqa: E402
+
+DATA_PATH = ROOT / "app" / "static" / "Brain Folders" / "Training"
+DEFAULT_CACHE = ROOT / ".search_cache"
+
+# Values tried per hyperparameter; filters double per block up to 256
+SEARCH_SPACE = {
+    "filters": [16, 24, 32],
+    "blocks": [3, 4],
+    "convs_per_block": [1, 2],
+    "dropout": [0.1, 0.25, 0.4],
+    "head": ["flatten", "gap"],
+    "dense_units": [128, 256, 512],
+    "dense_layers": [1, 2],
+    "head_dropout": [0.3, 0.5],
+    "learning_rate": [3e-4, 1e-3, 3e-3],
+}
+
+# The architecture train_model.py builds
+BASELINE = {
+    "filters": 32,
+    "blocks": 4,
+    "convs_per_block": 2,
+    "dropout": 0.25,
+    "head": "flatten",
+    "dense_units": 512,
+    "dense_layers": 2,
+    "head_dropout": 0.5,
+    "learning_rate": 1e-3,
+}
+
+
+def config_id(config: Dict[str, Any]) -> str:
+    """Stable short identifier of a configuration."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def sample_configs(
+    count: int,
+    space: Dict[str, Sequence[Any]] = SEARCH_SPACE,
+    seed: int = 0,
+    include: Sequence[Dict[str, Any]] = (BASELINE,),
+) -> List[Dict[str, Any]]:
+    """
+    Draw distinct configurations at random from a search space.
+
+    Args:
+        count: Configurations to return (fewer if the space is smaller)
+        space: Hyperparameter -> candidate values
+        seed: Random seed; the same seed gives the same list, and a larger
+            count extends it
+        include: Configurations placed first (the baseline)
+
+    Returns:
+        List of configuration dictionaries
+    """
+    rng = np.random.default_rng(seed)
+    configs = {config_id(config): dict(config) for config in include}
+    size = math.prod(len(values) for values in space.values())
+    attempts = 0
+    while len(configs) < min(count, size + len(include)) and attempts < 100 * count:
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        configs.setdefault(config_id(config), config)
+        attempts += 1
+    return list(configs.values())[:count]
+
+
+def median_stop(curves: Dict[str, List[float]], trial: str, min_epochs: int, min_trials: int = 3) -> bool:
+    """
+    Median stopping rule.
+
+    Args:
+        curves: Trial id -> validation accuracy per epoch so far
+        trial: Trial to decide on (its curve ends at the current epoch)
+        min_epochs: Epochs every trial runs before it can be stopped
+        min_trials: Other trials that must have reached this epoch
+
+    Returns:
+        True if the trial's best accuracy so far is below the median of the
+        other trials' best accuracy over the same number of epochs
+    """
+    curve = curves[trial]
+    epoch = len(curve)
+    if epoch < min_epochs:
+        return False
+    others = [max(c[:epoch]) for t, c in curves.items() if t != trial and len(c) >= epoch]
+    if len(others) < min_trials:
+        return False
+    return max(curve) < float(np.median(others))
+
+
+def pareto_front(trials: List[Dict[str, Any]], accuracy: str = "val_accuracy", latency: str = "latency_ms") -> List[Dict[str, Any]]:
+    """
+    Trials no other trial beats on both accuracy and latency.
+
+    Args:
+        trials: Trial records; those without both values are ignored
+        accuracy: Key of the accuracy (higher is better)
+        latency: Key of the latency (lower is better)
+
+    Returns:
+        Front ordered from fastest to most accurate
+    """
+    scored = [t for t in trials if t.get(accuracy) is not None and t.get(latency) is not None]
+    front, best = [], -math.inf
+    for trial in sorted(scored, key=lambda t: (t[latency], -t[accuracy])):
+        if trial[accuracy] > best:
+            front.append(trial)
+            best = trial[accuracy]
+    return front
+
+
+def near_duplicate_groups(paths: Sequence[str], radius: int = DEFAULT_RADIUS) -> np.ndarray:
+    """
+    Near-duplicate group of each image.
+
+    Returns:
+        Group id per path (the smallest path index of the group); files that
+        cannot be hashed are groups of their own
+    """
+    groups = np.arange(len(paths))
+    hashes, hashed = hash_files(paths)
+    if hashed:
+        found = duplicate_groups(HashIndex(hashes, radius=radius).pairs(), len(hashes))
+        groups[hashed] = np.asarray(hashed)[found]
+    return groups
+
+
+def split_groups(groups: np.ndarray, labels: np.ndarray, val_fraction: float, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stratified train/validation split that keeps each group on one side.
+
+    A group counts toward the class of its first image. Whole groups go to
+    validation, in random order, until that class reaches its share.
+
+    Args:
+        groups: Group id per image (an image index of the group, as from
+            ``near_duplicate_groups``)
+        labels: Class index per image
+        val_fraction: Share of each class to hold out
+        seed: Random seed
+
+    Returns:
+        Tuple of (train indices, validation indices), sorted
+    """
+    rng = np.random.default_rng(seed)
+    validation = np.zeros(len(groups), dtype=bool)
+    group_ids = np.unique(groups)
+    for cls in np.unique(labels):
+        target = round(np.count_nonzero(labels == cls) * val_fraction)
+        taken = 0
+        for group in rng.permutation(group_ids[labels[group_ids] == cls]):
+            if taken >= target:
+                break
+            members = groups == group
+            validation |= members
+            taken += int(np.count_nonzero(members))
+    return np.flatnonzero(~validation), np.flatnonzero(validation)
+
+
+def dataset_key(paths: Sequence[str], size: int) -> str:
+    """Identify the decoded dataset: files, input size and preprocessing."""
+    digest = hashlib.sha256(json.dumps({"size": size, "resample": settings.PREPROCESS_RESAMPLE}).encode())
+    digest.update(file_sha256(str(ROOT / "app" / "core" / "preprocessing.py")).encode())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_dataset(paths: Sequence[str], labels: np.ndarray, size: int, cache_dir: Path) -> Path:
+    """
+    Decode a dataset once into ``pixels.npy``, ``labels.npy`` and ``groups.npy``.
+
+    Args:
+        paths: Image paths
+        labels: Class index per path
+        size: Model input side
+        cache_dir: Directory of the cached datasets
+
+    Returns:
+        Directory of the cached arrays (reused when the files are unchanged)
+    """
+    directory = Path(cache_dir) / f"dataset-{dataset_key(paths, size)}"
+    if directory.is_dir():
+        return directory
+    pixels, kept = load_dataset(paths, size)
+    kept_paths = [paths[i] for i in kept]
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    # Written next to the final directory and renamed, so workers never see a partial dataset
+    tmp = Path(tempfile.mkdtemp(dir=directory.parent, prefix=".dataset-"))
+    np.save(tmp / "pixels.npy", pixels)
+    np.save(tmp / "labels.npy", np.asarray(labels)[kept])
+    np.save(tmp / "groups.npy", near_duplicate_groups(kept_paths))
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # another run cached it first
+    return directory
+
+
+class TrialLog:
+    """Append-only JSONL log of trial results; the last record of a trial wins."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a run interrupted mid-write
+                    self.entries[record["trial"]] = record
+
+    def get(self, trial: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(trial)
+
+    def add(self, record: Dict[str, Any]):
+        self.entries[record["trial"]] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def build_model(config: Dict[str, Any], input_size: int, num_classes: int = NUM_CLASSES):
+    """
+    Build and compile the CNN of one configuration.
+
+    Same layout as ``train_model.py``: uint8 input rescaled in the graph,
+    blocks of 3x3 convolutions + max pooling + dropout, then a dense head.
+
+    Args:
+        config: Configuration with the keys of ``SEARCH_SPACE``
+        input_size: Side of the square RGB input
+        num_classes: Output classes
+
+    Returns:
+        Compiled Keras model ending in probabilities
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(input_size, input_size, 3), dtype="uint8"),
+        layers.Rescaling(1.0 / 255),
+    ])
+    for block in range(config["blocks"]):
+        filters = min(256, config["filters"] * 2 ** block)
+        for _ in range(config["convs_per_block"]):
+            model.add(layers.Conv2D(filters, (3, 3), activation="relu", padding="same"))
+        model.add(layers.MaxPooling2D((2, 2)))
+        model.add(layers.Dropout(config["dropout"]))
+    model.add(layers.Flatten() if config["head"] == "flatten" else layers.GlobalAveragePooling2D())
+    for _ in range(config["dense_layers"]):
+        model.add(layers.Dense(config["dense_units"], activation="relu"))
+        model.add(layers.Dropout(config["head_dropout"]))
+    model.add(layers.Dense(num_classes, activation="softmax"))
+    model.compile(
+        loss="sparse_categorical_crossentropy",
+        optimizer=tf.keras.optimizers.Adam(learning_rate=config["learning_rate"]),
+        metrics=["accuracy"],
+    )
+    return model
+
+
+def _batches(pixels: np.ndarray, labels: np.ndarray, indices: np.ndarray, batch_size: int, shuffle: bool, seed: int = 0):
+    """Keras sequence gathering batches from the memory-mapped pixels."""
+    import tensorflow as tf
+
+    class Batches(tf.keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.order = np.array(indices)
+            self.rng = np.random.default_rng(seed)
+            if shuffle:
+                self.rng.shuffle(self.order)
+
+        def __len__(self):
+            return math.ceil(len(self.order) / batch_size)
+
+        def __getitem__(self, i):
+            # Sorted so the memory map is read front to back
+            batch = np.sort(self.order[i * batch_size:(i + 1) * batch_size])
+            return np.asarray(pixels[batch]), labels[batch]
+
+        def on_epoch_end(self):
+            if shuffle:
+                self.rng.shuffle(self.order)
+
+    return Batches()
+
+
+# Per worker process: the memory-mapped dataset, the split and the shared curves
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(dataset_dir: str, train_idx: np.ndarray, val_idx: np.ndarray, curves, threads: int, options: Dict[str, Any]):
+    import logging
+
+    import tensorflow as tf
+
+    logging.disable(logging.WARNING)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _worker.update({
+        "pixels": np.load(Path(dataset_dir) / "pixels.npy", mmap_mode="r"),
+        "labels": np.load(Path(dataset_dir) / "labels.npy"),
+        "train_idx": train_idx,
+        "val_idx": val_idx,
+        "curves": curves,
+        "options": options,
+    })
+
+
+def run_trial(trial: str, config: Dict[str, Any], model_path: str) -> Dict[str, Any]:
+    """
+    Train one configuration (in a worker process).
+
+    Returns:
+        Record with the validation accuracy, the accuracy curve, whether the
+        median rule stopped the trial, parameters and training time; the
+        model is saved to ``model_path`` unless the trial was stopped
+    """
+    import tensorflow as tf
+
+    pixels, labels, options, curves = _worker["pixels"], _worker["labels"], _worker["options"], _worker["curves"]
+    size = pixels.shape[1]
+    pruned = []
+
+    class MedianStopping(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            # Manager dict: values must be reassigned, not mutated in place
+            curves[trial] = list(curves.get(trial, [])) + [float(logs["val_accuracy"])]
+            if median_stop(dict(curves), trial, options["min_epochs"]):
+                pruned.append(epoch + 1)
+                self.model.stop_training = True
+
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(options["seed"])
+    model = build_model(config, size)
+    train = _batches(pixels, labels, _worker["train_idx"], options["batch_size"], shuffle=True, seed=options["seed"])
+    val = _batches(pixels, labels, _worker["val_idx"], options["batch_size"], shuffle=False)
+    model.fit(
+        train,
+        validation_data=val,
+        epochs=options["epochs"],
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=options["patience"], restore_best_weights=True),
+            MedianStopping(),
+        ],
+        verbose=0,
+    )
+    curve = list(curves.get(trial, []))
+    record = {
+        "trial": trial,
+        "config": config,
+        "parameters": int(model.count_params()),
+        "epochs_run": len(curve),
+        "curve": [round(value, 4) for value in curve],
+        "stopped_early": bool(pruned),
+        "train_time_s": round(time.perf_counter() - start, 1),
+    }
+    if pruned:
+        record["val_accuracy"] = round(max(curve), 4)
+    else:
+        record["val_accuracy"] = round(float(model.evaluate(val, verbose=0)[1]), 4)
+        model.save(model_path)
+        record["model_path"] = model_path
+    return record
+
+
+def measure_latency(model_path: str, repeats: int = 20) -> Dict[str, float]:
+    """Milliseconds per image at batch 1 and 32 (in a worker process)."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    size = model.input_shape[1]
+    pixels = np.random.default_rng(0).integers(0, 256, (32, size, size, 3), dtype=np.uint8)
+    return {
+        "batch_1": round(latency_per_image(model, pixels, 1, repeats), 3),
+        "batch_32": round(latency_per_image(model, pixels, 32, repeats), 3),
+    }
+
+
+def build_report(records: List[Dict[str, Any]], baseline: str) -> Dict[str, Any]:
+    """
+    Rank the trials and compute the Pareto front of accuracy and batch-1 latency.
+
+    Args:
+        records: Trial records (from ``run_trial`` plus latency)
+        baseline: Trial id of the baseline configuration
+
+    Returns:
+        Report with the trials by accuracy, the front and the baseline
+    """
+    trials = sorted(records, key=lambda r: (-r["val_accuracy"], r["trial"]))
+    for record in trials:
+        record["latency_ms"] = (record.get("latency_ms_per_image") or {}).get("batch_1")
+    front = pareto_front(trials)
+    reference = next((r for r in trials if r["trial"] == baseline), None)
+    if reference and reference.get("latency_ms"):
+        for record in front:
+            record["vs_baseline"] = {
+                "accuracy_delta": round(record["val_accuracy"] - reference["val_accuracy"], 4),
+                "speedup": round(reference["latency_ms"] / record["latency_ms"], 2),
+            }
+    return {
+        "trials": trials,
+        "pareto_front": [r["trial"] for r in front],
+        "front": front,
+        "baseline": reference,
+        "completed": sum(not r["stopped_early"] for r in trials),
+        "stopped_early": sum(r["stopped_early"] for r in trials),
+    }
+
+
+def run_search(
+    data_dir: Path,
+    trials: int,
+    workers: int,
+    options: Dict[str, Any],
+    size: int = 150,
+    val_fraction: float = 0.2,
+    cache_dir: Path = DEFAULT_CACHE,
+) -> Dict[str, Any]:
+    """
+    Run the search.
+
+    Args:
+        data_dir: Split with one folder per class
+        trials: Configurations to evaluate (the baseline is the first)
+        workers: Trials trained at the same time
+        options: Training options (epochs, batch_size, patience, min_epochs, seed)
+        size: Model input side
+        val_fraction: Share of each class held out for validation
+        cache_dir: Cache of the decoded dataset, trial log and trial models
+
+    Returns:
+        Report dictionary (see ``build_report``)
+    """
+    paths, labels = list_images(data_dir)
+    dataset_dir = cache_dataset(paths, labels, size, cache_dir)
+    cached_labels = np.load(dataset_dir / "labels.npy")
+    train_idx, val_idx = split_groups(np.load(dataset_dir / "groups.npy"), cached_labels, val_fraction, options["seed"])
+
+    fingerprint = hashlib.sha256(json.dumps({**options, "val_fraction": val_fraction}, sort_keys=True).encode())
+    run_dir = dataset_dir / f"search-{fingerprint.hexdigest()[:10]}"
+    log = TrialLog(run_dir / "trials.jsonl")
+    configs = sample_configs(trials, seed=options["seed"])
+    pending = [(config_id(config), config) for config in configs if log.get(config_id(config)) is None]
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    if pending:
+        # Spawned, not forked: TensorFlow does not survive a fork
+        with context.Manager() as manager:
+            # Curves of earlier runs count toward the median rule
+            curves = manager.dict({t: r["curve"] for t, r in log.entries.items()})
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(str(dataset_dir), train_idx, val_idx, curves, threads, options),
+            ) as pool:
+                futures = {
+                    pool.submit(run_trial, trial, config, str(run_dir / f"{trial}.h5")): trial
+                    for trial, config in pending
+                }
+                for future in as_completed(futures):
+                    record = future.result()
+                    log.add(record)
+                    state = f"stopped at epoch {record['epochs_run']}" if record["stopped_early"] else "done"
+                    print(f"   {record['trial']}: val accuracy {record['val_accuracy']:.4f} ({state})")
+    trained = time.perf_counter()
+
+    # One model at a time, with no training running, so timings are comparable
+    records = [log.get(config_id(config)) for config in configs]
+    unmeasured = [r for r in records if not r["stopped_early"] and "latency_ms_per_image" not in r]
+    if unmeasured:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            for record, latency in zip(unmeasured, pool.map(measure_latency, [r["model_path"] for r in unmeasured])):
+                log.add({**record, "latency_ms_per_image": latency})
+
+    report = build_report([dict(log.get(r["trial"])) for r in records], config_id(BASELINE))
+    report.update({
+        "data": str(data_dir),
+        "images": {"train": int(len(train_idx)), "validation": int(len(val_idx))},
+        "input_size": size,
+        "options": {**options, "val_fraction": val_fraction},
+        "search_space": SEARCH_SPACE,
+        "workers": workers,
+        "trained": len(pending),
+        "cached": len(configs) - len(pending),
+        "wall_time_s": {"training": round(trained - start, 1), "latency": round(time.perf_counter() - trained, 1)},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search scored on accuracy and CPU latency")
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--size", type=int, default=150, help="Model input side")
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--patience", type=int, default=3, help="Epochs without val_loss improvement")
+    parser.add_argument("--min-epochs", type=int, default=3, help="Epochs before the median rule applies")
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE))
+    parser.add_argument("--output", default="search_results.json")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data)
+    if not data_dir.is_dir():
+        print(f"❌ Data folder not found: {data_dir}", file=sys.stderr)
+        return 1
+    options = {
+        "epochs": args.epochs,
+        "batch_size": args.batch_size,
+        "patience": args.patience,
+        "min_epochs": args.min_epochs,
+        "seed": args.seed,
+    }
+    print(f"🔎 Searching {args.trials} configurations on {args.workers} workers...")
+    report = run_search(data_dir, args.trials, args.workers, options, args.size, args.val_fraction, Path(args.cache_dir))
+    Path(args.output).write_text(json.dumps(report, indent=2))
+
+    print(f"\n{report['completed']} trials completed, {report['stopped_early']} stopped early")
+    print("Pareto front (batch-1 latency vs validation accuracy):")
+    for record in report["front"]:
+        baseline = " (baseline)" if report["baseline"] and record["trial"] == report["baseline"]["trial"] else ""
+        print(f"   {record['trial']}: {record['latency_ms']:8.2f} ms  acc {record['val_accuracy']:.4f}  "
+              f"{record['parameters']:>10,} params{baseline}  {json.dumps(record['config'])}")
+    print(f"📄 Report written to {args.output}; trial models are in {args.cache_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
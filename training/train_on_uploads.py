@@ -5,17 +5,21 @@ Trains on images from app/static/uploads/brain tumor folder
 """
 
 import os
+import sys
 import numpy as np
-import cv2
 import tensorflow as tf
 from sklearn.model_selection import train_test_split
 from sklearn.utils import shuffle
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout, Input, Rescaling
 from tensorflow.keras.optimizers import Adam
 from sklearn.metrics import classification_report, confusion_matrix
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.phash import dedupe  # noqa: E402
+from app.core.preprocessing import load_dataset  # noqa: E402
+
 # Optional matplotlib imports - skip if not available
 try:
     import matplotlib.pyplot as plt
@@ -27,6 +31,8 @@ except ImportError:
 
 # Configuration
 IMAGE_SIZE = 150
+# Opt in with PRUNE_DUPLICATES=true: keep one image of each group of near-duplicates
+PRUNE_DUPLICATES = os.getenv("PRUNE_DUPLICATES", "false").lower() == "true"
 DATA_PATH = r"C:\Users\vikas\OneDrive\Desktop\BN\brain-tumor-chatbot\app\static\uploads\brain tumor"
 MODEL_SAVE_PATH = r"C:\Users\vikas\OneDrive\Desktop\BN\brain-tumor-chatbot\app\models\brain_tumor_model.h5"
 
@@ -53,8 +59,8 @@ os.makedirs(os.path.dirname(MODEL_SAVE_PATH), exist_ok=True)
 
 # Load images from folder
 print("\n📁 Loading images from uploads folder...")
-X_train = []
-Y_train = []
+image_paths = []
+image_labels = []
 
 # Check if data path exists
 if not os.path.exists(DATA_PATH):
@@ -104,32 +110,32 @@ for data_folder in data_folders:
             if not os.path.isfile(img_path):
                 continue
             
-            try:
-                # Read image
-                img = cv2.imread(img_path)
-                
-                if img is None:
-                    continue
-                
-                # Resize image
-                img = cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE))
-                
-                # Append to training data with standardized label name
-                X_train.append(img)
-                Y_train.append(label_name)
-                image_count += 1
-                
-            except Exception as e:
-                continue
+            # Standardized label name
+            image_paths.append(img_path)
+            image_labels.append(label_name)
+            image_count += 1
         
         if image_count == 0:
             print(f"❌ (0 images)")
         else:
             print(f"✅ ({image_count} images)")
 
-# Convert to numpy arrays
-X_train = np.array(X_train)
-Y_train = np.array(Y_train)
+# Near-duplicates (re-encoded copies of the same scan) would land on both
+# sides of the train/test split and inflate the test accuracy
+if PRUNE_DUPLICATES:
+    keep, duplicate_pairs, conflicts = dedupe(image_paths, image_labels)
+    print(f"🧹 Pruned {len(image_paths) - len(keep)} near-duplicate images ({len(duplicate_pairs)} pairs)")
+    if conflicts:
+        print(f"⚠️  Skipped {len(conflicts)} near-duplicate groups with conflicting labels:")
+        for group in conflicts:
+            print("   " + ", ".join(f"{image_paths[i]} ({image_labels[i]})" for i in group))
+    image_paths = [image_paths[i] for i in keep]
+    image_labels = [image_labels[i] for i in keep]
+
+# Decode and resize exactly as the server does (RGB, same filter), in parallel;
+# files that cannot be decoded are skipped
+X_train, kept = load_dataset(image_paths, IMAGE_SIZE)
+Y_train = np.array(image_labels)[kept]
 
 print(f"\n📊 Total images loaded: {len(X_train)}")
 print(f"📊 Data shape: {X_train.shape}")
@@ -142,9 +148,7 @@ if len(X_train) == 0:
 print("\n🔀 Shuffling data...")
 X_train, Y_train = shuffle(X_train, Y_train, random_state=101)
 
-# Normalize images
-print("🎨 Normalizing images...")
-X_train = X_train / 255.0
+# Images stay uint8: the model rescales them to [0, 1] in its first layer
 
 # Train-test split
 print("📌 Splitting data into train/test sets...")
@@ -166,7 +170,9 @@ print(f"   Test set: {X_test.shape}")
 # Build CNN Model
 print("\n🏗️  Building CNN model...")
 model = Sequential()
-model.add(Conv2D(32, (3, 3), activation='relu', input_shape=(IMAGE_SIZE, IMAGE_SIZE, 3)))
+model.add(Input(shape=(IMAGE_SIZE, IMAGE_SIZE, 3), dtype='uint8'))
+model.add(Rescaling(1.0 / 255))
+model.add(Conv2D(32, (3, 3), activation='relu'))
 model.add(Conv2D(64, (3, 3), activation='relu'))
 model.add(MaxPooling2D(2, 2))
 model.add(Dropout(0.3))